@@ -0,0 +1,18 @@
+from .src.synthetic import SYNTHETIC_FEATURE_NAMES, make_package_files, write_package, write_tarball, generate_packages, generate_feature_matrix, write_feature_csvs
+from .src.suite import Benchmark, run_benchmark, save_results, load_results, compare_results, parse_size
+
+__all__ = [
+    'SYNTHETIC_FEATURE_NAMES',
+    'make_package_files',
+    'write_package',
+    'write_tarball',
+    'generate_packages',
+    'generate_feature_matrix',
+    'write_feature_csvs',
+    'Benchmark',
+    'run_benchmark',
+    'save_results',
+    'load_results',
+    'compare_results',
+    'parse_size'
+]
@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import traceback
+
+import numpy as np
+
+from .synthetic import SYNTHETIC_FEATURE_NAMES, generate_packages, generate_feature_matrix, write_feature_csvs
+from conf.settings import MODEL_NAMES
+
+
+# 数据集规模的名称
+DATASET_SIZES = {'1k': 1000, '100k': 100000, '1M': 1000000}
+
+# 超过该规模时不再为每个包写特征文件，只测试打包后的特征
+CSV_MAX_PACKAGES = 100000
+
+# 各模型训练时最多使用的样本数，SVM的训练时间随样本数平方增长
+TRAIN_MAX_SAMPLES = {'MLP': 100000, 'NB': 1000000, 'SVM': 10000, 'RF': 100000}
+
+# 比较基线时允许的变慢比例
+REGRESSION_TOLERANCE = 0.25
+
+# 短于该时间（秒）的差异视为噪声
+REGRESSION_MIN_SECONDS = 0.05
+
+
+def parse_size(size: str) -> int:
+    """数据集规模，如1k、100k、1M或直接的包数"""
+    if size in DATASET_SIZES:
+        return DATASET_SIZES[size]
+    return int(size)
+
+def make_model(model_name: str):
+    """使用与保存模型时相同的超参数创建模型"""
+    if model_name == 'RF':
+        from sklearn.ensemble import RandomForestClassifier
+        from conf.settings import DEFAULT_MODEL_HYPER_PARAMETERS
+        return RandomForestClassifier(n_estimators=DEFAULT_MODEL_HYPER_PARAMETERS['RF']['N_ESTIMATORS'], max_depth=DEFAULT_MODEL_HYPER_PARAMETERS['RF']['MAX_DEPTH'])
+    if model_name == 'MLP':
+        from sklearn.neural_network import MLPClassifier
+        from training.src.train_MLP import best_layer_size, best_activation, best_solver, best_learn_rate_init, best_max_iter
+        return MLPClassifier(hidden_layer_sizes=best_layer_size, activation=best_activation, solver=best_solver, learning_rate_init=best_learn_rate_init, max_iter=best_max_iter)
+    if model_name == 'NB':
+        from sklearn.naive_bayes import GaussianNB
+        from training.src.train_NB import best_smoothing
+        return GaussianNB(var_smoothing=best_smoothing)
+    if model_name == 'SVM':
+        from sklearn.svm import SVC
+        from training.src.train_SVM import best_C, best_gamma
+        return SVC(C=best_C, gamma=best_gamma)
+    raise ValueError(f'Unknown model {model_name}')
+
+
+class Benchmark:
+    """
+    记录各阶段的耗时
+    结果以"阶段/规模"为键，如"predict-RF/100k"，值包括耗时（秒）、处理的数量与吞吐量
+    """
+
+    def __init__(self, repeat: int = 1):
+        """
+        :param repeat: 每个阶段重复的次数，取最短的耗时
+        """
+        self.repeat = repeat
+        self.results = {}
+
+    def run(self, name: str, items: int, function, setup=None):
+        """
+        计时并记录一个阶段
+        :param items: 处理的数量（包、文件或行）
+        :param function: 被计时的函数
+        :param setup: 每次计时前调用的函数（如清理上次的输出），不计入耗时
+        :return: 最后一次调用的返回值
+        """
+        seconds = None
+        result = None
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - start
+            seconds = elapsed if seconds is None else min(seconds, elapsed)
+        self.results[name] = {'seconds': seconds, 'items': items, 'items_per_second': items / seconds if seconds > 0 else None}
+        print(f'{name:<24} {seconds:10.3f} s  {items:>9} items  {self.results[name]["items_per_second"] or 0:14.1f} items/s')
+        return result
+
+    def skip(self, name: str, reason: str):
+        """记录跳过的阶段"""
+        self.results[name] = {'skipped': reason}
+        print(f'{name:<24} skipped: {reason}')
+
+
+def bench_extract(benchmark: Benchmark, work_path: str, packages: int, jobs: int, seed: int):
+    """解压并提取合成tarball的特征，需要node与构建好的特征提取程序"""
+    from extraction import extract_tarballs
+    tarball_paths = generate_packages(os.path.join(work_path, 'tarballs'), packages, seed=seed)
+    feature_path = os.path.join(work_path, 'extract-features')
+    position_path = os.path.join(work_path, 'extract-positions')
+    scratch_path = os.path.join(work_path, 'extract-scratch')
+
+    def clean():
+        for path in [feature_path, position_path, scratch_path]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    try:
+        summary = benchmark.run(f'extract/{packages}', packages, lambda: extract_tarballs(tarball_paths, feature_path, position_path, scratch_path, jobs=jobs), setup=clean)
+    except Exception as e:
+        traceback.print_exc()
+        benchmark.skip(f'extract/{packages}', f'{type(e).__name__}: {e}')
+        return
+    if summary['failed'] > 0:
+        print(f'{summary["failed"]} synthetic packages failed to extract, see {summary["log_path"]}')
+
+def bench_load(benchmark: Benchmark, work_path: str, size_name: str, feature_matrix, package_names: list):
+    """读取特征文件与打包后的特征"""
+    import training
+    from training.src.feature_store import write_feature_store
+    n = len(package_names)
+    if n <= CSV_MAX_PACKAGES:
+        csv_path = os.path.join(work_path, f'features-{size_name}')
+        write_feature_csvs(csv_path, feature_matrix, package_names)
+        benchmark.run(f'load-csv/{size_name}', n, lambda: training.read_feature_matrix(csv_path))
+        shutil.rmtree(csv_path)
+    else:
+        benchmark.skip(f'load-csv/{size_name}', f'more than {CSV_MAX_PACKAGES} feature files')
+    store_path = os.path.join(work_path, f'store-{size_name}')
+    write_feature_store(store_path, feature_matrix, package_names, SYNTHETIC_FEATURE_NAMES)
+    benchmark.run(f'load-store/{size_name}', n, lambda: np.asarray(training.read_feature_matrix(store_path)[0]))
+    shutil.rmtree(store_path)
+
+def bench_train(benchmark: Benchmark, size_name: str, feature_matrix, labels, model_names: list):
+    """使用保存模型时的超参数训练各模型，训练样本数不超过TRAIN_MAX_SAMPLES"""
+    for model_name in model_names:
+        n = min(len(labels), TRAIN_MAX_SAMPLES[model_name])
+        X = feature_matrix[:n]
+        y = labels[:n]
+        benchmark.run(f'train-{model_name}/{size_name}', n, lambda: make_model(model_name).fit(X, y))
+
+def bench_predict(benchmark: Benchmark, size_name: str, feature_matrix, model_names: list):
+    """使用models中保存的模型（以及已编译的真值表）预测"""
+    import training
+    n = feature_matrix.shape[0]
+    for model_name in model_names:
+        # 先加载一次模型，只计预测的时间
+        training.get_model(model_name)
+        benchmark.run(f'predict-{model_name}/{size_name}', n, lambda: training.predict_matrix(model_name, feature_matrix))
+        table = training.load_truth_table(model_name)
+        if table is not None:
+            benchmark.run(f'predict-table-{model_name}/{size_name}', n, lambda: table.score(feature_matrix))
+
+def bench_report(benchmark: Benchmark, work_path: str, size_name: str, package_names: list, y_pred):
+    """分块写入预测报告"""
+    import training
+    report_path = os.path.join(work_path, f'report-{size_name}.csv')
+
+    def write():
+        with training.ReportWriter(report_path, ['package name', 'predict']) as writer:
+            writer.write_rows(zip(package_names, y_pred))
+
+    benchmark.run(f'report/{size_name}', len(package_names), write)
+    os.remove(report_path)
+
+def get_environment() -> dict:
+    """运行环境，比较基线时结果只有在相同环境下才有意义"""
+    import sklearn
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'argv': sys.argv
+    }
+
+def run_benchmark(sizes: list = ['1k'], model_names: list = MODEL_NAMES, stages: list = None, packages: int = 50, jobs: int = 1, seed: int = 0, repeat: int = 1, work_path: str = None) -> dict:
+    """
+    运行基准测试
+    :param sizes: 合成特征数据集的规模，见parse_size
+    :param model_names: 训练与预测的模型
+    :param stages: 运行的阶段（extract、load、train、predict、report），None表示全部
+    :param packages: 提取特征时合成的tarball数量
+    :param jobs: 提取特征时并行的进程数
+    :param seed: 随机种子
+    :param repeat: 每个阶段重复的次数，取最短的耗时
+    :param work_path: 存放合成数据的临时文件夹，None表示使用系统临时文件夹，结束后删除
+    :return: 包括运行环境与各阶段结果的字典
+    """
+    stages = stages or ['extract', 'load', 'train', 'predict', 'report']
+    benchmark = Benchmark(repeat)
+    work_path = tempfile.mkdtemp(prefix='npm-benchmark-', dir=work_path)
+    try:
+        if 'extract' in stages:
+            bench_extract(benchmark, work_path, packages, jobs, seed)
+        for size in sizes:
+            size_name = size if size in DATASET_SIZES else str(parse_size(size))
+            feature_matrix, labels, package_names = generate_feature_matrix(parse_size(size), seed=seed)
+            if 'load' in stages:
+                bench_load(benchmark, work_path, size_name, feature_matrix, package_names)
+            if 'train' in stages:
+                bench_train(benchmark, size_name, feature_matrix, labels, model_names)
+            if 'predict' in stages:
+                bench_predict(benchmark, size_name, feature_matrix, model_names)
+            if 'report' in stages:
+                bench_report(benchmark, work_path, size_name, package_names, labels)
+    finally:
+        shutil.rmtree(work_path, ignore_errors=True)
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': get_environment(),
+        'seed': seed,
+        'results': benchmark.results
+    }
+
+def save_results(results: dict, results_path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+    with open(results_path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+def load_results(results_path: str) -> dict:
+    with open(results_path) as f:
+        return json.load(f)
+
+def compare_results(results: dict, baseline: dict, tolerance: float = REGRESSION_TOLERANCE, min_seconds: float = REGRESSION_MIN_SECONDS) -> list:
+    """
+    与基线比较，两次都运行了的阶段才比较
+    :param tolerance: 允许的变慢比例
+    :param min_seconds: 短于该时间的差异视为噪声
+    :return: 变慢的阶段列表，每项为(阶段, 基线耗时, 本次耗时)
+    """
+    regressions = []
+    for name, result in results['results'].items():
+        base = baseline['results'].get(name)
+        if base is None or 'seconds' not in base or 'seconds' not in result:
+            continue
+        ratio = result['seconds'] / base['seconds'] if base['seconds'] > 0 else float('inf')
+        regressed = result['seconds'] > base['seconds'] * (1 + tolerance) and result['seconds'] - base['seconds'] > min_seconds
+        if regressed:
+            regressions.append((name, base['seconds'], result['seconds']))
+        print(f'{"SLOW" if regressed else "OK  "} {name:<24} {base["seconds"]:10.3f} s -> {result["seconds"]:10.3f} s  ({ratio:.2f}x)')
+    if baseline.get('environment', {}).get('platform') != results['environment']['platform'] or baseline.get('environment', {}).get('cpu_count') != results['environment']['cpu_count']:
+        print('Warning: the baseline was recorded on a different machine')
+    return regressions
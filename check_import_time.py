@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+
+ROOT_PATH = os.path.dirname(os.path.abspath(__file__))
+
+# 检查的命令，只显示帮助信息，不会执行任何操作
+COMMANDS = [
+    ['cli.py', '-h'],
+    ['cli.py', 'extract', '-h'],
+    ['cli.py', 'predict', '-h'],
+    ['task.py', '-h']
+]
+
+# 启动时不应导入的模块
+FORBIDDEN_MODULES = ['sklearn', 'scipy', 'prettytable']
+
+# 默认的导入时间预算（毫秒）
+IMPORT_TIME_BUDGET = 300
+
+
+def measure_import_time(command: list) -> list:
+    """
+    使用python -X importtime运行命令
+    :return: [导入总时间（毫秒）, 运行时间（毫秒）, 导入的模块名列表, 顶层导入的(模块名, 累计时间)列表]
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', *command], cwd=ROOT_PATH, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall_time = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f'{" ".join(command)} exited with code {result.returncode}:\n{result.stderr}')
+    modules = []
+    top_level = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.append(name.strip())
+        # 顶层导入的模块名前只有一个空格
+        if not name.startswith('  '):
+            top_level.append((name.strip(), int(cumulative) / 1000))
+    return [sum(cumulative for _, cumulative in top_level), wall_time, modules, top_level]
+
+def check_command(command: list, budget: float) -> bool:
+    """检查一个命令的导入时间与导入的模块"""
+    import_time, wall_time, modules, top_level = measure_import_time(command)
+    forbidden = [module for module in FORBIDDEN_MODULES if module in modules]
+    passed = import_time <= budget and len(forbidden) == 0
+    print(f'{"OK  " if passed else "FAIL"} {" ".join(command)}: imports {import_time:.0f} ms (budget {budget:.0f} ms), total {wall_time:.0f} ms')
+    if len(forbidden) > 0:
+        print(f'     imports {", ".join(forbidden)}')
+    if not passed:
+        for name, cumulative in sorted(top_level, key=lambda item: item[1], reverse=True)[:5]:
+            print(f'     {cumulative:8.1f} ms  {name}')
+    return passed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that the command line tools start without importing heavy modules.')
+    parser.add_argument('-b', '--budget', type=float, default=IMPORT_TIME_BUDGET, help='import time budget of each command in milliseconds')
+    args = parser.parse_args()
+    results = [check_command(command, args.budget) for command in COMMANDS]
+    if not all(results):
+        exit(1)
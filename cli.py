@@ -1,11 +1,14 @@
 import os
+import json
 import shutil
 import argparse
-import traceback
 
 from conf.settings import (
     FEATURES_PATH,
     FEATURE_POSITIONS_PATH,
+    EXTRACT_CACHE_PATH,
+    EXTRACT_PACKAGE_TIMEOUT,
+    EXTRACT_MEMORY_LIMIT,
     REPORTS_PATH,
     MALICIOUS_DATASETS_PATH,
     BENIGN_DATASETS_PATH,
@@ -15,20 +18,15 @@ from conf.settings import (
     BENIGN_DATASET_NAMES,
     UNKOWN_DATASET_NAMES,
     FEATURE_NAMES,
+    FEATURE_POSITION_NAMES,
     MODEL_NAMES,
+    ENSEMBLE_VOTES,
     PREPROCESS_METHOD_NAMES,
     MODEL_HYPER_PARAMETERS
 )
-from training import (
-    PreprocessMethodEnum,
-    ModelEnum,
-    ActionEnum,
-    train,
-    predict_package_MLP,
-    predict_package_NB,
-    predict_package_SVM,
-    predict_package_RF
-)
+from extraction import ExtractCache, ExtractLimits, get_quarantine_path, extract_dataset, print_extract_summary, PositionStore, pack_position_dir, close_position_stores
+# training只在用到时导入对应模块，避免启动时导入sklearn
+import training
 
 
 def extract_cli():
@@ -49,15 +47,21 @@ def extract_cli():
     if os.path.exists(feature_path):
         shutil.rmtree(feature_path)
     os.makedirs(feature_path)
+    # 特征位置库只追加写入，重新提取时清空
+    if os.path.exists(feature_position_path):
+        shutil.rmtree(feature_position_path)
 
+    # 超时或超出内存上限的包在新的进程中重试一次，仍失败时记入隔离名单
+    limits = ExtractLimits(timeout=args.timeout or None, memory_limit=args.memory_limit or None, quarantine_path=get_quarantine_path(feature_path))
+    cache = ExtractCache(EXTRACT_CACHE_PATH)
     try:
-        cwd = os.getcwd()
-        os.chdir('feature-extract')
-        os.system(f'npm run start {dataset_path} {feature_path} {feature_position_path}')
-        os.chdir(cwd)
-    except Exception:
-        print(f'Error: {dataset_name}')
-        traceback.print_exc()
+        summary = extract_dataset(dataset_path, feature_path, feature_position_path, jobs=args.jobs, cache=cache, force=args.force, fast=args.fast, limits=limits)
+    finally:
+        cache.close()
+        close_position_stores()
+    print_extract_summary(summary)
+    if summary['failed'] > 0:
+        exit(1)
 
 def train_cli():
     """训练模型"""
@@ -71,31 +75,31 @@ def train_cli():
     hyper_parameters = {}
 
     if preprocess_method == 'none':
-        preprocess = PreprocessMethodEnum.NONE
+        preprocess = training.PreprocessMethodEnum.NONE
     elif preprocess_method == 'standardlize':
-        preprocess = PreprocessMethodEnum.STANDARDLIZE
+        preprocess = training.PreprocessMethodEnum.STANDARDLIZE
     elif preprocess_method == 'min-max-scale':
-        preprocess = PreprocessMethodEnum.MIN_MAX_SCALE
+        preprocess = training.PreprocessMethodEnum.MIN_MAX_SCALE
 
     if action_name == 'training':
-        action = ActionEnum.TRAINING
+        action = training.ActionEnum.TRAINING
     elif action_name == 'save':
-        action = ActionEnum.SAVE
+        action = training.ActionEnum.SAVE
     elif action_name == 'test':
-        action = ActionEnum.TEST
+        action = training.ActionEnum.TEST
 
     if model_name == 'MLP':
-        model = ModelEnum.MLP
+        model = training.ModelEnum.MLP
     elif model_name == 'NB':
-        model = ModelEnum.NB
+        model = training.ModelEnum.NB
     elif model_name == 'SVM':
-        model = ModelEnum.SVM
+        model = training.ModelEnum.SVM
     elif model_name == 'RF':
-        model = ModelEnum.RF
+        model = training.ModelEnum.RF
         hyper_parameters['n_estimators'] = args.hyper_estimators
         hyper_parameters['max_depth'] = args.hyper_depth
 
-    train(malicous_csv_dir_path, normal_csv_dir_path, preprocess, model, action, hyper_parameters)
+    training.train(malicous_csv_dir_path, normal_csv_dir_path, preprocess, model, action, hyper_parameters, search_workers=args.workers, search_resume=args.resume, search_method=args.search, dedupe=args.dedupe)
 
 def test_cli():
     """测试模型
@@ -108,63 +112,59 @@ def test_cli():
     normal_csv_dir_path = os.path.join(FEATURES_PATH, benign_dataset_name)
 
     report_name = f'{malicious_dataset_name}-{benign_dataset_name}-{model_name}-report-1.csv'
-    report_content = 'package name, package path, actual, predict\n'
-    report_data = []
-    for feature_file_name in os.listdir(malicous_csv_dir_path):
-        feature_file_path = os.path.join(malicous_csv_dir_path, feature_file_name)
-        if model_name == 'MLP':
-            result = predict_package_MLP(feature_file_path)
-        elif model_name == 'NB':
-            result = predict_package_NB(feature_file_path)
-        elif model_name == 'SVM':
-            result = predict_package_SVM(feature_file_path)
-        elif model_name == 'RF':
-            result = predict_package_RF(feature_file_path)
-        report_content += feature_file_name + ', ' + feature_file_path + ', ' + 'malicious' + ', ' + result + '\n'
-        report_data.append((feature_file_name, feature_file_path, 'malicious', result))
-    
-    for feature_file_name in os.listdir(normal_csv_dir_path):
-        feature_file_path = os.path.join(normal_csv_dir_path, feature_file_name)
-        if model_name == 'MLP':
-            result = predict_package_MLP(feature_file_path)
-        elif model_name == 'NB':
-            result = predict_package_NB(feature_file_path)
-        elif model_name == 'SVM':
-            result = predict_package_SVM(feature_file_path)
-        elif model_name == 'RF':
-            result = predict_package_RF(feature_file_path)
-        report_content += feature_file_name + ', ' + feature_file_path + ', ' + 'benign' + ', ' + result + '\n'
-        report_data.append((feature_file_name, feature_file_path, 'benign', result))
+    report_path = os.path.join(REPORTS_PATH, report_name)
+    # 以特征文件路径标识每个包，恶意包与良性包数据集中可能有同名的包
+    columns = ['package name', 'package path', 'actual', 'predict']
+    with training.ReportWriter(report_path, columns, resume=args.resume, parquet=args.parquet, key_column=1) as writer:
+        for csv_dir_path, actual in [(malicous_csv_dir_path, 'malicious'), (normal_csv_dir_path, 'benign')]:
+            feature_matrix, package_names = training.read_feature_matrix(csv_dir_path)
+            training.write_predictions(
+                writer,
+                lambda matrix: training.predict_matrix(model_name, matrix)[0],
+                feature_matrix,
+                package_names,
+                lambda package_name, result: (package_name + '.csv', os.path.join(csv_dir_path, package_name + '.csv'), actual, result),
+                make_key=lambda package_name: os.path.join(csv_dir_path, package_name + '.csv')
+            )
 
-    with open(os.path.join(REPORTS_PATH, report_name), 'w') as f:
-        f.write(report_content)
-    
     # calculate evaluation metrics
-    TP = 0
-    FP = 0
-    TN = 0
-    FN = 0
-    for data in report_data:
-        if data[2] == 'malicious' and data[3] == 'malicious':
-            TP += 1
-        elif data[2] == 'malicious' and data[3] == 'benign':
-            FN += 1
-        elif data[2] == 'benign' and data[3] == 'malicious':
-            FP += 1
-        elif data[2] == 'benign' and data[3] == 'benign':
-            TN += 1
-    accuracy = (TP + TN) / (TP + TN + FP + FN)
-    precision = TP / (TP + FP)
-    recall = TP / (TP + FN)
-    f1_score = 2 * precision * recall / (precision + recall)
+    # 从报告中统计，继续中断的测试时之前写入的包也被计入
+    rows = list(training.read_report(report_path))
+    y_true = [row[2] for row in rows]
+    y_pred = [row[3] for row in rows]
+    metrics = training.evaluate(y_true, y_pred)
 
     report_name = f'{malicious_dataset_name}-{benign_dataset_name}-{model_name}-report-2.csv'
     report_content = 'TP, FP, TN, FN, accuracy, precision, recall, f1_score\n'
-    report_content += f'{TP}, {FP}, {TN}, {FN}, {accuracy}, {precision}, {recall}, {f1_score}\n'
+    report_content += f"{metrics['TP']}, {metrics['FP']}, {metrics['TN']}, {metrics['FN']}, {metrics['accu']}, {metrics['prec']}, {metrics['rec']}, {metrics['f1']}\n"
 
     with open(os.path.join(REPORTS_PATH, report_name), 'w') as f:
         f.write(report_content)
 
+    if args.bootstrap > 0:
+        intervals = training.bootstrap_ci(y_true, y_pred, n_resamples=args.bootstrap)
+        for name, (low, high) in intervals.items():
+            print(f'{name}: {metrics[name]:.4f} (95% CI {low:.4f} - {high:.4f})')
+
+    if args.thresholds:
+        # 每个阈值上的指标，需要恶意概率，因此重新预测两个数据集
+        y_true = []
+        y_score = []
+        for csv_dir_path, actual in [(malicous_csv_dir_path, 'malicious'), (normal_csv_dir_path, 'benign')]:
+            feature_matrix, _ = training.read_feature_matrix(csv_dir_path)
+            _, y_proba = training.predict_matrix(model_name, feature_matrix)
+            if y_proba is None:
+                raise ValueError(f'Model {model_name} does not support predict_proba')
+            y_true += [actual] * len(y_proba)
+            y_score += y_proba.tolist()
+        sweep = training.threshold_sweep(y_true, y_score)
+        report_name = f'{malicious_dataset_name}-{benign_dataset_name}-{model_name}-report-thresholds.csv'
+        with open(os.path.join(REPORTS_PATH, report_name), 'w') as f:
+            f.write('threshold, TP, FP, TN, FN, accuracy, precision, recall, f1_score, mcc\n')
+            for i in range(len(sweep['threshold'])):
+                f.write(', '.join(str(sweep[name][i]) for name in ['threshold', 'TP', 'FP', 'TN', 'FN', 'accu', 'prec', 'rec', 'f1', 'matt_cor']) + '\n')
+    print(training.get_model_registry().report())
+
 def predict_cli():
     """预测包
     对指定的数据集进行预测（恶意包或良性包）
@@ -173,22 +173,103 @@ def predict_cli():
     model_name = args.model
 
     report_name = f'{dataset_name}-{model_name}-report.csv'
-    report_content = 'package name, predict\n'
     csv_dir_path = os.path.join(FEATURES_PATH, dataset_name)
-    for feature_file_name in os.listdir(csv_dir_path):
-        feature_file_path = os.path.join(csv_dir_path, feature_file_name)
-        if model_name == 'MLP':
-            result = predict_package_MLP(feature_file_path)
-        elif model_name == 'NB':
-            result = predict_package_NB(feature_file_path)
-        elif model_name == 'SVM':
-            result = predict_package_SVM(feature_file_path)
-        elif model_name == 'RF':
-            result = predict_package_RF(feature_file_path)
-        report_content += feature_file_name[:-4] + ', ' + result + '\n'
+    feature_matrix, package_names = training.read_feature_matrix(csv_dir_path)
+    if model_name == 'all':
+        predict_ensemble(report_name, csv_dir_path, feature_matrix, package_names)
+        return
+    # 与task.py相同，模型已编译为真值表时查表预测，不加载模型
+    table = None if args.no_table else training.load_truth_table(model_name)
+    if table is not None:
+        table.check_feature_names(training.get_dataset_feature_names(csv_dir_path))
+        predict = table.predict
+    else:
+        predict = lambda matrix: training.predict_matrix(model_name, matrix)[0]
+    with training.ReportWriter(os.path.join(REPORTS_PATH, report_name), ['package name', 'predict'], resume=args.resume, parquet=args.parquet) as writer:
+        count = training.write_predictions(
+            writer,
+            predict,
+            feature_matrix,
+            package_names,
+            lambda package_name, result: (package_name, result)
+        )
+    print(f'Predicted {count} packages{" with the truth table" if table is not None else ""}, skipped {len(package_names) - count} already in the report')
+    print(training.get_model_registry().report())
 
-    with open(os.path.join(REPORTS_PATH, report_name), 'w') as f:
-        f.write(report_content)
+def predict_ensemble(report_name: str, csv_dir_path: str, feature_matrix, package_names: list):
+    """
+    用所有模型一起预测数据集，特征矩阵只读取一次，每块特征矩阵由各模型同时预测
+    报告中包括每个模型的预测结果与恶意概率，以及按--vote合并的集成结果
+    """
+    with training.EnsembleScorer(MODEL_NAMES, vote=args.vote, threshold=args.threshold, use_table=not args.no_table, workers=args.workers) as scorer:
+        scorer.check_feature_names(training.get_dataset_feature_names(csv_dir_path))
+        with training.ReportWriter(os.path.join(REPORTS_PATH, report_name), scorer.columns, resume=args.resume, parquet=args.parquet) as writer:
+            count = training.write_predictions(
+                writer,
+                scorer.rows,
+                feature_matrix,
+                package_names,
+                lambda package_name, row: (package_name, *row)
+            )
+    print(f'Predicted {count} packages with {", ".join(MODEL_NAMES)} ({args.vote} vote), skipped {len(package_names) - count} already in the report')
+    print(training.get_model_registry().report())
+
+def pack_cli():
+    """打包特征
+    将数据集的特征文件打包为按位压缩的特征矩阵，之后读取数据集只需一次mmap
+    """
+    dataset_name = args.dataset
+    csv_dir_path = os.path.join(FEATURES_PATH, dataset_name)
+    package_number = training.pack_feature_dir(csv_dir_path, remove_csv=args.remove_csv)
+    print(f'Packed features of {package_number} packages in {csv_dir_path}')
+    # 之前版本的特征提取程序每个包写入一个特征位置JSON文件
+    feature_position_path = os.path.join(FEATURE_POSITIONS_PATH, dataset_name)
+    if os.path.isdir(feature_position_path):
+        try:
+            package_number = pack_position_dir(feature_position_path, remove_json=args.remove_csv)
+        finally:
+            close_position_stores()
+        print(f'Packed feature positions of {package_number} packages in {feature_position_path}')
+
+def positions_cli():
+    """查询特征位置
+    读取一个包的特征位置，或查找有某个特征记录的所有包，每行输出一个JSON
+    """
+    store = PositionStore(os.path.join(FEATURE_POSITIONS_PATH, args.dataset))
+    if args.package is not None:
+        positions = store.get(args.package)
+        if positions is None:
+            print(f'No feature positions of {args.package} in {args.dataset}')
+            exit(1)
+        print(json.dumps({'package': args.package, 'positions': positions}, ensure_ascii=False))
+    else:
+        for package_name, records in store.search(args.feature):
+            print(json.dumps({'package': package_name, args.feature: records}, ensure_ascii=False))
+
+def compile_cli():
+    """编译模型
+    将模型编译为真值表，编译后检查真值表与模型的预测结果是否一致
+    """
+    model_name = args.model
+    csv_dir_paths = [os.path.join(FEATURES_PATH, dataset_name) for dataset_name in args.dataset or []]
+    # 保存特征顺序，预测时检查
+    feature_names = training.get_dataset_feature_names(csv_dir_paths[0]) if len(csv_dir_paths) > 0 else None
+    table = training.compile_truth_table(model_name, feature_names, workers=args.workers)
+    print(f'Compiled {model_name} into {table.table_dir}, the truth table agrees with the model on {min(1 << table.feature_count, training.CHECK_SAMPLE_SIZE)} re-predicted feature vectors')
+    for csv_dir_path in csv_dir_paths:
+        feature_matrix, package_names = training.read_feature_matrix(csv_dir_path)
+        mismatches = training.check_truth_table_on_matrix(table, feature_matrix)
+        print(f'{csv_dir_path}: {len(package_names)} packages, {mismatches} mismatches')
+        if mismatches > 0:
+            exit(1)
+
+def serve_cli():
+    """启动评分服务
+    常驻的HTTP（或Unix socket）服务，模型只加载一次，并发请求合并为小批量预测
+    """
+    # 评分服务导入numpy与模型，只在使用时导入
+    from service import serve
+    serve(args.model, host=args.host, port=args.port, unix_socket=args.unix_socket, max_batch_size=args.max_batch, max_wait=args.max_wait_ms / 1000, jobs=args.jobs, scratch_path=args.scratch, use_table=not args.no_table)
 
 if __name__ == '__main__':
     hyper_parameters = {}
@@ -198,6 +279,11 @@ if __name__ == '__main__':
     # extract CLI parameters
     parser_extract = subparsers.add_parser('extract', help='extract features', description='Extract features from given dataset.')
     parser_extract.add_argument('-d', '--dataset', type=str, required=True, help='dataset name', choices=DATASET_NAMES)
+    parser_extract.add_argument('-j', '--jobs', type=int, default=1, help='number of extractor processes running at once')
+    parser_extract.add_argument('--force', action='store_true', help='analyze every package again instead of reusing cached features')
+    parser_extract.add_argument('--timeout', type=float, default=EXTRACT_PACKAGE_TIMEOUT, help=f'seconds an extractor process may spend on one package before it is killed and the package retried, 0 disables the deadline (default: {EXTRACT_PACKAGE_TIMEOUT})')
+    parser_extract.add_argument('--memory-limit', type=int, default=EXTRACT_MEMORY_LIMIT, help=f'memory ceiling of an extractor process in MiB, 0 disables it (default: {EXTRACT_MEMORY_LIMIT})')
+    parser_extract.add_argument('--fast', action='store_true', help='stop analyzing a package once no remaining JS file can change its feature vector; feature positions are marked as truncated')
 
     # train CLI parameters
     parser_train = subparsers.add_parser('train', help='train model', description='Train model with given dataset.')
@@ -208,17 +294,61 @@ if __name__ == '__main__':
     parser_train.add_argument('-a', '--action', type=str, required=True, help='action', choices=['training', 'save', 'test'])
     parser_train.add_argument('-he', '--hyper-estimators', type=int, help='number of estimators of model to save', choices=MODEL_HYPER_PARAMETERS['RF']['N_ESTIMATORS'])
     parser_train.add_argument('-hd', '--hyper-depth', type=int, help='max depth of model to save', choices=MODEL_HYPER_PARAMETERS['RF']['MAX_DEPTH'])
+    parser_train.add_argument('-w', '--workers', type=int, help='number of processes training models at once in hyper parameter search (default: number of CPUs)')
+    parser_train.add_argument('--resume', action='store_true', help='continue an interrupted hyper parameter search instead of starting over')
+    parser_train.add_argument('--dedupe', action='store_true', help='train on unique (feature vector, label) rows weighted by their counts, for models accepting sample weights')
+    parser_train.add_argument('--search', type=str, default='grid', choices=['grid', 'halving'], help='hyper parameter search method, halving drops weak hyper parameters early on growing subsets of the training set')
 
     # test CLI parameters
     parser_test = subparsers.add_parser('test', help='test model', description='Test model with given dataset.')
     parser_test.add_argument('-m', '--malicious', type=str, required=True, help='malicious dataset name', choices=MALICIOUS_DATASET_NAMES)
     parser_test.add_argument('-b', '--benign', type=str, required=True, help='benign dataset name', choices=BENIGN_DATASET_NAMES)
     parser_test.add_argument('-o', '--model', type=str, required=True, help='model name', choices=MODEL_NAMES)
+    parser_test.add_argument('--resume', action='store_true', help='continue an interrupted test, skipping packages already in the report')
+    parser_test.add_argument('--parquet', action='store_true', help='also write the report as Parquet (requires pyarrow)')
+    parser_test.add_argument('--thresholds', action='store_true', help='also write the metrics at every decision threshold of the malicious probability (not supported by SVM)')
+    parser_test.add_argument('--bootstrap', type=int, default=0, help='number of bootstrap resamples for confidence intervals of the metrics (default: 0, no intervals)')
 
     # predict CLI parameters
     parser_predict = subparsers.add_parser('predict', help='predict package', description='Predict package with given model.')
     parser_predict.add_argument('-d', '--dataset', type=str, help='dataset name', choices=FEATURE_NAMES)
-    parser_predict.add_argument('-o', '--model', type=str, required=True, help='model name', choices=MODEL_NAMES)
+    parser_predict.add_argument('-o', '--model', type=str, required=True, help='model name, all scores with every model and adds an ensemble verdict', choices=MODEL_NAMES + ['all'])
+    parser_predict.add_argument('--resume', action='store_true', help='continue an interrupted prediction, skipping packages already in the report')
+    parser_predict.add_argument('--parquet', action='store_true', help='also write the report as Parquet (requires pyarrow)')
+    parser_predict.add_argument('--vote', type=str, default='majority', help='how the ensemble verdict combines the models with -o all (default: majority)', choices=ENSEMBLE_VOTES)
+    parser_predict.add_argument('--threshold', type=float, default=0.5, help='fraction of malicious votes (majority) or mean malicious probability (mean-proba) for a malicious ensemble verdict (default: 0.5)')
+    parser_predict.add_argument('-w', '--workers', type=int, help='number of models predicting at once with -o all (default: number of models)')
+    parser_predict.add_argument('--no-table', action='store_true', help='predict with the model(s) even if they have been compiled into truth tables')
+
+    # pack CLI parameters
+    parser_pack = subparsers.add_parser('pack', help='pack features', description='Pack feature files of given dataset into a memory-mapped feature store.')
+    parser_pack.add_argument('-d', '--dataset', type=str, required=True, help='dataset name', choices=FEATURE_NAMES)
+    parser_pack.add_argument('--remove-csv', action='store_true', help='remove feature files (and per-package feature position files) after packing')
+
+    # positions CLI parameters
+    parser_positions = subparsers.add_parser('positions', help='query feature positions', description='Print the feature positions of a package, or of every package with records of a feature.')
+    parser_positions.add_argument('-d', '--dataset', type=str, required=True, help='dataset name', choices=FEATURE_POSITION_NAMES)
+    parser_positions_query = parser_positions.add_mutually_exclusive_group(required=True)
+    parser_positions_query.add_argument('-p', '--package', type=str, help='package name, e.g. left-pad@1.3.0')
+    parser_positions_query.add_argument('-f', '--feature', type=str, help='feature name, e.g. useEval')
+
+    # compile CLI parameters
+    parser_compile = subparsers.add_parser('compile', help='compile model', description='Compile model into a truth table over all feature vectors.')
+    parser_compile.add_argument('-o', '--model', type=str, required=True, help='model name', choices=MODEL_NAMES)
+    parser_compile.add_argument('-d', '--dataset', type=str, nargs='*', help='datasets to check the truth table against the model with', choices=FEATURE_NAMES)
+    parser_compile.add_argument('-w', '--workers', type=int, help='number of processes predicting feature vectors at once (default: number of CPUs)')
+
+    # serve CLI parameters
+    parser_serve = subparsers.add_parser('serve', help='serve model', description='Serve verdicts for feature vectors and tarballs over HTTP, batching concurrent requests.')
+    parser_serve.add_argument('-o', '--model', type=str, default='RF', help='model name (default: RF)', choices=MODEL_NAMES)
+    parser_serve.add_argument('--host', type=str, default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser_serve.add_argument('--port', type=int, default=8765, help='port to listen on (default: 8765)')
+    parser_serve.add_argument('--unix-socket', type=str, help='listen on this Unix socket instead of a TCP port')
+    parser_serve.add_argument('--max-batch', type=int, default=1024, help='maximum number of feature vectors predicted in one batch (default: 1024)')
+    parser_serve.add_argument('--max-wait-ms', type=float, default=2, help='milliseconds to wait for more requests after the first one of a batch (default: 2)')
+    parser_serve.add_argument('-j', '--jobs', type=int, default=1, help='number of extractor processes for tarball requests, 0 disables them (default: 1)')
+    parser_serve.add_argument('--scratch', type=str, help='directory to decompress tarballs into, e.g. a tmpfs like /dev/shm/npm-packages')
+    parser_serve.add_argument('--no-table', action='store_true', help='predict with the model even if it has been compiled into a truth table')
 
     args = parser.parse_args()
     subparser_name = args.subparser_name
@@ -229,4 +359,12 @@ if __name__ == '__main__':
     elif subparser_name == 'test':
         test_cli()
     elif subparser_name == 'predict':
-        predict_cli()
\ No newline at end of file
+        predict_cli()
+    elif subparser_name == 'pack':
+        pack_cli()
+    elif subparser_name == 'positions':
+        positions_cli()
+    elif subparser_name == 'compile':
+        compile_cli()
+    elif subparser_name == 'serve':
+        serve_cli()
\ No newline at end of file
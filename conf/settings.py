@@ -10,9 +10,18 @@ MALICIOUS_DATASETS_PATH = os.path.join(DATASETS_PATH, 'malicious')
 BENIGN_DATASETS_PATH = os.path.join(DATASETS_PATH, 'benign')
 UNKOWN_DATASETS_PATH = os.path.join(os.path.dirname(ROOT_PATH), 'collect-npm-packages/packages')
 
+# feature extractor path
+FEATURE_EXTRACT_PATH = os.path.join(ROOT_PATH, 'feature-extract')
+
+# cache of extracted features keyed by package content hash
+EXTRACT_CACHE_PATH = os.path.join(ROOT_PATH, '.extract-cache')
+
 # models path
 MODELS_PATH = os.path.join(ROOT_PATH, 'models')
 
+# truth tables compiled from models
+MODEL_TABLES_PATH = os.path.join(MODELS_PATH, 'tables')
+
 # features path
 FEATURES_PATH = os.path.join(ROOT_PATH, 'features')
 
@@ -25,17 +34,76 @@ REPORTS_PATH = os.path.join(ROOT_PATH, 'reports')
 # supported models
 MODEL_NAMES = ['MLP', 'NB', 'SVM', 'RF']
 
+# ways to combine the verdicts of all models in ensemble prediction (predict -o all)
+ENSEMBLE_VOTES = ['majority', 'any', 'all', 'mean-proba']
+
+# number of packages predicted in one classifier call
+PREDICT_CHUNK_SIZE = 8192
+
+# number of report rows written to disk at once
+REPORT_CHUNK_SIZE = 8192
+
+# seconds between two scans of the unknown datasets directory in watch mode
+WATCH_POLL_INTERVAL = 2
+
+# number of daily directories (today and the days before) scanned in watch mode
+WATCH_DAYS = 2
+
+# seconds an extractor process may spend on one package before it is killed
+EXTRACT_PACKAGE_TIMEOUT = 120
+
+# memory ceiling of an extractor process in MiB (RSS, also used as the V8 heap limit)
+EXTRACT_MEMORY_LIMIT = 2048
+
+# times a package that timed out or exceeded the memory ceiling is retried in a fresh extractor process
+EXTRACT_RETRIES = 1
+
+# number of processes training models at once in hyper parameter search
+SEARCH_WORKERS = os.cpu_count() or 1
+
 # supported preprocess methods
 PREPROCESS_METHOD_NAMES = ['none', 'standardlize', 'min-max-scale']
 
+class DatasetNames:
+    """
+    文件夹中的数据集名
+    使用时才读取文件夹，文件夹不存在时为空，可以直接作为argparse的choices
+    """
+
+    def __init__(self, *dir_paths: str):
+        self.dir_paths = dir_paths
+
+    def names(self) -> list:
+        names = []
+        for dir_path in self.dir_paths:
+            if os.path.isdir(dir_path):
+                names.extend(os.listdir(dir_path))
+        return names
+
+    def __contains__(self, name) -> bool:
+        if not isinstance(name, str) or name in ('', '.', '..') or os.sep in name:
+            return False
+        return any(os.path.exists(os.path.join(dir_path, name)) for dir_path in self.dir_paths)
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __len__(self) -> int:
+        return len(self.names())
+
+    def __repr__(self) -> str:
+        return repr(self.names())
+
 # supported datasets
-MALICIOUS_DATASET_NAMES = os.listdir(MALICIOUS_DATASETS_PATH)
-BENIGN_DATASET_NAMES = os.listdir(BENIGN_DATASETS_PATH)
-UNKOWN_DATASET_NAMES = os.listdir(UNKOWN_DATASETS_PATH)
-DATASET_NAMES = MALICIOUS_DATASET_NAMES + BENIGN_DATASET_NAMES + UNKOWN_DATASET_NAMES
+MALICIOUS_DATASET_NAMES = DatasetNames(MALICIOUS_DATASETS_PATH)
+BENIGN_DATASET_NAMES = DatasetNames(BENIGN_DATASETS_PATH)
+UNKOWN_DATASET_NAMES = DatasetNames(UNKOWN_DATASETS_PATH)
+DATASET_NAMES = DatasetNames(MALICIOUS_DATASETS_PATH, BENIGN_DATASETS_PATH, UNKOWN_DATASETS_PATH)
 
 # supported package features
-FEATURE_NAMES = os.listdir(FEATURES_PATH)
+FEATURE_NAMES = DatasetNames(FEATURES_PATH)
+# datasets with feature positions
+FEATURE_POSITION_NAMES = DatasetNames(FEATURE_POSITIONS_PATH)
 
 # hyper parameters for training models
 MODEL_HYPER_PARAMETERS = {
@@ -0,0 +1,34 @@
+from .src.worker import ExtractorWorker, ExtractorError, ExtractorAborted, build_extractor, ensure_extractor_built
+from .src.cache import ExtractCache, package_hash, tarball_hash
+from .src.extractor import extract_dataset, print_extract_summary, get_extract_log_path
+from .src.pipeline import TarballPipeline, extract_tarballs, extract_positions, decompress_tarball, find_packages, remove_dir
+from .src.timing import ExtractTimings
+from .src.limits import ExtractLimits, get_quarantine_path
+from .src.position_store import PositionStore, get_position_store, close_position_stores, pack_position_dir
+
+__all__ = [
+    'ExtractorWorker',
+    'ExtractorError',
+    'ExtractorAborted',
+    'build_extractor',
+    'ensure_extractor_built',
+    'ExtractCache',
+    'package_hash',
+    'tarball_hash',
+    'extract_dataset',
+    'print_extract_summary',
+    'get_extract_log_path',
+    'TarballPipeline',
+    'extract_tarballs',
+    'extract_positions',
+    'decompress_tarball',
+    'find_packages',
+    'remove_dir',
+    'ExtractTimings',
+    'ExtractLimits',
+    'get_quarantine_path',
+    'PositionStore',
+    'get_position_store',
+    'close_position_stores',
+    'pack_position_dir'
+]
\ No newline at end of file
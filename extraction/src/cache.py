@@ -0,0 +1,156 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+
+from .worker import extractor_source_hash
+from .position_store import get_position_store
+
+
+# 缓存格式版本，修改缓存内容时递增
+EXTRACT_CACHE_VERSION = 1
+
+
+def tarball_hash(tarball_path: str) -> str:
+    """计算包压缩文件的sha256"""
+    sha256 = hashlib.sha256()
+    with open(tarball_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def package_hash(package_path: str) -> str:
+    """
+    计算包文件夹内容的sha256
+    特征提取不会分析node_modules，因此不计入hash
+    """
+    sha256 = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(package_path):
+        dirnames[:] = sorted(dirname for dirname in dirnames if dirname != 'node_modules')
+        for filename in sorted(filenames):
+            file_path = os.path.join(dirpath, filename)
+            if not os.path.isfile(file_path):
+                continue
+            sha256.update(os.path.relpath(file_path, package_path).encode() + b'\0')
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    sha256.update(block)
+            sha256.update(b'\0')
+    return sha256.hexdigest()
+
+def write_feature_file(feature_file_path: str, features: list):
+    """按特征提取程序的格式写入特征文件"""
+    with open(feature_file_path, 'w') as f:
+        for feature_name, value in features:
+            f.write(f'{feature_name},{"true" if value else "false"}\n')
+
+
+class ExtractCache:
+    """
+    以包内容hash与特征提取程序版本为键的特征缓存
+    保存每个包的特征向量与特征位置，内容未变化的包无需重新分析；
+    缓存文件夹下的js-files由特征提取程序按JS文件内容hash缓存每个JS文件的分析结果，供不同的包共用
+    """
+
+    def __init__(self, cache_path: str, extractor_version: str = None):
+        """
+        :param cache_path: 缓存文件夹路径
+        :param extractor_version: 特征提取程序版本，None表示使用特征提取程序源码的hash
+        """
+        os.makedirs(cache_path, exist_ok=True)
+        if extractor_version is None:
+            extractor_version = extractor_source_hash()
+        self.extractor_version = f'{EXTRACT_CACHE_VERSION}:{extractor_version}'
+        self.js_file_cache_path = os.path.join(cache_path, 'js-files')
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(os.path.join(cache_path, 'features.sqlite'), check_same_thread=False)
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS features (
+                content_hash TEXT NOT NULL,
+                extractor_version TEXT NOT NULL,
+                package_name TEXT NOT NULL,
+                feature_file_name TEXT NOT NULL,
+                features TEXT NOT NULL,
+                positions TEXT NOT NULL,
+                PRIMARY KEY (content_hash, extractor_version)
+            )
+        ''')
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, content_hash: str, allow_truncated: bool = False) -> dict:
+        """
+        查询缓存
+        :param content_hash: 包内容hash
+        :param allow_truncated: 是否接受特征位置不完整的结果（快速模式或未记录特征位置），其特征向量是完整的
+        :return: 包名、特征文件名、特征向量与特征位置，未命中时为None
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT package_name, feature_file_name, features, positions FROM features WHERE content_hash = ? AND extractor_version = ?',
+                (content_hash, self.extractor_version)
+            ).fetchone()
+            positions = json.loads(row[3]) if row is not None else None
+            if row is None or (positions.get('truncated') is True and not allow_truncated):
+                self.misses += 1
+                return None
+            self.hits += 1
+        package_name, feature_file_name, features, _ = row
+        return {
+            'packageName': package_name,
+            'featureFileName': feature_file_name,
+            'features': json.loads(features),
+            'positions': positions
+        }
+
+    def put(self, content_hash: str, result: dict):
+        """
+        保存特征提取结果
+        :param content_hash: 包内容hash
+        :param result: 特征提取程序返回的结果
+        """
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    content_hash,
+                    self.extractor_version,
+                    result['packageName'],
+                    os.path.basename(result['csvPath']),
+                    json.dumps(result['features']),
+                    json.dumps(result['positions'], separators=(',', ':'))
+                )
+            )
+            self.connection.commit()
+
+    def restore(self, content_hash: str, feature_path: str, feature_position_path: str, allow_truncated: bool = False) -> dict:
+        """
+        命中缓存时直接写入特征文件，特征位置追加到特征位置库
+        :param feature_position_path: 特征位置库所在文件夹路径，None表示不写入特征位置
+        :param allow_truncated: 是否接受特征位置不完整的结果（快速模式或未记录特征位置）
+        :return: 缓存的结果（同get），未命中时为None
+        """
+        cached = self.get(content_hash, allow_truncated)
+        if cached is None:
+            return None
+        os.makedirs(feature_path, exist_ok=True)
+        write_feature_file(os.path.join(feature_path, cached['featureFileName']), cached['features'])
+        if feature_position_path is not None:
+            get_position_store(feature_position_path).append(cached['packageName'], cached['positions'])
+        return cached
+
+    def worker_options(self) -> dict:
+        """特征提取进程使用JS文件缓存的参数，传给ExtractorWorker"""
+        return {'file_cache_path': self.js_file_cache_path, 'file_cache_version': self.extractor_version}
+
+    def stats(self) -> dict:
+        """缓存命中与未命中次数"""
+        with self.lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total > 0 else 0.0}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
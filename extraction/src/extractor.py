@@ -0,0 +1,180 @@
+import os
+import sys
+import time
+import queue
+import threading
+
+from .worker import ExtractorWorker, ExtractorError, ExtractorAborted, ensure_extractor_built, EXTRACTOR_LOG_PATH
+from .cache import ExtractCache, package_hash
+from .position_store import get_position_store
+from .timing import ExtractTimings
+from .limits import ExtractLimits
+
+
+# 统计信息中列出的隔离的包数量
+SHOWN_QUARANTINED_NUMBER = 20
+
+
+def get_extract_log_path(feature_path: str, stage: str = None) -> str:
+    """
+    特征提取日志路径，以特征文件夹名区分数据集
+    :param stage: 同一数据集的其他提取阶段（如positions），None表示特征提取
+    """
+    os.makedirs(EXTRACTOR_LOG_PATH, exist_ok=True)
+    name = os.path.basename(feature_path) if stage is None else f'{os.path.basename(feature_path)}-{stage}'
+    return os.path.join(EXTRACTOR_LOG_PATH, f'extract-{name}.log')
+
+def new_extract_summary(log_path: str) -> dict:
+    """特征提取的统计信息"""
+    return {'succeeded': 0, 'failed': 0, 'failed_packages': [], 'cache_hits': 0, 'cache_misses': 0, 'file_cache_hits': 0, 'file_cache_misses': 0, 'file_cache_bytes_skipped': 0, 'truncated': 0, 'aborted': 0, 'quarantined': [], 'quarantine_path': None, 'log_path': log_path}
+
+def update_extract_summary(summary: dict, lock: threading.Lock, package_path: str, succeeded: bool, cache_hit: bool = None, result: dict = None):
+    """
+    记录一个包的特征提取结果
+    :param cache_hit: 是否命中缓存，None表示未使用缓存
+    :param result: 特征提取结果，用于统计JS文件缓存命中情况与快速模式下提前停止的包，None表示没有结果
+    """
+    file_cache = result.get('fileCache') if result is not None else None
+    with lock:
+        if result is not None and result.get('truncated') is True:
+            summary['truncated'] += 1
+        if file_cache is not None:
+            summary['file_cache_hits'] += file_cache['hits']
+            summary['file_cache_misses'] += file_cache['misses']
+            summary['file_cache_bytes_skipped'] += file_cache['bytesSkipped']
+        if succeeded:
+            summary['succeeded'] += 1
+        else:
+            summary['failed'] += 1
+            summary['failed_packages'].append(package_path)
+        if cache_hit is True:
+            summary['cache_hits'] += 1
+        elif cache_hit is False:
+            summary['cache_misses'] += 1
+
+def analyze_package(worker: ExtractorWorker, package_path: str, feature_path: str, feature_position_path: str, cache: ExtractCache = None, force: bool = False, content_hash: str = None, timings: ExtractTimings = None, fast: bool = False, limits: ExtractLimits = None, skip_lookup: bool = False) -> list:
+    """
+    提取单个包的特征，命中缓存时直接使用缓存的结果
+    特征提取进程超时、超出内存上限或退出时重启进程并重试，重试后仍失败的包记入隔离名单
+    :param worker: 特征提取进程
+    :param package_path: 包路径
+    :param feature_path: 特征文件夹路径
+    :param feature_position_path: 特征位置库所在文件夹路径，None表示不记录特征位置，只计算特征向量
+    :param cache: 特征缓存，None表示不使用缓存
+    :param force: 是否忽略缓存重新分析（结果仍写入缓存）
+    :param content_hash: 缓存键，None表示使用包文件夹内容的hash
+    :param timings: 记录分析耗时，None表示不记录
+    :param fast: 快速模式，特征向量饱和后不再分析剩余的JS文件，特征位置不完整；可以使用快速模式下缓存的结果
+    :param limits: 时限、内存上限、重试次数与隔离名单，需与创建worker时的参数一致，None表示不重试
+    :param skip_lookup: 调用者已用content_hash查询过缓存且未命中，不再查询，结果仍写入缓存
+    :return: [是否成功, 是否命中缓存（未使用缓存时为None）, 包名、特征文件名与特征向量等结果（失败时为None）]
+    """
+    positions = feature_position_path is not None
+    cache_hit = None
+    if cache is not None:
+        if content_hash is None:
+            content_hash = package_hash(package_path)
+        cached = None if force or skip_lookup else cache.restore(content_hash, feature_path, feature_position_path, allow_truncated=fast or not positions)
+        if cached is not None:
+            return [True, True, cached]
+        cache_hit = False
+    retries = limits.retries if limits is not None else 0
+    attempts = 0
+    while True:
+        attempts += 1
+        start = time.perf_counter()
+        try:
+            # 特征位置随结果返回，由本进程追加到特征位置库，特征提取进程不再写入特征位置文件
+            result = worker.analyze(package_path, feature_path, timing=timings is not None, refresh_file_cache=force, fast=fast, positions=positions)
+            break
+        except ExtractorAborted as e:
+            # 卡住或崩溃的进程已被杀死，在新的进程中重试
+            worker.restart()
+            if limits is not None:
+                limits.add_aborted(package_path, e)
+            if attempts > retries:
+                if limits is not None:
+                    limits.quarantine(package_path, e, attempts, content_hash)
+                return [False, cache_hit, None]
+        except ExtractorError:
+            if worker.process is None or worker.process.poll() is not None:
+                worker.restart()
+            return [False, cache_hit, None]
+    result['featureFileName'] = os.path.basename(result['csvPath'])
+    if positions:
+        get_position_store(feature_position_path).append(result['packageName'], result['positions'])
+    if timings is not None:
+        timings.add_package(package_path, time.perf_counter() - start, result.get('timing'))
+    if cache is not None:
+        cache.put(content_hash, result)
+    return [True, cache_hit, result]
+
+def extract_dataset(dataset_path: str, feature_path: str, feature_position_path: str, jobs: int = 1, cache: ExtractCache = None, force: bool = False, package_key=None, timings: ExtractTimings = None, fast: bool = False, limits: ExtractLimits = None) -> dict:
+    """
+    提取数据集中所有包的特征
+    启动jobs个常驻的特征提取进程，各进程从同一队列中取包，写入相同的特征文件夹与特征位置库
+    :param dataset_path: 数据集路径
+    :param feature_path: 特征文件夹路径
+    :param feature_position_path: 特征位置库所在文件夹路径，None表示不记录特征位置
+    :param jobs: 并行的特征提取进程数
+    :param cache: 特征缓存，None表示不使用缓存
+    :param force: 是否忽略缓存重新分析所有包（结果仍写入缓存）
+    :param package_key: 根据包路径返回缓存键的函数，返回None或未给出时使用包文件夹内容的hash
+    :param timings: 记录分析耗时，None表示不记录
+    :param fast: 快速模式，特征向量饱和后不再分析剩余的JS文件，特征位置标记为不完整（truncated）
+    :param limits: 每个包的时限、进程内存上限与隔离名单，None表示不限制
+    :return: 提取成功与失败的包数量、失败的包路径、缓存命中情况以及隔离的包
+    """
+    ensure_extractor_built()
+    log_path = get_extract_log_path(feature_path)
+    log_lock = threading.Lock()
+    summary = new_extract_summary(log_path)
+    summary_lock = threading.Lock()
+
+    with open(log_path, 'w') as log_file:
+        worker_options = cache.worker_options() if cache is not None else {}
+        if limits is not None:
+            worker_options.update(limits.worker_options())
+        workers = [ExtractorWorker(i, log_file, log_lock, **worker_options).start() for i in range(jobs)]
+        try:
+            package_queue = queue.Queue()
+            for package_path in workers[0].list_packages(dataset_path):
+                package_queue.put(package_path)
+
+            def run(worker: ExtractorWorker):
+                while True:
+                    try:
+                        package_path = package_queue.get_nowait()
+                    except queue.Empty:
+                        return
+                    content_hash = package_key(package_path) if package_key is not None else None
+                    succeeded, cache_hit, result = analyze_package(worker, package_path, feature_path, feature_position_path, cache, force, content_hash, timings, fast, limits)
+                    update_extract_summary(summary, summary_lock, package_path, succeeded, cache_hit, result)
+
+            threads = [threading.Thread(target=run, args=(worker,)) for worker in workers]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            for worker in workers:
+                worker.close()
+    if limits is not None:
+        summary.update(limits.stats())
+    return summary
+
+def print_extract_summary(summary: dict, file=sys.stdout):
+    """打印特征提取的统计信息"""
+    print(f"Extracted {summary['succeeded']} packages, {summary['failed']} failed. Log: {summary['log_path']}", file=file)
+    lookups = summary.get('cache_hits', 0) + summary.get('cache_misses', 0)
+    if lookups > 0:
+        print(f"Extract cache: {summary['cache_hits']} hits, {summary['cache_misses']} misses, hit rate {summary['cache_hits'] / lookups:.2%}", file=file)
+    if summary.get('truncated', 0) > 0:
+        print(f"Fast mode: {summary['truncated']} packages stopped early, their feature positions are truncated", file=file)
+    if summary.get('aborted', 0) > 0:
+        print(f"Killed {summary['aborted']} stuck extractor processes, quarantined {len(summary['quarantined'])} packages. Quarantine: {summary['quarantine_path']}", file=file)
+        for entry in summary['quarantined'][:SHOWN_QUARANTINED_NUMBER]:
+            print(f"  {entry['reason']:<8} {entry['stage'] or 'unknown stage'} {entry['filePath'] or ''}  {entry['package']}", file=file)
+    file_lookups = summary.get('file_cache_hits', 0) + summary.get('file_cache_misses', 0)
+    if file_lookups > 0:
+        print(f"JS file cache: {summary['file_cache_hits']} hits, {summary['file_cache_misses']} misses, hit rate {summary['file_cache_hits'] / file_lookups:.2%}, {summary['file_cache_bytes_skipped'] / 1024 / 1024:.1f} MiB not analyzed", file=file)
@@ -0,0 +1,75 @@
+import os
+import json
+import time
+import threading
+
+from conf.settings import EXTRACT_PACKAGE_TIMEOUT, EXTRACT_MEMORY_LIMIT, EXTRACT_RETRIES
+from .worker import ExtractorAborted, EXTRACTOR_LOG_PATH
+
+
+def get_quarantine_path(feature_path: str) -> str:
+    """隔离名单路径，与特征提取日志放在一起，以特征文件夹名区分数据集"""
+    os.makedirs(EXTRACTOR_LOG_PATH, exist_ok=True)
+    return os.path.join(EXTRACTOR_LOG_PATH, f'quarantine-{os.path.basename(feature_path)}.ndjson')
+
+
+class ExtractLimits:
+    """
+    每个包的分析时限与特征提取进程的内存上限
+    超出时杀死特征提取进程，在新的进程中重试；重试后仍超出的包记入隔离名单（每行一个JSON），
+    一次运行的总耗时因此受时限约束，而不是由最慢的包决定。可被多个线程同时使用
+    """
+
+    def __init__(self, timeout: float = EXTRACT_PACKAGE_TIMEOUT, memory_limit: int = EXTRACT_MEMORY_LIMIT, retries: int = EXTRACT_RETRIES, quarantine_path: str = None):
+        """
+        :param timeout: 分析一个包的时限（秒），None表示不限制
+        :param memory_limit: 特征提取进程的内存上限（MiB），None表示不限制
+        :param retries: 超时、超出内存上限或进程退出后在新进程中重试的次数
+        :param quarantine_path: 隔离名单路径，None表示只统计不写入
+        """
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.retries = retries
+        self.quarantine_path = quarantine_path
+        self.lock = threading.Lock()
+        self.aborted = 0
+        self.quarantined = []
+
+    def worker_options(self) -> dict:
+        """特征提取进程的时限与内存上限参数，传给ExtractorWorker"""
+        return {'timeout': self.timeout, 'memory_limit': self.memory_limit}
+
+    def add_aborted(self, package_path: str, error: ExtractorAborted):
+        """记录一次被中止的分析"""
+        with self.lock:
+            self.aborted += 1
+
+    def quarantine(self, package_path: str, error: ExtractorAborted, attempts: int, content_hash: str = None) -> dict:
+        """
+        将重试后仍失败的包记入隔离名单
+        :param error: 最后一次的中止原因，包括卡住的阶段与文件
+        :param attempts: 分析的次数
+        :param content_hash: 包内容hash，未知时为None
+        :return: 隔离名单中的一项
+        """
+        entry = {
+            'package': package_path,
+            'reason': error.reason,
+            'stage': error.stage,
+            'filePath': error.file_path,
+            'elapsed': round(error.elapsed, 3) if error.elapsed is not None else None,
+            'attempts': attempts,
+            'contentHash': content_hash,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        with self.lock:
+            self.quarantined.append(entry)
+            if self.quarantine_path is not None:
+                with open(self.quarantine_path, 'a') as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return entry
+
+    def stats(self) -> dict:
+        """被中止的分析次数与隔离的包，合并到特征提取的统计信息中"""
+        with self.lock:
+            return {'aborted': self.aborted, 'quarantined': list(self.quarantined), 'quarantine_path': self.quarantine_path}
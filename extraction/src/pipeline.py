@@ -0,0 +1,293 @@
+import os
+import stat
+import queue
+import shutil
+import time
+import tarfile
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from .worker import ExtractorWorker, ensure_extractor_built
+from .cache import ExtractCache, tarball_hash
+from .timing import ExtractTimings
+from .extractor import get_extract_log_path, new_extract_summary, update_extract_summary, analyze_package
+from .limits import ExtractLimits
+
+
+def _is_safe_member(member: tarfile.TarInfo, target_path: str) -> bool:
+    """只解压普通文件与文件夹，且不能写到目标文件夹之外"""
+    if not (member.isfile() or member.isdir()):
+        return False
+    member_path = os.path.realpath(os.path.join(target_path, member.name))
+    return member_path == target_path or member_path.startswith(target_path + os.sep)
+
+def decompress_tarball(tarball_path: str, target_path: str):
+    """
+    解压包的压缩文件，解压时即保证文件夹可读写执行、文件可读写
+    链接、设备文件以及路径超出目标文件夹的成员不会被解压
+    :param tarball_path: 压缩文件路径
+    :param target_path: 解压到的文件夹
+    """
+    target_path = os.path.realpath(target_path)
+    os.makedirs(target_path, exist_ok=True)
+    with tarfile.open(tarball_path) as tar:
+        members = []
+        for member in tar:
+            if not _is_safe_member(member, target_path):
+                continue
+            if member.isdir():
+                member.mode |= stat.S_IRWXU
+            else:
+                member.mode |= stat.S_IRUSR | stat.S_IWUSR
+            members.append(member)
+        if hasattr(tarfile, 'data_filter'):
+            # Python 3.11.4及以上版本的解压过滤器，再次拒绝超出目标文件夹的路径与特殊文件
+            tar.extractall(path=target_path, members=members, filter='data')
+        else:
+            tar.extractall(path=target_path, members=members)
+
+def find_packages(dir_path: str) -> list:
+    """查找文件夹中的包，与特征提取程序中的getPackagesFromDir一致"""
+    result = []
+    def resolve(current_path: str):
+        entries = sorted(os.scandir(current_path), key=lambda entry: entry.name)
+        for entry in entries:
+            if entry.name == 'package.json' and os.path.basename(current_path) == 'package':
+                result.append(current_path)
+                return
+            if entry.is_dir(follow_symlinks=False) and entry.name != 'node_modules':
+                resolve(entry.path)
+    resolve(dir_path)
+    return result
+
+def remove_dir(dir_path: str):
+    """删除文件夹，没有权限时先添加权限"""
+    def add_mode(func, path, _):
+        os.chmod(os.path.dirname(path), 0o777)
+        os.chmod(path, 0o777)
+        func(path)
+    shutil.rmtree(dir_path, onerror=add_mode)
+
+
+class _TarballPackage:
+    """已解压、等待特征提取的包"""
+
+    def __init__(self, tarball_path: str, package_path: str, content_hash: str, decompressed_path: str):
+        self.tarball_path = tarball_path
+        self.package_path = package_path
+        self.content_hash = content_hash
+        self.decompressed_path = decompressed_path
+
+
+class TarballPipeline:
+    """
+    以流水线的方式解压并提取包压缩文件的特征，可以持续提交压缩文件
+    解压线程并行解压压缩文件，解压好的包立即交给常驻的特征提取进程，分析结束后立即删除；
+    已提交、尚未处理完的压缩文件数量有上限，达到上限时submit等待，因此临时空间的占用不会随提交的数量增长
+    """
+
+    def __init__(self, scratch_path: str, log_path: str, jobs: int = 1, decompress_jobs: int = None, max_pending: int = None, cache: ExtractCache = None, force: bool = False, timings: ExtractTimings = None, on_tarball_done=None, limits: ExtractLimits = None):
+        """
+        :param scratch_path: 解压用的临时文件夹，可以位于tmpfs（如/dev/shm）
+        :param log_path: 特征提取日志路径
+        :param jobs: 并行的特征提取进程数
+        :param decompress_jobs: 并行解压的线程数，None表示与jobs相同
+        :param max_pending: 已解压、等待分析的压缩文件数量上限，None表示jobs的两倍
+        :param cache: 特征缓存，命中缓存的压缩文件不会被解压，None表示不使用缓存
+        :param force: 是否忽略缓存重新分析所有包（结果仍写入缓存）
+        :param timings: 记录解压与分析的耗时，None表示不记录
+        :param on_tarball_done: 一个压缩文件处理完后在处理它的线程中调用，参数为压缩文件路径与
+            (包路径, 特征提取结果)的列表，提取失败的包结果为None；可以阻塞以向流水线施加反压
+        :param limits: 每个包的时限、进程内存上限与隔离名单，None表示不限制
+        """
+        self.scratch_path = scratch_path
+        self.log_path = log_path
+        self.jobs = jobs
+        self.decompress_jobs = decompress_jobs or jobs
+        self.max_pending = max_pending or 2 * jobs
+        self.cache = cache
+        self.force = force
+        self.timings = timings
+        self.on_tarball_done = on_tarball_done
+        self.limits = limits
+        self.summary = new_extract_summary(log_path)
+        self._summary_lock = threading.Lock()
+        # 每个元素是一个压缩文件中的所有包，None表示解压结束
+        self._package_queue = queue.Queue(maxsize=self.max_pending)
+        # 正在解压、等待分析与正在分析的压缩文件数量上限
+        self._slots = threading.BoundedSemaphore(self.decompress_jobs + self.max_pending + jobs)
+        self._submitted = 0
+        self._submitted_lock = threading.Lock()
+        self._log_file = None
+        self._executor = None
+        self._workers = []
+        self._threads = []
+
+    def start(self):
+        ensure_extractor_built()
+        os.makedirs(self.scratch_path, exist_ok=True)
+        self._log_file = open(self.log_path, 'w')
+        log_lock = threading.Lock()
+        worker_options = self.cache.worker_options() if self.cache is not None else {}
+        if self.limits is not None:
+            worker_options.update(self.limits.worker_options())
+        self._workers = [ExtractorWorker(i, self._log_file, log_lock, **worker_options).start() for i in range(self.jobs)]
+        self._threads = [threading.Thread(target=self._consume, args=(worker,)) for worker in self._workers]
+        for thread in self._threads:
+            thread.start()
+        self._executor = ThreadPoolExecutor(max_workers=self.decompress_jobs)
+        return self
+
+    def submit(self, tarball_path: str, feature_path: str, feature_position_path: str):
+        """
+        提交一个压缩文件，已提交、尚未处理完的压缩文件达到上限时等待
+        :param tarball_path: 包压缩文件路径
+        :param feature_path: 特征文件夹路径
+        :param feature_position_path: 特征位置库所在文件夹路径，None表示不记录特征位置
+        """
+        self._slots.acquire()
+        with self._submitted_lock:
+            self._submitted += 1
+            index = self._submitted
+        self._executor.submit(self._decompress, index, tarball_path, feature_path, feature_position_path)
+
+    def _done(self, tarball_path: str, results: list):
+        try:
+            if self.on_tarball_done is not None:
+                self.on_tarball_done(tarball_path, results)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            self._slots.release()
+
+    def _failed(self, tarball_path: str):
+        update_extract_summary(self.summary, self._summary_lock, tarball_path, False)
+        self._done(tarball_path, [])
+
+    def _decompress(self, index: int, tarball_path: str, feature_path: str, feature_position_path: str):
+        """解压一个压缩文件，放入队列时若队列已满则等待"""
+        tarball_name = os.path.basename(tarball_path)
+        # 加上提交序号，不同文件夹中的同名压缩文件不会解压到同一位置
+        decompressed_path = os.path.join(self.scratch_path, f'{index}-{tarball_name[:-4] if tarball_name.endswith(".tgz") else tarball_name}')
+        # 解压线程的异常不会被submit的调用者看到，任何异常都按失败处理并释放名额，
+        # 否则压缩文件在扫描后被删除或不可读时，submit会因名额耗尽而一直等待
+        try:
+            content_hash = None
+            if self.cache is not None:
+                content_hash = tarball_hash(tarball_path)
+                cached = None if self.force else self.cache.restore(content_hash, feature_path, feature_position_path, allow_truncated=feature_position_path is None)
+                if cached is not None:
+                    update_extract_summary(self.summary, self._summary_lock, tarball_path, True, True)
+                    self._done(tarball_path, [(tarball_path, cached)])
+                    return
+            start = time.perf_counter()
+            decompress_tarball(tarball_path, decompressed_path)
+            if self.timings is not None:
+                self.timings.add_decompress(tarball_path, time.perf_counter() - start)
+            package_paths = find_packages(decompressed_path)
+        except Exception:
+            if os.path.exists(decompressed_path):
+                remove_dir(decompressed_path)
+            self._failed(tarball_path)
+            return
+        if len(package_paths) == 0:
+            remove_dir(decompressed_path)
+            self._failed(tarball_path)
+            return
+        packages = []
+        for package_path in package_paths:
+            # npm压缩包中的包位于package文件夹，此时使用压缩文件的hash作为缓存键
+            package_content_hash = content_hash if package_path == os.path.join(decompressed_path, 'package') else None
+            packages.append(_TarballPackage(tarball_path, package_path, package_content_hash, decompressed_path))
+        self._package_queue.put((packages, feature_path, feature_position_path))
+
+    def _consume(self, worker: ExtractorWorker):
+        while True:
+            item = self._package_queue.get()
+            if item is None:
+                return
+            packages, feature_path, feature_position_path = item
+            results = []
+            try:
+                for package in packages:
+                    try:
+                        # 带有content_hash的包在解压前已查询过缓存，每个包只查询一次，命中率才准确
+                        succeeded, cache_hit, result = analyze_package(worker, package.package_path, feature_path, feature_position_path, self.cache, self.force, package.content_hash, self.timings, limits=self.limits, skip_lookup=package.content_hash is not None)
+                    except Exception:
+                        # 消费者线程不能退出，否则解压线程会一直等待队列
+                        traceback.print_exc()
+                        succeeded, cache_hit, result = False, None, None
+                    update_extract_summary(self.summary, self._summary_lock, package.package_path, succeeded, cache_hit, result)
+                    results.append((package.package_path, result))
+            finally:
+                remove_dir(packages[0].decompressed_path)
+                self._done(packages[0].tarball_path, results)
+
+    def close(self):
+        """等待已提交的压缩文件处理完，关闭特征提取进程"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for _ in self._threads:
+            self._package_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for worker in self._workers:
+            worker.close()
+        self._workers = []
+        if self.limits is not None:
+            with self._summary_lock:
+                self.summary.update(self.limits.stats())
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def extract_tarballs(tarball_paths: list, feature_path: str, feature_position_path: str, scratch_path: str, jobs: int = 1, decompress_jobs: int = None, max_pending: int = None, cache: ExtractCache = None, force: bool = False, timings: ExtractTimings = None, on_tarball_done=None, log_path: str = None, limits: ExtractLimits = None) -> dict:
+    """
+    以流水线的方式解压并提取多个包压缩文件的特征
+    解压线程并行解压压缩文件，解压好的包立即交给特征提取进程，分析结束后立即删除；
+    等待分析的包数量有上限，因此临时空间的占用不会随数据集大小增长
+    :param tarball_paths: 包压缩文件路径列表
+    :param feature_path: 特征文件夹路径
+    :param feature_position_path: 特征位置库所在文件夹路径，None表示不记录特征位置，只计算特征向量
+    :param scratch_path: 解压用的临时文件夹，可以位于tmpfs（如/dev/shm）
+    :param jobs: 并行的特征提取进程数
+    :param decompress_jobs: 并行解压的线程数，None表示与jobs相同
+    :param max_pending: 已解压、等待分析的压缩文件数量上限，None表示jobs的两倍
+    :param cache: 特征缓存，命中缓存的压缩文件不会被解压，None表示不使用缓存
+    :param force: 是否忽略缓存重新分析所有包（结果仍写入缓存）
+    :param timings: 记录解压与分析的耗时，None表示不记录
+    :param on_tarball_done: 一个压缩文件处理完后调用，参数同TarballPipeline
+    :param log_path: 特征提取日志路径，None表示按特征文件夹名生成
+    :param limits: 每个包的时限、进程内存上限与隔离名单，None表示不限制
+    :return: 提取成功与失败的包数量、失败的包路径以及缓存命中情况
+    """
+    os.makedirs(feature_path, exist_ok=True)
+    pipeline = TarballPipeline(scratch_path, log_path or get_extract_log_path(feature_path), jobs, decompress_jobs, max_pending, cache, force, timings, on_tarball_done, limits)
+    with pipeline:
+        for tarball_path in tarball_paths:
+            pipeline.submit(tarball_path, feature_path, feature_position_path)
+    return pipeline.summary
+
+def extract_positions(tarball_paths: list, feature_path: str, feature_position_path: str, scratch_path: str, jobs: int = 1, cache: ExtractCache = None, timings: ExtractTimings = None, limits: ExtractLimits = None) -> dict:
+    """
+    第二遍提取：重新分析部分压缩文件（如预测为恶意的包），记录特征位置
+    第一遍提取不记录特征位置时，缓存中的结果特征位置不完整，不会被使用；
+    JS文件缓存中保存了每个JS文件完整的分析结果，因此第一遍分析过的JS文件无需重新解析
+    :param tarball_paths: 需要特征位置的包压缩文件路径列表
+    :param feature_path: 特征文件夹路径，特征文件会被重新写入（内容相同）
+    :param feature_position_path: 特征位置库所在文件夹路径
+    :param scratch_path: 解压用的临时文件夹
+    :param limits: 每个包的时限、进程内存上限与隔离名单，None表示不限制
+    :return: 同extract_tarballs
+    """
+    return extract_tarballs(tarball_paths, feature_path, feature_position_path, scratch_path, jobs, cache=cache, timings=timings, log_path=get_extract_log_path(feature_path, 'positions'), limits=limits)
@@ -0,0 +1,246 @@
+import os
+import json
+import threading
+
+
+# 特征位置库中的文件
+POSITIONS_FILE = 'positions.ndjson'
+PATHS_FILE = 'paths.ndjson'
+INDEX_FILE = 'index.ndjson'
+
+
+def _read_lines(file_path: str) -> list:
+    """
+    读取追加写入的文件中完整的行，中断时写入一半的最后一行被截掉
+    :return: 完整的行（bytes）
+    """
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    if end < len(data):
+        with open(file_path, 'r+b') as f:
+            f.truncate(end)
+    return data[:end].splitlines()
+
+def _encode_content(content):
+    """位置写为[起始行, 起始列, 结束行, 结束列]，字符串内容原样保存"""
+    if isinstance(content, dict):
+        return [content['start']['line'], content['start']['column'], content['end']['line'], content['end']['column']]
+    return content
+
+def _decode_content(content):
+    if isinstance(content, list):
+        return {'start': {'line': content[0], 'column': content[1]}, 'end': {'line': content[2], 'column': content[3]}}
+    return content
+
+
+class PositionStore:
+    """
+    一个数据集的特征位置库，替代每个包一个的特征位置JSON文件
+    - paths.ndjson：文件路径表，每行一个JSON字符串，行号即路径编号，相同的路径只保存一次
+    - positions.ndjson：每行一个包的特征位置，记录中的文件路径替换为路径编号
+    - index.ndjson：每行一个包的包名、在positions.ndjson中的偏移与长度、有记录的特征与是否不完整
+    三个文件都只追加写入，写入顺序为路径、特征位置、索引，索引中的包都是完整写入的；
+    同一个包再次写入时追加新的记录，读取时以最后一次为准。
+    同一时间只能有一个进程写入，读取可以在写入的同时进行
+    """
+
+    def __init__(self, dirPath: str, writable: bool = False):
+        """
+        :param dirPath: 特征位置库所在文件夹（即数据集的特征位置文件夹）
+        :param writable: 是否追加写入，写入时截掉上次中断时未写完的内容
+        """
+        self.dirPath = dirPath
+        self.writable = writable
+        self.lock = threading.Lock()
+        self.paths = []
+        self.path_ids = {}
+        self.index = {}
+        self._positions_size = 0
+        self._paths_file = None
+        self._positions_file = None
+        self._index_file = None
+        if writable:
+            os.makedirs(dirPath, exist_ok=True)
+        self._load()
+        if writable:
+            self._paths_file = open(os.path.join(dirPath, PATHS_FILE), 'ab')
+            self._positions_file = open(os.path.join(dirPath, POSITIONS_FILE), 'ab')
+            self._index_file = open(os.path.join(dirPath, INDEX_FILE), 'ab')
+
+    def _load(self):
+        """读取路径表与索引，写入时丢弃中断时未写完的行与没有写入索引的特征位置"""
+        paths_path = os.path.join(self.dirPath, PATHS_FILE)
+        positions_path = os.path.join(self.dirPath, POSITIONS_FILE)
+        index_path = os.path.join(self.dirPath, INDEX_FILE)
+        # 先读索引再读路径表，写入者在两次读取之间追加的包引用的路径也能读到
+        read_lines = _read_lines if self.writable else self._read_complete_lines
+        index_lines = read_lines(index_path)
+        lines = read_lines(paths_path)
+        self.paths = [json.loads(line) for line in lines]
+        self.path_ids = {path: i for i, path in enumerate(self.paths)}
+        self._positions_size = 0
+        for line in index_lines:
+            entry = json.loads(line)
+            self.index[entry['package']] = entry
+            self._positions_size = max(self._positions_size, entry['offset'] + entry['length'])
+        if self.writable and os.path.exists(positions_path) and os.path.getsize(positions_path) > self._positions_size:
+            with open(positions_path, 'r+b') as f:
+                f.truncate(self._positions_size)
+
+    @staticmethod
+    def _read_complete_lines(file_path: str) -> list:
+        """只读时不截断文件，忽略正在写入的最后一行"""
+        if not os.path.exists(file_path):
+            return []
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        return data[:data.rfind(b'\n') + 1].splitlines()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, package_name: str):
+        return package_name in self.index
+
+    def package_names(self) -> list:
+        """库中所有包的包名，按首次写入的顺序"""
+        return list(self.index)
+
+    def _intern(self, file_path: str, new_paths: list) -> int:
+        path_id = self.path_ids.get(file_path)
+        if path_id is None:
+            path_id = len(self.paths)
+            self.paths.append(file_path)
+            self.path_ids[file_path] = path_id
+            new_paths.append(file_path)
+        return path_id
+
+    def append(self, package_name: str, positions: dict):
+        """
+        追加一个包的特征位置
+        :param package_name: 包名（name@version，与特征位置文件名一致）
+        :param positions: 特征提取程序返回的特征位置，特征名到{filePath, content}记录列表的映射，可以带有truncated
+        """
+        if not self.writable:
+            raise ValueError(f'Position store {self.dirPath} is opened read-only')
+        with self.lock:
+            new_paths = []
+            record = {}
+            for feature_name, records in positions.items():
+                if feature_name == 'truncated' or len(records) == 0:
+                    continue
+                record[feature_name] = [[self._intern(r['filePath'], new_paths), _encode_content(r['content'])] for r in records]
+            truncated = positions.get('truncated') is True
+            line = json.dumps({'package': package_name, 'positions': record, 'truncated': truncated}, separators=(',', ':'), ensure_ascii=False).encode() + b'\n'
+            if len(new_paths) > 0:
+                self._paths_file.write(b''.join(json.dumps(path, ensure_ascii=False).encode() + b'\n' for path in new_paths))
+                self._paths_file.flush()
+            self._positions_file.write(line)
+            self._positions_file.flush()
+            entry = {'package': package_name, 'offset': self._positions_size, 'length': len(line), 'features': list(record), 'truncated': truncated}
+            self._index_file.write(json.dumps(entry, separators=(',', ':'), ensure_ascii=False).encode() + b'\n')
+            self._index_file.flush()
+            self._positions_size += len(line)
+            self.index[package_name] = entry
+
+    def _read_record(self, entry: dict, f) -> dict:
+        f.seek(entry['offset'])
+        return json.loads(f.read(entry['length']))
+
+    def _decode(self, record: dict, feature_names=None) -> dict:
+        positions = {
+            feature_name: [{'filePath': self.paths[path_id], 'content': _decode_content(content)} for path_id, content in records]
+            for feature_name, records in record['positions'].items()
+            if feature_names is None or feature_name in feature_names
+        }
+        if record['truncated']:
+            positions['truncated'] = True
+        return positions
+
+    def get(self, package_name: str) -> dict:
+        """
+        读取一个包的特征位置，只读取该包的一行
+        :return: 与特征位置文件相同的格式，只包含有记录的特征；包不存在时为None
+        """
+        entry = self.index.get(package_name)
+        if entry is None:
+            return None
+        with open(os.path.join(self.dirPath, POSITIONS_FILE), 'rb') as f:
+            return self._decode(self._read_record(entry, f))
+
+    def search(self, feature_name: str):
+        """
+        查找有某个特征记录的包，根据索引跳过没有该特征的包，不解析它们的特征位置
+        :param feature_name: 特征名，如useEval
+        :return: (包名, 该特征的记录列表)的生成器
+        """
+        entries = sorted((entry for entry in self.index.values() if feature_name in entry['features']), key=lambda entry: entry['offset'])
+        if len(entries) == 0:
+            return
+        with open(os.path.join(self.dirPath, POSITIONS_FILE), 'rb') as f:
+            for entry in entries:
+                yield entry['package'], self._decode(self._read_record(entry, f), [feature_name])[feature_name]
+
+    def reload(self):
+        """只读打开时重新读取路径表与索引，看到之后写入的包"""
+        if not self.writable:
+            self.index = {}
+            self._load()
+
+    def close(self):
+        for f in (self._paths_file, self._positions_file, self._index_file):
+            if f is not None:
+                f.close()
+        self._paths_file = self._positions_file = self._index_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_position_store(dirPath: str) -> PositionStore:
+    """
+    获取文件夹对应的可写特征位置库，同一进程中的所有线程共用一个
+    :param dirPath: 数据集的特征位置文件夹
+    """
+    dirPath = os.path.abspath(dirPath)
+    with _stores_lock:
+        if dirPath not in _stores:
+            _stores[dirPath] = PositionStore(dirPath, writable=True)
+        return _stores[dirPath]
+
+def close_position_stores(dirPaths: list = None):
+    """
+    关闭get_position_store打开的特征位置库
+    :param dirPaths: 需要关闭的文件夹，None表示全部
+    """
+    with _stores_lock:
+        for dirPath in list(_stores) if dirPaths is None else [os.path.abspath(dirPath) for dirPath in dirPaths]:
+            store = _stores.pop(dirPath, None)
+            if store is not None:
+                store.close()
+
+def pack_position_dir(dirPath: str, remove_json: bool = False) -> int:
+    """
+    将文件夹中每个包一个的特征位置JSON文件追加到特征位置库
+    :param dirPath: 数据集的特征位置文件夹
+    :param remove_json: 追加后是否删除JSON文件
+    :return: 追加的包数量
+    """
+    store = get_position_store(dirPath)
+    file_names = sorted(file_name for file_name in os.listdir(dirPath) if file_name.endswith('.json'))
+    for file_name in file_names:
+        file_path = os.path.join(dirPath, file_name)
+        with open(file_path, encoding='utf-8') as f:
+            store.append(file_name[:-len('.json')], json.load(f))
+    for file_name in file_names if remove_json else []:
+        os.remove(os.path.join(dirPath, file_name))
+    return len(file_names)
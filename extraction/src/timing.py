@@ -0,0 +1,87 @@
+import heapq
+import threading
+
+
+# 默认列出的最慢的包与文件数量
+SLOWEST_NUMBER = 20
+
+
+class ExtractTimings:
+    """
+    特征提取各阶段的耗时
+    保存总耗时以及最慢的若干个包与JS文件，内存占用不随包数量增长；可被多个线程同时更新
+    """
+
+    def __init__(self, slowest_number: int = SLOWEST_NUMBER):
+        self.slowest_number = slowest_number
+        self.lock = threading.Lock()
+        self.packages = 0
+        self.files = 0
+        self.totals = {'decompress_seconds': 0.0, 'analyze_seconds': 0.0, 'package_json_ms': 0.0, 'install_script_ms': 0.0, 'parse_ms': 0.0, 'traverse_ms': 0.0, 'regexp_ms': 0.0}
+        # 最小堆，堆顶是目前保留的最快的一项
+        self._slowest_packages = []
+        self._slowest_files = []
+        self._counter = 0
+
+    def _push(self, heap: list, seconds: float, item: dict):
+        self._counter += 1
+        entry = (seconds, self._counter, item)
+        if len(heap) < self.slowest_number:
+            heapq.heappush(heap, entry)
+        elif seconds > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+
+    def add_decompress(self, tarball_path: str, seconds: float):
+        """记录解压一个压缩文件的耗时"""
+        with self.lock:
+            self.totals['decompress_seconds'] += seconds
+
+    def add_package(self, package_path: str, seconds: float, timing: dict = None):
+        """
+        记录分析一个包的耗时
+        :param seconds: 请求特征提取程序到收到结果的时间
+        :param timing: 特征提取程序返回的各阶段耗时（毫秒），包括每个JS文件解析、遍历AST与正则匹配的耗时
+        """
+        with self.lock:
+            self.packages += 1
+            self.totals['analyze_seconds'] += seconds
+            item = {'package': package_path, 'seconds': seconds}
+            if timing is not None:
+                files = timing['files']
+                self.files += len(files)
+                self.totals['package_json_ms'] += timing['packageJSONMs']
+                self.totals['install_script_ms'] += timing['installScriptMs']
+                for file in files:
+                    self.totals['parse_ms'] += file['parseMs']
+                    self.totals['traverse_ms'] += file['traverseMs']
+                    self.totals['regexp_ms'] += file['regExpMs']
+                    self._push(self._slowest_files, file['parseMs'] + file['traverseMs'] + file['regExpMs'], dict(file, package=package_path))
+                item.update(files=len(files), parse_ms=sum(file['parseMs'] for file in files), traverse_ms=sum(file['traverseMs'] for file in files), regexp_ms=sum(file['regExpMs'] for file in files))
+            self._push(self._slowest_packages, seconds, item)
+
+    def slowest_packages(self) -> list:
+        with self.lock:
+            return [item for _, _, item in sorted(self._slowest_packages, key=lambda entry: entry[0], reverse=True)]
+
+    def slowest_files(self) -> list:
+        with self.lock:
+            return [item for _, _, item in sorted(self._slowest_files, key=lambda entry: entry[0], reverse=True)]
+
+    def to_dict(self) -> dict:
+        return {
+            'packages': self.packages,
+            'files': self.files,
+            'totals': dict(self.totals),
+            'slowest_packages': self.slowest_packages(),
+            'slowest_files': self.slowest_files()
+        }
+
+    def print_summary(self, number: int = 5):
+        """打印各阶段的总耗时与最慢的几个包和文件"""
+        totals = self.totals
+        print(f"Analyzed {self.packages} packages ({self.files} JS files) in {totals['analyze_seconds']:.1f} s, decompressed in {totals['decompress_seconds']:.1f} s")
+        print(f"  package.json {totals['package_json_ms'] / 1000:.1f} s, install scripts {totals['install_script_ms'] / 1000:.1f} s, parse {totals['parse_ms'] / 1000:.1f} s, traverse {totals['traverse_ms'] / 1000:.1f} s, regexp {totals['regexp_ms'] / 1000:.1f} s")
+        for item in self.slowest_packages()[:number]:
+            print(f"  slow package {item['seconds']:8.2f} s  {item['package']}")
+        for item in self.slowest_files()[:number]:
+            print(f"  slow file    {(item['parseMs'] + item['traverseMs'] + item['regExpMs']) / 1000:8.2f} s  {item['filePath']} ({item['size']} bytes)")
@@ -0,0 +1,325 @@
+import os
+import json
+import time
+import select
+import signal
+import hashlib
+import threading
+import subprocess
+
+from conf.settings import FEATURE_EXTRACT_PATH
+
+
+EXTRACTOR_DIST_PATH = os.path.join(FEATURE_EXTRACT_PATH, 'dist')
+EXTRACTOR_BUNDLE_PATH = os.path.join(EXTRACTOR_DIST_PATH, 'main.js')
+EXTRACTOR_LOG_PATH = os.path.join(FEATURE_EXTRACT_PATH, 'log')
+
+# 保存构建时源码hash的文件
+EXTRACTOR_SOURCE_HASH_PATH = os.path.join(EXTRACTOR_DIST_PATH, '.source-hash')
+
+# 影响构建结果的文件与文件夹
+EXTRACTOR_SOURCES = ['src', 'material', 'package.json', 'package-lock.json', 'tsconfig.json', 'webpack.config.js']
+
+# 等待结果时检查特征提取进程内存占用的间隔（秒）
+MEMORY_POLL_INTERVAL = 0.5
+
+# 进程内存上限中留给V8堆以外的空间（MiB），堆的上限低于进程内存上限
+HEAP_HEADROOM = 256
+
+# V8堆耗尽时node输出的错误信息
+HEAP_EXHAUSTED_MESSAGE = 'heap out of memory'
+
+_build_lock = threading.Lock()
+
+
+def extractor_source_hash() -> str:
+    """计算特征提取程序源码的hash"""
+    sha256 = hashlib.sha256()
+    for source in EXTRACTOR_SOURCES:
+        source_path = os.path.join(FEATURE_EXTRACT_PATH, source)
+        file_paths = []
+        if os.path.isdir(source_path):
+            for dirpath, _, filenames in os.walk(source_path):
+                file_paths.extend(os.path.join(dirpath, filename) for filename in filenames)
+        elif os.path.isfile(source_path):
+            file_paths.append(source_path)
+        for file_path in sorted(file_paths):
+            sha256.update(os.path.relpath(file_path, FEATURE_EXTRACT_PATH).encode())
+            with open(file_path, 'rb') as f:
+                sha256.update(f.read())
+    return sha256.hexdigest()
+
+def build_extractor():
+    """使用webpack构建特征提取程序"""
+    subprocess.run(['npm', 'run', 'compile'], cwd=FEATURE_EXTRACT_PATH, check=True, stdout=subprocess.DEVNULL)
+
+def ensure_extractor_built():
+    """只有源码发生变化或尚未构建时才构建特征提取程序"""
+    with _build_lock:
+        source_hash = extractor_source_hash()
+        if os.path.exists(EXTRACTOR_BUNDLE_PATH) and os.path.exists(EXTRACTOR_SOURCE_HASH_PATH):
+            with open(EXTRACTOR_SOURCE_HASH_PATH) as f:
+                if f.read().strip() == source_hash:
+                    return
+        build_extractor()
+        with open(EXTRACTOR_SOURCE_HASH_PATH, 'w') as f:
+            f.write(source_hash)
+
+
+class ExtractorError(Exception):
+    """特征提取程序处理请求失败"""
+
+
+class ExtractorAborted(ExtractorError):
+    """特征提取进程超时、超出内存上限或意外退出，请求没有结果，进程需要重启"""
+
+    def __init__(self, reason: str, message: str, stage: str = None, file_path: str = None, elapsed: float = None):
+        """
+        :param reason: timeout、memory或exit
+        :param stage: 中止时正在进行的阶段（package.json、install-scripts、js-file等），未知时为None
+        :param file_path: 中止时正在分析的文件
+        :param elapsed: 发送请求后经过的秒数
+        """
+        super().__init__(message)
+        self.reason = reason
+        self.stage = stage
+        self.file_path = file_path
+        self.elapsed = elapsed
+
+
+def get_heap_limit(memory_limit: int) -> int:
+    """
+    V8堆的上限（MiB），为进程内存上限留出堆以外（代码、Buffer、解析器）占用的空间
+    :param memory_limit: 进程的内存上限（MiB）
+    """
+    return max(memory_limit - min(HEAP_HEADROOM, memory_limit // 4), 16)
+
+def get_process_rss(pid: int) -> int:
+    """:return: 进程的常驻内存（MiB），无法读取（非Linux）时为None"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+class ExtractorWorker:
+    """
+    常驻的特征提取进程
+    通过stdin/stdout以JSON行的形式发送请求、接收结果，一个进程同一时间只处理一个请求
+    """
+
+    def __init__(self, index: int = 0, log_file=None, log_lock: threading.Lock = None, file_cache_path: str = None, file_cache_version: str = None, timeout: float = None, memory_limit: int = None):
+        """
+        :param index: 进程编号，用于区分日志
+        :param log_file: 特征提取进程的日志（stderr）加上进程编号后写入该文件并打印，None表示直接输出到stderr
+        :param log_lock: 多个进程写入同一日志文件时共用的锁
+        :param file_cache_path: JS文件缓存文件夹，内容相同的JS文件只分析一次，None表示不使用
+        :param file_cache_version: JS文件缓存的版本，None表示使用特征提取程序源码的hash
+        :param timeout: 分析一个包的时限（秒），超时后杀死进程，None表示不限制
+        :param memory_limit: 进程的内存上限（MiB），超出后杀死进程，None表示不限制；
+            V8堆的上限略低于该值（见get_heap_limit），堆耗尽导致的退出同样记为超出内存上限
+        """
+        self.index = index
+        self.file_cache_path = file_cache_path
+        self.file_cache_version = file_cache_version
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.log_file = log_file
+        self.log_lock = log_lock if log_lock is not None else threading.Lock()
+        self.process = None
+        self.log_thread = None
+        self.next_id = 0
+        # 从stdout读到、尚未组成完整一行的内容
+        self._buffer = b''
+        # 日志中出现了V8堆耗尽的错误
+        self._heap_exhausted = False
+        # 当前请求正在进行的阶段与文件，由特征提取程序的进度消息更新
+        self.stage = None
+        self.stage_file_path = None
+
+    def start(self):
+        """启动特征提取进程"""
+        ensure_extractor_built()
+        args = ['node', 'main.js', '--serve', '--worker', str(self.index)]
+        if self.memory_limit is not None:
+            args.insert(1, f'--max-old-space-size={get_heap_limit(self.memory_limit)}')
+        if self.file_cache_path is not None:
+            args += ['--file-cache', self.file_cache_path, self.file_cache_version or extractor_source_hash()]
+        self.process = subprocess.Popen(
+            args,
+            cwd=EXTRACTOR_DIST_PATH,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE if self.log_file is not None else None,
+            text=True,
+            bufsize=1
+        )
+        if self.log_file is not None:
+            self.log_thread = threading.Thread(target=self._forward_log, args=(self.process.stderr,), daemon=True)
+            self.log_thread.start()
+        self._buffer = b''
+        self._heap_exhausted = False
+        return self
+
+    def _forward_log(self, stream):
+        """将特征提取进程的日志加上进程编号后写入日志文件"""
+        prefix = f'[worker {self.index}] '
+        for line in stream:
+            line = line.rstrip('\n')
+            if line == '':
+                continue
+            if HEAP_EXHAUSTED_MESSAGE in line:
+                self._heap_exhausted = True
+            with self.log_lock:
+                print(prefix + line, flush=True)
+                self.log_file.write(prefix + line + '\n')
+
+    def _abort(self, reason: str, message: str, start: float):
+        """杀死卡住的进程"""
+        self.process.kill()
+        self.process.wait()
+        return ExtractorAborted(reason, message, self.stage, self.stage_file_path, time.monotonic() - start)
+
+    def _exit_reason(self, code: int) -> str:
+        """
+        进程退出的原因，V8堆耗尽时node打印错误后以SIGABRT退出，记为memory，与超出内存上限被杀死的包一起重试与隔离
+        :param code: 进程的返回值
+        :return: memory或exit
+        """
+        if self.memory_limit is None:
+            return 'exit'
+        if self.log_thread is not None:
+            # 等待日志线程读完stderr中的错误信息
+            self.log_thread.join(timeout=1)
+        if self._heap_exhausted or code in (-signal.SIGABRT, 128 + signal.SIGABRT):
+            return 'memory'
+        return 'exit'
+
+    def _read_line(self, start: float, timeout: float = None) -> str:
+        """
+        读取stdout的一行，超时或超出内存上限时杀死进程
+        直接读取文件描述符，自行缓存不完整的行，select不会漏掉已读入缓冲区的内容
+        :raise ExtractorAborted: 超时、超出内存上限或进程退出
+        """
+        fd = self.process.stdout.fileno()
+        while b'\n' not in self._buffer:
+            wait = None
+            if timeout is not None:
+                remaining = start + timeout - time.monotonic()
+                if remaining <= 0:
+                    raise self._abort('timeout', f'Extractor worker timed out after {timeout} s', start)
+                wait = remaining
+            if self.memory_limit is not None:
+                wait = MEMORY_POLL_INTERVAL if wait is None else min(wait, MEMORY_POLL_INTERVAL)
+            ready, _, _ = select.select([fd], [], [], wait)
+            if not ready:
+                rss = get_process_rss(self.process.pid) if self.memory_limit is not None else None
+                if rss is not None and rss > self.memory_limit:
+                    raise self._abort('memory', f'Extractor worker used {rss} MiB, more than {self.memory_limit} MiB', start)
+                continue
+            data = os.read(fd, 1 << 16)
+            if data == b'':
+                code = self.process.wait()
+                reason = self._exit_reason(code)
+                message = f'Extractor worker ran out of memory (exit code {code})' if reason == 'memory' else f'Extractor worker exited with code {code}'
+                raise ExtractorAborted(reason, message, self.stage, self.stage_file_path, time.monotonic() - start)
+            self._buffer += data
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return line.decode('utf-8')
+
+    def request(self, payload: dict, timeout: float = None) -> dict:
+        """
+        发送一个请求并等待结果，特征提取程序的进度消息用于记录当前阶段
+        :param timeout: 等待结果的时限（秒），None表示不限制
+        :raise ExtractorAborted: 特征提取进程超时、超出内存上限或退出
+        :raise ExtractorError: 特征提取进程没有运行或处理请求失败
+        """
+        if self.process is None or self.process.poll() is not None:
+            raise ExtractorError('Extractor worker is not running')
+        self.next_id += 1
+        payload = dict(payload, id=self.next_id)
+        self.stage = None
+        self.stage_file_path = None
+        start = time.monotonic()
+        try:
+            self.process.stdin.write(json.dumps(payload) + '\n')
+            self.process.stdin.flush()
+        except BrokenPipeError:
+            raise ExtractorAborted('exit', f'Extractor worker exited with code {self.process.wait()}')
+        while True:
+            response = json.loads(self._read_line(start, timeout))
+            if 'progress' not in response:
+                break
+            self.stage = response['progress'].get('stage')
+            self.stage_file_path = response['progress'].get('filePath')
+        if not response['ok']:
+            raise ExtractorError(response['error'])
+        return response
+
+    def analyze(self, package_path: str, feature_path: str = None, feature_position_path: str = None, timing: bool = False, refresh_file_cache: bool = False, fast: bool = False, positions: bool = True) -> dict:
+        """
+        提取单个包的特征
+        :param package_path: 包路径，其中应有package.json
+        :param feature_path: 特征文件夹路径，None表示不写入特征文件
+        :param feature_position_path: 特征位置文件夹路径，None表示不写入特征位置文件
+        :param timing: 是否返回各阶段的耗时（timing），包括每个JS文件解析、遍历AST与正则匹配的毫秒数
+        :param refresh_file_cache: 是否忽略JS文件缓存重新分析每个JS文件（结果仍写入缓存）
+        :param fast: 快速模式，剩余的JS文件不可能改变特征向量时停止分析，此时特征位置不完整（truncated）
+        :param positions: 是否记录特征位置，False时只计算特征向量，返回的特征位置为空并标记为不完整
+        设置了时限或内存上限时，超出后进程被杀死并抛出ExtractorAborted，需要restart后才能继续使用
+        :return: 包名、特征向量（特征名与特征值组成的列表）、特征位置、特征位置是否不完整，使用JS文件缓存时还有缓存命中情况（fileCache）
+        """
+        payload = {'command': 'extract', 'packagePath': package_path}
+        if timing:
+            payload['timing'] = True
+        if refresh_file_cache:
+            payload['refreshFileCache'] = True
+        if fast:
+            payload['fast'] = True
+        if not positions:
+            payload['positions'] = False
+        if self.timeout is not None or self.memory_limit is not None:
+            # 请求进度消息，超时时可以知道卡在哪个阶段
+            payload['progress'] = True
+        if feature_path is not None:
+            payload['featureDirPath'] = feature_path
+        if feature_position_path is not None:
+            payload['featurePosDirPath'] = feature_position_path
+        return self.request(payload, self.timeout)
+
+    def list_packages(self, dataset_path: str) -> list:
+        """获取数据集中所有包的路径"""
+        return self.request({'command': 'list', 'packageDirPath': dataset_path})['packages']
+
+    def close(self):
+        """关闭特征提取进程"""
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self.log_thread is not None:
+            self.log_thread.join()
+            self.log_thread = None
+        self.process = None
+
+    def restart(self):
+        """结束当前进程并启动新的特征提取进程"""
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+        self.close()
+        return self.start()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
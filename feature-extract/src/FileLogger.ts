@@ -1,6 +1,7 @@
 import { type FileHandle, open, mkdir } from 'fs/promises'
 import { dirname, join } from 'path'
 import { getRootDirectory } from './util'
+import { getConfig } from './config'
 
 export class FileLogger {
   fileHandler: FileHandle
@@ -32,7 +33,7 @@ export async function getFileLogger (): Promise<FileLogger> {
     return logger
   }
   logger = new FileLogger()
-  const logPath = join(getRootDirectory(), 'log', 'error.log')
+  const logPath = join(getRootDirectory(), 'log', getConfig().errorLogName)
   await logger.init(logPath)
   return logger
 }
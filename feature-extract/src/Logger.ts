@@ -1,13 +1,22 @@
 import chalk from 'chalk'
+import { getConfig } from './config'
+
+function output (message: string) {
+  if (getConfig().logToStderr) {
+    console.error(message)
+  } else {
+    console.log(message)
+  }
+}
 
 export const Logger = {
   info (message: string) {
-    console.log(chalk.green(`${new Date().toLocaleString()}: ${message}\n`))
+    output(chalk.green(`${new Date().toLocaleString()}: ${message}\n`))
   },
   warning (message: string) {
-    console.log(chalk.yellow(`${new Date().toLocaleString()}: ${message}\n`))
+    output(chalk.yellow(`${new Date().toLocaleString()}: ${message}\n`))
   },
   error (message: string) {
-    console.log(chalk.red(`${new Date().toLocaleString()}: ${message}\n`))
+    output(chalk.red(`${new Date().toLocaleString()}: ${message}\n`))
   }
-}
+}
\ No newline at end of file
@@ -1,4 +1,6 @@
 import { type PositionRecorder } from './feature-extract/PositionRecorder'
+import { type TimingRecorder } from './feature-extract/TimingRecorder'
+import { type JSFileCache } from './feature-extract/JSFileCache'
 
 export enum Classifier {
   RF = 'RF',
@@ -9,12 +11,20 @@ export enum Classifier {
 
 interface Config {
   positionRecorder: PositionRecorder | null
+  timingRecorder: TimingRecorder | null
+  jsFileCache: JSFileCache | null
   classifier: Classifier
+  errorLogName: string
+  logToStderr: boolean
 }
 
 const config: Config = {
   positionRecorder: null,
-  classifier: Classifier.SVM
+  timingRecorder: null,
+  jsFileCache: null,
+  classifier: Classifier.SVM,
+  errorLogName: 'error.log',
+  logToStderr: false
 }
 
 export const getConfig = () => config
@@ -23,6 +33,22 @@ export const setPositionRecorder = (positionRecorder: PositionRecorder) => {
   config.positionRecorder = positionRecorder
 }
 
+export const setTimingRecorder = (timingRecorder: TimingRecorder) => {
+  config.timingRecorder = timingRecorder
+}
+
+export const setJSFileCache = (jsFileCache: JSFileCache) => {
+  config.jsFileCache = jsFileCache
+}
+
 export const setClassifier = (classifier: Classifier) => {
   config.classifier = classifier
 }
+
+export const setErrorLogName = (errorLogName: string) => {
+  config.errorLogName = errorLogName
+}
+
+export const setLogToStderr = (logToStderr: boolean) => {
+  config.logToStderr = logToStderr
+}
@@ -11,6 +11,8 @@ import {
 } from './Patterns'
 import { getFileLogger } from '../FileLogger'
 import { type PositionRecorder, type Record } from './PositionRecorder'
+import { elapsedMs, type FileTiming } from './TimingRecorder'
+import { performance } from 'perf_hooks'
 
 const MAX_STRING_LENGTH = 66875
 
@@ -21,6 +23,7 @@ const MAX_STRING_LENGTH = 66875
  * @param isInstallScript whether the JavaScript file name is present in install script
  * @param targetJSFilePath current analyzed file path
  * @param positionRecorder feature position recorder
+ * @param fileTiming records the time spent on parsing and traversing the file
  * @returns feature information
  */
 export async function extractFeaturesFromJSFileByAST (
@@ -28,7 +31,8 @@ export async function extractFeaturesFromJSFileByAST (
   featureSet: PackageFeatureInfo,
   isInstallScript: boolean,
   targetJSFilePath: string,
-  positionRecorder: PositionRecorder
+  positionRecorder: PositionRecorder,
+  fileTiming?: FileTiming
 ): Promise<PackageFeatureInfo> {
   function getRecord (path: any) {
     return {
@@ -39,6 +43,7 @@ export async function extractFeaturesFromJSFileByAST (
 
   const logger = await getFileLogger()
   let ast: any
+  const parseStartTime = performance.now()
   try {
     ast = parse(code, {
       sourceType: 'unambiguous'
@@ -49,6 +54,10 @@ export async function extractFeaturesFromJSFileByAST (
     await logger.log(`ERROR MESSAGE: ${errorObj.name}: ${errorObj.message}`)
     await logger.log('ERROR STACK:' + errorObj.stack)
   }
+  if (fileTiming !== undefined) {
+    fileTiming.parseMs = elapsedMs(parseStartTime)
+  }
+  const traverseStartTime = performance.now()
   try {
     traverse(ast, {
       CallExpression: function (path) {
@@ -296,6 +305,9 @@ export async function extractFeaturesFromJSFileByAST (
     await logger.log(`ERROR MESSAGE: ${errorObj.name}: ${errorObj.message}`)
     await logger.log('ERROR STACK:' + errorObj.stack)
   }
+  if (fileTiming !== undefined) {
+    fileTiming.traverseMs = elapsedMs(traverseStartTime)
+  }
 
   return featureSet
 }
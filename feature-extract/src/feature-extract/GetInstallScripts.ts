@@ -5,6 +5,7 @@ import { accessSync, readFileSync } from 'fs'
 import { dirname, join } from 'path'
 import { isStringLiteral } from '@babel/types'
 import { getFileLogger } from '../FileLogger'
+import { Logger } from '../Logger'
 
 /**
  * Get all JavaScript files that are executed or imported directly and indirectly in the install hook
@@ -50,7 +51,7 @@ export async function getAllJSFilesInInstallScript (jsFilesInInstallScript: stri
                         accessSync(importScript)
                         jsFilesInInstallScript.push(importScript)
                       } catch (error) {
-                        console.log(error)
+                        Logger.warning(`The file ${importScript} required in ${jsFilesInInstallScript[idx]} doesn't exist.`)
                       }
                     }
                   }
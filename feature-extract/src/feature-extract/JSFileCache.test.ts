@@ -0,0 +1,78 @@
+import { mkdir, mkdtemp, rm, writeFile } from 'fs/promises'
+import { tmpdir } from 'os'
+import { join } from 'path'
+import { getContentHash, JSFileCache, type JSFileContribution } from './JSFileCache'
+import { getPackageFeatureInfo } from './PackageFeatureInfo'
+import { getConfig, setJSFileCache } from '../config'
+
+// chalk 5 is ESM only and is not transformed by ts-jest
+jest.mock('chalk', () => {
+  const identity = (message: string) => message
+  return { __esModule: true, default: { red: identity, green: identity, yellow: identity } }
+})
+// keep the error log out of the source tree
+jest.mock('../FileLogger', () => ({
+  getFileLogger: async () => ({ log: async () => {} })
+}))
+
+const CODE = "eval('1')\n"
+
+let rootPath: string
+
+beforeAll(async () => {
+  rootPath = await mkdtemp(join(tmpdir(), 'js-file-cache-'))
+})
+
+afterAll(async () => {
+  await rm(rootPath, { recursive: true, force: true })
+})
+
+test('entries are keyed by content hash, install script and extractor version', async () => {
+  const cacheDirPath = join(rootPath, 'entries')
+  const cache = new JSFileCache(cacheDirPath, '1.0.0')
+  const contribution: JSFileContribution = { features: ['useEval'], positions: { useEval: ['eval'] } }
+  const contentHash = getContentHash(CODE)
+
+  expect(await cache.get(contentHash, false, CODE.length)).toBeUndefined()
+  expect(cache.stats).toEqual({ hits: 0, misses: 1, bytesSkipped: 0 })
+
+  await cache.put(contentHash, false, contribution)
+  expect(await cache.get(contentHash, false, CODE.length)).toEqual(contribution)
+  expect(cache.stats).toEqual({ hits: 1, misses: 1, bytesSkipped: CODE.length })
+
+  // the same file run by an install script sets other features
+  expect(await cache.get(contentHash, true, CODE.length)).toBeUndefined()
+  // entries of another extractor version are ignored
+  expect(await new JSFileCache(cacheDirPath, '2.0.0').get(contentHash, false, CODE.length)).toBeUndefined()
+  // a new instance reads the entries written by another process
+  expect(await new JSFileCache(cacheDirPath, '1.0.0').get(contentHash, false, CODE.length)).toEqual(contribution)
+})
+
+test('refreshFileCache analyzes every file again and replaces the entries', async () => {
+  const packagePath = join(rootPath, 'package')
+  await mkdir(packagePath)
+  await writeFile(join(packagePath, 'package.json'), JSON.stringify({ name: 'cached', version: '1.0.0' }))
+  await writeFile(join(packagePath, 'index.js'), CODE)
+  const cache = new JSFileCache(join(rootPath, 'packages'), '1.0.0')
+  setJSFileCache(cache)
+
+  // miss: the file is analyzed and its contribution cached
+  expect((await getPackageFeatureInfo(packagePath)).useEval).toBe(true)
+  expect(cache.stats).toEqual({ hits: 0, misses: 1, bytesSkipped: 0 })
+
+  // hit: the cached contribution is used, positions included
+  expect((await getPackageFeatureInfo(packagePath)).useEval).toBe(true)
+  expect(cache.stats).toEqual({ hits: 1, misses: 1, bytesSkipped: CODE.length })
+  expect(getConfig().positionRecorder!.featurePosSet.useEval).toHaveLength(1)
+
+  // a stale entry is used until the cache is refreshed
+  await cache.put(getContentHash(CODE), false, { features: [], positions: {} })
+  expect((await getPackageFeatureInfo(packagePath)).useEval).toBe(false)
+  expect(cache.stats.hits).toBe(2)
+
+  // refresh: the cache is not looked up and the stale entry is replaced
+  expect((await getPackageFeatureInfo(packagePath, { refreshFileCache: true })).useEval).toBe(true)
+  expect(cache.stats).toEqual({ hits: 2, misses: 1, bytesSkipped: 2 * CODE.length })
+  expect((await getPackageFeatureInfo(packagePath)).useEval).toBe(true)
+  expect(cache.stats.hits).toBe(3)
+})
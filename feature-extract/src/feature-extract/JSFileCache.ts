@@ -0,0 +1,133 @@
+import { createHash } from 'crypto'
+import { mkdir, readFile, rename, writeFile } from 'fs/promises'
+import { dirname, join } from 'path'
+import { type PackageFeatureInfo } from './PackageFeatureInfo'
+import { type PositionRecorder, type Record } from './PositionRecorder'
+import {
+  base64_Pattern,
+  bytestring_pattern2,
+  getDomainPattern,
+  IP_Pattern,
+  Network_Command_Pattern,
+  SensitiveStringPattern
+} from './Patterns'
+
+// Bump when the analysis of a JavaScript file changes without a change of the extractor version
+const JS_FILE_CACHE_VERSION = 1
+
+/**
+ * The features and feature positions a JavaScript file contributes to its package
+ */
+export interface JSFileContribution {
+  features: Array<keyof PackageFeatureInfo>
+  positions: { [key: string]: Array<Record['content']> }
+}
+
+export interface JSFileCacheStats {
+  hits: number
+  misses: number
+  bytesSkipped: number
+}
+
+/**
+ * Hash of the patterns used to analyze JavaScript files, so that cached results are dropped when a pattern changes
+ */
+export function getPatternVersion () {
+  const patterns = [IP_Pattern, base64_Pattern, bytestring_pattern2, getDomainPattern(), Network_Command_Pattern, SensitiveStringPattern]
+  return createHash('sha256').update(patterns.map(pattern => `${pattern.source}/${pattern.flags}`).join('\n')).digest('hex')
+}
+
+/**
+ * Hash of the content of a JavaScript file
+ */
+export function getContentHash (code: string) {
+  return createHash('sha256').update(code).digest('hex')
+}
+
+/**
+ * Collect the features and positions recorded while analyzing a single JavaScript file
+ * @param fileFeatureInfo the features set by analyzing the file only
+ * @param filePositionRecorder the positions recorded by analyzing the file only
+ */
+export function getContribution (fileFeatureInfo: Partial<PackageFeatureInfo>, filePositionRecorder: PositionRecorder): JSFileContribution {
+  const features = (Object.keys(fileFeatureInfo) as Array<keyof PackageFeatureInfo>).filter(key => fileFeatureInfo[key] === true)
+  const positions: JSFileContribution['positions'] = {}
+  const featurePosSet = filePositionRecorder.featurePosSet
+  for (const key of Object.keys(featurePosSet) as Array<keyof typeof featurePosSet>) {
+    const records = featurePosSet[key]
+    if (records.length > 0) {
+      positions[key] = records.map(record => record.content)
+    }
+  }
+  return { features, positions }
+}
+
+/**
+ * Add the contribution of a JavaScript file to the features and positions of its package
+ * @param contribution the contribution of the file
+ * @param result feature information of the package
+ * @param positionRecorder feature position recorder of the package
+ * @param targetJSFilePath the path to the file in this package
+ */
+export function applyContribution (contribution: JSFileContribution, result: PackageFeatureInfo, positionRecorder: PositionRecorder, targetJSFilePath: string) {
+  for (const key of contribution.features) {
+    // @ts-expect-error only boolean features are contributed by JavaScript files
+    result[key] = true
+  }
+  for (const key of Object.keys(contribution.positions)) {
+    for (const content of contribution.positions[key]) {
+      positionRecorder.addRecord(key as keyof PackageFeatureInfo, { filePath: targetJSFilePath, content })
+    }
+  }
+}
+
+/**
+ * On-disk store of the analysis results of JavaScript files, keyed by the file content hash and
+ * whether the file is run by an install script. Byte-identical files vendored by many packages are analyzed once.
+ * Every entry is a small JSON file written atomically, so several extractor processes can share one store.
+ */
+export class JSFileCache {
+  private readonly dirPath: string
+  stats: JSFileCacheStats = { hits: 0, misses: 0, bytesSkipped: 0 }
+
+  /**
+   * @param cacheDirPath the directory of the store
+   * @param extractorVersion version of the extractor, entries of other versions are ignored
+   */
+  constructor (cacheDirPath: string, extractorVersion: string) {
+    const version = createHash('sha256').update(`${JS_FILE_CACHE_VERSION}\n${extractorVersion}\n${getPatternVersion()}`).digest('hex')
+    this.dirPath = join(cacheDirPath, version.slice(0, 16))
+  }
+
+  private getEntryPath (contentHash: string, isInstallScript: boolean) {
+    return join(this.dirPath, contentHash.slice(0, 2), `${contentHash}-${isInstallScript ? 'install' : 'file'}.json`)
+  }
+
+  /**
+   * Look up the contribution of a file
+   * @param contentHash hash of the file content
+   * @param isInstallScript whether the file is run by an install script
+   * @param size the size of the file, counted as skipped on a hit
+   * @returns the cached contribution or undefined on a miss
+   */
+  async get (contentHash: string, isInstallScript: boolean, size: number): Promise<JSFileContribution | undefined> {
+    try {
+      const contribution = JSON.parse(await readFile(this.getEntryPath(contentHash, isInstallScript), { encoding: 'utf-8' }))
+      this.stats.hits++
+      this.stats.bytesSkipped += size
+      return contribution
+    } catch (error) {
+      // missing or broken entries are analyzed again
+      this.stats.misses++
+      return undefined
+    }
+  }
+
+  async put (contentHash: string, isInstallScript: boolean, contribution: JSFileContribution) {
+    const entryPath = this.getEntryPath(contentHash, isInstallScript)
+    await mkdir(dirname(entryPath), { recursive: true })
+    const tempPath = `${entryPath}.${process.pid}.tmp`
+    await writeFile(tempPath, JSON.stringify(contribution))
+    await rename(tempPath, entryPath)
+  }
+}
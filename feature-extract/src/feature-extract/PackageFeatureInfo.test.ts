@@ -0,0 +1,107 @@
+import { mkdtemp, rm, writeFile } from 'fs/promises'
+import { tmpdir } from 'os'
+import { join } from 'path'
+import { getPackageFeatureInfo, type PackageFeatureInfo } from './PackageFeatureInfo'
+import { getConfig } from '../config'
+
+// chalk 5 is ESM only and is not transformed by ts-jest
+jest.mock('chalk', () => {
+  const identity = (message: string) => message
+  return { __esModule: true, default: { red: identity, green: identity, yellow: identity } }
+})
+// keep the error log out of the source tree
+jest.mock('../FileLogger', () => ({
+  getFileLogger: async () => ({ log: async () => {} })
+}))
+
+const JS_FILE_FEATURES: Array<keyof PackageFeatureInfo> = [
+  'containIP',
+  'useBase64Conversion',
+  'containBase64StringInJSFile',
+  'containBytestring',
+  'containDomainInJSFile',
+  'useBuffer',
+  'useEval',
+  'requireChildProcessInJSFile',
+  'accessFSInJSFile',
+  'accessNetworkInJSFile',
+  'accessProcessEnvInJSFile',
+  'containSuspiciousString',
+  'accessCryptoAndZip',
+  'accessSensitiveAPI'
+]
+
+// sets every feature a JavaScript file can set
+const SATURATING_CODE = [
+  "const cp = require('child_process')",
+  "const fs = require('fs')",
+  "const http = require('http')",
+  "const crypto = require('crypto')",
+  "const os = require('os')",
+  'os.homedir()',
+  "const ip = '10.0.0.1'",
+  "const host = 'example.com'",
+  "const shadow = '/etc/shadow'",
+  "const bytes = \"\\x41\\x42\"",
+  "const decoded = Buffer.from('aGVsbG8=', 'base64')",
+  "eval('1')",
+  'const home = process.env.HOME',
+  ''
+].join('\n')
+
+let packagePath: string
+
+beforeAll(async () => {
+  packagePath = await mkdtemp(join(tmpdir(), 'package-feature-info-'))
+  await writeFile(join(packagePath, 'package.json'), JSON.stringify({
+    name: 'saturated',
+    version: '1.0.0',
+    scripts: { postinstall: 'node install.js' }
+  }))
+  // the install script is the largest file but is still analyzed first
+  await writeFile(join(packagePath, 'install.js'), "require('child_process')\n" + '// padding\n'.repeat(200))
+  await writeFile(join(packagePath, 'all.js'), SATURATING_CODE)
+  await writeFile(join(packagePath, 'bundle.js'), SATURATING_CODE + '// padding\n'.repeat(100))
+})
+
+afterAll(async () => {
+  await rm(packagePath, { recursive: true, force: true })
+})
+
+async function analyze (fastMode: boolean) {
+  const analyzed: string[] = []
+  const result = await getPackageFeatureInfo(packagePath, {
+    fastMode,
+    onProgress: (stage, filePath) => {
+      if (stage === 'js-file') {
+        analyzed.push(filePath!)
+      }
+    }
+  })
+  return { result, analyzed }
+}
+
+test('fast mode stops once every JavaScript file feature is set', async () => {
+  const { result, analyzed } = await analyze(true)
+  expect(analyzed).toEqual([join(packagePath, 'install.js'), join(packagePath, 'all.js')])
+  for (const key of JS_FILE_FEATURES) {
+    expect([key, result[key]]).toEqual([key, true])
+  }
+  expect(getConfig().positionRecorder!.truncated).toBe(true)
+})
+
+test('fast mode still reports the features of install scripts', async () => {
+  const { result } = await analyze(true)
+  expect(result.hasInstallScripts).toBe(true)
+  expect(result.requireChildProcessInInstallScript).toBe(true)
+  // all.js is not run by the install script
+  expect(result.accessFSInInstallScript).toBe(false)
+})
+
+test('without fast mode every JavaScript file is analyzed', async () => {
+  const fast = await analyze(true)
+  const { result, analyzed } = await analyze(false)
+  expect(analyzed.sort()).toEqual(['all.js', 'bundle.js', 'install.js'].map(name => join(packagePath, name)))
+  expect(result).toEqual(fast.result)
+  expect(getConfig().positionRecorder!.truncated).toBe(false)
+})
@@ -7,11 +7,63 @@ import { extractFeaturesFromJSFileByAST } from './AST'
 import { matchUseRegExp } from './RegExp'
 import chalk from 'chalk'
 import { PositionRecorder } from './PositionRecorder'
-import { setPositionRecorder } from '../config'
+import { TimingRecorder, elapsedMs } from './TimingRecorder'
+import { performance } from 'perf_hooks'
+import { applyContribution, getContentHash, getContribution } from './JSFileCache'
+import { getConfig, setPositionRecorder, setTimingRecorder } from '../config'
 import { Logger } from '../Logger'
 
 const ALLOWED_MAX_JS_SIZE = 2 * 1024 * 1024
 
+// features any JavaScript file can set
+const JS_FILE_FEATURES: Array<keyof PackageFeatureInfo> = [
+  'containIP',
+  'useBase64Conversion',
+  'containBase64StringInJSFile',
+  'containBytestring',
+  'containDomainInJSFile',
+  'useBuffer',
+  'useEval',
+  'requireChildProcessInJSFile',
+  'accessFSInJSFile',
+  'accessNetworkInJSFile',
+  'accessProcessEnvInJSFile',
+  'containSuspiciousString',
+  'accessCryptoAndZip',
+  'accessSensitiveAPI'
+]
+
+// features only JavaScript files run by an install script can set
+const INSTALL_SCRIPT_FEATURES: Array<keyof PackageFeatureInfo> = [
+  'useBase64ConversionInInstallScript',
+  'containBase64StringInInstallScript',
+  'containDomainInInstallScript',
+  'requireChildProcessInInstallScript',
+  'accessFSInInstallScript',
+  'accessNetworkInInstallScript',
+  'accessProcessEnvInInstallScript'
+]
+
+interface JSFileEntry {
+  filePath: string
+  isInstallScriptFile: boolean
+  size: number
+}
+
+export interface PackageFeatureOptions {
+  // analyze every JavaScript file again instead of using the JavaScript file cache, the results are still cached
+  refreshFileCache?: boolean
+  // stop analyzing JavaScript files once none of the remaining files can change the feature vector,
+  // the feature positions are then marked as truncated
+  fastMode?: boolean
+  // record feature positions (default), when false only the feature vector is computed and the positions are empty
+  // and marked as truncated. Contributions of JavaScript files missing from the file cache are still cached in full
+  recordPositions?: boolean
+  // called when the analysis enters a stage ('package.json', 'install-scripts', 'collect-js-files', 'js-file'),
+  // so that a client can tell where a package got stuck
+  onProgress?: (stage: string, filePath?: string) => void
+}
+
 export interface PackageFeatureInfo {
   hasInstallScripts: boolean
   containIP: boolean
@@ -44,9 +96,14 @@ export interface PackageFeatureInfo {
 /**
  * Extract features from the npm package
  * @param packagePath the directory of the npm package, where there should be a package.json file
+ * @param options whether to refresh the JavaScript file cache, whether to stop early in fast mode, whether to record positions
+ * and the progress callback
  */
-export async function getPackageFeatureInfo (packagePath: string): Promise<PackageFeatureInfo> {
-  const positionRecorder = new PositionRecorder()
+export async function getPackageFeatureInfo (packagePath: string, options: PackageFeatureOptions = {}): Promise<PackageFeatureInfo> {
+  const refreshFileCache = options.refreshFileCache === true
+  const onProgress = options.onProgress ?? (() => {})
+  const positionRecorder = new PositionRecorder(options.recordPositions !== false)
+  const timingRecorder = new TimingRecorder()
   const result: PackageFeatureInfo = {
     hasInstallScripts: false,
     containIP: false,
@@ -76,7 +133,10 @@ export async function getPackageFeatureInfo (packagePath: string): Promise<Packa
     version: ''
   }
   const packageJSONPath = join(packagePath, 'package.json')
+  onProgress('package.json', packageJSONPath)
+  const packageJSONStartTime = performance.now()
   const packageJSONInfo: PackageJSONInfo = await getPackageJSONInfo(packageJSONPath)
+  timingRecorder.packageJSONMs = elapsedMs(packageJSONStartTime)
   Object.assign(result, packageJSONInfo)
 
   if (packageJSONInfo.hasInstallScripts) {
@@ -128,7 +188,42 @@ export async function getPackageFeatureInfo (packagePath: string): Promise<Packa
   }
 
   // analyze JavaScript files in the install script
+  onProgress('install-scripts')
+  const installScriptStartTime = performance.now()
   await getAllJSFilesInInstallScript(result.executeJSFiles)
+  timingRecorder.installScriptMs = elapsedMs(installScriptStartTime)
+
+  async function analyzeJSFile (jsFileContent: string, isInstallScriptFile: boolean, targetJSFilePath: string, size: number) {
+    onProgress('js-file', targetJSFilePath)
+    const jsFileCache = getConfig().jsFileCache
+    if (jsFileCache === null) {
+      const fileTiming = timingRecorder.addFile(targetJSFilePath, size)
+      await extractFeaturesFromJSFileByAST(jsFileContent, result, isInstallScriptFile, targetJSFilePath, positionRecorder, fileTiming)
+      const regExpStartTime = performance.now()
+      matchUseRegExp(jsFileContent, result, positionRecorder, targetJSFilePath)
+      fileTiming.regExpMs = elapsedMs(regExpStartTime)
+      return
+    }
+    const contentHash = getContentHash(jsFileContent)
+    if (!refreshFileCache) {
+      const cached = await jsFileCache.get(contentHash, isInstallScriptFile, size)
+      if (cached !== undefined) {
+        applyContribution(cached, result, positionRecorder, targetJSFilePath)
+        return
+      }
+    }
+    // analyze the file on its own so that its contribution can be cached and added to any package
+    const fileFeatureInfo: Partial<PackageFeatureInfo> = {}
+    const filePositionRecorder = new PositionRecorder()
+    const fileTiming = timingRecorder.addFile(targetJSFilePath, size)
+    await extractFeaturesFromJSFileByAST(jsFileContent, fileFeatureInfo as PackageFeatureInfo, isInstallScriptFile, targetJSFilePath, filePositionRecorder, fileTiming)
+    const regExpStartTime = performance.now()
+    matchUseRegExp(jsFileContent, fileFeatureInfo as PackageFeatureInfo, filePositionRecorder, targetJSFilePath)
+    fileTiming.regExpMs = elapsedMs(regExpStartTime)
+    const contribution = getContribution(fileFeatureInfo, filePositionRecorder)
+    applyContribution(contribution, result, positionRecorder, targetJSFilePath)
+    await jsFileCache.put(contentHash, isInstallScriptFile, contribution)
+  }
 
   async function traverseDir (dirPath: string) {
     if (basename(dirPath) === 'node_modules') {
@@ -145,8 +240,7 @@ export async function getPackageFeatureInfo (packagePath: string): Promise<Packa
             const jsFileContent = await readFile(targetJSFilePath, { encoding: 'utf-8' })
             const fileInfo = await stat(targetJSFilePath)
             if (fileInfo.size <= ALLOWED_MAX_JS_SIZE) {
-              await extractFeaturesFromJSFileByAST(jsFileContent, result, isInstallScriptFile, targetJSFilePath, positionRecorder)
-              matchUseRegExp(jsFileContent, result, positionRecorder, targetJSFilePath)
+              await analyzeJSFile(jsFileContent, isInstallScriptFile, targetJSFilePath, fileInfo.size)
             }
             resolve(true)
           }, 0)
@@ -156,7 +250,63 @@ export async function getPackageFeatureInfo (packagePath: string): Promise<Packa
       }
     }
   }
-  await traverseDir(packagePath)
+
+  /**
+   * Whether none of the remaining JavaScript files can change the feature vector
+   * @param remainingInstallScripts number of install script files not analyzed yet
+   */
+  function isSaturated (remainingInstallScripts: number) {
+    return JS_FILE_FEATURES.every(key => result[key] === true) &&
+      (remainingInstallScripts === 0 || INSTALL_SCRIPT_FEATURES.every(key => result[key] === true))
+  }
+
+  async function collectJSFiles (dirPath: string, files: JSFileEntry[]) {
+    if (basename(dirPath) === 'node_modules') {
+      return
+    }
+    const dir = await opendir(dirPath)
+    for await (const dirent of dir) {
+      const jsFilePath = join(dirPath, dirent.name)
+      const isInstallScriptFile = result.executeJSFiles.findIndex(filePath => filePath === jsFilePath) >= 0
+      if (dirent.isFile() && (dirent.name.endsWith('.js') || isInstallScriptFile)) {
+        const fileInfo = await stat(jsFilePath)
+        if (fileInfo.size <= ALLOWED_MAX_JS_SIZE) {
+          files.push({ filePath: jsFilePath, isInstallScriptFile, size: fileInfo.size })
+        }
+      } else if (dirent.isDirectory()) {
+        await collectJSFiles(jsFilePath, files)
+      }
+    }
+  }
+
+  async function traverseUntilSaturated () {
+    const files: JSFileEntry[] = []
+    onProgress('collect-js-files')
+    await collectJSFiles(packagePath, files)
+    // install scripts can set every feature and small files are cheap to parse,
+    // so the largest bundles come last and are the ones skipped once the feature vector is saturated
+    files.sort((a, b) => Number(b.isInstallScriptFile) - Number(a.isInstallScriptFile) || a.size - b.size)
+    let remainingInstallScripts = files.filter(file => file.isInstallScriptFile).length
+    for (const file of files) {
+      if (isSaturated(remainingInstallScripts)) {
+        positionRecorder.truncated = true
+        return
+      }
+      const jsFileContent = await readFile(file.filePath, { encoding: 'utf-8' })
+      await analyzeJSFile(jsFileContent, file.isInstallScriptFile, file.filePath, file.size)
+      if (file.isInstallScriptFile) {
+        remainingInstallScripts--
+      }
+    }
+  }
+
+  if (options.fastMode === true) {
+    await traverseUntilSaturated()
+  } else {
+    await traverseDir(packagePath)
+  }
+  timingRecorder.finish()
   setPositionRecorder(positionRecorder)
+  setTimingRecorder(timingRecorder)
   return result
 }
@@ -42,14 +42,32 @@ export class PositionRecorder {
     containSuspiciousString: []
   }
 
+  // whether some JavaScript files were not analyzed in fast mode, so the records are incomplete
+  truncated = false
+
+  // whether records are kept, a disabled recorder drops every record
+  readonly enabled: boolean
+
+  constructor (enabled = true) {
+    this.enabled = enabled
+  }
+
   addRecord (key: keyof PackageFeatureInfo, record: Record) {
-    if (this.featurePosSet[key].length > MAX_RECORD_NUMBER) {
+    if (!this.enabled || this.featurePosSet[key].length > MAX_RECORD_NUMBER) {
       return
     }
     this.featurePosSet[key].push(record)
   }
 
+  /**
+   * The records of every feature, with "truncated": true if some JavaScript files were not analyzed
+   * or the recorder is disabled
+   */
+  getRecords () {
+    return this.truncated || !this.enabled ? { ...this.featurePosSet, truncated: true } : this.featurePosSet
+  }
+
   serializeRecord () {
-    return JSON.stringify(this.featurePosSet)
+    return JSON.stringify(this.getRecords())
   }
 }
@@ -0,0 +1,52 @@
+import { performance } from 'perf_hooks'
+
+export interface FileTiming {
+  filePath: string
+  size: number
+  parseMs: number
+  traverseMs: number
+  regExpMs: number
+}
+
+/**
+ * Time spent on the stages of analyzing one npm package
+ */
+export class TimingRecorder {
+  private readonly startTime = performance.now()
+  private totalMs = 0
+  packageJSONMs = 0
+  installScriptMs = 0
+  fileTimings: FileTiming[] = []
+
+  /**
+   * Start recording the time spent on a JavaScript file
+   * @param filePath the path to the JavaScript file
+   * @param size the size of the file in bytes
+   * @returns the timing of the file, filled by the analyzing functions
+   */
+  addFile (filePath: string, size: number) {
+    const fileTiming: FileTiming = { filePath, size, parseMs: 0, traverseMs: 0, regExpMs: 0 }
+    this.fileTimings.push(fileTiming)
+    return fileTiming
+  }
+
+  finish () {
+    this.totalMs = performance.now() - this.startTime
+  }
+
+  serializeTiming () {
+    return {
+      totalMs: this.totalMs,
+      packageJSONMs: this.packageJSONMs,
+      installScriptMs: this.installScriptMs,
+      files: this.fileTimings
+    }
+  }
+}
+
+/**
+ * Milliseconds elapsed since the start time got from performance.now()
+ */
+export function elapsedMs (startTime: number) {
+  return performance.now() - startTime
+}
@@ -5,16 +5,12 @@ import { getValidFileName } from '../util'
 import { getPackageFeatureInfo, type PackageFeatureInfo } from './PackageFeatureInfo'
 
 /**
- * Extract features from the npm package and save the features to the feature file
- * @param packagePath the directory of the npm package, where there should be a package.json file
- * @param featureDirPath directory of saving feature files
- * @returns the path of the feature file and feature information
+ * Get the feature vector in the order of the feature file
+ * @param result feature information of the npm package
+ * @returns pairs of feature name and feature value
  */
-export async function extractFeatureFromPackage (packagePath: string, featureDirPath: string) {
-  const result: PackageFeatureInfo = await getPackageFeatureInfo(packagePath)
-  const fileName = getValidFileName(result.packageName)
-  const csvPath = join(featureDirPath, fileName + '.csv')
-  const featureArr: Array<[string, number | boolean]> = []
+export function getFeatureArray (result: PackageFeatureInfo) {
+  const featureArr: Array<[string, boolean]> = []
   featureArr.push(['hasInstallScript', result.hasInstallScripts])
   featureArr.push(['containIP', result.containIP])
   featureArr.push(['useBase64Conversion', result.useBase64Conversion])
@@ -37,6 +33,15 @@ export async function extractFeatureFromPackage (packagePath: string, featureDir
   featureArr.push(['containSuspicousString', result.containSuspiciousString])
   featureArr.push(['accessCryptoAndZip', result.accessCryptoAndZip])
   featureArr.push(['accessSensitiveAPI', result.accessSensitiveAPI])
+  return featureArr
+}
+
+/**
+ * Save the feature vector to the feature file
+ * @param featureArr pairs of feature name and feature value
+ * @param csvPath the path to the feature file
+ */
+export async function writeFeatureFile (featureArr: Array<[string, boolean]>, csvPath: string) {
   await new Promise(resolve => {
     setTimeout(async () => {
       await writeFile(csvPath, stringify(featureArr, {
@@ -52,8 +57,31 @@ export async function extractFeatureFromPackage (packagePath: string, featureDir
       resolve(true)
     })
   })
+}
+
+/**
+ * Get the path to the feature file of the npm package
+ * @param packageName name of the npm package
+ * @param featureDirPath directory of saving feature files
+ */
+export function getFeatureFilePath (packageName: string, featureDirPath: string) {
+  return join(featureDirPath, getValidFileName(packageName) + '.csv')
+}
+
+/**
+ * Extract features from the npm package and save the features to the feature file
+ * @param packagePath the directory of the npm package, where there should be a package.json file
+ * @param featureDirPath directory of saving feature files
+ * @returns the path of the feature file and feature information
+ */
+export async function extractFeatureFromPackage (packagePath: string, featureDirPath: string) {
+  const result: PackageFeatureInfo = await getPackageFeatureInfo(packagePath)
+  const csvPath = getFeatureFilePath(result.packageName, featureDirPath)
+  const featureArr = getFeatureArray(result)
+  await writeFeatureFile(featureArr, csvPath)
   return {
     csvPath,
-    featureInfo: result
+    featureInfo: result,
+    featureArr
   }
 }
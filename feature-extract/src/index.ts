@@ -1,26 +1,53 @@
 import { accessSync, constants } from 'fs'
 import { Logger } from './Logger'
 import { analyzePackages } from './programs/AnalyzePackage/PackageAnalyzer'
+import { serve } from './programs/ExtractorServer/ExtractorServer'
+import { setErrorLogName, setJSFileCache } from './config'
+import { JSFileCache } from './feature-extract/JSFileCache'
 
 function showUsage () {
   Logger.info(
 `node main.js $package_dir_path $feature_dir_path $feature_pos_dir_path.
+node main.js --serve [--worker $index] [--file-cache $cache_dir_path $version].
 \t$package_dir_path is absolute path to the parent directory of the npm package which should have a file named package.json.
 \t$feature_dir_path is absolute path to the parent directory of the feature files.
-\t$feature_pos_dir_path is absolute path to the parent directory of the feature position files.`
+\t$feature_pos_dir_path is absolute path to the parent directory of the feature position files.
+\t--serve reads extraction requests as JSON lines from stdin and writes one JSON response per line to stdout.
+\t--worker $index names the error log of the server after its index.
+\t--file-cache $cache_dir_path $version caches the analysis results of JavaScript files by content hash in $cache_dir_path, $version is the version of the extractor.`
   )
 }
 
 async function main () {
-  if (process.argv.length === 5) {
-    const packageDirPath = process.argv[2]
-    const featureDirPath = process.argv[3]
-    const featurePosDirPath = process.argv[4]
+  const args = process.argv.slice(2)
+  if (args[0] === '--serve') {
+    if (args[1] === '--worker' && /^\d+$/.test(args[2] ?? '')) {
+      setErrorLogName(`error-worker-${args[2]}.log`)
+    }
+    const fileCacheOptionIdx = args.indexOf('--file-cache')
+    if (fileCacheOptionIdx >= 0) {
+      const [cacheDirPath, version] = args.slice(fileCacheOptionIdx + 1, fileCacheOptionIdx + 3)
+      if (cacheDirPath === undefined || version === undefined) {
+        showUsage()
+        process.exitCode = 2
+        return
+      }
+      setJSFileCache(new JSFileCache(cacheDirPath, version))
+    }
+    await serve()
+    return
+  }
+  if (args.length === 3) {
+    const [packageDirPath, featureDirPath, featurePosDirPath] = args
     try {
       accessSync(packageDirPath, constants.F_OK | constants.R_OK)
-      await analyzePackages(packageDirPath, featureDirPath, featurePosDirPath)
+      const failed = await analyzePackages(packageDirPath, featureDirPath, featurePosDirPath)
+      if (failed > 0) {
+        process.exitCode = 1
+      }
     } catch (error) {
       Logger.error(`Error: ${(error as Error).message}`)
+      process.exitCode = 1
     }
   } else {
     showUsage()
@@ -4,7 +4,6 @@ import { getConfig } from '../../config'
 import { join } from 'path'
 import { writeFile, mkdir } from 'fs/promises'
 import { Logger } from '../../Logger'
-import { error } from 'console'
 
 function getAnalyzeResult (fileName: string, featurePosPath: string) {
   return `Finished extracting features of ${fileName}.  recorded at ${featurePosPath}`
@@ -17,14 +16,15 @@ function getAnalyzeResult (fileName: string, featurePosPath: string) {
  * @param featurePosDirPath the absolute directory path to save feature position files
  */
 async function analyzeSinglePackage (packagePath: string, featureDirPath: string, featurePosDirPath: string) {
-  const result = await extractFeatureFromPackage(packagePath, featureDirPath)
-  const packageName = `${result.featureInfo.packageName}@${result.featureInfo.version}`.replace('/', '#')
   try {
+    const result = await extractFeatureFromPackage(packagePath, featureDirPath)
+    const packageName = `${result.featureInfo.packageName}@${result.featureInfo.version}`.replace('/', '#')
     const featurePosPath = join(featurePosDirPath, `${packageName}.json`)
     Logger.warning(getAnalyzeResult(packageName, featurePosPath))
     await writeFile(featurePosPath, getConfig().positionRecorder!.serializeRecord())
     return result
   } catch (error) {
+    Logger.error(`Failed to extract features of ${packagePath}`)
     Logger.error(getErrorInfo(error))
     return null
   }
@@ -35,12 +35,18 @@ async function analyzeSinglePackage (packagePath: string, featureDirPath: string
  * @param packageDirPath the absolute directory path to npm package
  * @param featureDirPath the absolute directory path to save feature files
  * @param featurePosDirPath the absolute directory path to save feature position files
+ * @returns the number of packages failed
  */
 export async function analyzePackages (packageDirPath: string, featureDirPath: string, featurePosDirPath: string) {
-  try { await mkdir(featureDirPath) } catch (e) {}
-  try { await mkdir(featurePosDirPath) } catch (e) {}
+  try { await mkdir(featureDirPath, { recursive: true }) } catch (e) {}
+  try { await mkdir(featurePosDirPath, { recursive: true }) } catch (e) {}
   const packagesPath = await getPackagesFromDir(packageDirPath)
+  let failed = 0
   for (const packagePath of packagesPath) {
-    await analyzeSinglePackage(packagePath, featureDirPath, featurePosDirPath)
+    const result = await analyzeSinglePackage(packagePath, featureDirPath, featurePosDirPath)
+    if (result === null) {
+      failed++
+    }
   }
+  return failed
 }
@@ -0,0 +1,116 @@
+import { access, mkdir, mkdtemp, rm, writeFile } from 'fs/promises'
+import { tmpdir } from 'os'
+import { join } from 'path'
+import { Readable } from 'stream'
+import { serve } from './ExtractorServer'
+
+// chalk 5 is ESM only and is not transformed by ts-jest
+jest.mock('chalk', () => {
+  const identity = (message: string) => message
+  return { __esModule: true, default: { red: identity, green: identity, yellow: identity } }
+})
+// keep the error log out of the source tree
+jest.mock('../../FileLogger', () => ({
+  getFileLogger: async () => ({ log: async () => {} })
+}))
+
+let rootPath: string
+
+async function makePackage (dirName: string, name: string, code: string) {
+  const packagePath = join(rootPath, 'dataset', dirName, 'package')
+  await mkdir(packagePath, { recursive: true })
+  await writeFile(join(packagePath, 'package.json'), JSON.stringify({ name, version: '1.0.0' }))
+  await writeFile(join(packagePath, 'index.js'), code)
+  return packagePath
+}
+
+/**
+ * Run the server on the given stdin lines until stdin ends
+ * @returns the responses written to stdout
+ */
+async function runServer (lines: string[]) {
+  const stdin = Object.getOwnPropertyDescriptor(process, 'stdin')!
+  Object.defineProperty(process, 'stdin', { value: Readable.from(lines.map(line => line + '\n')), configurable: true })
+  const output: string[] = []
+  const write = jest.spyOn(process.stdout, 'write').mockImplementation((chunk: any) => {
+    output.push(String(chunk))
+    return true
+  })
+  try {
+    await serve()
+  } finally {
+    write.mockRestore()
+    Object.defineProperty(process, 'stdin', stdin)
+  }
+  const text = output.join('')
+  // every response is a single line
+  expect(text.endsWith('\n')).toBe(true)
+  return text.slice(0, -1).split('\n').map(line => JSON.parse(line))
+}
+
+beforeAll(async () => {
+  rootPath = await mkdtemp(join(tmpdir(), 'extractor-server-'))
+})
+
+afterAll(async () => {
+  await rm(rootPath, { recursive: true, force: true })
+})
+
+test('answers every request with one line in order', async () => {
+  const evalPath = await makePackage('eval', 'eval-pkg', "eval('1')\n")
+  const plainPath = await makePackage('plain', 'plain-pkg', 'module.exports = 1\n')
+  const featureDirPath = join(rootPath, 'features')
+  const responses = await runServer([
+    '',
+    JSON.stringify({ id: 1, command: 'list', packageDirPath: join(rootPath, 'dataset') }),
+    JSON.stringify({ id: 2, command: 'extract', packagePath: evalPath, featureDirPath }),
+    '   ',
+    JSON.stringify({ id: 3, command: 'extract', packagePath: plainPath })
+  ])
+  expect(responses.map(response => [response.id, response.ok])).toEqual([[1, true], [2, true], [3, true]])
+  expect(responses[0].packages.sort()).toEqual([evalPath, plainPath])
+
+  expect(responses[1].packageName).toBe('eval-pkg@1.0.0')
+  expect(responses[1].features).toHaveLength(22)
+  expect(Object.fromEntries(responses[1].features).useEval).toBe(true)
+  expect(responses[1].positions.useEval).toHaveLength(1)
+  expect(responses[1].truncated).toBe(false)
+  await access(responses[1].csvPath)
+
+  expect(responses[2].packageName).toBe('plain-pkg@1.0.0')
+  expect(Object.fromEntries(responses[2].features).useEval).toBe(false)
+  expect(responses[2].csvPath).toBeUndefined()
+})
+
+test('replies with an error and keeps serving', async () => {
+  const packagePath = await makePackage('ok', 'ok-pkg', 'module.exports = 1\n')
+  const responses = await runServer([
+    'not a request',
+    JSON.stringify({ id: 2, command: 'extract', packagePath: join(rootPath, 'missing') }),
+    JSON.stringify({ id: 3, command: 'extract', packagePath })
+  ])
+  expect(responses).toHaveLength(3)
+  expect(responses[0]).toEqual({ id: null, ok: false, error: 'Invalid request: not a request' })
+  expect(responses[1].id).toBe(2)
+  expect(responses[1].ok).toBe(false)
+  expect(typeof responses[1].error).toBe('string')
+  expect(responses[2].id).toBe(3)
+  expect(responses[2].ok).toBe(true)
+  expect(responses[2].packageName).toBe('ok-pkg@1.0.0')
+})
+
+test('positions false computes the features without positions', async () => {
+  const packagePath = await makePackage('no-positions', 'no-positions-pkg', "eval('1')\n")
+  const featurePosDirPath = join(rootPath, 'positions')
+  const [withPositions, withoutPositions] = await runServer([
+    JSON.stringify({ id: 1, command: 'extract', packagePath }),
+    JSON.stringify({ id: 2, command: 'extract', packagePath, featurePosDirPath, positions: false })
+  ])
+  expect(withoutPositions.ok).toBe(true)
+  expect(withoutPositions.features).toEqual(withPositions.features)
+  expect(Object.fromEntries(withoutPositions.features).useEval).toBe(true)
+  expect(withoutPositions.positions.useEval).toEqual([])
+  expect(withoutPositions.positions.truncated).toBe(true)
+  // a disabled recorder writes no position file
+  await expect(access(featurePosDirPath)).rejects.toThrow()
+})
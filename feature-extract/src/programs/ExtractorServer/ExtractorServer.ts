@@ -0,0 +1,111 @@
+import { createInterface } from 'readline'
+import { writeFile, mkdir } from 'fs/promises'
+import { join } from 'path'
+import { getFeatureArray, getFeatureFilePath, writeFeatureFile } from '../../feature-extract'
+import { getPackageFeatureInfo } from '../../feature-extract/PackageFeatureInfo'
+import { getErrorInfo, getPackagesFromDir, getValidFileName } from '../../util'
+import { getConfig, setLogToStderr } from '../../config'
+import { Logger } from '../../Logger'
+
+/**
+ * A request sent to the extractor server, one JSON object per line on stdin
+ */
+interface ExtractRequest {
+  id: number
+  command: 'extract' | 'list'
+  packagePath?: string
+  packageDirPath?: string
+  featureDirPath?: string
+  featurePosDirPath?: string
+  timing?: boolean
+  refreshFileCache?: boolean
+  fast?: boolean
+  positions?: boolean
+  progress?: boolean
+}
+
+function sendResponse (response: object) {
+  process.stdout.write(JSON.stringify(response) + '\n')
+}
+
+/**
+ * Extract the features of a single npm package
+ * @param request the request containing the path to the npm package and the optional output directories
+ * @returns the feature vector and the feature positions of the package
+ */
+async function handleExtract (request: ExtractRequest) {
+  const jsFileCache = getConfig().jsFileCache
+  const fileCacheStats = jsFileCache !== null ? { ...jsFileCache.stats } : undefined
+  const featureInfo = await getPackageFeatureInfo(request.packagePath!, {
+    refreshFileCache: request.refreshFileCache === true,
+    fastMode: request.fast === true,
+    recordPositions: request.positions !== false,
+    onProgress: request.progress === true
+      ? (stage, filePath) => { sendResponse({ id: request.id, progress: { stage, filePath } }) }
+      : undefined
+  })
+  const packageName = getValidFileName(`${featureInfo.packageName}@${featureInfo.version}`)
+  const featureArr = getFeatureArray(featureInfo)
+  const positionRecorder = getConfig().positionRecorder!
+  let csvPath: string | undefined
+  if (request.featureDirPath) {
+    await mkdir(request.featureDirPath, { recursive: true })
+    csvPath = getFeatureFilePath(featureInfo.packageName, request.featureDirPath)
+    await writeFeatureFile(featureArr, csvPath)
+  }
+  if (request.featurePosDirPath && positionRecorder.enabled) {
+    await mkdir(request.featurePosDirPath, { recursive: true })
+    await writeFile(join(request.featurePosDirPath, `${packageName}.json`), positionRecorder.serializeRecord())
+  }
+  return {
+    packageName,
+    csvPath,
+    features: featureArr,
+    positions: positionRecorder.getRecords(),
+    truncated: positionRecorder.truncated,
+    timing: request.timing === true ? getConfig().timingRecorder!.serializeTiming() : undefined,
+    fileCache: jsFileCache !== null && fileCacheStats !== undefined
+      ? {
+          hits: jsFileCache.stats.hits - fileCacheStats.hits,
+          misses: jsFileCache.stats.misses - fileCacheStats.misses,
+          bytesSkipped: jsFileCache.stats.bytesSkipped - fileCacheStats.bytesSkipped
+        }
+      : undefined
+  }
+}
+
+/**
+ * Serve extraction requests on stdin and write one JSON response per line on stdout.
+ * Requests with "progress": true are also answered with progress messages ({ id, progress: { stage, filePath } })
+ * before the response, so that the client can tell where a package got stuck before killing the server.
+ * Requests are handled one after another, so a client runs several servers to analyze packages in parallel.
+ */
+export async function serve () {
+  setLogToStderr(true)
+  const lines = createInterface({ input: process.stdin, crlfDelay: Infinity })
+  for await (const line of lines) {
+    if (line.trim() === '') {
+      continue
+    }
+    let request: ExtractRequest
+    try {
+      request = JSON.parse(line)
+    } catch (error) {
+      sendResponse({ id: null, ok: false, error: `Invalid request: ${line}` })
+      continue
+    }
+    try {
+      if (request.command === 'list') {
+        const packages = await getPackagesFromDir(request.packageDirPath!)
+        sendResponse({ id: request.id, ok: true, packages })
+      } else {
+        const result = await handleExtract(request)
+        sendResponse({ id: request.id, ok: true, ...result })
+      }
+    } catch (error) {
+      Logger.error(`Failed to handle request ${line}`)
+      Logger.error(getErrorInfo(error))
+      sendResponse({ id: request.id, ok: false, error: (error as Error).message })
+    }
+  }
+}
@@ -0,0 +1,9 @@
+from .src.stages import StageMetrics, profile, reset_peak_rss, get_peak_rss, get_cpu_times
+
+__all__ = [
+    'StageMetrics',
+    'profile',
+    'reset_peak_rss',
+    'get_peak_rss',
+    'get_cpu_times'
+]
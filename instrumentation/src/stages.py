@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import resource
+import cProfile
+from contextlib import contextmanager
+
+
+def reset_peak_rss() -> bool:
+    """
+    将本进程的峰值内存（VmHWM）重置为当前内存，只支持Linux
+    :return: 是否重置成功，失败时峰值内存为进程启动以来的峰值
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def get_peak_rss() -> float:
+    """本进程的峰值内存（MiB）"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss在Linux上以KiB为单位
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def get_cpu_times() -> list:
+    """
+    :return: [本进程的CPU时间, 已结束的子进程（如特征提取进程）的CPU时间]（秒）
+    """
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return [time.process_time(), children.ru_utime + children.ru_stime]
+
+
+class StageMetrics:
+    """
+    记录各阶段的运行时间、CPU时间与峰值内存
+    子进程的CPU时间在子进程结束后才计入，因此特征提取进程的CPU时间计入结束这些进程的阶段
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.extra = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """记录with语句块的运行时间、CPU时间与峰值内存，出错时同样记录"""
+        peak_reset = reset_peak_rss()
+        cpu_start, children_cpu_start = get_cpu_times()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            cpu, children_cpu = get_cpu_times()
+            self.stages.append({
+                'stage': name,
+                'wall_seconds': wall,
+                'cpu_seconds': cpu - cpu_start,
+                'children_cpu_seconds': children_cpu - children_cpu_start,
+                'peak_rss_mib': get_peak_rss(),
+                'peak_rss_is_stage_peak': peak_reset,
+                'children_peak_rss_mib': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+            })
+
+    def add(self, name: str, value):
+        """记录阶段之外的信息，如特征提取的耗时统计"""
+        self.extra[name] = value
+
+    def to_dict(self) -> dict:
+        return dict(self.extra, stages=self.stages)
+
+    def write(self, metrics_path: str):
+        """写入JSON格式的指标文件"""
+        os.makedirs(os.path.dirname(os.path.abspath(metrics_path)), exist_ok=True)
+        with open(metrics_path + '.tmp', 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(metrics_path + '.tmp', metrics_path)
+
+    def print_summary(self):
+        for stage in self.stages:
+            print(f"{stage['stage']:<20} wall {stage['wall_seconds']:9.2f} s  cpu {stage['cpu_seconds']:9.2f} s  children cpu {stage['children_cpu_seconds']:9.2f} s  peak rss {stage['peak_rss_mib']:8.1f} MiB")
+
+
+@contextmanager
+def profile(profile_path: str = None):
+    """
+    使用cProfile分析with语句块，结果写入profile_path，可以用snakeviz或flameprof等工具生成火焰图
+    :param profile_path: 结果文件路径，None表示不分析
+    """
+    if profile_path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        os.makedirs(os.path.dirname(os.path.abspath(profile_path)), exist_ok=True)
+        profiler.dump_stats(profile_path)
+        print(f'Profile saved to {profile_path}')
@@ -0,0 +1,106 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+
+import numpy as np
+
+
+# 合成特征向量的特征数，与特征文件一致
+FEATURE_COUNT = 22
+
+
+class Connection:
+    """到评分服务的keep-alive HTTP连接"""
+
+    def __init__(self, host: str, port: int, unix_socket: str = None):
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        if self.unix_socket is not None:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.unix_socket)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def request(self, method: str, path: str, body: dict = None) -> list:
+        """:return: [状态码, JSON响应]"""
+        data = json.dumps(body).encode() if body is not None else b''
+        self.writer.write(f'{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n'.encode() + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        return [status, json.loads(await self.reader.readexactly(length))]
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def run_client(args, deadline: float, latencies: list, errors: list, rng: random.Random):
+    connection = await Connection(args.host, args.port, args.unix_socket).open()
+    try:
+        while time.perf_counter() < deadline:
+            if args.tarball:
+                body = {'path': rng.choice(args.tarball)}
+                path = '/predict-tarball'
+            else:
+                body = {'vectors': [[rng.random() < 0.2 for _ in range(FEATURE_COUNT)] for _ in range(args.batch)]}
+                path = '/predict'
+            start = time.perf_counter()
+            status, response = await connection.request('POST', path, body)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(response.get('error'))
+    finally:
+        connection.close()
+
+async def run_load_test(args) -> dict:
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*[run_client(args, deadline, latencies, errors, random.Random(args.seed + i)) for i in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    connection = await Connection(args.host, args.port, args.unix_socket).open()
+    try:
+        _, server_stats = await connection.request('GET', '/stats')
+    finally:
+        connection.close()
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'first_error': errors[0] if len(errors) > 0 else None,
+        'requests_per_second': len(latencies) / elapsed,
+        'vectors_per_second': len(latencies) * (1 if args.tarball else args.batch) / elapsed,
+        'client_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) > 0 else None,
+        'client_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) > 0 else None,
+        'server': server_stats
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the scoring service started by "cli.py serve".')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='address of the service (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='port of the service (default: 8765)')
+    parser.add_argument('--unix-socket', type=str, help='connect to this Unix socket instead of a TCP port')
+    parser.add_argument('-c', '--concurrency', type=int, default=32, help='number of concurrent clients, each sending one request at a time (default: 32)')
+    parser.add_argument('-d', '--duration', type=float, default=10, help='seconds to run (default: 10)')
+    parser.add_argument('-b', '--batch', type=int, default=1, help='random feature vectors per request (default: 1)')
+    parser.add_argument('--tarball', type=str, nargs='+', help='send these tarball paths instead of feature vectors')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the feature vectors')
+    args = parser.parse_args()
+    result = asyncio.run(run_load_test(args))
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,51 @@
+import os
+import time
+import argparse
+
+from conf.settings import ROOT_PATH, MODEL_NAMES
+from benchmark import run_benchmark, save_results, load_results, compare_results, generate_packages
+
+
+BENCHMARK_PATH = os.path.join(ROOT_PATH, 'benchmark')
+
+# 各次运行的结果与基线
+BENCHMARK_RESULTS_PATH = os.path.join(BENCHMARK_PATH, 'results')
+BENCHMARK_BASELINE_PATH = os.path.join(BENCHMARK_RESULTS_PATH, 'baseline.json')
+
+BENCHMARK_STAGES = ['extract', 'load', 'train', 'predict', 'report']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark extraction, feature loading, training, prediction and report writing on synthetic data. Runs offline.')
+    parser.add_argument('-s', '--sizes', type=str, nargs='+', default=['1k'], help='synthetic feature dataset sizes: 1k, 100k, 1M or a number of packages (default: 1k)')
+    parser.add_argument('-o', '--models', type=str, nargs='+', default=MODEL_NAMES, choices=MODEL_NAMES, help='models to train and predict with (default: all)')
+    parser.add_argument('--stages', type=str, nargs='+', choices=BENCHMARK_STAGES, help='stages to run (default: all)')
+    parser.add_argument('-p', '--packages', type=int, default=50, help='number of synthetic tarballs to extract (default: 50)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of extractor processes running at once')
+    parser.add_argument('-r', '--repeat', type=int, default=1, help='run every stage this many times and keep the fastest')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the synthetic data')
+    parser.add_argument('--work-dir', type=str, help='directory for the synthetic data, e.g. a tmpfs (default: system temp directory)')
+    parser.add_argument('--baseline', type=str, default=BENCHMARK_BASELINE_PATH, help='baseline results to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline, 0.25 means 25%% (default: 0.25)')
+    parser.add_argument('--generate-packages', type=str, metavar='DIR', help='only write synthetic tarballs (see -p) into DIR and exit')
+    args = parser.parse_args()
+
+    if args.generate_packages:
+        paths = generate_packages(args.generate_packages, args.packages, seed=args.seed)
+        print(f'Generated {len(paths)} synthetic packages in {args.generate_packages}')
+        exit(0)
+
+    results = run_benchmark(args.sizes, args.models, args.stages, packages=args.packages, jobs=args.jobs, seed=args.seed, repeat=args.repeat, work_path=args.work_dir)
+    results_path = os.path.join(BENCHMARK_RESULTS_PATH, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    save_results(results, results_path)
+    print(f'Results saved to {results_path}')
+
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f'Baseline saved to {args.baseline}')
+    elif os.path.exists(args.baseline):
+        regressions = compare_results(results, load_results(args.baseline), args.tolerance)
+        if len(regressions) > 0:
+            print(f'{len(regressions)} stage(s) slower than the baseline by more than {args.tolerance:.0%}')
+            exit(1)
@@ -0,0 +1,11 @@
+from .src.batcher import LatencyStats, MicroBatcher
+from .src.server import Scorer, TarballExtractor, ScoringService, serve
+
+__all__ = [
+    'LatencyStats',
+    'MicroBatcher',
+    'Scorer',
+    'TarballExtractor',
+    'ScoringService',
+    'serve'
+]
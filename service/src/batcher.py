@@ -0,0 +1,128 @@
+import time
+import asyncio
+from collections import deque
+
+import numpy as np
+
+
+# 计算延迟分位数时保留的最近请求数
+LATENCY_WINDOW = 10000
+
+
+class LatencyStats:
+    """最近若干个请求的延迟"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.latencies.append(seconds)
+        self.count += 1
+
+    def summary(self) -> dict:
+        """请求总数与最近请求延迟（毫秒）的p50、p99、平均值与最大值"""
+        if len(self.latencies) == 0:
+            return {'count': self.count, 'p50_ms': None, 'p99_ms': None, 'mean_ms': None, 'max_ms': None}
+        latencies = np.fromiter(self.latencies, dtype=np.float64) * 1000
+        p50, p99 = np.percentile(latencies, [50, 99])
+        return {'count': self.count, 'p50_ms': float(p50), 'p99_ms': float(p99), 'mean_ms': float(latencies.mean()), 'max_ms': float(latencies.max())}
+
+
+class MicroBatcher:
+    """
+    将并发请求的特征向量合并为一批再调用分类器
+    一批在收到第一个请求后最多等待max_wait秒或攒够max_batch_size行；分类器在线程中运行，
+    运行时事件循环继续接收请求，这些请求组成下一批
+    """
+
+    def __init__(self, predict, max_batch_size: int = 1024, max_wait: float = 0.002):
+        """
+        :param predict: 预测函数，参数为特征矩阵，返回[预测结果数组, 恶意概率数组（可以为None）]
+        :param max_batch_size: 每批最多的行数
+        :param max_wait: 收到第一个请求后等待更多请求的时间（秒）
+        """
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue = None
+        self.pending_rows = 0
+        self.batches = 0
+        self.batched_rows = 0
+        self._task = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, feature_matrix) -> list:
+        """
+        提交若干行特征向量，等待所在的批预测结束
+        :return: [预测结果数组, 恶意概率数组（分类器不支持predict_proba时为None）]
+        """
+        feature_matrix = np.asarray(feature_matrix, dtype=bool)
+        future = asyncio.get_running_loop().create_future()
+        self.pending_rows += len(feature_matrix)
+        await self.queue.put((feature_matrix, future))
+        return await future
+
+    async def _next_batch(self) -> list:
+        items = [await self.queue.get()]
+        rows = len(items[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch_size:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            items.append(item)
+            rows += len(item[0])
+        return items
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._next_batch()
+            matrices = [matrix for matrix, _ in items]
+            rows = sum(len(matrix) for matrix in matrices)
+            self.pending_rows -= rows
+            try:
+                y_pred, y_proba = await loop.run_in_executor(None, self.predict, np.concatenate(matrices))
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.batched_rows += rows
+            start = 0
+            for matrix, future in items:
+                stop = start + len(matrix)
+                if not future.done():
+                    future.set_result([y_pred[start:stop], None if y_proba is None else y_proba[start:stop]])
+                start = stop
+
+    def stats(self) -> dict:
+        """排队的请求数与行数、已处理的批数与平均每批行数"""
+        return {
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'queued_rows': self.pending_rows,
+            'batches': self.batches,
+            'mean_batch_size': self.batched_rows / self.batches if self.batches > 0 else None
+        }
@@ -0,0 +1,309 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+
+import numpy as np
+
+import training
+from conf.settings import EXTRACT_PACKAGE_TIMEOUT, EXTRACT_MEMORY_LIMIT
+from extraction import ExtractorWorker, ensure_extractor_built, decompress_tarball, find_packages, remove_dir
+from .batcher import MicroBatcher, LatencyStats
+
+
+# HTTP请求体的大小上限
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class RequestError(Exception):
+    """请求有误，返回给客户端的错误"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Scorer:
+    """
+    常驻内存的模型
+    模型已编译为真值表时查表，否则使用加载好的模型预测
+    """
+
+    def __init__(self, model_name: str, use_table: bool = True):
+        self.model_name = model_name
+        self.table = training.load_truth_table(model_name) if use_table else None
+        if self.table is not None:
+            self.feature_count = self.table.feature_count
+            self.feature_names = self.table.feature_names
+        else:
+            self.feature_count = training.get_model(model_name).classifier.n_features_in_
+            self.feature_names = None
+
+    def score(self, feature_matrix) -> list:
+        """:return: [预测结果数组, 恶意概率数组（模型不支持predict_proba时为None）]"""
+        if self.table is not None:
+            return self.table.score(feature_matrix)
+        return training.predict_matrix(self.model_name, feature_matrix)
+
+    def check_features(self, features: list) -> list:
+        """
+        将特征提取程序返回的特征转换为特征向量
+        :param features: 特征名与特征值组成的列表
+        :return: 特征值列表
+        """
+        names = [name for name, _ in features]
+        if len(names) != self.feature_count or (self.feature_names is not None and names != self.feature_names):
+            raise RequestError(500, f'Extracted features do not match the features of {self.model_name}')
+        return [bool(value) for _, value in features]
+
+
+class TarballExtractor:
+    """常驻的特征提取进程池，请求在线程中解压与分析，不阻塞事件循环"""
+
+    def __init__(self, jobs: int, scratch_path: str):
+        self.jobs = jobs
+        self.scratch_path = scratch_path
+        self.workers = []
+        self.idle_workers = None
+
+    def start(self):
+        ensure_extractor_built()
+        os.makedirs(self.scratch_path, exist_ok=True)
+        self.idle_workers = asyncio.Queue()
+        for i in range(self.jobs):
+            # 卡住的进程被杀死，请求返回错误，下一个请求使用新的进程
+            worker = ExtractorWorker(i, timeout=EXTRACT_PACKAGE_TIMEOUT, memory_limit=EXTRACT_MEMORY_LIMIT).start()
+            self.workers.append(worker)
+            self.idle_workers.put_nowait(worker)
+        return self
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+    def _extract(self, worker: ExtractorWorker, tarball_path: str) -> list:
+        decompressed_path = os.path.join(self.scratch_path, uuid.uuid4().hex)
+        try:
+            decompress_tarball(tarball_path, decompressed_path)
+            results = []
+            for package_path in find_packages(decompressed_path):
+                try:
+                    # 评分只需要特征向量，不记录特征位置
+                    result = worker.analyze(package_path, positions=False)
+                except Exception:
+                    # 特征提取进程崩溃时换一个新的进程
+                    if worker.process is None or worker.process.poll() is not None:
+                        worker.restart()
+                    raise
+                results.append((result['packageName'], result['features']))
+            return results
+        finally:
+            if os.path.exists(decompressed_path):
+                remove_dir(decompressed_path)
+
+    async def extract(self, tarball_path: str) -> list:
+        """
+        提取压缩文件中所有包的特征
+        :return: (包名, 特征名与特征值组成的列表)的列表
+        """
+        worker = await self.idle_workers.get()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, self._extract, worker, tarball_path)
+        finally:
+            self.idle_workers.put_nowait(worker)
+
+    def stats(self) -> dict:
+        return {'workers': self.jobs, 'idle_workers': self.idle_workers.qsize() if self.idle_workers is not None else 0}
+
+
+class ScoringService:
+    """
+    本地的评分服务，HTTP接口：
+    POST /predict          {"vectors": [[...], ...]}或{"vector": [...]}，返回每个向量的预测结果与恶意概率
+    POST /predict-tarball  {"path": "/path/to/package.tgz"}，提取压缩文件中的包后预测
+    GET  /stats            请求数、p50/p99延迟、排队深度与批大小
+    GET  /health
+    """
+
+    def __init__(self, scorer: Scorer, batcher: MicroBatcher, extractor: TarballExtractor = None):
+        self.scorer = scorer
+        self.batcher = batcher
+        self.extractor = extractor
+        self.latency = {}
+        self.in_flight = 0
+        self.started = time.time()
+
+    def _record_latency(self, endpoint: str, seconds: float):
+        if endpoint not in self.latency:
+            self.latency[endpoint] = LatencyStats()
+        self.latency[endpoint].record(seconds)
+
+    def _parse_vectors(self, body: dict) -> np.ndarray:
+        if 'vectors' in body:
+            vectors = body['vectors']
+        elif 'vector' in body:
+            vectors = [body['vector']]
+        else:
+            raise RequestError(400, 'Expected "vectors" or "vector"')
+        try:
+            feature_matrix = np.array(vectors, dtype=bool)
+        except (TypeError, ValueError):
+            raise RequestError(400, 'Feature vectors must be lists of booleans')
+        if feature_matrix.ndim != 2 or feature_matrix.shape[1] != self.scorer.feature_count:
+            raise RequestError(400, f'Expected vectors of {self.scorer.feature_count} features, got shape {list(feature_matrix.shape)}')
+        return feature_matrix
+
+    @staticmethod
+    def _verdicts(y_pred, y_proba) -> dict:
+        return {'verdicts': [str(verdict) for verdict in y_pred], 'probabilities': None if y_proba is None else [float(proba) for proba in y_proba]}
+
+    async def predict(self, body: dict) -> dict:
+        feature_matrix = self._parse_vectors(body)
+        y_pred, y_proba = await self.batcher.submit(feature_matrix)
+        return self._verdicts(y_pred, y_proba)
+
+    async def predict_tarball(self, body: dict) -> dict:
+        if self.extractor is None:
+            raise RequestError(503, 'Tarball extraction is disabled')
+        tarball_path = body.get('path')
+        if not isinstance(tarball_path, str) or not os.path.isfile(tarball_path):
+            raise RequestError(400, f'No such tarball: {tarball_path}')
+        results = await self.extractor.extract(tarball_path)
+        if len(results) == 0:
+            raise RequestError(400, f'No package found in {tarball_path}')
+        feature_matrix = np.array([self.scorer.check_features(features) for _, features in results], dtype=bool)
+        y_pred, y_proba = await self.batcher.submit(feature_matrix)
+        return {
+            'packages': [
+                {'package': package_name, 'verdict': str(y_pred[i]), 'probability': None if y_proba is None else float(y_proba[i])}
+                for i, (package_name, _) in enumerate(results)
+            ]
+        }
+
+    def stats(self) -> dict:
+        stats = {
+            'model': self.scorer.model_name,
+            'truth_table': self.scorer.table is not None,
+            'uptime_seconds': time.time() - self.started,
+            'in_flight': self.in_flight,
+            'latency': {endpoint: latency.summary() for endpoint, latency in self.latency.items()},
+            **self.batcher.stats()
+        }
+        if self.extractor is not None:
+            stats['extractor'] = self.extractor.stats()
+        return stats
+
+    async def handle(self, method: str, path: str, body: bytes) -> dict:
+        """处理一个请求，返回JSON响应"""
+        if path == '/health':
+            return {'ok': True}
+        if path == '/stats':
+            return self.stats()
+        handlers = {'/predict': self.predict, '/predict-tarball': self.predict_tarball}
+        if path not in handlers:
+            raise RequestError(404, f'Unknown path {path}')
+        if method != 'POST':
+            raise RequestError(405, f'{path} only accepts POST')
+        try:
+            request = json.loads(body)
+        except ValueError:
+            raise RequestError(400, 'Request body must be JSON')
+        if not isinstance(request, dict):
+            raise RequestError(400, 'Request body must be a JSON object')
+        start = time.perf_counter()
+        self.in_flight += 1
+        try:
+            return await handlers[path](request)
+        finally:
+            self.in_flight -= 1
+            self._record_latency(path[1:], time.perf_counter() - start)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """HTTP/1.1连接，支持keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    return
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_BODY_SIZE:
+                    status, response = 413, {'error': f'Request body larger than {MAX_BODY_SIZE} bytes'}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length > 0 else b''
+                    try:
+                        status, response = 200, await self.handle(method, target.split('?')[0], body)
+                    except RequestError as e:
+                        status, response = e.status, {'error': str(e)}
+                    except Exception as e:
+                        status, response = 500, {'error': f'{type(e).__name__}: {e}'}
+                data = json.dumps(response).encode()
+                writer.write(
+                    f'HTTP/1.1 {status} {HTTP_REASONS.get(status, "")}\r\n'
+                    f'Content-Type: application/json\r\nContent-Length: {len(data)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve(model_name: str, host: str, port: int, unix_socket: str, max_batch_size: int, max_wait: float, jobs: int, scratch_path: str, use_table: bool):
+    scorer = Scorer(model_name, use_table)
+    batcher = MicroBatcher(scorer.score, max_batch_size, max_wait).start()
+    extractor = TarballExtractor(jobs, scratch_path).start() if jobs > 0 else None
+    service = ScoringService(scorer, batcher, extractor)
+    if unix_socket is not None:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = await asyncio.start_unix_server(service.handle_connection, path=unix_socket)
+        address = unix_socket
+    else:
+        server = await asyncio.start_server(service.handle_connection, host=host, port=port)
+        address = f'http://{host}:{port}'
+    print(f'Scoring with {model_name} ({"truth table" if scorer.table is not None else "model"}) on {address}', flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+        if extractor is not None:
+            extractor.close()
+
+def serve(model_name: str = 'RF', host: str = '127.0.0.1', port: int = 8765, unix_socket: str = None, max_batch_size: int = 1024, max_wait: float = 0.002, jobs: int = 1, scratch_path: str = None, use_table: bool = True):
+    """
+    启动评分服务，直到被中断
+    :param model_name: 模型名
+    :param host: 监听的地址，默认只接受本机的请求
+    :param port: 监听的端口
+    :param unix_socket: Unix socket路径，给出时不监听TCP端口
+    :param max_batch_size: 每批最多的特征向量数
+    :param max_wait: 收到第一个请求后等待更多请求的时间（秒）
+    :param jobs: 特征提取进程数，0表示不接受压缩文件
+    :param scratch_path: 解压用的临时文件夹，None表示当前文件夹下的.scoring-service-packages
+    :param use_table: 模型已编译为真值表时是否查表预测
+    """
+    scratch_path = scratch_path or os.path.abspath('.scoring-service-packages')
+    try:
+        asyncio.run(_serve(model_name, host, port, unix_socket, max_batch_size, max_wait, jobs, scratch_path, use_table))
+    except KeyboardInterrupt:
+        pass
@@ -1,12 +1,17 @@
 import os
 import sys
+import time
+import signal
 import shutil
-import tarfile
+import argparse
 import traceback
 from datetime import date, timedelta
 
-from conf.settings import UNKOWN_DATASETS_PATH, FEATURES_PATH, FEATURE_POSITIONS_PATH, REPORTS_PATH
-from training import predict_package_RF
+from conf.settings import UNKOWN_DATASETS_PATH, FEATURES_PATH, FEATURE_POSITIONS_PATH, REPORTS_PATH, EXTRACT_CACHE_PATH, EXTRACT_PACKAGE_TIMEOUT, EXTRACT_MEMORY_LIMIT, WATCH_DAYS, WATCH_POLL_INTERVAL
+from extraction import ExtractCache, ExtractTimings, ExtractLimits, get_quarantine_path, extract_tarballs, extract_positions, print_extract_summary, close_position_stores
+from instrumentation import StageMetrics, profile
+# training只在用到时导入对应模块，使用真值表预测时不会导入sklearn
+import training
 
 
 def add_mode(dir: str):
@@ -24,73 +29,204 @@ def add_mode(dir: str):
             if not os.access(file_path, os.R_OK | os.W_OK):
                 os.chmod(file_path, 0o666)
                 
-def extract_cli(dataset_name: str):
-    """提取特征"""
+def extract_cli(dataset_name: str, jobs: int = os.cpu_count() or 1, force: bool = False, scratch_path: str = None, max_pending: int = None, metrics: StageMetrics = None, lazy_positions: bool = False, timeout: float = EXTRACT_PACKAGE_TIMEOUT, memory_limit: int = EXTRACT_MEMORY_LIMIT) -> dict:
+    """提取特征
+    解压与特征提取同时进行，每个包解压后立即分析，分析结束后立即删除解压的文件
+    压缩文件内容未变化的包直接使用缓存的特征，无需解压与分析
+    :param scratch_path: 解压用的临时文件夹，可以位于tmpfs（如/dev/shm），None表示使用当前文件夹
+    :param max_pending: 已解压、等待分析的包数量上限，None表示jobs的两倍
+    :param metrics: 记录各阶段的耗时与内存，None表示不记录
+    :param lazy_positions: 只计算特征向量，不记录特征位置，预测后由positions_cli为恶意的包记录特征位置
+    :param timeout: 分析一个包的时限（秒），超时的包在新的进程中重试，仍超时则记入隔离名单，None表示不限制
+    :param memory_limit: 特征提取进程的内存上限（MiB），None表示不限制
+    :return: 包名（与报告中一致）到压缩文件路径的映射
+    """
+    metrics = metrics or StageMetrics()
     dataset_path = os.path.join(UNKOWN_DATASETS_PATH, dataset_name)
     feature_path = os.path.join(FEATURES_PATH, dataset_name)
     feature_postion_path = os.path.join(FEATURE_POSITIONS_PATH, dataset_name)
 
-    if os.path.exists(feature_path):
-        try:
-            shutil.rmtree(feature_path)
-        except PermissionError:
-            traceback.print_exc()
-            add_mode(temp_dataset_path)
-            shutil.rmtree(temp_dataset_path)
-    os.makedirs(feature_path)
+    with metrics.stage('prepare'):
+        if os.path.exists(feature_path):
+            try:
+                shutil.rmtree(feature_path)
+            except PermissionError:
+                traceback.print_exc()
+                add_mode(feature_path)
+                shutil.rmtree(feature_path)
+        os.makedirs(feature_path)
+        # 特征位置库只追加写入，重新提取时清空
+        if os.path.exists(feature_postion_path):
+            shutil.rmtree(feature_postion_path)
+
+        if scratch_path is None:
+            scratch_path = os.path.abspath('.decompressed-packages-dataset')
+        temp_dataset_path = os.path.join(scratch_path, dataset_name)
+        if os.path.exists(temp_dataset_path):
+            try:
+                shutil.rmtree(temp_dataset_path)
+            except PermissionError:
+                traceback.print_exc()
+                add_mode(temp_dataset_path)
+                shutil.rmtree(temp_dataset_path)
+        tarball_paths = [os.path.join(dataset_path, file_name) for file_name in sorted(os.listdir(dataset_path)) if file_name.endswith('.tgz')]
 
-    temp_dataset_path = os.path.abspath(f'.decompressed-packages-dataset')
-    if os.path.exists(temp_dataset_path):
-        try:
-            shutil.rmtree(temp_dataset_path)
-        except PermissionError:
-            traceback.print_exc()
-            add_mode(temp_dataset_path)
-            shutil.rmtree(temp_dataset_path)
-    os.makedirs(temp_dataset_path)
-    for file_name in os.listdir(dataset_path):
-        file_path = os.path.join(dataset_path, file_name)
-        try:
-            # decompress .tgz file
-            if file_name.endswith('.tgz'):
-                tar = tarfile.open(file_path)
-                temp_package_path = f'{temp_dataset_path}/{file_name[:-4]}'
-                os.makedirs(temp_package_path)
-                tar.extractall(path=temp_package_path)
-                tar.close()
-        except Exception:
-            print(f'Error: {file_name}', file=sys.stderr)
-            traceback.print_exc()
-    add_mode(temp_dataset_path)
+    tarball_of = {}
+    def on_tarball_done(tarball_path: str, results: list):
+        for _, result in results:
+            if result is not None:
+                tarball_of[result['featureFileName'][:-4]] = tarball_path
+
+    limits = ExtractLimits(timeout=timeout, memory_limit=memory_limit, quarantine_path=get_quarantine_path(feature_path))
+    cache = ExtractCache(EXTRACT_CACHE_PATH)
+    timings = ExtractTimings()
     try:
-        cwd = os.getcwd()
-        os.chdir('feature-extract')
-        os.system(f'npm run start {temp_dataset_path} {feature_path} {feature_postion_path}')
-        os.chdir(cwd)
+        with metrics.stage('extract'):
+            summary = extract_tarballs(tarball_paths, feature_path, None if lazy_positions else feature_postion_path, temp_dataset_path, jobs=jobs, max_pending=max_pending, cache=cache, force=force, timings=timings, on_tarball_done=on_tarball_done, limits=limits)
+        print_extract_summary(summary)
+        timings.print_summary()
+        metrics.add('extract_summary', {key: summary[key] for key in ['succeeded', 'failed', 'cache_hits', 'cache_misses', 'file_cache_hits', 'file_cache_misses', 'file_cache_bytes_skipped', 'aborted', 'quarantined']})
+        metrics.add('extract_timings', timings.to_dict())
     except Exception:
         print(f'Error: {dataset_name}')
         traceback.print_exc()
-    # shutil.rmtree(temp_dataset_path)
+    finally:
+        cache.close()
+        close_position_stores()
+        if os.path.exists(temp_dataset_path):
+            shutil.rmtree(temp_dataset_path, ignore_errors=True)
+    return tarball_of
 
-def predict_cli(dataset_name: str):
-    """预测包"""
+def predict_cli(dataset_name: str, resume: bool = False, parquet: bool = False, metrics: StageMetrics = None, use_table: bool = True):
+    """预测包
+    模型已编译为真值表（cli.py compile -o RF）时直接查表，否则加载模型预测；
+    报告分块写入，resume为True时跳过报告中已有的包
+    :param metrics: 记录各阶段的耗时与内存，None表示不记录
+    :param use_table: 模型已编译为真值表时是否查表预测
+    """
+    metrics = metrics or StageMetrics()
     csv_dir_path = os.path.join(FEATURES_PATH, dataset_name)
     report_name = f'{dataset_name}-report.csv'
-    report_content = 'package name, predict\n'
-    for feature_file_name in os.listdir(csv_dir_path):
-        feature_file_path = os.path.join(csv_dir_path, feature_file_name)
-        result = predict_package_RF(feature_file_path)
-        report_content += feature_file_name[:-4] + ', ' + result + '\n'
-    with open(os.path.join(REPORTS_PATH, report_name), 'w') as f:
-        f.write(report_content)
+    with metrics.stage('load-model'):
+        table = training.load_truth_table('RF') if use_table else None
+        if table is not None:
+            table.check_feature_names(training.get_dataset_feature_names(csv_dir_path))
+            model_predict = table.predict
+        else:
+            training.get_model('RF')
+            model_predict = lambda matrix: training.predict_matrix('RF', matrix)[0]
+    with metrics.stage('load-features'):
+        feature_matrix, package_names = training.read_feature_matrix(csv_dir_path)
+
+    # 预测与写入报告交替进行，单独累计预测的时间
+    predict_seconds = 0.0
+    def predict(matrix):
+        nonlocal predict_seconds
+        start = time.perf_counter()
+        result = model_predict(matrix)
+        predict_seconds += time.perf_counter() - start
+        return result
+
+    with metrics.stage('predict-and-report'):
+        with training.ReportWriter(os.path.join(REPORTS_PATH, report_name), ['package name', 'predict'], resume=resume, parquet=parquet) as writer:
+            training.write_predictions(writer, predict, feature_matrix, package_names, lambda package_name, result: (package_name, result))
+    metrics.add('predict_seconds', predict_seconds)
+    metrics.add('packages', len(package_names))
+    if table is None:
+        print(training.get_model_registry().report())
+
+def positions_cli(dataset_name: str, tarball_of: dict, jobs: int = os.cpu_count() or 1, scratch_path: str = None, metrics: StageMetrics = None, timeout: float = EXTRACT_PACKAGE_TIMEOUT, memory_limit: int = EXTRACT_MEMORY_LIMIT):
+    """记录特征位置
+    第一遍提取不记录特征位置时，预测后只重新分析报告中恶意的包，将它们的特征位置写入特征位置库
+    :param tarball_of: extract_cli返回的包名到压缩文件路径的映射
+    :param scratch_path: 解压用的临时文件夹，None表示使用当前文件夹
+    :param metrics: 记录各阶段的耗时与内存，None表示不记录
+    :param timeout: 分析一个包的时限（秒），None表示不限制
+    :param memory_limit: 特征提取进程的内存上限（MiB），None表示不限制
+    """
+    metrics = metrics or StageMetrics()
+    feature_path = os.path.join(FEATURES_PATH, dataset_name)
+    feature_postion_path = os.path.join(FEATURE_POSITIONS_PATH, dataset_name)
+    report_path = os.path.join(REPORTS_PATH, f'{dataset_name}-report.csv')
+    # 同一压缩文件中的多个包只解压一次
+    tarball_paths = sorted(set(tarball_of[package_name] for package_name, verdict in training.read_report(report_path) if verdict == 'malicious' and package_name in tarball_of))
+    temp_dataset_path = os.path.join(scratch_path or os.path.abspath('.decompressed-packages-dataset'), f'{dataset_name}-positions')
+    cache = ExtractCache(EXTRACT_CACHE_PATH)
+    try:
+        with metrics.stage('positions'):
+            summary = extract_positions(tarball_paths, feature_path, feature_postion_path, temp_dataset_path, jobs=jobs, cache=cache, limits=ExtractLimits(timeout=timeout, memory_limit=memory_limit, quarantine_path=get_quarantine_path(feature_path)))
+        print(f"Recorded feature positions of {summary['succeeded']} flagged packages ({len(tarball_paths)} tarballs), {summary['failed']} failed. Log: {summary['log_path']}")
+        metrics.add('positions_summary', {'tarballs': len(tarball_paths), 'succeeded': summary['succeeded'], 'failed': summary['failed'], 'file_cache_hits': summary['file_cache_hits'], 'file_cache_misses': summary['file_cache_misses']})
+    finally:
+        cache.close()
+        close_position_stores()
+        if os.path.exists(temp_dataset_path):
+            shutil.rmtree(temp_dataset_path, ignore_errors=True)
+
+def watch_cli(jobs: int = os.cpu_count() or 1, force: bool = False, scratch_path: str = None, max_pending: int = None, days: int = WATCH_DAYS, poll_interval: float = WATCH_POLL_INTERVAL, timeout: float = EXTRACT_PACKAGE_TIMEOUT, memory_limit: int = EXTRACT_MEMORY_LIMIT, use_table: bool = True):
+    """持续评分
+    监视未知数据集中今天及之前几天的文件夹，新的压缩文件写完后立即解压、提取特征、预测，并追加到当天的报告；
+    已评分的压缩文件记录在报告旁的.journal文件中，重启后不会重新评分。Ctrl-C或SIGTERM停止扫描，处理完已提交的压缩文件后退出
+    """
+    from watch import TarballWatcher
+    table = training.load_truth_table('RF') if use_table else None
+    if table is not None:
+        model_predict = table.predict
+        check_feature_names = table.check_feature_names
+    else:
+        training.get_model('RF')
+        model_predict = lambda matrix: training.predict_matrix('RF', matrix)[0]
+        check_feature_names = None
+    cache = ExtractCache(EXTRACT_CACHE_PATH)
+    limits = ExtractLimits(timeout=timeout, memory_limit=memory_limit, quarantine_path=get_quarantine_path('watch'))
+    watcher = TarballWatcher(model_predict, check_feature_names, jobs=jobs, scratch_path=scratch_path, max_pending=max_pending, cache=cache, force=force, days=days, poll_interval=poll_interval, limits=limits)
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *_: watcher.stop())
+    print(f'Watching {UNKOWN_DATASETS_PATH} ({"truth table" if table is not None else "model"}), press Ctrl-C to stop.', flush=True)
+    try:
+        summary = watcher.run()
+    finally:
+        cache.close()
+    print_extract_summary(summary)
 
 if __name__ == '__main__':
-    today = date.today()
-    yesterday = today - timedelta(days=1)
-    malcious_dataset_name = f'{yesterday.year}-{yesterday.month}-{yesterday.day}'
-    print('Extract features started.')
-    extract_cli(malcious_dataset_name)
-    print('Extract features finished.')
-    print('Predict packages started.')
-    predict_cli(malcious_dataset_name)
-    print('Predict packages finished.')
+    parser = argparse.ArgumentParser(description='Extract features from and predict the npm packages published yesterday.')
+    parser.add_argument('--force', action='store_true', help='analyze every package again instead of reusing cached features')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='number of extractor processes running in parallel')
+    parser.add_argument('--scratch', help='directory to decompress packages into, e.g. a tmpfs like /dev/shm/npm-packages')
+    parser.add_argument('--max-pending', type=int, help='maximum number of decompressed packages waiting for extraction (default: twice the jobs)')
+    parser.add_argument('--resume', action='store_true', help='continue an interrupted prediction, skipping packages already in the report')
+    parser.add_argument('--parquet', action='store_true', help='also write the report as Parquet (requires pyarrow)')
+    parser.add_argument('--metrics', help='file to write the wall time, CPU time and peak memory of every stage and the slowest packages and files to as JSON (default: reports/<dataset>-metrics.json)')
+    parser.add_argument('--profile', help='profile the run with cProfile and save the stats to this file, e.g. for snakeviz or flameprof')
+    parser.add_argument('--timeout', type=float, default=EXTRACT_PACKAGE_TIMEOUT, help=f'seconds an extractor process may spend on one package before it is killed and the package retried, 0 disables the deadline (default: {EXTRACT_PACKAGE_TIMEOUT})')
+    parser.add_argument('--memory-limit', type=int, default=EXTRACT_MEMORY_LIMIT, help=f'memory ceiling of an extractor process in MiB, 0 disables it (default: {EXTRACT_MEMORY_LIMIT})')
+    parser.add_argument('--lazy-positions', action='store_true', help='extract only the feature vectors first, then record feature positions only for the packages predicted malicious')
+    parser.add_argument('--watch', action='store_true', help='keep watching the unknown datasets directory and score tarballs as soon as they are written, appending to the daily report')
+    parser.add_argument('--days', type=int, default=WATCH_DAYS, help=f'number of daily directories watched, today included (default: {WATCH_DAYS})')
+    parser.add_argument('--poll-interval', type=float, default=WATCH_POLL_INTERVAL, help=f'seconds between two scans in watch mode (default: {WATCH_POLL_INTERVAL})')
+    parser.add_argument('--no-table', action='store_true', help='predict with the model even if it has been compiled into a truth table')
+    args = parser.parse_args()
+    if args.watch:
+        watch_cli(jobs=args.jobs, force=args.force, scratch_path=args.scratch, max_pending=args.max_pending, days=args.days, poll_interval=args.poll_interval, timeout=args.timeout or None, memory_limit=args.memory_limit or None, use_table=not args.no_table)
+    else:
+        today = date.today()
+        yesterday = today - timedelta(days=1)
+        malcious_dataset_name = f'{yesterday.year}-{yesterday.month}-{yesterday.day}'
+        metrics = StageMetrics()
+        metrics.add('dataset', malcious_dataset_name)
+        with profile(args.profile):
+            print('Extract features started.')
+            tarball_of = extract_cli(malcious_dataset_name, jobs=args.jobs, force=args.force, scratch_path=args.scratch, max_pending=args.max_pending, metrics=metrics, lazy_positions=args.lazy_positions, timeout=args.timeout or None, memory_limit=args.memory_limit or None)
+            print('Extract features finished.')
+            print('Predict packages started.')
+            predict_cli(malcious_dataset_name, resume=args.resume, parquet=args.parquet, metrics=metrics, use_table=not args.no_table)
+            print('Predict packages finished.')
+            if args.lazy_positions:
+                print('Record feature positions started.')
+                positions_cli(malcious_dataset_name, tarball_of, jobs=args.jobs, scratch_path=args.scratch, metrics=metrics, timeout=args.timeout or None, memory_limit=args.memory_limit or None)
+                print('Record feature positions finished.')
+        metrics.print_summary()
+        metrics_path = args.metrics or os.path.join(REPORTS_PATH, f'{malcious_dataset_name}-metrics.json')
+        metrics.write(metrics_path)
+        print(f'Metrics saved to {metrics_path}')
@@ -0,0 +1,169 @@
+import os
+import json
+import pickle
+import shutil
+import tarfile
+
+import numpy as np
+import pytest
+
+
+# 与特征提取程序输出一致的特征数
+FEATURE_COUNT = 22
+
+# 实现特征提取程序--serve协议的替身，不需要构建特征提取程序
+FAKE_EXTRACTOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_extractor.js')
+
+
+def random_feature_matrix(n_rows: int, feature_count: int = FEATURE_COUNT, seed: int = 0) -> np.ndarray:
+    """随机的布尔特征矩阵"""
+    return np.random.default_rng(seed).random((n_rows, feature_count)) < 0.3
+
+def make_labels(feature_matrix) -> np.ndarray:
+    """前三个特征中至少两个为真时为恶意包，模型容易学到"""
+    return np.where(np.asarray(feature_matrix)[:, :3].sum(axis=1) >= 2, 'malicious', 'benign')
+
+def write_feature_csv(file_path: str, feature_vec, feature_names: list = None):
+    """写入与特征提取程序相同格式的特征文件"""
+    feature_names = feature_names or [f'feature{i}' for i in range(len(feature_vec))]
+    with open(file_path, 'w') as f:
+        for name, value in zip(feature_names, feature_vec):
+            f.write(f'{name},{"true" if value else "false"}\n')
+
+def write_feature_dir(dir_path: str, feature_matrix, package_names: list = None) -> list:
+    """
+    每个包写入一个特征文件
+    :return: 包名列表
+    """
+    os.makedirs(dir_path, exist_ok=True)
+    package_names = package_names or [f'pkg{i:04d}@1.0.0' for i in range(len(feature_matrix))]
+    for package_name, feature_vec in zip(package_names, feature_matrix):
+        write_feature_csv(os.path.join(dir_path, package_name + '.csv'), feature_vec)
+    return package_names
+
+def make_package(dataset_path: str, dir_name: str, name: str, version: str = '1.0.0', files: dict = None) -> str:
+    """
+    在数据集中创建一个包，与npm压缩包解压后的结构相同（<dir_name>/package/package.json）
+    :param files: 相对路径到文件内容的映射，替身特征提取程序在JS文件中找到特征名即认为有该特征
+    :return: 包路径
+    """
+    package_path = os.path.join(dataset_path, dir_name, 'package')
+    os.makedirs(package_path, exist_ok=True)
+    with open(os.path.join(package_path, 'package.json'), 'w') as f:
+        json.dump({'name': name, 'version': version}, f)
+    for relative_path, content in (files if files is not None else {'index.js': 'module.exports = 1\n'}).items():
+        file_path = os.path.join(package_path, relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w') as f:
+            f.write(content)
+    return package_path
+
+def make_tarball(dir_path: str, name: str, version: str = '1.0.0', files: dict = None) -> str:
+    """
+    创建与npm相同结构的包压缩文件（package/package.json）
+    :return: 压缩文件路径
+    """
+    package_path = make_package(os.path.join(dir_path, '.src'), f'{name}-{version}', name, version, files)
+    tarball_path = os.path.join(dir_path, f'{name}-{version}.tgz')
+    with tarfile.open(tarball_path, 'w:gz') as tar:
+        tar.add(package_path, arcname='package')
+    shutil.rmtree(os.path.dirname(package_path))
+    return tarball_path
+
+def train_model(kind: str = 'RF', feature_count: int = FEATURE_COUNT, n_rows: int = 200, seed: int = 0) -> list:
+    """
+    训练一个小模型
+    :param kind: RF、NB、SVM或MLP
+    :return: [分类器, scaler]
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.naive_bayes import BernoulliNB
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import SVC
+    X = random_feature_matrix(n_rows, feature_count, seed)
+    y = make_labels(X)
+    scaler = StandardScaler().fit(X)
+    classifier = {
+        'RF': lambda: RandomForestClassifier(n_estimators=5, max_depth=4, random_state=seed),
+        'NB': lambda: BernoulliNB(),
+        'SVM': lambda: SVC(random_state=seed),
+        'MLP': lambda: MLPClassifier(hidden_layer_sizes=(8,), max_iter=2000, random_state=seed)
+    }[kind]()
+    classifier.fit(scaler.transform(X), y)
+    return [classifier, scaler]
+
+def save_model(dir_path: str, name: str, kind: str = 'RF', feature_count: int = FEATURE_COUNT, seed: int = 0) -> tuple:
+    """
+    训练并保存模型
+    :return: (分类器路径, scaler路径)
+    """
+    classifier, scaler = train_model(kind, feature_count, seed=seed)
+    classifier_path = os.path.join(dir_path, f'{name}.pkl')
+    scaler_path = os.path.join(dir_path, f'{name}_scaler.pkl')
+    with open(classifier_path, 'wb') as f:
+        pickle.dump(classifier, f)
+    with open(scaler_path, 'wb') as f:
+        pickle.dump(scaler, f)
+    return classifier_path, scaler_path
+
+
+@pytest.fixture
+def model_paths(tmp_path, monkeypatch):
+    """
+    临时文件夹中的四个小模型，替换预测时使用的模型路径，并清空进程内的模型缓存
+    :return: 模型名到(分类器路径, scaler路径)的映射
+    """
+    pytest.importorskip('sklearn')
+    from training.src.commons import model_file_paths
+    from training.src.model_registry import get_model_registry
+    paths = {name: save_model(str(tmp_path), name, name) for name in ['MLP', 'NB', 'SVM', 'RF']}
+    for name, model_path in paths.items():
+        monkeypatch.setitem(model_file_paths, name, model_path)
+    get_model_registry().clear()
+    yield paths
+    get_model_registry().clear()
+
+@pytest.fixture
+def fake_extractor(tmp_path, monkeypatch):
+    """
+    使用替身特征提取程序，特征提取日志与隔离名单写入临时文件夹
+    :return: 日志文件夹
+    """
+    if shutil.which('node') is None:
+        pytest.skip('node is not installed')
+    from extraction.src import worker, extractor, pipeline, limits
+    from extraction.src.position_store import close_position_stores
+    dist_path = tmp_path / 'extractor-dist'
+    log_path = tmp_path / 'extractor-log'
+    dist_path.mkdir()
+    log_path.mkdir()
+    shutil.copy(FAKE_EXTRACTOR_PATH, dist_path / 'main.js')
+    monkeypatch.setattr(worker, 'EXTRACTOR_DIST_PATH', str(dist_path))
+    for module in (worker, extractor, pipeline):
+        monkeypatch.setattr(module, 'ensure_extractor_built', lambda: None)
+    for module in (worker, extractor, limits):
+        monkeypatch.setattr(module, 'EXTRACTOR_LOG_PATH', str(log_path))
+    yield log_path
+    close_position_stores()
+
+@pytest.fixture
+def real_extractor(tmp_path, monkeypatch):
+    """
+    使用真实的特征提取程序（必要时构建dist/main.js），特征提取日志写入临时文件夹
+    没有安装node或feature-extract的依赖时跳过
+    :return: 日志文件夹
+    """
+    from conf.settings import FEATURE_EXTRACT_PATH
+    if shutil.which('node') is None or shutil.which('npm') is None:
+        pytest.skip('node is not installed')
+    if not os.path.isdir(os.path.join(FEATURE_EXTRACT_PATH, 'node_modules')):
+        pytest.skip('the dependencies of the feature extractor are not installed')
+    from extraction.src import worker, extractor, limits
+    from extraction.src.position_store import close_position_stores
+    log_path = tmp_path / 'extractor-log'
+    log_path.mkdir()
+    for module in (worker, extractor, limits):
+        monkeypatch.setattr(module, 'EXTRACTOR_LOG_PATH', str(log_path))
+    yield log_path
+    close_position_stores()
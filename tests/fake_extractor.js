@@ -0,0 +1,150 @@
+// A stand-in for dist/main.js --serve used by the tests. It speaks the same line protocol as
+// src/programs/ExtractorServer/ExtractorServer.ts without parsing JavaScript:
+// a feature is set when a .js file of the package contains the feature name.
+// Package names select misbehaviour: "hang" never answers, "crash" exits, "heap" aborts like V8 running
+// out of heap, "flaky" crashes on its first request only.
+const readline = require('readline')
+const fs = require('fs')
+const path = require('path')
+const crypto = require('crypto')
+
+const FEATURE_NAMES = ['hasInstallScript', 'containIP', 'useBase64Conversion', 'useBase64ConversionInInstallScript', 'containBase64StringInJSFile', 'containBase64StringInInstallScript', 'containBytestring', 'containDomainInJSFile', 'containDomainInInstallScript', 'useBuffer', 'useEval', 'requireChildProcessInJSFile', 'requireChildProcessInInstallScript', 'accessFSInJSFile', 'accessFSInInstallScript', 'accessNetworkInJSFile', 'accessNetworkInInstallScript', 'accessProcessEnvInJSFile', 'accessProcessEnvInInstallScript', 'containSuspicousString', 'accessCryptoAndZip', 'accessSensitiveAPI']
+
+const fileCacheIdx = process.argv.indexOf('--file-cache')
+const fileCacheDir = fileCacheIdx >= 0
+  ? path.join(process.argv[fileCacheIdx + 1], crypto.createHash('sha256').update(process.argv[fileCacheIdx + 2]).digest('hex').slice(0, 16))
+  : null
+
+function send (response) {
+  process.stdout.write(JSON.stringify(response) + '\n')
+}
+
+function findPackages (dirPath, result) {
+  const entries = fs.readdirSync(dirPath, { withFileTypes: true }).sort((a, b) => a.name < b.name ? -1 : 1)
+  if (path.basename(dirPath) === 'package' && entries.some(entry => entry.name === 'package.json')) {
+    result.push(dirPath)
+    return result
+  }
+  for (const entry of entries) {
+    if (entry.isDirectory() && entry.name !== 'node_modules') {
+      findPackages(path.join(dirPath, entry.name), result)
+    }
+  }
+  return result
+}
+
+function findJSFiles (dirPath, result) {
+  for (const entry of fs.readdirSync(dirPath, { withFileTypes: true }).sort((a, b) => a.name < b.name ? -1 : 1)) {
+    const entryPath = path.join(dirPath, entry.name)
+    if (entry.isDirectory() && entry.name !== 'node_modules') {
+      findJSFiles(entryPath, result)
+    } else if (entry.isFile() && entry.name.endsWith('.js')) {
+      result.push(entryPath)
+    }
+  }
+  return result
+}
+
+function extract (request) {
+  const packageJSON = JSON.parse(fs.readFileSync(path.join(request.packagePath, 'package.json'), 'utf-8'))
+  const name = packageJSON.name
+  if (request.progress) {
+    send({ id: request.id, progress: { stage: 'package.json', filePath: path.join(request.packagePath, 'package.json') } })
+  }
+  const files = findJSFiles(request.packagePath, [])
+  if (request.progress && files.length > 0) {
+    send({ id: request.id, progress: { stage: 'js-file', filePath: files[0] } })
+  }
+  if (name.includes('hang')) {
+    return null
+  }
+  if (name.includes('crash')) {
+    process.exit(1)
+  }
+  if (name.includes('heap')) {
+    console.error('FATAL ERROR: Reached heap limit Allocation failed - JavaScript heap out of memory')
+    process.abort()
+  }
+  const flakyMarker = path.join(request.packagePath, '..', '.flaky')
+  if (name.includes('flaky') && !fs.existsSync(flakyMarker)) {
+    fs.writeFileSync(flakyMarker, '')
+    process.exit(1)
+  }
+
+  const recordPositions = request.positions !== false
+  const values = FEATURE_NAMES.map(() => false)
+  const positions = {}
+  const fileCache = fileCacheDir !== null ? { hits: 0, misses: 0, bytesSkipped: 0 } : undefined
+  const timingFiles = []
+  let truncated = !recordPositions
+  for (const filePath of files) {
+    if (request.fast && values.every(value => value)) {
+      truncated = true
+      break
+    }
+    const code = fs.readFileSync(filePath, 'utf-8')
+    if (fileCache !== undefined) {
+      const entryPath = path.join(fileCacheDir, crypto.createHash('sha256').update(code).digest('hex') + '.json')
+      if (!request.refreshFileCache && fs.existsSync(entryPath)) {
+        fileCache.hits++
+        fileCache.bytesSkipped += Buffer.byteLength(code)
+      } else {
+        fileCache.misses++
+        fs.mkdirSync(fileCacheDir, { recursive: true })
+        fs.writeFileSync(entryPath, '{}')
+      }
+    }
+    FEATURE_NAMES.forEach((featureName, i) => {
+      const line = code.split('\n').findIndex(text => text.includes(featureName))
+      if (line < 0) {
+        return
+      }
+      values[i] = true
+      if (recordPositions) {
+        positions[featureName] = positions[featureName] || []
+        const column = code.split('\n')[line].indexOf(featureName)
+        positions[featureName].push({ filePath, content: { start: { line: line + 1, column }, end: { line: line + 1, column: column + featureName.length } } })
+      }
+    })
+    timingFiles.push({ filePath, size: Buffer.byteLength(code), parseMs: 1, traverseMs: 1, regExpMs: 0.5 })
+  }
+  const features = FEATURE_NAMES.map((featureName, i) => [featureName, values[i]])
+  let csvPath
+  if (request.featureDirPath) {
+    fs.mkdirSync(request.featureDirPath, { recursive: true })
+    csvPath = path.join(request.featureDirPath, name.replace('/', '#') + '.csv')
+    fs.writeFileSync(csvPath, features.map(([featureName, value]) => `${featureName},${value}`).join('\n') + '\n')
+  }
+  return {
+    packageName: `${name}@${packageJSON.version}`.replace('/', '#'),
+    csvPath,
+    features,
+    // like PositionRecorder.serialize, incomplete positions carry "truncated": true
+    positions: truncated ? { ...positions, truncated: true } : positions,
+    truncated,
+    timing: request.timing ? { totalMs: 3, packageJSONMs: 0.5, installScriptMs: 0.5, files: timingFiles } : undefined,
+    fileCache
+  }
+}
+
+const lines = readline.createInterface({ input: process.stdin, crlfDelay: Infinity })
+lines.on('line', line => {
+  if (line.trim() === '') {
+    return
+  }
+  const request = JSON.parse(line)
+  console.error(`Handling request ${request.id}`)
+  try {
+    if (request.command === 'list') {
+      send({ id: request.id, ok: true, packages: findPackages(request.packageDirPath, []) })
+    } else {
+      const result = extract(request)
+      if (result !== null) {
+        send({ id: request.id, ok: true, ...result })
+      }
+    }
+  } catch (error) {
+    console.error(`Failed to handle request ${line}`)
+    send({ id: request.id, ok: false, error: error.message })
+  }
+})
@@ -0,0 +1,71 @@
+import os
+import tarfile
+
+import numpy as np
+
+from benchmark.src.synthetic import generate_packages, generate_feature_matrix, make_package_files, SUSPICIOUS_PATTERNS, SYNTHETIC_FEATURE_NAMES
+from benchmark.src.suite import run_benchmark, compare_results, parse_size, save_results, load_results
+
+
+def read_tarball(tarball_path: str) -> dict:
+    with tarfile.open(tarball_path) as tar:
+        return {member.name: tar.extractfile(member).read() for member in tar if member.isfile()}
+
+def test_packages_are_reproducible(tmp_path):
+    first = generate_packages(str(tmp_path / 'a'), 6, seed=3, js_files=2, js_file_size=512)
+    second = generate_packages(str(tmp_path / 'b'), 6, seed=3, js_files=2, js_file_size=512)
+    assert [os.path.basename(path) for path in first] == [os.path.basename(path) for path in second]
+    for first_path, second_path in zip(first, second):
+        assert read_tarball(first_path) == read_tarball(second_path)
+    assert 'package/package.json' in read_tarball(first[0])
+
+def test_package_files():
+    files = make_package_files('x', install_script=True, js_files=3, js_file_size=2048, patterns=['eval', 'child_process'])
+    assert sorted(files) == ['index.js', 'install.js', os.path.join('lib', 'module1.js'), os.path.join('lib', 'module2.js'), 'package.json']
+    assert '"preinstall"' in files['package.json']
+    assert files['index.js'].startswith(SUSPICIOUS_PATTERNS['eval'] + SUSPICIOUS_PATTERNS['child_process'])
+    assert 'eval(' not in files[os.path.join('lib', 'module1.js')]
+    assert all(len(content) >= 2048 for name, content in files.items() if name.endswith('.js'))
+
+def test_feature_matrix_is_reproducible():
+    feature_matrix, labels, package_names = generate_feature_matrix(1000, seed=1)
+    assert feature_matrix.shape == (1000, len(SYNTHETIC_FEATURE_NAMES))
+    assert len(set(package_names)) == 1000
+    same_matrix, same_labels, _ = generate_feature_matrix(1000, seed=1)
+    assert (feature_matrix == same_matrix).all() and (labels == same_labels).all()
+    # 恶意包的特征更多
+    assert feature_matrix[labels == 'malicious'].mean() > feature_matrix[labels == 'benign'].mean()
+
+def test_offline_stages(tmp_path):
+    results = run_benchmark(sizes=['300'], stages=['load', 'report'], work_path=str(tmp_path))
+    assert {'seconds', 'items'} <= set(results['results']['load-csv/300'])
+    assert any(name.startswith('report') for name in results['results'])
+    assert os.listdir(tmp_path) == []
+    assert parse_size('100k') == 100000
+
+def test_regressions_are_reported():
+    environment = {'platform': 'linux', 'cpu_count': 1}
+    baseline = {'environment': environment, 'results': {'a': {'seconds': 1.0}, 'b': {'seconds': 0.01}, 'c': {'seconds': 1.0}, 'd': {'skipped': 'no node'}}}
+    results = {'environment': environment, 'results': {'a': {'seconds': 1.5}, 'b': {'seconds': 0.03}, 'c': {'seconds': 1.1}, 'd': {'seconds': 9.0}}}
+    # b慢了两倍但差异短于噪声，d在基线中被跳过
+    assert compare_results(results, baseline, tolerance=0.25) == [('a', 1.0, 1.5)]
+
+def test_extraction_is_timed_on_synthetic_tarballs(fake_extractor, tmp_path):
+    (tmp_path / 'work').mkdir()
+    results = run_benchmark(sizes=[], stages=['extract'], packages=5, work_path=str(tmp_path / 'work'))
+    assert results['results']['extract/5']['items'] == 5
+    assert results['results']['extract/5']['seconds'] > 0
+    assert os.listdir(tmp_path / 'work') == []
+
+def test_training_and_prediction_per_model(model_paths, tmp_path):
+    results = run_benchmark(sizes=['200'], model_names=['NB', 'RF'], stages=['train', 'predict'], work_path=str(tmp_path))
+    for name in ['train-NB/200', 'train-RF/200', 'predict-NB/200', 'predict-RF/200']:
+        assert results['results'][name]['items'] == 200
+    assert not any(name.startswith(('train-SVM', 'train-MLP')) for name in results['results'])
+
+def test_results_round_trip_as_json(tmp_path):
+    results = run_benchmark(sizes=['100'], stages=['report'], work_path=str(tmp_path))
+    results_path = str(tmp_path / 'results' / 'run.json')
+    save_results(results, results_path)
+    assert load_results(results_path) == results
+    assert compare_results(results, load_results(results_path)) == []
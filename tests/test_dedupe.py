@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('sklearn')
+from sklearn.naive_bayes import BernoulliNB
+from sklearn.neural_network import MLPClassifier
+
+from training.src.dedupe import dedupe_rows, supports_sample_weight
+from training.src.evaluation import score_model
+from training.src.search import run_search
+from tests.conftest import make_labels
+
+
+def test_identical_rows_are_counted():
+    X = np.array([[1, 0], [0, 1], [1, 0], [1, 0], [0, 1]], dtype=bool)
+    y = np.array(['malicious', 'benign', 'malicious', 'benign', 'benign'])
+    unique_index, weights = dedupe_rows(X, y)
+    # 特征向量相同但标签不同的行不合并
+    assert unique_index.tolist() == [0, 1, 3]
+    assert weights.tolist() == [2, 2, 1]
+    assert weights.sum() == len(y)
+
+def test_empty_matrix():
+    unique_index, weights = dedupe_rows(np.zeros((0, 3), dtype=bool), np.array([]))
+    assert len(unique_index) == 0 and len(weights) == 0
+
+def test_weighted_fit_matches_fit_on_every_row():
+    rng = np.random.default_rng(0)
+    # 只有16种特征向量，重复很多
+    X = rng.random((500, 4)) < 0.5
+    y = make_labels(X)
+    unique_index, weights = dedupe_rows(X, y)
+    assert len(unique_index) <= 16
+
+    full = BernoulliNB().fit(X, y)
+    weighted = BernoulliNB().fit(X[unique_index], y[unique_index], sample_weight=weights)
+    assert np.allclose(full.feature_log_prob_, weighted.feature_log_prob_)
+    assert np.allclose(full.class_log_prior_, weighted.class_log_prior_)
+    assert np.allclose(score_model(full, X, y), score_model(full, X[unique_index], y[unique_index], sample_weight=weights), equal_nan=True)
+
+def test_sample_weight_support():
+    assert supports_sample_weight(BernoulliNB())
+    assert not supports_sample_weight(MLPClassifier())
+
+def test_dedupe_search_writes_the_same_scores(tmp_path, capsys):
+    """每折内去重并以样本权重训练与评估，验证结果与使用所有行相同"""
+    rng = np.random.default_rng(1)
+    X = rng.random((800, 5)) < 0.5
+    y = make_labels(X)
+    configs = [(f'alpha={alpha}', BernoulliNB(alpha=alpha)) for alpha in [0.5, 1.0]]
+    run_search(configs, X, y, str(tmp_path / 'all.csv'), workers=2)
+    run_search(configs, X, y, str(tmp_path / 'dedupe.csv'), workers=2, dedupe=True)
+    assert 'Deduplicated 800 rows into' in capsys.readouterr().out
+    with open(tmp_path / 'all.csv') as f:
+        all_rows = [line.split(',') for line in f.read().splitlines()]
+    with open(tmp_path / 'dedupe.csv') as f:
+        deduped_rows = [line.split(',') for line in f.read().splitlines()]
+    assert [row[0] for row in deduped_rows] == [row[0] for row in all_rows]
+    for all_row, dedupe_row in zip(all_rows[1:], deduped_rows[1:]):
+        assert np.allclose([float(value) for value in all_row[1:]], [float(value) for value in dedupe_row[1:]])
+    # 数据相同但去重方式不同时不能继续之前的搜索
+    with open(str(tmp_path / 'all.csv') + '.progress') as f, open(str(tmp_path / 'dedupe.csv') + '.progress') as g:
+        assert f.readline() != g.readline()
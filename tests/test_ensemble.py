@@ -0,0 +1,94 @@
+import os
+import argparse
+
+import numpy as np
+import pytest
+
+from training.src.ensemble import EnsembleScorer
+from training.src.predict import predict_matrix
+from training.src.report import ReportWriter, read_report, write_predictions
+from tests.conftest import random_feature_matrix, write_feature_dir
+
+
+MODEL_NAMES = ['MLP', 'NB', 'SVM', 'RF']
+
+
+def make_results(verdicts: list, probas: list) -> dict:
+    """每个模型的预测结果，verdicts中1为恶意"""
+    return {
+        f'M{i}': [np.where(np.array(votes) == 1, 'malicious', 'benign'), None if proba is None else np.array(proba)]
+        for i, (votes, proba) in enumerate(zip(verdicts, probas))
+    }
+
+@pytest.mark.parametrize('vote, threshold, expected', [
+    ('any', 0.5, [True, True, True, False]),
+    ('all', 0.5, [True, False, False, False]),
+    ('majority', 0.5, [True, True, False, False]),
+    ('majority', 0.25, [True, True, True, False]),
+    ('mean-proba', 0.5, [True, False, False, False]),
+    ('mean-proba', 0.4, [True, True, False, False])
+])
+def test_votes(vote, threshold, expected):
+    scorer = EnsembleScorer([], vote, threshold)
+    results = make_results(
+        [[1, 1, 1, 0], [1, 1, 0, 0], [1, 0, 0, 0], [1, 0, 0, 0]],
+        [[0.9, 0.8, 0.7, 0.1], [0.9, 0.6, 0.2, 0.1], None, [0.6, 0.4, 0.3, 0.4]]
+    )
+    # mean-proba中第三个模型没有概率，以预测结果计为0或1：第二个包为(0.8 + 0.6 + 0 + 0.4) / 4 = 0.45
+    assert list(scorer.combine(results)) == expected
+
+def test_unknown_vote():
+    with pytest.raises(ValueError):
+        EnsembleScorer([], 'plurality')
+
+@pytest.mark.parametrize('workers', [1, None])
+def test_every_model_scores_the_matrix_once(model_paths, workers):
+    feature_matrix = random_feature_matrix(50, seed=7)
+    with EnsembleScorer(MODEL_NAMES, 'majority', use_table=False, workers=workers) as scorer:
+        results, y_vote = scorer.score(feature_matrix)
+    for model_name in MODEL_NAMES:
+        y_pred, y_proba = predict_matrix(model_name, feature_matrix)
+        assert list(results[model_name][0]) == list(y_pred)
+        assert (results[model_name][1] is None) == (y_proba is None)
+    votes = np.mean([predict_matrix(model_name, feature_matrix)[0] == 'malicious' for model_name in MODEL_NAMES], axis=0)
+    assert list(y_vote) == list(np.where(votes >= 0.5, 'malicious', 'benign'))
+
+def test_report_has_a_column_per_model(model_paths, tmp_path):
+    feature_matrix = random_feature_matrix(20, seed=2)
+    package_names = [f'pkg{i}' for i in range(20)]
+    report_path = str(tmp_path / 'all-report.csv')
+    with EnsembleScorer(MODEL_NAMES, 'any', use_table=False) as scorer:
+        with ReportWriter(report_path, scorer.columns, chunk_size=8) as writer:
+            write_predictions(writer, scorer.rows, feature_matrix, package_names, lambda package_name, row: (package_name, *row))
+        columns = scorer.columns
+    rows = list(read_report(report_path))
+    assert columns == ['package name', 'MLP predict', 'NB predict', 'SVM predict', 'RF predict', 'MLP probability', 'NB probability', 'SVM probability', 'RF probability', 'ensemble']
+    assert [row[0] for row in rows] == package_names
+    assert all(len(row) == len(columns) for row in rows)
+    y_pred, y_proba = predict_matrix('RF', feature_matrix)
+    assert [row[4] for row in rows] == list(y_pred)
+    assert [float(row[8]) for row in rows] == pytest.approx(list(y_proba), abs=1e-4)
+    assert all(row[-1] == ('malicious' if 'malicious' in row[1:5] else 'benign') for row in rows)
+
+def test_cli_predict_all_reads_the_features_once(model_paths, tmp_path, monkeypatch):
+    """predict -o all只读取一次特征矩阵，报告写入临时文件夹，中断后继续时只预测报告中没有的包"""
+    import cli
+    monkeypatch.setattr(cli, 'FEATURES_PATH', str(tmp_path / 'features'))
+    monkeypatch.setattr(cli, 'REPORTS_PATH', str(tmp_path / 'reports'))
+    package_names = write_feature_dir(str(tmp_path / 'features' / 'day'), random_feature_matrix(12, seed=4))
+    (tmp_path / 'reports').mkdir()
+    reads = []
+    read_feature_matrix = cli.training.read_feature_matrix
+    monkeypatch.setattr(cli.training, 'read_feature_matrix', lambda dir_path: reads.append(dir_path) or read_feature_matrix(dir_path))
+    monkeypatch.setattr(cli, 'args', argparse.Namespace(dataset='day', model='all', resume=True, parquet=False, vote='all', threshold=0.5, no_table=True, workers=2), raising=False)
+    report_path = str(tmp_path / 'reports' / 'day-all-report.csv')
+    with ReportWriter(report_path, ['package name', *[f'{name} predict' for name in MODEL_NAMES], *[f'{name} probability' for name in MODEL_NAMES], 'ensemble']) as writer:
+        writer.write_row((package_names[0], 'benign', 'benign', 'benign', 'benign', 0, 0, 0, 0, 'benign'))
+
+    cli.predict_cli()
+    assert reads == [str(tmp_path / 'features' / 'day')]
+    rows = list(read_report(report_path))
+    assert [row[0] for row in rows] == package_names
+    assert rows[0][-1] == 'benign'
+    assert all(row[-1] == ('malicious' if set(row[1:5]) == {'malicious'} else 'benign') for row in rows[1:])
+    assert os.listdir(tmp_path / 'reports') == ['day-all-report.csv']
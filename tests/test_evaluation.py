@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('sklearn')
+from sklearn import metrics
+
+from training.src.evaluation import evaluate, threshold_sweep, bootstrap_ci, METRIC_NAMES
+
+
+def sklearn_metrics(y_true, y_pred, sample_weight=None) -> dict:
+    kwargs = {'sample_weight': sample_weight}
+    binary = dict(kwargs, pos_label='malicious', zero_division=0)
+    return {
+        'accu': metrics.accuracy_score(y_true, y_pred, **kwargs),
+        'prec': metrics.precision_score(y_true, y_pred, **binary),
+        'rec': metrics.recall_score(y_true, y_pred, **binary),
+        'f1': metrics.f1_score(y_true, y_pred, **binary),
+        'matt_cor': metrics.matthews_corrcoef(y_true, y_pred, **kwargs)
+    }
+
+def random_labels(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    y_true = np.where(rng.random(n) < 0.3, 'malicious', 'benign')
+    # 预测大多正确
+    y_score = np.clip((y_true == 'malicious') * 0.5 + rng.random(n) * 0.6, 0, 1).round(2)
+    return [y_true, y_score]
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_evaluate_matches_sklearn(weighted):
+    y_true, y_score = random_labels(500)
+    y_pred = np.where(y_score >= 0.5, 'malicious', 'benign')
+    sample_weight = np.random.default_rng(1).integers(1, 5, len(y_true)) if weighted else None
+    result = evaluate(y_true, y_pred, sample_weight)
+    expected = sklearn_metrics(y_true, y_pred, sample_weight)
+    for name in METRIC_NAMES:
+        assert result[name] == pytest.approx(expected[name])
+
+def test_degenerate_predictions_match_sklearn():
+    y_true = np.array(['malicious', 'benign', 'benign'])
+    y_pred = np.array(['benign', 'benign', 'benign'])
+    result = evaluate(y_true, y_pred)
+    expected = sklearn_metrics(y_true, y_pred)
+    assert [result[name] for name in METRIC_NAMES] == pytest.approx([expected[name] for name in METRIC_NAMES])
+
+def test_threshold_sweep_matches_sklearn_at_every_threshold():
+    y_true, y_score = random_labels(300)
+    sweep = threshold_sweep(y_true, y_score)
+    assert list(sweep['threshold']) == sorted(set(y_score), reverse=True)
+    for i, threshold in enumerate(sweep['threshold']):
+        expected = sklearn_metrics(y_true, np.where(y_score >= threshold, 'malicious', 'benign'))
+        for name in METRIC_NAMES:
+            assert sweep[name][i] == pytest.approx(expected[name])
+    fpr, tpr, _ = metrics.roc_curve(y_true, y_score, pos_label='malicious', drop_intermediate=False)
+    assert np.allclose(sweep['FP'] / (sweep['FP'][-1] + sweep['TN'][-1]), fpr[1:])
+    assert np.allclose(sweep['TP'] / (sweep['TP'][-1] + sweep['FN'][-1]), tpr[1:])
+
+def test_bootstrap_ci_matches_resampling_rows():
+    y_true, y_score = random_labels(400)
+    y_pred = np.where(y_score >= 0.5, 'malicious', 'benign')
+    result = bootstrap_ci(y_true, y_pred, n_resamples=2000, random_state=0)
+
+    # 逐行有放回重采样，evaluate与sklearn一致（见上），比每次调用sklearn快得多
+    rng = np.random.default_rng(1)
+    resampled = [evaluate(y_true[index], y_pred[index]) for index in rng.integers(0, len(y_true), (2000, len(y_true)))]
+    for name in METRIC_NAMES:
+        scores = [metrics_of_resample[name] for metrics_of_resample in resampled]
+        lower, upper = np.quantile(scores, [0.025, 0.975])
+        assert result[name][0] == pytest.approx(lower, abs=0.02)
+        assert result[name][1] == pytest.approx(upper, abs=0.02)
+        assert result[name][0] <= evaluate(y_true, y_pred)[name] <= result[name][1]
+
+def test_bootstrap_ci_is_reproducible():
+    y_true, y_score = random_labels(100)
+    y_pred = np.where(y_score >= 0.5, 'malicious', 'benign')
+    assert bootstrap_ci(y_true, y_pred, random_state=3) == bootstrap_ci(y_true, y_pred, random_state=3)
+
+def test_bootstrap_only_depends_on_the_confusion_matrix():
+    """重采样的是混淆矩阵的四个格子，行的顺序与数量级不影响计算"""
+    y_true, y_score = random_labels(200, seed=2)
+    y_pred = np.where(y_score >= 0.5, 'malicious', 'benign')
+    order = np.random.default_rng(4).permutation(len(y_true))
+    assert bootstrap_ci(y_true, y_pred, random_state=5) == bootstrap_ci(y_true[order], y_pred[order], random_state=5)
+
+def test_cli_test_writes_metrics_and_thresholds(model_paths, tmp_path, monkeypatch, capsys):
+    import argparse
+    import cli
+    from training.src.predict import predict_matrix
+    from tests.conftest import random_feature_matrix, write_feature_dir
+    monkeypatch.setattr(cli, 'FEATURES_PATH', str(tmp_path / 'features'))
+    monkeypatch.setattr(cli, 'REPORTS_PATH', str(tmp_path / 'reports'))
+    (tmp_path / 'reports').mkdir()
+    malicious = random_feature_matrix(30, seed=10) | (np.arange(22) < 3)
+    benign = random_feature_matrix(40, seed=11) & (np.arange(22) >= 3)
+    write_feature_dir(str(tmp_path / 'features' / 'mal'), malicious)
+    write_feature_dir(str(tmp_path / 'features' / 'ben'), benign)
+    monkeypatch.setattr(cli, 'args', argparse.Namespace(malicious='mal', benign='ben', model='RF', resume=False, parquet=False, bootstrap=200, thresholds=True), raising=False)
+    cli.test_cli()
+
+    y_true = np.array(['malicious'] * 30 + ['benign'] * 40)
+    y_pred, y_proba = predict_matrix('RF', np.concatenate([malicious, benign]))
+    expected = sklearn_metrics(y_true, y_pred)
+    with open(tmp_path / 'reports' / 'mal-ben-RF-report-2.csv') as f:
+        values = f.read().splitlines()[1].split(', ')
+    assert [float(value) for value in values[4:]] == pytest.approx([expected[name] for name in ['accu', 'prec', 'rec', 'f1']])
+    assert 'matt_cor' in capsys.readouterr().out
+    with open(tmp_path / 'reports' / 'mal-ben-RF-report-thresholds.csv') as f:
+        rows = f.read().splitlines()[1:]
+    assert [float(row.split(', ')[0]) for row in rows] == sorted(set(y_proba.tolist()), reverse=True)
@@ -0,0 +1,106 @@
+import io
+import os
+
+from extraction.src.cache import ExtractCache, package_hash
+from extraction.src.extractor import extract_dataset, print_extract_summary
+from extraction.src.position_store import PositionStore, close_position_stores
+from tests.conftest import make_package
+
+
+def count_extract_requests(log_path: str) -> int:
+    """日志中特征提取进程处理的请求数（不含list请求）"""
+    with open(log_path) as f:
+        return sum('Handling request' in line for line in f) - 1
+
+
+def test_package_hash_depends_on_content_only(tmp_path):
+    first_path = make_package(str(tmp_path / 'a'), 'x', 'same', files={'index.js': 'useEval\n', 'node_modules/dep/index.js': '1'})
+    second_path = make_package(str(tmp_path / 'b'), 'y', 'same', files={'index.js': 'useEval\n'})
+    assert package_hash(first_path) == package_hash(second_path)
+    with open(os.path.join(second_path, 'index.js'), 'a') as f:
+        f.write('useBuffer\n')
+    assert package_hash(first_path) != package_hash(second_path)
+
+def test_entries_are_keyed_by_extractor_version(tmp_path):
+    result = {'packageName': 'a@1.0.0', 'csvPath': '/features/a.csv', 'features': [['useEval', True]], 'positions': {}}
+    cache = ExtractCache(str(tmp_path), extractor_version='v1')
+    cache.put('hash', result)
+    assert cache.get('hash')['features'] == [['useEval', True]]
+    cache.close()
+    cache = ExtractCache(str(tmp_path), extractor_version='v2')
+    assert cache.get('hash') is None
+    cache.close()
+
+def test_truncated_entries_only_serve_fast_mode(tmp_path):
+    cache = ExtractCache(str(tmp_path), extractor_version='v1')
+    cache.put('hash', {'packageName': 'a@1.0.0', 'csvPath': 'a.csv', 'features': [], 'positions': {'truncated': True}})
+    assert cache.get('hash') is None
+    assert cache.get('hash', allow_truncated=True) is not None
+    cache.close()
+
+def test_second_extraction_is_served_from_the_cache(fake_extractor, tmp_path):
+    dataset_path = str(tmp_path / 'dataset')
+    for i in range(4):
+        make_package(dataset_path, f'pkg{i}', f'pkg{i}', files={'index.js': f'useBuffer // {i}\n'})
+    feature_path = str(tmp_path / 'features')
+    position_path = str(tmp_path / 'positions')
+    cache = ExtractCache(str(tmp_path / 'cache'), extractor_version='test')
+
+    summary = extract_dataset(dataset_path, feature_path, position_path, cache=cache)
+    assert (summary['cache_hits'], summary['cache_misses']) == (0, 4)
+    assert count_extract_requests(summary['log_path']) == 4
+    close_position_stores()
+    expected_positions = PositionStore(position_path).get('pkg0@1.0.0')
+    assert expected_positions['useBuffer'] != []
+
+    for dir_path in (feature_path, position_path):
+        for file_name in os.listdir(dir_path):
+            os.remove(os.path.join(dir_path, file_name))
+    summary = extract_dataset(dataset_path, feature_path, position_path, cache=cache)
+    assert (summary['cache_hits'], summary['cache_misses']) == (4, 0)
+    # 命中缓存的包不发送给特征提取进程，特征文件由缓存重新写入，特征位置重新追加到特征位置库
+    assert count_extract_requests(summary['log_path']) == 0
+    assert sorted(os.listdir(feature_path)) == [f'pkg{i}.csv' for i in range(4)]
+    with open(os.path.join(feature_path, 'pkg0.csv')) as f:
+        assert 'useBuffer,true\n' in f.read()
+    close_position_stores()
+    assert PositionStore(position_path).get('pkg0@1.0.0') == expected_positions
+
+    with open(os.path.join(dataset_path, 'pkg0', 'package', 'index.js'), 'a') as f:
+        f.write('useEval\n')
+    summary = extract_dataset(dataset_path, feature_path, position_path, cache=cache)
+    assert (summary['cache_hits'], summary['cache_misses']) == (3, 1)
+    assert count_extract_requests(summary['log_path']) == 1
+
+    summary = extract_dataset(dataset_path, feature_path, position_path, cache=cache, force=True)
+    assert (summary['cache_hits'], summary['cache_misses']) == (0, 4)
+    assert summary['succeeded'] == 4
+    cache.close()
+
+def test_overlapping_datasets_share_entries(fake_extractor, tmp_path):
+    cache = ExtractCache(str(tmp_path / 'cache'), extractor_version='test')
+    for name in ['a', 'b']:
+        make_package(str(tmp_path / 'day1'), name, name, files={'index.js': f'// {name}\n'})
+    for name in ['b', 'c']:
+        make_package(str(tmp_path / 'day2'), name, name, files={'index.js': f'// {name}\n'})
+    extract_dataset(str(tmp_path / 'day1'), str(tmp_path / 'features1'), str(tmp_path / 'positions1'), cache=cache)
+    summary = extract_dataset(str(tmp_path / 'day2'), str(tmp_path / 'features2'), str(tmp_path / 'positions2'), cache=cache)
+    assert (summary['cache_hits'], summary['cache_misses']) == (1, 1)
+    assert sorted(os.listdir(tmp_path / 'features2')) == ['b.csv', 'c.csv']
+
+    output = io.StringIO()
+    print_extract_summary(summary, file=output)
+    assert 'Extract cache: 1 hits, 1 misses, hit rate 50.00%' in output.getvalue()
+    cache.close()
+
+def test_package_key_replaces_the_content_hash(fake_extractor, tmp_path):
+    """task.py以压缩文件hash作为键，包文件夹内容变化也不影响命中"""
+    cache = ExtractCache(str(tmp_path / 'cache'), extractor_version='test')
+    package_path = make_package(str(tmp_path / 'dataset'), 'a', 'a')
+    extract_dataset(str(tmp_path / 'dataset'), str(tmp_path / 'features'), str(tmp_path / 'positions'), cache=cache, package_key=lambda path: 'tarball-sha256')
+    with open(os.path.join(package_path, 'index.js'), 'w') as f:
+        f.write('useEval\n')
+    summary = extract_dataset(str(tmp_path / 'dataset'), str(tmp_path / 'features'), str(tmp_path / 'positions'), cache=cache, package_key=lambda path: 'tarball-sha256')
+    assert summary['cache_hits'] == 1
+    assert cache.get(package_hash(package_path)) is None
+    cache.close()
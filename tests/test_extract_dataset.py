@@ -0,0 +1,49 @@
+import os
+
+from extraction.src.extractor import extract_dataset
+from extraction.src.position_store import PositionStore, close_position_stores
+from training.src.read_feature import read_csv_feature_matrix
+from tests.conftest import make_package
+
+
+def test_packages_are_shared_by_several_workers(fake_extractor, tmp_path):
+    dataset_path = str(tmp_path / 'dataset')
+    for i in range(9):
+        make_package(dataset_path, f'pkg{i}', f'pkg{i}', files={'index.js': 'useEval(x)\n' if i % 3 == 0 else 'module.exports = 1\n'})
+    feature_path = str(tmp_path / 'features')
+
+    summary = extract_dataset(dataset_path, feature_path, str(tmp_path / 'positions'), jobs=3)
+    assert summary['succeeded'] == 9
+    assert summary['failed'] == 0
+    feature_matrix, package_names = read_csv_feature_matrix(feature_path)
+    assert package_names == sorted(f'pkg{i}' for i in range(9))
+    use_eval = feature_matrix[:, 10]
+    assert use_eval.tolist() == [int(name[3:]) % 3 == 0 for name in package_names]
+    close_position_stores()
+    assert sorted(PositionStore(str(tmp_path / 'positions')).package_names()) == [f'pkg{i}@1.0.0' for i in range(9)]
+
+    # 每个进程只启动一次：一次list请求与9次extract请求的日志都带有进程编号
+    with open(summary['log_path']) as f:
+        log_lines = [line for line in f if 'Handling request' in line]
+    assert len(log_lines) == 10
+    assert {line.split(']')[0] + ']' for line in log_lines} <= {'[worker 0]', '[worker 1]', '[worker 2]'}
+
+def test_crashed_worker_is_replaced(fake_extractor, tmp_path):
+    dataset_path = str(tmp_path / 'dataset')
+    for name in ['a', 'b-crash', 'c', 'd']:
+        make_package(dataset_path, name, name)
+    summary = extract_dataset(dataset_path, str(tmp_path / 'features'), str(tmp_path / 'positions'), jobs=1)
+    assert summary['succeeded'] == 3
+    assert summary['failed_packages'] == [os.path.join(dataset_path, 'b-crash', 'package')]
+    assert sorted(os.listdir(tmp_path / 'features')) == ['a.csv', 'c.csv', 'd.csv']
+
+def test_failed_package_does_not_stop_the_others(fake_extractor, tmp_path):
+    dataset_path = str(tmp_path / 'dataset')
+    make_package(dataset_path, 'good', 'good')
+    broken_path = make_package(dataset_path, 'broken', 'broken')
+    with open(os.path.join(broken_path, 'package.json'), 'w') as f:
+        f.write('{not json')
+
+    summary = extract_dataset(dataset_path, str(tmp_path / 'features'), str(tmp_path / 'positions'), jobs=2)
+    assert summary['succeeded'] == 1
+    assert summary['failed_packages'] == [broken_path]
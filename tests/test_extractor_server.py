@@ -0,0 +1,49 @@
+"""使用真实的特征提取程序测试--serve协议，替身特征提取程序（fake_extractor.js）必须与之一致"""
+import os
+import json
+
+import pytest
+
+from extraction.src.worker import ExtractorWorker, ExtractorError
+from training.src.read_feature import read_feature_names
+from tests.conftest import FEATURE_COUNT, make_package
+
+
+def test_real_extractor_answers_requests(real_extractor, tmp_path):
+    dataset_path = str(tmp_path / 'dataset')
+    eval_path = make_package(dataset_path, 'eval', 'eval-pkg', files={'index.js': "eval('1')\n"})
+    plain_path = make_package(dataset_path, 'plain', 'plain-pkg')
+    feature_path = str(tmp_path / 'features')
+    position_path = str(tmp_path / 'positions')
+    with ExtractorWorker() as worker:
+        assert sorted(worker.list_packages(dataset_path)) == [eval_path, plain_path]
+        result = worker.analyze(eval_path, feature_path, position_path)
+        assert result['packageName'] == 'eval-pkg@1.0.0'
+        assert len(result['features']) == FEATURE_COUNT
+        assert dict(result['features'])['useEval'] is True
+        assert len(result['positions']['useEval']) == 1
+        assert result['truncated'] is False
+        # 特征文件与特征向量的特征名、顺序一致
+        assert read_feature_names(result['csvPath']) == [name for name, _ in result['features']]
+        with open(os.path.join(position_path, 'eval-pkg@1.0.0.json')) as f:
+            assert len(json.load(f)['useEval']) == 1
+        assert dict(worker.analyze(plain_path)['features'])['useEval'] is False
+
+def test_real_extractor_replies_with_errors(real_extractor, tmp_path):
+    package_path = make_package(str(tmp_path), 'ok', 'ok-pkg')
+    with ExtractorWorker() as worker:
+        with pytest.raises(ExtractorError):
+            worker.analyze(str(tmp_path / 'missing'))
+        assert worker.process.poll() is None
+        assert worker.analyze(package_path)['packageName'] == 'ok-pkg@1.0.0'
+
+def test_real_extractor_without_positions(real_extractor, tmp_path):
+    package_path = make_package(str(tmp_path), 'eval', 'eval-pkg', files={'index.js': "eval('1')\n"})
+    position_path = str(tmp_path / 'positions')
+    with ExtractorWorker() as worker:
+        full = worker.analyze(package_path)
+        result = worker.analyze(package_path, feature_position_path=position_path, positions=False)
+    assert result['features'] == full['features']
+    assert result['positions']['useEval'] == []
+    assert result['positions']['truncated'] is True
+    assert not os.path.exists(position_path)
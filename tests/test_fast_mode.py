@@ -0,0 +1,50 @@
+import os
+
+from extraction.src.cache import ExtractCache
+from extraction.src.extractor import extract_dataset
+from extraction.src.position_store import PositionStore, close_position_stores
+from training.src.read_feature import read_csv_feature_matrix
+from tests.conftest import make_package
+
+
+# 第一个文件已包含所有特征，之后的文件不会改变特征向量
+SATURATED_FILES = {
+    'a.js': '\n'.join(['hasInstallScript', 'containIP', 'useBase64Conversion', 'useBase64ConversionInInstallScript', 'containBase64StringInJSFile', 'containBase64StringInInstallScript', 'containBytestring', 'containDomainInJSFile', 'containDomainInInstallScript', 'useBuffer', 'useEval', 'requireChildProcessInJSFile', 'requireChildProcessInInstallScript', 'accessFSInJSFile', 'accessFSInInstallScript', 'accessNetworkInJSFile', 'accessNetworkInInstallScript', 'accessProcessEnvInJSFile', 'accessProcessEnvInInstallScript', 'containSuspicousString', 'accessCryptoAndZip', 'accessSensitiveAPI']),
+    'b.js': 'useEval\n'
+}
+
+
+def extract(tmp_path, name: str, fast: bool, cache: ExtractCache = None) -> list:
+    """:return: [提取结果摘要, 特征矩阵, 特征位置库]"""
+    feature_path = str(tmp_path / f'features-{name}')
+    position_path = str(tmp_path / f'positions-{name}')
+    summary = extract_dataset(str(tmp_path / 'dataset'), feature_path, position_path, cache=cache, fast=fast)
+    close_position_stores()
+    feature_matrix, _ = read_csv_feature_matrix(feature_path)
+    return [summary, feature_matrix, PositionStore(position_path)]
+
+def test_fast_mode_keeps_the_feature_vector(fake_extractor, tmp_path):
+    make_package(str(tmp_path / 'dataset'), 'saturated', 'saturated', files=SATURATED_FILES)
+    make_package(str(tmp_path / 'dataset'), 'plain', 'plain', files={'a.js': 'useEval\n', 'b.js': 'useBuffer\n'})
+    full_summary, full_matrix, full_positions = extract(tmp_path, 'full', fast=False)
+    fast_summary, fast_matrix, fast_positions = extract(tmp_path, 'fast', fast=True)
+
+    assert (full_matrix == fast_matrix).all()
+    assert (full_summary['truncated'], fast_summary['truncated']) == (0, 1)
+    assert fast_positions.get('saturated@1.0.0')['truncated'] is True
+    assert 'truncated' not in full_positions.get('saturated@1.0.0')
+    assert len(full_positions.get('saturated@1.0.0')['useEval']) == 2
+    # 没有饱和的包分析所有文件
+    assert fast_positions.get('plain@1.0.0') == full_positions.get('plain@1.0.0')
+
+def test_truncated_results_are_cached_for_fast_mode_only(fake_extractor, tmp_path):
+    make_package(str(tmp_path / 'dataset'), 'saturated', 'saturated', files=SATURATED_FILES)
+    cache = ExtractCache(str(tmp_path / 'cache'), extractor_version='test')
+    extract(tmp_path, 'fast', fast=True, cache=cache)
+    summary, _, _ = extract(tmp_path, 'fast-again', fast=True, cache=cache)
+    assert summary['cache_hits'] == 1
+    # 需要完整特征位置时重新分析
+    summary, _, positions = extract(tmp_path, 'full', fast=False, cache=cache)
+    assert summary['cache_hits'] == 0
+    assert 'truncated' not in positions.get('saturated@1.0.0')
+    cache.close()
@@ -0,0 +1,102 @@
+import os
+import json
+import argparse
+
+import numpy as np
+import pytest
+
+from training.src.feature_store import FeatureStore, is_feature_store, write_feature_store, STORE_MATRIX_FILE, STORE_NAMES_FILE, STORE_HEADER_FILE
+from training.src.read_feature import pack_feature_dir, read_feature_matrix, read_csv_feature_matrix, read_features
+from tests.conftest import random_feature_matrix, write_feature_dir
+
+
+def test_pack_round_trip(tmp_path):
+    feature_dir = str(tmp_path / 'features')
+    feature_matrix = random_feature_matrix(30, seed=1)
+    package_names = write_feature_dir(feature_dir, feature_matrix)
+    expected_matrix, expected_names = read_csv_feature_matrix(feature_dir)
+
+    assert pack_feature_dir(feature_dir, remove_csv=True) == 30
+    assert is_feature_store(feature_dir)
+    assert not any(name.endswith('.csv') for name in os.listdir(feature_dir))
+
+    packed_matrix, packed_names = read_feature_matrix(feature_dir)
+    assert packed_names == expected_names == package_names
+    assert packed_matrix.dtype == bool
+    assert (packed_matrix == expected_matrix).all()
+
+    store = FeatureStore(feature_dir)
+    assert len(store) == 30
+    assert store.feature_names == [f'feature{i}' for i in range(22)]
+    assert (store.get(package_names[7]) == feature_matrix[7]).all()
+    assert (store.matrix([3, 5]) == feature_matrix[[3, 5]]).all()
+
+def test_training_reads_packed_dataset_with_labels(tmp_path):
+    feature_matrix = random_feature_matrix(5, seed=2)
+    write_feature_store(str(tmp_path / 'malicious'), feature_matrix, [f'm{i}' for i in range(5)], [f'feature{i}' for i in range(22)])
+    X, labels, csv_names = read_features(str(tmp_path / 'malicious'), None)
+    assert (X == feature_matrix).all()
+    assert labels == ['malicious'] * 5
+    assert csv_names == [f'm{i}.csv' for i in range(5)]
+
+def test_truncated_store_is_rejected(tmp_path):
+    store_dir = str(tmp_path / 'store')
+    write_feature_store(store_dir, random_feature_matrix(4), ['a', 'b', 'c', 'd'], [f'feature{i}' for i in range(22)])
+    write_feature_store(str(tmp_path / 'other'), random_feature_matrix(3), ['a', 'b', 'c'], [f'feature{i}' for i in range(22)])
+    os.replace(str(tmp_path / 'other' / 'features.npy'), os.path.join(store_dir, 'features.npy'))
+    with pytest.raises(ValueError):
+        FeatureStore(store_dir)
+
+def test_empty_store(tmp_path):
+    write_feature_store(str(tmp_path), np.zeros((0, 22), dtype=bool), [], [f'feature{i}' for i in range(22)])
+    feature_matrix, package_names = read_feature_matrix(str(tmp_path))
+    assert feature_matrix.shape == (0, 22)
+    assert package_names == []
+
+def test_store_is_bit_packed_and_memory_mapped(tmp_path):
+    """每行22个特征占3个字节，特征名只在header中保存一次，读取时只打开一次矩阵文件"""
+    feature_dir = str(tmp_path / 'features')
+    package_names = write_feature_dir(feature_dir, random_feature_matrix(1000, seed=3))
+    pack_feature_dir(feature_dir, remove_csv=True)
+    assert sorted(os.listdir(feature_dir)) == ['features.npy', 'header.json', 'names.txt']
+    store = FeatureStore(feature_dir)
+    assert isinstance(store.packed, np.memmap)
+    assert store.packed.shape == (1000, 3)
+    assert store.packed.dtype == np.uint8
+    with open(os.path.join(feature_dir, 'header.json')) as f:
+        assert f.read().count('feature0') == 1
+    with open(os.path.join(feature_dir, 'names.txt')) as f:
+        assert f.read().splitlines() == package_names
+
+def test_reading_a_store_does_not_open_one_file_per_package(tmp_path, monkeypatch):
+    feature_dir = str(tmp_path / 'features')
+    write_feature_dir(feature_dir, random_feature_matrix(200, seed=4))
+    pack_feature_dir(feature_dir, remove_csv=True)
+    opened = []
+    original_open = open
+    monkeypatch.setattr('builtins.open', lambda file, *args, **kwargs: opened.append(os.path.basename(str(file))) or original_open(file, *args, **kwargs))
+    X, labels, csv_names = read_features(feature_dir, None)
+    assert np.asarray(X).shape == (200, 22)
+    assert len(csv_names) == 200
+    assert all(name in ('header.json', 'names.txt', 'features.npy') for name in opened)
+
+def test_cli_pack_writes_into_the_dataset_folders(tmp_path, monkeypatch):
+    """cli.py pack只写入数据集的特征文件夹与特征位置文件夹，测试中两者都位于临时文件夹"""
+    import cli
+    from extraction.src.position_store import PositionStore
+    monkeypatch.setattr(cli, 'FEATURES_PATH', str(tmp_path / 'features'))
+    monkeypatch.setattr(cli, 'FEATURE_POSITIONS_PATH', str(tmp_path / 'feature-positions'))
+    feature_matrix = random_feature_matrix(6, seed=6)
+    package_names = write_feature_dir(str(tmp_path / 'features' / 'mal-pack'), feature_matrix)
+    position_dir = tmp_path / 'feature-positions' / 'mal-pack'
+    position_dir.mkdir(parents=True)
+    (position_dir / f'{package_names[0]}.json').write_text(json.dumps({'useEval': [{'filePath': '/p/index.js', 'content': 'eval'}]}))
+    monkeypatch.setattr(cli, 'args', argparse.Namespace(dataset='mal-pack', remove_csv=True), raising=False)
+
+    cli.pack_cli()
+    assert sorted(os.listdir(tmp_path)) == ['feature-positions', 'features']
+    assert sorted(os.listdir(tmp_path / 'features' / 'mal-pack')) == sorted([STORE_MATRIX_FILE, STORE_NAMES_FILE, STORE_HEADER_FILE])
+    packed_matrix, packed_names = read_feature_matrix(str(tmp_path / 'features' / 'mal-pack'))
+    assert packed_names == package_names
+    assert (packed_matrix == feature_matrix).all()
+    assert PositionStore(str(position_dir)).get(package_names[0])['useEval'] == [{'filePath': '/p/index.js', 'content': 'eval'}]
@@ -0,0 +1,34 @@
+import sys
+import subprocess
+
+import pytest
+
+from check_import_time import COMMANDS, FORBIDDEN_MODULES, ROOT_PATH, measure_import_time
+
+
+@pytest.mark.parametrize('command', COMMANDS, ids=' '.join)
+def test_commands_do_not_import_heavy_modules(command):
+    _, _, modules, _ = measure_import_time(command)
+    assert [module for module in FORBIDDEN_MODULES if module in modules] == []
+
+def test_training_exports_are_lazy():
+    code = 'import sys, training; assert "sklearn" not in sys.modules; assert callable(training.predict_matrix)'
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT_PATH, check=True)
+
+def test_dataset_names_are_read_when_used(tmp_path):
+    from conf.settings import DatasetNames
+    names = DatasetNames(str(tmp_path / 'malicious'), str(tmp_path / 'benign'))
+    # 文件夹不存在时为空，不会在导入时出错
+    assert len(names) == 0
+    assert 'a' not in names
+    (tmp_path / 'benign' / 'b').mkdir(parents=True)
+    (tmp_path / 'malicious' / 'a').mkdir(parents=True)
+    assert sorted(names) == ['a', 'b']
+    assert 'a' in names
+    assert '..' not in names
+    assert 'a/../b' not in names
+
+def test_argparse_still_validates_dataset_names():
+    result = subprocess.run([sys.executable, 'cli.py', 'predict', '-o', 'RF', '-d', 'no-such-dataset'], cwd=ROOT_PATH, capture_output=True, text=True)
+    assert result.returncode == 2
+    assert "invalid choice: 'no-such-dataset'" in result.stderr
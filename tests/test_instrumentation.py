@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import pstats
+import subprocess
+
+import pytest
+
+from instrumentation import StageMetrics, profile
+from extraction.src.timing import ExtractTimings
+from extraction.src.extractor import extract_dataset
+from tests.conftest import make_package, random_feature_matrix, write_feature_dir
+
+
+def test_stages_are_recorded(tmp_path):
+    metrics = StageMetrics()
+    with metrics.stage('busy'):
+        sum(i * i for i in range(300000))
+    with pytest.raises(RuntimeError):
+        with metrics.stage('failing'):
+            raise RuntimeError
+    with metrics.stage('child'):
+        subprocess.run([sys.executable, '-c', 'sum(i * i for i in range(3000000))'], check=True)
+    metrics.add('dataset', 'test')
+
+    busy, failing, child = metrics.stages
+    assert [busy['stage'], failing['stage'], child['stage']] == ['busy', 'failing', 'child']
+    assert busy['cpu_seconds'] > 0 and busy['wall_seconds'] > 0 and busy['peak_rss_mib'] > 0
+    assert child['children_cpu_seconds'] > 0
+
+    metrics_path = str(tmp_path / 'metrics' / 'run.json')
+    metrics.write(metrics_path)
+    with open(metrics_path) as f:
+        written = json.load(f)
+    assert written['dataset'] == 'test'
+    assert [stage['stage'] for stage in written['stages']] == ['busy', 'failing', 'child']
+
+def test_profile_is_saved(tmp_path):
+    profile_path = str(tmp_path / 'run.prof')
+    with profile(profile_path):
+        sorted(range(1000), key=lambda i: -i)
+    assert pstats.Stats(profile_path).total_calls > 0
+    with profile(None):
+        pass
+
+def test_only_the_slowest_are_kept():
+    timings = ExtractTimings(slowest_number=3)
+    for i in range(10):
+        timings.add_package(f'pkg{i}', i, {'packageJSONMs': 1, 'installScriptMs': 0, 'files': [{'filePath': f'pkg{i}/index.js', 'size': 1, 'parseMs': i, 'traverseMs': 1, 'regExpMs': 0}]})
+    result = timings.to_dict()
+    assert result['packages'] == 10 and result['files'] == 10
+    assert result['totals']['analyze_seconds'] == sum(range(10))
+    assert result['totals']['parse_ms'] == sum(range(10))
+    assert [item['package'] for item in result['slowest_packages']] == ['pkg9', 'pkg8', 'pkg7']
+    assert [item['filePath'] for item in result['slowest_files']] == ['pkg9/index.js', 'pkg8/index.js', 'pkg7/index.js']
+
+def test_extractor_timings_are_collected(fake_extractor, tmp_path):
+    dataset_path = str(tmp_path / 'dataset')
+    for i in range(3):
+        make_package(dataset_path, f'pkg{i}', f'pkg{i}', files={'index.js': '1', 'lib/a.js': '2'})
+    timings = ExtractTimings()
+    extract_dataset(dataset_path, str(tmp_path / 'features'), str(tmp_path / 'positions'), timings=timings)
+    result = timings.to_dict()
+    assert result['packages'] == 3 and result['files'] == 6
+    assert result['totals']['parse_ms'] == 6
+    assert len(result['slowest_files']) == 6
+
+def test_predict_stages_are_recorded(model_paths, tmp_path, monkeypatch):
+    """task.py的预测按阶段记录，并单独累计预测时间；报告写入临时文件夹"""
+    import task
+    monkeypatch.setattr(task, 'FEATURES_PATH', str(tmp_path / 'features'))
+    monkeypatch.setattr(task, 'REPORTS_PATH', str(tmp_path / 'reports'))
+    write_feature_dir(str(tmp_path / 'features' / 'day'), random_feature_matrix(10, seed=17))
+    (tmp_path / 'reports').mkdir()
+    metrics = StageMetrics()
+    task.predict_cli('day', metrics=metrics)
+    result = metrics.to_dict()
+    assert [stage['stage'] for stage in result['stages']] == ['load-model', 'load-features', 'predict-and-report']
+    assert result['packages'] == 10
+    assert 0 < result['predict_seconds'] <= result['stages'][2]['wall_seconds']
+    assert os.listdir(tmp_path / 'reports') == ['day-report.csv']
@@ -0,0 +1,67 @@
+import io
+import os
+
+from extraction.src.cache import ExtractCache
+from extraction.src.extractor import extract_dataset, print_extract_summary
+from extraction.src.pipeline import extract_tarballs
+from tests.conftest import make_package, make_tarball
+
+
+VENDORED_FILE = 'module.exports = function lodash() {}\n' * 100
+
+
+def make_vendoring_dataset(dataset_path: str, count: int):
+    """每个包都带有相同的vendor/lodash.js与各自不同的index.js"""
+    for i in range(count):
+        make_package(dataset_path, f'pkg{i}', f'pkg{i}', files={'index.js': f'useBuffer // {dataset_path} {i}\n', 'vendor/lodash.js': VENDORED_FILE})
+
+def test_identical_files_are_analyzed_once(fake_extractor, tmp_path):
+    dataset_path = str(tmp_path / 'dataset')
+    make_vendoring_dataset(dataset_path, 4)
+    cache = ExtractCache(str(tmp_path / 'cache'), extractor_version='test')
+    summary = extract_dataset(dataset_path, str(tmp_path / 'features'), str(tmp_path / 'positions'), cache=cache)
+    cache.close()
+    # 4个index.js与第一个lodash.js未命中，其余3个lodash.js命中
+    assert (summary['file_cache_hits'], summary['file_cache_misses']) == (3, 5)
+    assert summary['file_cache_bytes_skipped'] == 3 * len(VENDORED_FILE)
+    assert len(os.listdir(os.path.join(tmp_path, 'cache', 'js-files'))) == 1
+
+    output = io.StringIO()
+    print_extract_summary(summary, file=output)
+    assert 'JS file cache: 3 hits, 5 misses' in output.getvalue()
+
+def test_file_cache_is_shared_across_runs_and_refreshed_by_force(fake_extractor, tmp_path):
+    dataset_path = str(tmp_path / 'dataset')
+    make_vendoring_dataset(dataset_path, 2)
+    cache = ExtractCache(str(tmp_path / 'cache'), extractor_version='test')
+    extract_dataset(dataset_path, str(tmp_path / 'features'), str(tmp_path / 'positions'), cache=cache)
+    make_vendoring_dataset(str(tmp_path / 'other'), 3)
+    summary = extract_dataset(str(tmp_path / 'other'), str(tmp_path / 'other-features'), str(tmp_path / 'other-positions'), cache=cache)
+    # 包内容都不同，但lodash.js与上一次运行相同
+    assert summary['cache_hits'] == 0
+    assert summary['file_cache_hits'] == 3
+    summary = extract_dataset(str(tmp_path / 'other'), str(tmp_path / 'other-features'), str(tmp_path / 'other-positions'), cache=cache, force=True)
+    assert summary['file_cache_hits'] == 0
+    cache.close()
+
+def test_file_cache_is_keyed_by_extractor_version(fake_extractor, tmp_path):
+    dataset_path = str(tmp_path / 'dataset')
+    make_vendoring_dataset(dataset_path, 2)
+    for version in ['v1', 'v2']:
+        cache = ExtractCache(str(tmp_path / 'cache'), extractor_version=version)
+        summary = extract_dataset(dataset_path, str(tmp_path / 'features'), str(tmp_path / 'positions'), cache=cache)
+        cache.close()
+        assert summary['file_cache_hits'] == 1
+
+def test_tarball_pipeline_shares_the_file_cache(fake_extractor, tmp_path):
+    """流水线的特征提取进程同样使用JS文件缓存，不使用特征缓存时不传入--file-cache"""
+    tarball_dir = str(tmp_path / 'tarballs')
+    os.makedirs(tarball_dir)
+    tarball_paths = [make_tarball(tarball_dir, f'pkg{i}', files={'index.js': f'useBuffer // {i}\n', 'vendor/lodash.js': VENDORED_FILE}) for i in range(3)]
+    cache = ExtractCache(str(tmp_path / 'cache'), extractor_version='test')
+    summary = extract_tarballs(tarball_paths, str(tmp_path / 'features'), str(tmp_path / 'positions'), str(tmp_path / 'scratch'), cache=cache)
+    cache.close()
+    assert (summary['file_cache_hits'], summary['file_cache_misses']) == (2, 4)
+
+    summary = extract_tarballs(tarball_paths, str(tmp_path / 'other-features'), str(tmp_path / 'positions'), str(tmp_path / 'scratch'))
+    assert (summary['file_cache_hits'], summary['file_cache_misses']) == (0, 0)
@@ -0,0 +1,50 @@
+import os
+
+from extraction.src.cache import ExtractCache
+from extraction.src.pipeline import extract_tarballs, extract_positions
+from extraction.src.position_store import PositionStore, close_position_stores
+from tests.conftest import make_tarball
+
+
+def test_second_pass_records_positions_of_flagged_packages_only(fake_extractor, tmp_path):
+    tarball_dir = str(tmp_path / 'tarballs')
+    os.makedirs(tarball_dir)
+    tarball_paths = [make_tarball(tarball_dir, f'pkg{i}', files={'index.js': 'useEval\n' if i < 2 else 'useBuffer\n', 'lib/util.js': f'// {i}\n'}) for i in range(6)]
+    feature_path = str(tmp_path / 'features')
+    position_path = str(tmp_path / 'positions')
+    cache = ExtractCache(str(tmp_path / 'cache'), extractor_version='test')
+    tarball_of = {}
+
+    def on_tarball_done(tarball_path, results):
+        for _, result in results:
+            tarball_of[result['featureFileName'][:-4]] = tarball_path
+    summary = extract_tarballs(tarball_paths, feature_path, None, str(tmp_path / 'scratch'), cache=cache, on_tarball_done=on_tarball_done)
+    assert summary['succeeded'] == 6
+    # 第一遍不写特征位置
+    assert not os.path.exists(position_path)
+    assert len(os.listdir(feature_path)) == 6
+
+    flagged = [tarball_of['pkg0'], tarball_of['pkg1']]
+    summary = extract_positions(flagged, feature_path, position_path, str(tmp_path / 'scratch'), cache=cache)
+    close_position_stores()
+    cache.close()
+    assert summary['succeeded'] == 2
+    # 第一遍的结果没有特征位置，不能使用，但JS文件都已分析过
+    assert summary['cache_hits'] == 0
+    assert (summary['file_cache_hits'], summary['file_cache_misses']) == (4, 0)
+    store = PositionStore(position_path)
+    assert store.package_names() == ['pkg0@1.0.0', 'pkg1@1.0.0']
+    assert [record['filePath'].endswith('index.js') for record in store.get('pkg0@1.0.0')['useEval']] == [True]
+    assert 'truncated' not in store.get('pkg0@1.0.0')
+
+def test_positions_are_reused_by_a_later_full_pass(fake_extractor, tmp_path):
+    tarball_dir = str(tmp_path / 'tarballs')
+    os.makedirs(tarball_dir)
+    tarball_path = make_tarball(tarball_dir, 'evil', files={'index.js': 'useEval\n'})
+    cache = ExtractCache(str(tmp_path / 'cache'), extractor_version='test')
+    extract_positions([tarball_path], str(tmp_path / 'features'), str(tmp_path / 'positions'), str(tmp_path / 'scratch'), cache=cache)
+    # 有完整特征位置的结果也可以用于只计算特征向量的提取
+    summary = extract_tarballs([tarball_path], str(tmp_path / 'features'), None, str(tmp_path / 'scratch'), cache=cache)
+    close_position_stores()
+    cache.close()
+    assert summary['cache_hits'] == 1
@@ -0,0 +1,52 @@
+import os
+import json
+import time
+
+from extraction.src.extractor import extract_dataset
+from extraction.src.limits import ExtractLimits
+from extraction.src.worker import get_heap_limit
+from tests.conftest import make_package
+
+
+def extract_with_limits(tmp_path, names: list, timeout: float = None, memory_limit: int = None) -> list:
+    """:return: [提取结果摘要, 隔离名单中的各项]"""
+    dataset_path = str(tmp_path / 'dataset')
+    for name in names:
+        make_package(dataset_path, name, name)
+    quarantine_path = str(tmp_path / 'quarantine.ndjson')
+    limits = ExtractLimits(timeout=timeout, memory_limit=memory_limit, retries=1, quarantine_path=quarantine_path)
+    summary = extract_dataset(dataset_path, str(tmp_path / 'features'), None, jobs=2, limits=limits)
+    quarantined = []
+    if os.path.exists(quarantine_path):
+        with open(quarantine_path) as f:
+            quarantined = [json.loads(line) for line in f]
+    return [summary, quarantined]
+
+def test_stalled_package_is_quarantined_with_its_stage(fake_extractor, tmp_path):
+    start = time.monotonic()
+    summary, quarantined = extract_with_limits(tmp_path, ['a', 'hang', 'b', 'c'], timeout=0.5)
+    # 卡住的包分析两次，每次最多0.5秒
+    assert time.monotonic() - start < 10
+    assert summary['succeeded'] == 3
+    assert summary['aborted'] == 2
+    [entry] = quarantined
+    assert entry['package'].endswith('hang/package')
+    assert (entry['reason'], entry['stage'], entry['attempts']) == ('timeout', 'js-file', 2)
+    assert entry['filePath'].endswith('index.js')
+    assert summary['quarantined'] == quarantined
+
+def test_crash_and_heap_exhaustion_are_told_apart(fake_extractor, tmp_path):
+    summary, quarantined = extract_with_limits(tmp_path, ['crash', 'heap', 'ok'], timeout=30, memory_limit=1024)
+    assert summary['succeeded'] == 1
+    reasons = {entry['package'].split('/')[-2]: entry['reason'] for entry in quarantined}
+    assert reasons == {'crash': 'exit', 'heap': 'memory'}
+
+def test_flaky_package_succeeds_in_a_fresh_process(fake_extractor, tmp_path):
+    summary, quarantined = extract_with_limits(tmp_path, ['flaky', 'ok'], timeout=30)
+    assert summary['succeeded'] == 2
+    assert summary['aborted'] == 1
+    assert quarantined == []
+
+def test_heap_limit_is_below_the_memory_limit():
+    assert get_heap_limit(2048) == 2048 - 256
+    assert get_heap_limit(256) == 192
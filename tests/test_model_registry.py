@@ -0,0 +1,81 @@
+import os
+import pickle
+
+import pytest
+
+from training.src.model_registry import ModelRegistry, get_model_registry
+from tests.conftest import save_model, train_model, write_feature_csv
+
+
+@pytest.fixture
+def registry(tmp_path):
+    pytest.importorskip('sklearn')
+    classifier_path, scaler_path = save_model(str(tmp_path), 'RF')
+    return ModelRegistry({'RF': (classifier_path, scaler_path)}, check_interval=0, max_idle_time=None)
+
+
+def test_model_is_loaded_once(registry):
+    model = registry.get('RF')
+    assert registry.get('RF') is model
+    assert registry.load_count['RF'] == 1
+    assert model.hits == 1
+
+def test_predict_functions_share_one_load_per_model(model_paths, tmp_path, monkeypatch):
+    """predict_package_*对每个特征文件调用一次，每个模型只反序列化一次"""
+    from training.src import predict
+    load_count = dict(get_model_registry().load_count)
+    loads = []
+    original_load = pickle.load
+    monkeypatch.setattr(pickle, 'load', lambda f: loads.append(os.path.basename(f.name)) or original_load(f))
+    csv_paths = []
+    for i in range(20):
+        csv_path = str(tmp_path / f'pkg{i}.csv')
+        write_feature_csv(csv_path, [j % (i + 2) == 0 for j in range(22)])
+        csv_paths.append(csv_path)
+    for csv_path in csv_paths:
+        for predict_function in (predict.predict_package_MLP, predict.predict_package_NB, predict.predict_package_SVM, predict.predict_package_RF):
+            assert predict_function(csv_path) in ('malicious', 'benign')
+    assert sorted(loads) == sorted(os.path.basename(path) for model_path in model_paths.values() for path in model_path)
+    assert {name: count - load_count.get(name, 0) for name, count in get_model_registry().load_count.items()} == {'MLP': 1, 'NB': 1, 'SVM': 1, 'RF': 1}
+
+def test_load_time_and_resident_size_are_reported(registry):
+    model = registry.get('RF')
+    registry.get('RF')
+    [stat] = registry.stats()
+    assert stat['model'] == 'RF'
+    assert stat['loads'] == 1
+    assert stat['hits'] == 1
+    assert stat['load_time'] == model.load_time > 0
+    # 随机森林的每棵树都持有numpy数组，估算的常驻大小不会小于各数组之和
+    tree_bytes = sum(tree.tree_.value.nbytes for tree in model.classifier.estimators_)
+    assert stat['size'] == model.size >= tree_bytes
+    assert 'RF: loaded 1 time(s)' in registry.report()
+    assert 'MiB resident' in registry.report()
+
+def test_model_is_reloaded_when_file_content_changes(registry):
+    model = registry.get('RF')
+    classifier, _ = train_model('RF', seed=1)
+    with open(model.classifier_path, 'wb') as f:
+        pickle.dump(classifier, f)
+    reloaded = registry.get('RF')
+    assert reloaded is not model
+    assert registry.load_count['RF'] == 2
+
+def test_touched_file_with_same_content_is_not_reloaded(registry):
+    model = registry.get('RF')
+    stat = os.stat(model.classifier_path)
+    os.utime(model.classifier_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert registry.get('RF') is model
+    assert registry.load_count['RF'] == 1
+
+def test_idle_model_is_evicted(registry):
+    registry.max_idle_time = 60
+    model = registry.get('RF')
+    model.last_used -= 120
+    registry.evict_idle()
+    assert registry.models == {}
+    assert registry.get('RF') is not model
+
+def test_unknown_model_is_rejected(registry):
+    with pytest.raises(ValueError):
+        registry.get('XGB')
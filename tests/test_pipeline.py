@@ -0,0 +1,168 @@
+import io
+import os
+import tarfile
+import threading
+
+from extraction.src import pipeline
+from extraction.src.cache import ExtractCache
+from extraction.src.pipeline import TarballPipeline, extract_tarballs, decompress_tarball
+from tests.conftest import make_tarball
+
+
+def run_with_timeout(target, timeout: float = 60):
+    """在线程中运行，超时说明流水线卡住"""
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(value=target()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'pipeline did not finish'
+    return result['value']
+
+def test_tarballs_are_analyzed_and_removed(fake_extractor, tmp_path):
+    tarball_dir = str(tmp_path / 'tarballs')
+    os.makedirs(tarball_dir)
+    tarball_paths = [make_tarball(tarball_dir, f'pkg{i}', files={'index.js': 'useEval\n'}) for i in range(6)]
+    scratch_path = str(tmp_path / 'scratch')
+
+    summary = extract_tarballs(tarball_paths, str(tmp_path / 'features'), str(tmp_path / 'positions'), scratch_path, jobs=2)
+    assert summary['succeeded'] == 6
+    assert os.listdir(scratch_path) == []
+    assert sorted(os.listdir(tmp_path / 'features')) == [f'pkg{i}.csv' for i in range(6)]
+
+def test_decompressed_tarballs_are_bounded(fake_extractor, tmp_path, monkeypatch):
+    tarball_dir = str(tmp_path / 'tarballs')
+    os.makedirs(tarball_dir)
+    tarball_paths = [make_tarball(tarball_dir, f'pkg{i}') for i in range(20)]
+    scratch_path = str(tmp_path / 'scratch')
+    on_disk = []
+    original = pipeline.decompress_tarball
+    def counting_decompress(tarball_path, target_path):
+        original(tarball_path, target_path)
+        on_disk.append(len(os.listdir(scratch_path)))
+    monkeypatch.setattr(pipeline, 'decompress_tarball', counting_decompress)
+
+    summary = extract_tarballs(tarball_paths, str(tmp_path / 'features'), str(tmp_path / 'positions'), scratch_path, jobs=1, decompress_jobs=2, max_pending=1)
+    assert summary['succeeded'] == 20
+    # 正在解压、等待分析与正在分析的压缩文件之和
+    assert max(on_disk) <= 2 + 1 + 1
+
+def test_blocked_consumer_stops_submissions(fake_extractor, tmp_path):
+    """on_tarball_done阻塞时已提交的压缩文件占满名额，submit等待；结果直接交给回调"""
+    tarball_dir = str(tmp_path / 'tarballs')
+    os.makedirs(tarball_dir)
+    tarball_paths = [make_tarball(tarball_dir, f'pkg{i}', files={'index.js': 'useEval\n'}) for i in range(6)]
+    release = threading.Event()
+    done = []
+    def on_tarball_done(tarball_path, results):
+        release.wait()
+        done.append((tarball_path, results))
+
+    submitted = []
+    tarball_pipeline = TarballPipeline(str(tmp_path / 'scratch'), str(tmp_path / 'extract.log'), jobs=1, decompress_jobs=1, max_pending=1, on_tarball_done=on_tarball_done).start()
+    def submit_all():
+        for tarball_path in tarball_paths:
+            tarball_pipeline.submit(tarball_path, str(tmp_path / 'features'), str(tmp_path / 'positions'))
+            submitted.append(tarball_path)
+    thread = threading.Thread(target=submit_all, daemon=True)
+    thread.start()
+    thread.join(1)
+    # 名额为decompress_jobs + max_pending + jobs = 3个
+    assert len(submitted) == 3
+    release.set()
+    run_with_timeout(lambda: thread.join() or tarball_pipeline.close())
+    assert sorted(path for path, _ in done) == sorted(tarball_paths)
+    for _, [(package_path, result)] in done:
+        assert dict(result['features'])['useEval'] is True
+
+def test_unreadable_tarballs_fail_without_blocking(fake_extractor, tmp_path):
+    tarball_dir = str(tmp_path / 'tarballs')
+    os.makedirs(tarball_dir)
+    corrupt_path = os.path.join(tarball_dir, 'corrupt-1.0.0.tgz')
+    with open(corrupt_path, 'wb') as f:
+        f.write(b'not a tarball')
+    missing_paths = [os.path.join(tarball_dir, f'missing{i}-1.0.0.tgz') for i in range(8)]
+    good_path = make_tarball(tarball_dir, 'good')
+    cache = ExtractCache(str(tmp_path / 'cache'), extractor_version='test')
+
+    # 名额只有decompress_jobs + max_pending + jobs = 3个，失败的压缩文件不释放名额时会卡住
+    def run():
+        tarball_pipeline = TarballPipeline(str(tmp_path / 'scratch'), str(tmp_path / 'extract.log'), jobs=1, max_pending=1, cache=cache)
+        tarball_pipeline.start()
+        for tarball_path in [corrupt_path] + missing_paths + [good_path]:
+            tarball_pipeline.submit(tarball_path, str(tmp_path / 'features'), None)
+        tarball_pipeline.close()
+        return tarball_pipeline.summary
+    summary = run_with_timeout(run)
+    cache.close()
+    assert summary['failed'] == 9
+    assert sorted(summary['failed_packages']) == sorted([corrupt_path] + missing_paths)
+    assert summary['succeeded'] == 1
+    assert os.listdir(tmp_path / 'scratch') == []
+
+def test_cached_tarballs_are_not_decompressed(fake_extractor, tmp_path, monkeypatch):
+    tarball_dir = str(tmp_path / 'tarballs')
+    os.makedirs(tarball_dir)
+    tarball_paths = [make_tarball(tarball_dir, f'pkg{i}') for i in range(3)]
+    cache = ExtractCache(str(tmp_path / 'cache'), extractor_version='test')
+    extract_tarballs(tarball_paths, str(tmp_path / 'features'), str(tmp_path / 'positions'), str(tmp_path / 'scratch'), cache=cache)
+    decompressed = []
+    original = pipeline.decompress_tarball
+    monkeypatch.setattr(pipeline, 'decompress_tarball', lambda tarball_path, target_path: decompressed.append(tarball_path) or original(tarball_path, target_path))
+    tarball_paths.append(make_tarball(tarball_dir, 'new'))
+    summary = extract_tarballs(tarball_paths, str(tmp_path / 'features'), str(tmp_path / 'positions'), str(tmp_path / 'scratch'), cache=cache)
+    cache.close()
+    assert summary['succeeded'] == 4
+    assert decompressed == [tarball_paths[-1]]
+
+def test_permissions_are_fixed_while_decompressing(tmp_path):
+    """压缩文件中不可读的文件与不可进入的文件夹解压后可以直接分析与删除"""
+    tarball_path = str(tmp_path / 'locked.tgz')
+    with tarfile.open(tarball_path, 'w:gz') as tar:
+        directory = tarfile.TarInfo('package/lib')
+        directory.type = tarfile.DIRTYPE
+        directory.mode = 0o000
+        tar.addfile(directory)
+        for name, data in [('package/package.json', b'{}'), ('package/lib/index.js', b'1')]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o000
+            tar.addfile(info, io.BytesIO(data))
+    target_path = tmp_path / 'target'
+    decompress_tarball(tarball_path, str(target_path))
+    assert os.access(target_path / 'package' / 'lib', os.R_OK | os.W_OK | os.X_OK)
+    assert (target_path / 'package' / 'lib' / 'index.js').read_text() == '1'
+    assert os.access(target_path / 'package' / 'package.json', os.R_OK | os.W_OK)
+
+def test_unsafe_members_are_not_decompressed(tmp_path):
+    tarball_path = str(tmp_path / 'evil.tgz')
+    with tarfile.open(tarball_path, 'w:gz') as tar:
+        for name, data in [('package/package.json', b'{}'), ('../escaped.js', b'1'), ('/abs.js', b'1')]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo('package/link')
+        link.type = tarfile.SYMTYPE
+        link.linkname = '/etc/passwd'
+        tar.addfile(link)
+
+    target_path = tmp_path / 'target'
+    decompress_tarball(tarball_path, str(target_path))
+    assert os.listdir(target_path) == ['package']
+    assert os.listdir(target_path / 'package') == ['package.json']
+    assert not (tmp_path / 'escaped.js').exists()
+
+def test_each_tarball_is_looked_up_once(fake_extractor, tmp_path):
+    """未命中的压缩文件在解压前查询一次缓存，分析时不再查询，缓存的命中率与摘要一致"""
+    tarball_dir = str(tmp_path / 'tarballs')
+    os.makedirs(tarball_dir)
+    tarball_paths = [make_tarball(tarball_dir, f'pkg{i}') for i in range(3)]
+    cache = ExtractCache(str(tmp_path / 'cache'), extractor_version='test')
+    summary = extract_tarballs(tarball_paths, str(tmp_path / 'features'), None, str(tmp_path / 'scratch'), cache=cache)
+    assert (summary['cache_hits'], summary['cache_misses']) == (0, 3)
+    assert cache.stats() == {'hits': 0, 'misses': 3, 'hit_rate': 0.0}
+
+    tarball_paths.append(make_tarball(tarball_dir, 'new'))
+    summary = extract_tarballs(tarball_paths, str(tmp_path / 'features'), None, str(tmp_path / 'scratch'), cache=cache)
+    cache.close()
+    assert (summary['cache_hits'], summary['cache_misses']) == (3, 1)
+    assert cache.stats() == {'hits': 3, 'misses': 4, 'hit_rate': 3 / 7}
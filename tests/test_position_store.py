@@ -0,0 +1,87 @@
+import os
+import json
+
+import pytest
+
+from extraction.src.position_store import PositionStore, pack_position_dir, close_position_stores, POSITIONS_FILE, PATHS_FILE, INDEX_FILE
+
+
+def record(file_path: str, line: int) -> dict:
+    return {'filePath': file_path, 'content': {'start': {'line': line, 'column': 0}, 'end': {'line': line, 'column': 7}}}
+
+POSITIONS = {
+    'useEval': [record('/p/index.js', 1), record('/p/lib/a.js', 3)],
+    'containIP': [{'filePath': '/p/index.js', 'content': '203.0.113.7'}],
+    'useBuffer': []
+}
+
+def test_round_trip_with_interned_paths(tmp_path):
+    with PositionStore(str(tmp_path), writable=True) as store:
+        store.append('a@1.0.0', POSITIONS)
+        store.append('b@1.0.0', {'useEval': [record('/p/index.js', 9)], 'truncated': True})
+    store = PositionStore(str(tmp_path))
+    assert store.package_names() == ['a@1.0.0', 'b@1.0.0']
+    # 没有记录的特征不保存
+    assert store.get('a@1.0.0') == {'useEval': POSITIONS['useEval'], 'containIP': POSITIONS['containIP']}
+    assert store.get('b@1.0.0') == {'useEval': [record('/p/index.js', 9)], 'truncated': True}
+    assert store.get('c@1.0.0') is None
+    with open(tmp_path / PATHS_FILE) as f:
+        assert [json.loads(line) for line in f] == ['/p/index.js', '/p/lib/a.js']
+
+def test_last_append_wins(tmp_path):
+    with PositionStore(str(tmp_path), writable=True) as store:
+        store.append('a@1.0.0', POSITIONS)
+        store.append('a@1.0.0', {'useEval': [record('/p/new.js', 2)]})
+    store = PositionStore(str(tmp_path))
+    assert len(store) == 1
+    assert store.get('a@1.0.0') == {'useEval': [record('/p/new.js', 2)]}
+
+def test_search_reads_only_matching_packages(tmp_path):
+    with PositionStore(str(tmp_path), writable=True) as store:
+        for i in range(5):
+            store.append(f'pkg{i}@1.0.0', {'useEval': [record(f'/p{i}/index.js', i)]} if i % 2 == 0 else {'containIP': [{'filePath': '/x.js', 'content': '10.0.0.1'}]})
+    store = PositionStore(str(tmp_path))
+    # 破坏没有useEval的包的记录，search不应读取它们
+    entries = [store.index[f'pkg{i}@1.0.0'] for i in (1, 3)]
+    with open(tmp_path / POSITIONS_FILE, 'r+b') as f:
+        for entry in entries:
+            f.seek(entry['offset'])
+            f.write(b'#' * (entry['length'] - 1))
+    assert list(store.search('useEval')) == [(f'pkg{i}@1.0.0', [record(f'/p{i}/index.js', i)]) for i in (0, 2, 4)]
+    assert list(store.search('accessFSInJSFile')) == []
+
+def test_interrupted_writes_are_discarded(tmp_path):
+    with PositionStore(str(tmp_path), writable=True) as store:
+        store.append('a@1.0.0', POSITIONS)
+    # 写入特征位置后、写入索引前中断
+    with open(tmp_path / PATHS_FILE, 'ab') as f:
+        f.write(b'"/p/half.js"\n"/p/ha')
+    with open(tmp_path / POSITIONS_FILE, 'ab') as f:
+        f.write(b'{"package":"b@1.0.0","positions":{}}\n')
+    with open(tmp_path / INDEX_FILE, 'ab') as f:
+        f.write(b'{"package":"b@1.0')
+
+    reader = PositionStore(str(tmp_path))
+    assert reader.package_names() == ['a@1.0.0']
+    with PositionStore(str(tmp_path), writable=True) as store:
+        assert store.package_names() == ['a@1.0.0']
+        store.append('c@1.0.0', {'useEval': [record('/p/c.js', 1)]})
+    reader.reload()
+    assert reader.package_names() == ['a@1.0.0', 'c@1.0.0']
+    assert reader.get('c@1.0.0') == {'useEval': [record('/p/c.js', 1)]}
+    assert reader.get('a@1.0.0') == {'useEval': POSITIONS['useEval'], 'containIP': POSITIONS['containIP']}
+
+def test_read_only_store_rejects_appends(tmp_path):
+    with pytest.raises(ValueError):
+        PositionStore(str(tmp_path)).append('a@1.0.0', POSITIONS)
+
+def test_pack_json_files(tmp_path):
+    for name in ['a@1.0.0', '@scope#b@2.0.0']:
+        with open(tmp_path / f'{name}.json', 'w') as f:
+            json.dump(POSITIONS, f)
+    try:
+        assert pack_position_dir(str(tmp_path), remove_json=True) == 2
+    finally:
+        close_position_stores()
+    assert sorted(os.listdir(tmp_path)) == sorted([POSITIONS_FILE, PATHS_FILE, INDEX_FILE])
+    assert PositionStore(str(tmp_path)).get('@scope#b@2.0.0')['useEval'] == POSITIONS['useEval']
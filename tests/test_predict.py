@@ -0,0 +1,55 @@
+import pickle
+
+import numpy as np
+
+from training.src.predict import predict_matrix, predict_dataset, predict_package
+from tests.conftest import random_feature_matrix, write_feature_dir
+
+
+def load_pickle(file_path: str):
+    with open(file_path, 'rb') as f:
+        return pickle.load(f)
+
+
+def test_predict_matrix_matches_the_classifier_in_every_chunk_size(model_paths):
+    classifier_path, scaler_path = model_paths['MLP']
+    classifier, scaler = load_pickle(classifier_path), load_pickle(scaler_path)
+    feature_matrix = random_feature_matrix(50, seed=3)
+    expected = classifier.predict(scaler.transform(feature_matrix))
+    malicious = list(classifier.classes_).index('malicious')
+    expected_proba = classifier.predict_proba(scaler.transform(feature_matrix))[:, malicious]
+    for chunk_size in [1, 7, 50, 1000]:
+        y_pred, y_proba = predict_matrix('MLP', feature_matrix, chunk_size)
+        assert (y_pred == expected).all()
+        assert np.allclose(y_proba, expected_proba)
+
+def test_predict_matrix_without_predict_proba(model_paths):
+    y_pred, y_proba = predict_matrix('SVM', random_feature_matrix(10))
+    assert len(y_pred) == 10
+    assert y_proba is None
+
+def test_predict_matrix_of_no_rows(model_paths):
+    y_pred, y_proba = predict_matrix('RF', np.zeros((0, 22), dtype=bool))
+    assert len(y_pred) == 0
+    assert len(y_proba) == 0
+
+def test_predict_dataset_agrees_with_single_package_prediction(model_paths, tmp_path):
+    feature_matrix = random_feature_matrix(12, seed=4)
+    write_feature_dir(str(tmp_path / 'features'), feature_matrix)
+    package_names, y_pred, _ = predict_dataset('NB', str(tmp_path / 'features'), chunk_size=5)
+    assert package_names == sorted(package_names)
+    for package_name, verdict in zip(package_names, y_pred):
+        assert predict_package('NB', str(tmp_path / 'features' / f'{package_name}.csv')) == verdict
+
+def test_scaler_runs_once_and_classifier_once_per_chunk(model_paths, monkeypatch):
+    """整个矩阵只做一次预处理，分类器按块调用而不是按包调用"""
+    from training.src.model_registry import get_model
+    model = get_model('RF')
+    calls = {'transform': [], 'predict': []}
+    for obj, method in [(model.scaler, 'transform'), (model.classifier, 'predict')]:
+        original = getattr(obj, method)
+        monkeypatch.setattr(obj, method, lambda X, original=original, method=method: calls[method].append(len(X)) or original(X))
+    y_pred, y_proba = predict_matrix('RF', random_feature_matrix(1000, seed=5), chunk_size=256)
+    assert calls['transform'] == [1000]
+    assert calls['predict'] == [256, 256, 256, 232]
+    assert len(y_pred) == len(y_proba) == 1000
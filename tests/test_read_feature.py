@@ -0,0 +1,98 @@
+import os
+import numpy as np
+import pytest
+
+from training.src.read_feature import load_feature_files, read_csv_feature_matrix, read_features
+from tests.conftest import random_feature_matrix, write_feature_dir
+
+
+def test_malformed_files_are_skipped_and_reported(tmp_path):
+    feature_dir = tmp_path / 'features'
+    feature_matrix = random_feature_matrix(6, seed=5)
+    package_names = write_feature_dir(str(feature_dir), feature_matrix)
+    # 行数不对、值不是true/false、字段数不对
+    (feature_dir / 'short@1.0.0.csv').write_text('feature0,true\n')
+    (feature_dir / 'value@1.0.0.csv').write_text(''.join(f'feature{i},yes\n' for i in range(22)))
+    (feature_dir / 'fields@1.0.0.csv').write_text(''.join(f'feature{i},true,1\n' for i in range(22)))
+
+    errors = []
+    matrix, names = read_csv_feature_matrix(str(feature_dir), errors)
+    assert names == package_names
+    assert (matrix == feature_matrix).all()
+    assert sorted(os.path.basename(file_path) for file_path, _ in errors) == ['fields@1.0.0.csv', 'short@1.0.0.csv', 'value@1.0.0.csv']
+
+def test_parallel_loading_matches_file_order(tmp_path):
+    feature_matrix = random_feature_matrix(300, seed=6)
+    package_names = write_feature_dir(str(tmp_path), feature_matrix)
+    file_paths = [str(tmp_path / f'{name}.csv') for name in package_names]
+    for workers in [1, 3, 32]:
+        matrix, valid = load_feature_files(file_paths, workers=workers)
+        assert valid.all()
+        assert matrix.dtype == bool
+        assert (matrix == feature_matrix).all()
+
+def test_missing_file_is_invalid(tmp_path):
+    package_names = write_feature_dir(str(tmp_path), random_feature_matrix(2))
+    errors = []
+    _, valid = load_feature_files([str(tmp_path / f'{package_names[0]}.csv'), str(tmp_path / 'missing.csv')], errors)
+    assert valid.tolist() == [True, False]
+    assert len(errors) == 1
+
+def test_labels_skip_malformed_files(tmp_path):
+    write_feature_dir(str(tmp_path / 'malicious'), random_feature_matrix(3, seed=7))
+    (tmp_path / 'malicious' / 'broken.csv').write_text('not a feature file\n')
+    write_feature_dir(str(tmp_path / 'benign'), random_feature_matrix(2, seed=8))
+    X, labels, csv_names = read_features(str(tmp_path / 'malicious'), str(tmp_path / 'benign'))
+    assert X.shape == (5, 22)
+    assert labels == ['malicious'] * 3 + ['benign'] * 2
+    assert 'broken.csv' not in csv_names
+
+def test_empty_directory(tmp_path):
+    matrix, names = read_csv_feature_matrix(str(tmp_path))
+    assert matrix.shape[0] == 0
+    assert names == []
+    assert np.asarray(matrix).dtype == bool
+
+def test_row_of_every_file_matches_its_name(tmp_path, monkeypatch):
+    """跳过格式错误的文件后，每行仍与其文件名对应，且与目录的列出顺序无关"""
+    feature_matrix = random_feature_matrix(40, seed=9)
+    package_names = write_feature_dir(str(tmp_path), feature_matrix)
+    (tmp_path / f'{package_names[10]}.csv').write_text('broken\n')
+    listdir = os.listdir
+    monkeypatch.setattr(os, 'listdir', lambda path: list(reversed(listdir(path))))
+    X, labels, csv_names = read_features(str(tmp_path), None)
+    assert csv_names == [f'{name}.csv' for i, name in enumerate(package_names) if i != 10]
+    expected = {f'{name}.csv': feature_matrix[i] for i, name in enumerate(package_names)}
+    for row, csv_name in enumerate(csv_names):
+        assert (X[row] == expected[csv_name]).all()
+
+def test_width_comes_from_the_first_valid_file(tmp_path):
+    """多数文件行数不对时，特征数量仍以第一个格式正确的文件为准"""
+    feature_matrix = random_feature_matrix(3, seed=10)
+    package_names = write_feature_dir(str(tmp_path), feature_matrix)
+    for i in range(20):
+        (tmp_path / f'short{i:02d}@1.0.0.csv').write_text('feature0,true\nfeature1,false\n')
+    errors = []
+    matrix, names = read_csv_feature_matrix(str(tmp_path), errors)
+    assert matrix.shape == (3, 22)
+    assert names == package_names
+    assert (matrix == feature_matrix).all()
+    assert len(errors) == 20
+
+def test_files_with_other_feature_names_are_invalid(tmp_path):
+    feature_matrix = random_feature_matrix(2, seed=11)
+    package_names = write_feature_dir(str(tmp_path), feature_matrix)
+    # 特征数量相同但特征顺序不同
+    swapped = [f'feature{i}' for i in range(22)]
+    swapped[0], swapped[1] = swapped[1], swapped[0]
+    (tmp_path / 'swapped@1.0.0.csv').write_text(''.join(f'{name},true\n' for name in swapped))
+    errors = []
+    matrix, names = read_csv_feature_matrix(str(tmp_path), errors)
+    assert names == package_names
+    assert [os.path.basename(file_path) for file_path, _ in errors] == ['swapped@1.0.0.csv']
+
+def test_directories_with_different_widths_are_rejected(tmp_path):
+    write_feature_dir(str(tmp_path / 'malicious'), random_feature_matrix(3, seed=12))
+    write_feature_dir(str(tmp_path / 'benign'), random_feature_matrix(2, seed=13)[:, :20])
+    with pytest.raises(ValueError, match='22 features.*20 features'):
+        read_features(str(tmp_path / 'malicious'), str(tmp_path / 'benign'))
@@ -0,0 +1,106 @@
+import os
+import argparse
+
+import numpy as np
+import pytest
+
+from training.src.report import ReportWriter, read_report, write_predictions
+from tests.conftest import random_feature_matrix, write_feature_dir
+
+
+COLUMNS = ['package_name', 'is_malicious']
+
+
+def test_rows_are_written_in_chunks(tmp_path):
+    report_path = str(tmp_path / 'report.csv')
+    with ReportWriter(report_path, COLUMNS, chunk_size=2) as writer:
+        writer.write_rows([('a', True), ('b', False), ('c', True)])
+        assert list(read_report(report_path)) == [['a', 'True'], ['b', 'False']]
+        assert os.path.exists(report_path + '.checkpoint')
+    assert list(read_report(report_path)) == [['a', 'True'], ['b', 'False'], ['c', 'True']]
+    with open(report_path) as f:
+        assert f.readline() == 'package_name, is_malicious\n'
+    assert not os.path.exists(report_path + '.checkpoint')
+
+def test_resume_drops_rows_after_the_checkpoint(tmp_path):
+    report_path = str(tmp_path / 'report.csv')
+    writer = ReportWriter(report_path, COLUMNS, chunk_size=2)
+    writer.write_rows([('a', True), ('b', False)])
+    # 模拟写入检查点前中断：报告末尾有未记录在检查点中的半行
+    with open(report_path, 'a') as f:
+        f.write('c, Tr')
+
+    writer = ReportWriter(report_path, COLUMNS, resume=True, chunk_size=2)
+    assert writer.done == {'a', 'b'}
+    writer.write_rows([('c', True), ('d', False)])
+    writer.close()
+    assert [row[0] for row in read_report(report_path)] == ['a', 'b', 'c', 'd']
+
+def test_resume_of_a_finished_report_keeps_it(tmp_path):
+    report_path = str(tmp_path / 'report.csv')
+    with ReportWriter(report_path, COLUMNS) as writer:
+        writer.write_rows([('a', True), ('b', False)])
+    writer = ReportWriter(report_path, COLUMNS, resume=True)
+    assert writer.done == {'a', 'b'}
+    writer.close()
+    assert len(list(read_report(report_path))) == 2
+
+def test_error_keeps_the_checkpoint(tmp_path):
+    report_path = str(tmp_path / 'report.csv')
+    with pytest.raises(KeyboardInterrupt):
+        with ReportWriter(report_path, COLUMNS, chunk_size=10) as writer:
+            writer.write_row(('a', True))
+            raise KeyboardInterrupt
+    assert os.path.exists(report_path + '.checkpoint')
+    assert ReportWriter(report_path, COLUMNS, resume=True).done == {'a'}
+
+def test_write_predictions_skips_done_packages(tmp_path):
+    report_path = str(tmp_path / 'report.csv')
+    package_names = [f'pkg{i}' for i in range(7)]
+    feature_matrix = np.arange(7)[:, None] % 2 == 0
+    with ReportWriter(report_path, COLUMNS, chunk_size=3) as writer:
+        writer.write_rows([('pkg0', True), ('pkg1', False)])
+    predicted = []
+    def predict(matrix):
+        predicted.append(len(matrix))
+        return matrix[:, 0]
+    with ReportWriter(report_path, COLUMNS, resume=True, chunk_size=3) as writer:
+        assert write_predictions(writer, predict, feature_matrix, package_names, lambda name, result: (name, result)) == 5
+    assert sum(predicted) == 5
+    assert list(read_report(report_path)) == [[name, str(i % 2 == 0)] for i, name in enumerate(package_names)]
+
+def test_parquet_report(tmp_path):
+    try:
+        import pyarrow
+    except ImportError:
+        with pytest.raises(ImportError):
+            ReportWriter(str(tmp_path / 'report.csv'), COLUMNS, parquet=True)
+        return
+    import pyarrow.parquet
+    report_path = str(tmp_path / 'report.csv')
+    with ReportWriter(report_path, COLUMNS, parquet=True, chunk_size=2) as writer:
+        writer.write_rows([('a', True), ('b', False), ('c', True)])
+    table = pyarrow.parquet.read_table(str(tmp_path / 'report.parquet'))
+    assert table.column('package_name').to_pylist() == ['a', 'b', 'c']
+
+def test_cli_predict_resumes_its_report(model_paths, tmp_path, monkeypatch):
+    """报告写入临时文件夹；中断后继续时只预测报告中没有的包"""
+    import cli
+    monkeypatch.setattr(cli, 'FEATURES_PATH', str(tmp_path / 'features'))
+    monkeypatch.setattr(cli, 'REPORTS_PATH', str(tmp_path / 'reports'))
+    package_names = write_feature_dir(str(tmp_path / 'features' / 'day'), random_feature_matrix(10, seed=8))
+    (tmp_path / 'reports').mkdir()
+    report_path = str(tmp_path / 'reports' / 'day-RF-report.csv')
+    with ReportWriter(report_path, ['package name', 'predict']) as writer:
+        writer.write_rows([(package_names[0], 'benign'), (package_names[1], 'benign')])
+
+    predicted = []
+    predict_matrix = cli.training.predict_matrix
+    monkeypatch.setattr(cli.training, 'predict_matrix', lambda model_name, matrix: predicted.append(len(matrix)) or predict_matrix(model_name, matrix))
+    monkeypatch.setattr(cli, 'args', argparse.Namespace(dataset='day', model='RF', resume=True, parquet=False, no_table=True), raising=False)
+    cli.predict_cli()
+    assert predicted == [8]
+    rows = list(read_report(report_path))
+    assert [row[0] for row in rows] == package_names
+    assert rows[:2] == [[package_names[0], 'benign'], [package_names[1], 'benign']]
+    assert os.listdir(tmp_path / 'reports') == ['day-RF-report.csv']
@@ -0,0 +1,197 @@
+import csv
+import json
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+pytest.importorskip('sklearn')
+from sklearn.metrics import make_scorer, precision_score, recall_score, f1_score, matthews_corrcoef
+from sklearn.model_selection import StratifiedKFold, cross_validate
+from sklearn.naive_bayes import BernoulliNB
+
+from training.src import search
+from training.src.commons import field_names
+from training.src.search import run_search, SEARCH_FOLDS, SEARCH_RANDOM_STATE
+from tests.conftest import random_feature_matrix, make_labels
+
+
+# 与搜索写入验证结果表的指标相同的sklearn评分
+SKLEARN_SCORING = {
+    'accu': 'accuracy',
+    'prec': make_scorer(precision_score, pos_label='malicious', zero_division=0),
+    'rec': make_scorer(recall_score, pos_label='malicious', zero_division=0),
+    'f1': make_scorer(f1_score, pos_label='malicious', zero_division=0),
+    'matt_cor': make_scorer(matthews_corrcoef)
+}
+
+
+class SerialExecutor:
+    """在当前进程中依次执行任务并记录执行过的任务，代替搜索使用的进程池"""
+
+    tasks = []
+    initargs = []
+
+    def __init__(self, max_workers=None, initializer=None, initargs=()):
+        SerialExecutor.initargs.append(initargs)
+        initializer(*initargs)
+
+    def submit(self, fn, *args):
+        # 任务只包含模型与序号，训练数据通过initializer传给工作进程
+        assert not any(isinstance(arg, np.ndarray) for arg in args)
+        SerialExecutor.tasks.append(args[1:4])
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+@pytest.fixture
+def serial_search(monkeypatch):
+    SerialExecutor.tasks = []
+    SerialExecutor.initargs = []
+    monkeypatch.setattr(search, 'ProcessPoolExecutor', SerialExecutor)
+    return SerialExecutor.tasks
+
+def make_configs(n_configs: int) -> list:
+    return [(f'alpha={alpha}', BernoulliNB(alpha=alpha)) for alpha in np.linspace(0.1, 2.0, n_configs)]
+
+def read_rows(csv_path: str) -> list:
+    with open(csv_path) as f:
+        return list(csv.reader(f))[1:]
+
+def test_grid_search_writes_every_config_in_order(serial_search, tmp_path):
+    X = random_feature_matrix(200)
+    y = make_labels(X)
+    configs = make_configs(3)
+    csv_path = str(tmp_path / 'validation.csv')
+    run_search(configs, X, y, csv_path, workers=1)
+    with open(csv_path) as f:
+        assert next(csv.reader(f)) == field_names
+    assert [row[0] for row in read_rows(csv_path)] == [name for name, _ in configs]
+    assert len(serial_search) == 3 * SEARCH_FOLDS
+
+def test_resume_skips_finished_folds(serial_search, tmp_path):
+    X = random_feature_matrix(200)
+    y = make_labels(X)
+    configs = make_configs(3)
+    csv_path = str(tmp_path / 'validation.csv')
+    run_search(configs, X, y, csv_path, workers=1)
+    expected_rows = read_rows(csv_path)
+
+    # 模拟中断：最后三个任务没有完成，最后一行只写了一半
+    with open(csv_path + '.progress') as f:
+        lines = f.read().splitlines()
+    with open(csv_path + '.progress', 'w') as f:
+        f.write('\n'.join(lines[:-3]) + '\n' + lines[-3][:10])
+    interrupted = {(json.loads(line)['config'], json.loads(line)['fold']) for line in lines[-3:]}
+    serial_search.clear()
+    run_search(configs, X, y, csv_path, workers=1, resume=True)
+    assert {(configs[config_index][0], fold_index) for config_index, fold_index, _ in serial_search} == interrupted
+    assert read_rows(csv_path) == expected_rows
+
+def test_resume_with_other_data_starts_over(serial_search, tmp_path):
+    X = random_feature_matrix(200)
+    y = make_labels(X)
+    configs = make_configs(2)
+    csv_path = str(tmp_path / 'validation.csv')
+    run_search(configs, X, y, csv_path, workers=1)
+    serial_search.clear()
+    run_search(configs, X[:-1], y[:-1], csv_path, workers=1, resume=True)
+    assert len(serial_search) == 2 * SEARCH_FOLDS
+
+def test_every_config_uses_the_same_folds_as_cross_validate(serial_search, tmp_path):
+    X = random_feature_matrix(200, seed=1)
+    y = make_labels(X)
+    configs = make_configs(2)
+    run_search(configs, X, y, str(tmp_path / 'validation.csv'), workers=1)
+    assert len(SerialExecutor.initargs) == 1
+    skf = StratifiedKFold(n_splits=SEARCH_FOLDS, shuffle=True, random_state=SEARCH_RANDOM_STATE)
+    for (_, model), row in zip(configs, read_rows(str(tmp_path / 'validation.csv'))):
+        expected = cross_validate(model, X, y, cv=skf, scoring=SKLEARN_SCORING)
+        assert np.allclose([float(value) for value in row[1:]], [expected[f'test_{name}'].mean() for name in search.SCORE_NAMES])
+
+def test_process_pool_gives_the_serial_result(tmp_path):
+    X = random_feature_matrix(120, seed=2)
+    y = make_labels(X)
+    configs = make_configs(2)
+    run_search(configs, X, y, str(tmp_path / 'parallel.csv'), workers=2)
+    with open(str(tmp_path / 'parallel.csv') + '.progress') as f:
+        assert len(f.read().splitlines()) == 1 + 2 * SEARCH_FOLDS
+    serial_scores = []
+    for _, model in configs:
+        expected = cross_validate(model, X, y, cv=StratifiedKFold(n_splits=SEARCH_FOLDS, shuffle=True, random_state=SEARCH_RANDOM_STATE), scoring=SKLEARN_SCORING)
+        serial_scores.append([f'{expected[f"test_{name}"].mean()}' for name in search.SCORE_NAMES])
+    assert [row[1:] for row in read_rows(str(tmp_path / 'parallel.csv'))] == serial_scores
+
+def test_halving_schedule():
+    assert search.get_halving_schedule(27, 13500) == [1500, 4500, None]
+    assert search.get_halving_schedule(9, 1000) == [None]
+    assert search.get_halving_schedule(1, 100000) == [None]
+
+def test_halving_keeps_the_best_third(serial_search, tmp_path, monkeypatch):
+    monkeypatch.setattr(search, 'HALVING_MIN_SAMPLES', 10)
+    X = random_feature_matrix(400)
+    y = make_labels(X)
+    configs = make_configs(9)
+    csv_path = str(tmp_path / 'validation.csv')
+    run_search(configs, X, y, csv_path, workers=1, method='halving')
+
+    with open(csv_path) as f:
+        assert next(csv.reader(f)) == search.HALVING_FIELD_NAMES
+    rows = read_rows(csv_path)
+    # 超参数描述与网格搜索相同，训练样本数在单独的一列
+    assert [row[0] for row in rows] == [name for name, _ in configs]
+    dropped = [row[0] for row in rows if row[-1] == '100']
+    assert len(dropped) == 6
+    survivor_samples = {row[-1] for row in rows if row[0] not in dropped}
+    assert survivor_samples == {str(min(len(train_index) for train_index, _ in search.get_search_splits(X, y)))}
+    # 第一轮9个超参数使用100个样本，第二轮只剩3个超参数使用整个训练集
+    assert [n_samples for _, _, n_samples in serial_search].count(100) == 9 * SEARCH_FOLDS
+    assert [n_samples for _, _, n_samples in serial_search].count(None) == 3 * SEARCH_FOLDS
+
+def test_halving_survivors_have_the_best_first_round_mcc(serial_search, tmp_path, monkeypatch):
+    monkeypatch.setattr(search, 'HALVING_MIN_SAMPLES', 10)
+    X = random_feature_matrix(400, seed=3)
+    y = make_labels(X)
+    configs = make_configs(9)
+    csv_path = str(tmp_path / 'validation.csv')
+    run_search(configs, X, y, csv_path, workers=1, method='halving')
+
+    first_round = {}
+    with open(csv_path + '.progress') as f:
+        for line in f.read().splitlines()[1:]:
+            record = json.loads(line)
+            if record['n_samples'] == 100:
+                first_round.setdefault(record['config'], []).append(record['scores'][-1])
+    assert sorted(first_round) == sorted(name for name, _ in configs)
+    ranked = sorted(first_round, key=lambda name: (-np.mean(first_round[name]), [name for name, _ in configs].index(name)))
+    survivors = {row[0] for row in read_rows(csv_path) if row[-1] != '100'}
+    assert survivors == set(ranked[:3])
+
+def test_interrupted_halving_resumes_in_its_round(serial_search, tmp_path, monkeypatch):
+    monkeypatch.setattr(search, 'HALVING_MIN_SAMPLES', 10)
+    X = random_feature_matrix(400, seed=4)
+    y = make_labels(X)
+    configs = make_configs(9)
+    csv_path = str(tmp_path / 'validation.csv')
+    run_search(configs, X, y, csv_path, workers=1, method='halving')
+    expected_rows = read_rows(csv_path)
+
+    # 中断在最后一轮：整个训练集上的任务没有完成
+    with open(csv_path + '.progress') as f:
+        lines = [line for line in f.read().splitlines() if json.loads(line).get('n_samples', 0) is not None]
+    with open(csv_path + '.progress', 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    serial_search.clear()
+    run_search(configs, X, y, csv_path, workers=1, resume=True, method='halving')
+    assert [n_samples for _, _, n_samples in serial_search] == [None] * 3 * SEARCH_FOLDS
+    assert read_rows(csv_path) == expected_rows
@@ -0,0 +1,151 @@
+import json
+import asyncio
+
+import numpy as np
+import pytest
+
+from service import MicroBatcher, LatencyStats, Scorer, ScoringService, TarballExtractor
+from service.src import server
+from tests.conftest import random_feature_matrix, make_tarball
+
+
+class RecordingPredict:
+    """记录每批的行数，恶意概率为第一个特征"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, feature_matrix):
+        self.batches.append(len(feature_matrix))
+        return [np.where(feature_matrix[:, 0], 'malicious', 'benign'), feature_matrix[:, 0].astype(float)]
+
+def test_concurrent_requests_share_a_batch():
+    predict = RecordingPredict()
+    matrices = [random_feature_matrix(n, seed=n) for n in [1, 3, 2, 5]]
+
+    async def run():
+        batcher = MicroBatcher(predict, max_batch_size=100, max_wait=0.05).start()
+        results = await asyncio.gather(*(batcher.submit(matrix) for matrix in matrices))
+        await batcher.stop()
+        return results, batcher.stats()
+    results, stats = asyncio.run(run())
+    assert predict.batches == [11]
+    assert stats['batches'] == 1 and stats['queued_rows'] == 0
+    # 每个请求只拿到自己的行
+    for matrix, (y_pred, y_proba) in zip(matrices, results):
+        assert list(y_pred) == list(np.where(matrix[:, 0], 'malicious', 'benign'))
+        assert list(y_proba) == list(matrix[:, 0].astype(float))
+
+def test_batches_are_capped():
+    predict = RecordingPredict()
+
+    async def run():
+        batcher = MicroBatcher(predict, max_batch_size=4, max_wait=0.05).start()
+        await asyncio.gather(*(batcher.submit(random_feature_matrix(1, seed=i)) for i in range(10)))
+        await batcher.stop()
+    asyncio.run(run())
+    assert sum(predict.batches) == 10
+    assert max(predict.batches) <= 4
+
+def test_full_batch_does_not_wait():
+    """攒够max_batch_size行的批不等待max_wait"""
+    predict = RecordingPredict()
+
+    async def run():
+        batcher = MicroBatcher(predict, max_batch_size=4, max_wait=5).start()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*(batcher.submit(random_feature_matrix(2, seed=i)) for i in range(2)))
+        elapsed = loop.time() - start
+        await batcher.stop()
+        return elapsed
+    assert asyncio.run(run()) < 1
+    assert predict.batches == [4]
+
+def test_prediction_error_reaches_every_request():
+    def predict(feature_matrix):
+        raise ValueError('broken model')
+
+    async def run():
+        batcher = MicroBatcher(predict, max_wait=0.05).start()
+        results = await asyncio.gather(*(batcher.submit(random_feature_matrix(1)) for _ in range(3)), return_exceptions=True)
+        await batcher.stop()
+        return results
+    assert all(isinstance(result, ValueError) for result in asyncio.run(run()))
+
+def test_latency_percentiles():
+    latency = LatencyStats(window=100)
+    assert latency.summary()['p50_ms'] is None
+    for i in range(1, 201):
+        latency.record(i / 1000)
+    summary = latency.summary()
+    assert summary['count'] == 200
+    # 只保留最近100个请求
+    assert summary['p50_ms'] == pytest.approx(150.5)
+    assert summary['max_ms'] == pytest.approx(200)
+
+async def http_request(port: int, requests: list) -> list:
+    """在一个keep-alive连接上依次发送请求，返回(状态码, JSON响应)列表"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    responses = []
+    for method, path, body in requests:
+        data = json.dumps(body).encode() if body is not None else b''
+        writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n'.encode() + data)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) != b'\r\n':
+            name, _, value = line.decode().partition(':')
+            headers[name.lower()] = value.strip()
+        responses.append((status, json.loads(await reader.readexactly(int(headers['content-length'])))))
+    writer.close()
+    return responses
+
+def run_service(service: ScoringService, requests: list) -> list:
+    async def run():
+        service.batcher.start()
+        tcp_server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        try:
+            return await http_request(tcp_server.sockets[0].getsockname()[1], requests)
+        finally:
+            tcp_server.close()
+            await service.batcher.stop()
+    return asyncio.run(run())
+
+def test_http_predict(model_paths):
+    import training
+    scorer = Scorer('RF', use_table=False)
+    feature_matrix = random_feature_matrix(5)
+    responses = run_service(ScoringService(scorer, MicroBatcher(scorer.score)), [
+        ('POST', '/predict', {'vectors': feature_matrix.tolist()}),
+        ('POST', '/predict', {'vector': [True] * 3}),
+        ('GET', '/predict', None),
+        ('GET', '/stats', None)
+    ])
+    (status, predicted), (bad_status, _), (method_status, _), (_, stats) = responses
+    y_pred, y_proba = training.predict_matrix('RF', feature_matrix)
+    assert status == 200
+    assert predicted['verdicts'] == list(y_pred)
+    assert predicted['probabilities'] == pytest.approx(list(y_proba))
+    assert (bad_status, method_status) == (400, 405)
+    assert stats['latency']['predict']['count'] == 2
+    assert stats['truth_table'] is False
+
+def test_http_predict_tarball(model_paths, fake_extractor, tmp_path, monkeypatch):
+    monkeypatch.setattr(server, 'ensure_extractor_built', lambda: None)
+    tarball_path = make_tarball(str(tmp_path), 'evil', files={'index.js': 'useEval\nrequireChildProcessInJSFile\n'})
+    scorer = Scorer('RF', use_table=False)
+    extractor = TarballExtractor(1, str(tmp_path / 'scratch')).start()
+    try:
+        responses = run_service(ScoringService(scorer, MicroBatcher(scorer.score), extractor), [
+            ('POST', '/predict-tarball', {'path': tarball_path}),
+            ('POST', '/predict-tarball', {'path': str(tmp_path / 'missing.tgz')})
+        ])
+    finally:
+        extractor.close()
+    (status, result), (missing_status, _) = responses
+    assert status == 200
+    assert [package['package'] for package in result['packages']] == ['evil@1.0.0']
+    assert result['packages'][0]['verdict'] in ('malicious', 'benign')
+    assert missing_status == 400
+    assert len(list((tmp_path / 'scratch').iterdir())) == 0
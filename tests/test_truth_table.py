@@ -0,0 +1,125 @@
+import os
+import sys
+import pickle
+import subprocess
+
+import numpy as np
+import pytest
+
+pytest.importorskip('sklearn')
+
+from training.src import truth_table
+from training.src.commons import model_file_paths
+from training.src.model_registry import get_model_registry
+from training.src.predict import predict_matrix
+from training.src.compile_model import compile_truth_table, check_truth_table, check_truth_table_on_matrix
+from training.src.truth_table import TruthTable, load_truth_table, all_feature_vectors, get_table_dir, TABLE_VERDICTS_FILE, TABLE_PROBA_FILE
+from training.src.report import read_report
+from tests.conftest import random_feature_matrix, write_feature_dir, save_model, train_model
+
+
+# 小模型只有2^10个特征向量，编译与逐项比较都很快
+TABLE_FEATURE_COUNT = 10
+
+
+@pytest.fixture
+def compiled_table(tmp_path, monkeypatch):
+    """编译一个10个特征的RF模型，返回(真值表文件夹路径, 分类器路径)"""
+    classifier_path, scaler_path = save_model(str(tmp_path), 'RF', 'RF', TABLE_FEATURE_COUNT)
+    monkeypatch.setitem(model_file_paths, 'RF', (classifier_path, scaler_path))
+    monkeypatch.setattr(truth_table, 'MODELS_PATH', str(tmp_path))
+    get_model_registry().clear()
+    table_path = str(tmp_path / 'tables')
+    compile_truth_table('RF', [f'feature{i}' for i in range(TABLE_FEATURE_COUNT)], table_path, workers=1)
+    yield table_path, classifier_path
+    get_model_registry().clear()
+
+def test_table_equals_the_model(compiled_table):
+    table_path, _ = compiled_table
+    table = load_truth_table('RF', table_path)
+    feature_matrix = all_feature_vectors(0, 1 << TABLE_FEATURE_COUNT, TABLE_FEATURE_COUNT)
+    y_pred, y_proba = predict_matrix('RF', feature_matrix)
+    assert (table.predict(feature_matrix) == y_pred).all()
+    assert np.abs(table.predict_proba(feature_matrix) - y_proba).max() <= 0.5 / truth_table.PROBA_SCALE + 1e-12
+
+def test_table_is_bit_packed(compiled_table):
+    """每个特征向量的预测结果占1位，恶意概率为uint16定点数"""
+    table_path, _ = compiled_table
+    table_dir = get_table_dir('RF', table_path)
+    verdicts = np.load(os.path.join(table_dir, TABLE_VERDICTS_FILE))
+    proba = np.load(os.path.join(table_dir, TABLE_PROBA_FILE))
+    assert verdicts.dtype == np.uint8 and verdicts.nbytes == (1 << TABLE_FEATURE_COUNT) // 8
+    assert proba.dtype == np.uint16 and len(proba) == 1 << TABLE_FEATURE_COUNT
+
+def test_scoring_does_not_import_sklearn(compiled_table):
+    table_path, _ = compiled_table
+    code = (
+        'import sys\n'
+        'import numpy as np\n'
+        'from training.src.truth_table import TruthTable\n'
+        f'table = TruthTable("RF", {table_path!r})\n'
+        f'print(table.predict(np.ones((2, {TABLE_FEATURE_COUNT}), dtype=bool)).tolist())\n'
+        'print(any(name.split(".")[0] == "sklearn" for name in sys.modules))\n'
+    )
+    root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', code], cwd=root_path, capture_output=True, text=True, check=True).stdout.splitlines()
+    y_pred, _ = predict_matrix('RF', np.ones((2, TABLE_FEATURE_COUNT), dtype=bool))
+    assert output == [str(y_pred.tolist()), 'False']
+
+def test_same_content_with_new_mtime_is_fresh(compiled_table):
+    table_path, classifier_path = compiled_table
+    stat = os.stat(classifier_path)
+    os.utime(classifier_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load_truth_table('RF', table_path) is not None
+
+def test_unchanged_model_is_not_hashed(compiled_table, monkeypatch):
+    table_path, _ = compiled_table
+    monkeypatch.setattr(truth_table, 'file_hash', lambda path: pytest.fail('hashed an unchanged model'))
+    assert load_truth_table('RF', table_path) is not None
+
+def test_retrained_model_makes_the_table_stale(compiled_table):
+    table_path, classifier_path = compiled_table
+    with open(classifier_path, 'wb') as f:
+        pickle.dump(train_model('RF', TABLE_FEATURE_COUNT, seed=1)[0], f)
+    assert load_truth_table('RF', table_path) is None
+
+def test_check_catches_a_corrupted_table(compiled_table):
+    """检查时用模型重新预测，而不是与编译时的结果比较"""
+    table_path, _ = compiled_table
+    assert check_truth_table(TruthTable('RF', table_path)) == 0
+    verdicts_path = os.path.join(get_table_dir('RF', table_path), TABLE_VERDICTS_FILE)
+    packed = np.load(verdicts_path)
+    packed[3] ^= 0b100
+    np.save(verdicts_path, packed)
+    assert check_truth_table(TruthTable('RF', table_path)) == 1
+
+def test_check_on_a_dataset(compiled_table):
+    table_path, _ = compiled_table
+    assert check_truth_table_on_matrix(TruthTable('RF', table_path), random_feature_matrix(300, TABLE_FEATURE_COUNT, seed=7)) == 0
+
+def test_feature_order_is_checked(compiled_table):
+    table_path, _ = compiled_table
+    table = load_truth_table('RF', table_path)
+    table.check_feature_names([f'feature{i}' for i in range(TABLE_FEATURE_COUNT)])
+    with pytest.raises(ValueError):
+        table.check_feature_names([f'feature{i}' for i in reversed(range(TABLE_FEATURE_COUNT))])
+
+@pytest.mark.parametrize('no_table', [False, True])
+def test_cli_predict_uses_the_table(compiled_table, tmp_path, monkeypatch, no_table):
+    """cli.py predict在模型已编译为真值表时查表预测，--no-table时加载模型预测，两者结果相同"""
+    import argparse
+    import cli
+    table_path, _ = compiled_table
+    monkeypatch.setattr(cli, 'FEATURES_PATH', str(tmp_path / 'features'))
+    monkeypatch.setattr(cli, 'REPORTS_PATH', str(tmp_path / 'reports'))
+    monkeypatch.setattr(cli.training, 'load_truth_table', lambda model_name: load_truth_table(model_name, table_path))
+    feature_matrix = random_feature_matrix(30, TABLE_FEATURE_COUNT, seed=5)
+    package_names = write_feature_dir(str(tmp_path / 'features' / 'day'), feature_matrix)
+    (tmp_path / 'reports').mkdir()
+    predicted = []
+    monkeypatch.setattr(cli.training, 'predict_matrix', lambda model_name, matrix: predicted.append(len(matrix)) or predict_matrix(model_name, matrix))
+    monkeypatch.setattr(cli, 'args', argparse.Namespace(dataset='day', model='RF', resume=False, parquet=False, no_table=no_table), raising=False)
+    cli.predict_cli()
+    assert predicted == ([30] if no_table else [])
+    y_pred, _ = predict_matrix('RF', feature_matrix)
+    assert list(read_report(str(tmp_path / 'reports' / 'day-RF-report.csv'))) == [[name, verdict] for name, verdict in zip(package_names, y_pred)]
@@ -0,0 +1,85 @@
+import os
+import time
+import json
+import threading
+from datetime import date
+
+import numpy as np
+import pytest
+
+from watch.src import watcher
+from watch.src.watcher import WatchJournal, TarballWatcher, get_dataset_name, get_watched_dataset_names
+from training.src.report import read_report
+from tests.conftest import make_tarball
+
+
+def test_watched_dataset_names():
+    assert get_watched_dataset_names(2, date(2024, 3, 1)) == ['2024-2-29', '2024-3-1']
+
+def test_half_written_journal_line_is_dropped(tmp_path):
+    journal_path = str(tmp_path / 'report.csv.journal')
+    journal = WatchJournal(journal_path)
+    journal.add([{'tarball': 'a-1.0.0.tgz'}, {'tarball': 'b-1.0.0.tgz'}])
+    journal.close()
+    with open(journal_path, 'a') as f:
+        f.write('{"tarball": "c-1')
+
+    journal = WatchJournal(journal_path)
+    assert journal.tarballs == {'a-1.0.0.tgz', 'b-1.0.0.tgz'}
+    journal.add([{'tarball': 'c-1.0.0.tgz'}])
+    journal.close()
+    with open(journal_path) as f:
+        assert [json.loads(line)['tarball'] for line in f] == ['a-1.0.0.tgz', 'b-1.0.0.tgz', 'c-1.0.0.tgz']
+
+
+class CountingPredict:
+    """useEval（第11个特征）为真时预测为恶意"""
+
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, feature_matrix):
+        self.rows += len(feature_matrix)
+        return np.where(feature_matrix[:, 10], 'malicious', 'benign')
+
+@pytest.fixture
+def watch_paths(fake_extractor, tmp_path, monkeypatch):
+    """特征、特征位置与报告写入临时文件夹，返回今天的文件夹"""
+    for name in ['FEATURES_PATH', 'FEATURE_POSITIONS_PATH', 'REPORTS_PATH']:
+        monkeypatch.setattr(watcher, name, str(tmp_path / name.lower()))
+    today_path = tmp_path / 'packages' / get_dataset_name(date.today())
+    today_path.mkdir(parents=True)
+    return today_path
+
+def watch_until(today_path, predict, expected_rows: int) -> dict:
+    """运行监视直到报告中有expected_rows行"""
+    tarball_watcher = TarballWatcher(predict, scratch_path=str(today_path.parent.parent / 'scratch'), poll_interval=0.05, datasets_path=str(today_path.parent))
+    thread = threading.Thread(target=tarball_watcher.run)
+    thread.start()
+    report_path = os.path.join(watcher.REPORTS_PATH, f'{today_path.name}-report.csv')
+    deadline = time.monotonic() + 30
+    try:
+        while time.monotonic() < deadline:
+            if os.path.exists(report_path) and len(list(read_report(report_path))) >= expected_rows:
+                break
+            time.sleep(0.05)
+    finally:
+        tarball_watcher.stop()
+        thread.join(30)
+    assert not thread.is_alive()
+    return {row[0]: row[1] for row in read_report(report_path)}
+
+def test_restart_does_not_rescore(watch_paths):
+    for i in range(3):
+        make_tarball(str(watch_paths), f'pkg{i}', files={'index.js': 'useEval\n' if i == 0 else '1\n'})
+    predict = CountingPredict()
+    assert watch_until(watch_paths, predict, 3) == {'pkg0': 'malicious', 'pkg1': 'benign', 'pkg2': 'benign'}
+    assert predict.rows == 3
+
+    make_tarball(str(watch_paths), 'pkg3')
+    predict = CountingPredict()
+    report = watch_until(watch_paths, predict, 4)
+    assert sorted(report) == ['pkg0', 'pkg1', 'pkg2', 'pkg3']
+    assert predict.rows == 1
+    with open(os.path.join(watcher.REPORTS_PATH, f'{watch_paths.name}-report.csv.journal')) as f:
+        assert sorted(json.loads(line)['tarball'] for line in f) == [f'pkg{i}-1.0.0.tgz' for i in range(4)]
@@ -0,0 +1,57 @@
+import pytest
+
+from extraction.src import worker as worker_module
+from extraction.src.worker import ExtractorWorker, ExtractorError
+from tests.conftest import make_package
+
+
+def test_one_process_answers_many_requests(fake_extractor, tmp_path):
+    dataset_path = str(tmp_path / 'dataset')
+    package_paths = [make_package(dataset_path, f'pkg{i}', f'pkg{i}', files={'index.js': 'useBuffer\n'}) for i in range(3)]
+    with ExtractorWorker() as worker:
+        pid = worker.process.pid
+        assert worker.list_packages(dataset_path) == package_paths
+        for i, package_path in enumerate(package_paths):
+            result = worker.analyze(package_path, str(tmp_path / 'features'))
+            assert result['packageName'] == f'pkg{i}@1.0.0'
+            assert dict(result['features'])['useBuffer'] is True
+            assert result['csvPath'] == str(tmp_path / 'features' / f'pkg{i}.csv')
+        assert worker.process.pid == pid
+        assert worker.next_id == 4
+    assert worker.process is None or worker.process.poll() is not None
+
+def test_failed_request_keeps_the_process(fake_extractor, tmp_path):
+    with ExtractorWorker() as worker:
+        with pytest.raises(ExtractorError):
+            worker.analyze(str(tmp_path / 'missing'))
+        assert worker.process.poll() is None
+        package_path = make_package(str(tmp_path), 'ok', 'ok')
+        assert worker.analyze(package_path)['packageName'] == 'ok@1.0.0'
+
+def test_request_to_a_stopped_worker(fake_extractor):
+    worker = ExtractorWorker()
+    with pytest.raises(ExtractorError):
+        worker.list_packages('/')
+
+def test_extractor_is_built_only_when_sources_change(tmp_path, monkeypatch):
+    """dist/main.js已由相同源码构建时不再运行webpack"""
+    source_path = tmp_path / 'feature-extract'
+    (source_path / 'src').mkdir(parents=True)
+    (source_path / 'src' / 'index.ts').write_text('main()\n')
+    (source_path / 'dist').mkdir()
+    builds = []
+    monkeypatch.setattr(worker_module, 'FEATURE_EXTRACT_PATH', str(source_path))
+    monkeypatch.setattr(worker_module, 'EXTRACTOR_BUNDLE_PATH', str(source_path / 'dist' / 'main.js'))
+    monkeypatch.setattr(worker_module, 'EXTRACTOR_SOURCE_HASH_PATH', str(source_path / 'dist' / '.source-hash'))
+    monkeypatch.setattr(worker_module, 'build_extractor', lambda: builds.append(1) or (source_path / 'dist' / 'main.js').write_text(''))
+
+    worker_module.ensure_extractor_built()
+    worker_module.ensure_extractor_built()
+    assert len(builds) == 1
+    (source_path / 'src' / 'index.ts').write_text('main(true)\n')
+    worker_module.ensure_extractor_built()
+    assert len(builds) == 2
+    # 与源码无关的文件不影响构建
+    (source_path / 'README.md').write_text('docs\n')
+    worker_module.ensure_extractor_built()
+    assert len(builds) == 2
@@ -1,13 +1,64 @@
-from .src.train_classifier import PreprocessMethodEnum, ModelEnum, ActionEnum, train
-from .src.predict import predict_package_MLP, predict_package_NB, predict_package_SVM, predict_package_RF
-
-__all__ = [
-    'PreprocessMethodEnum',
-    'ModelEnum',
-    'ActionEnum',
-    'train',
-    'predict_package_MLP',
-    'predict_package_NB',
-    'predict_package_SVM',
-    'predict_package_RF'
-]
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING
+
+# 导出的名称及其所在模块，使用时才导入（PEP 562），只用到真值表或特征读取时不会导入sklearn
+_EXPORTS = {
+    'PreprocessMethodEnum': '.src.train_classifier',
+    'ModelEnum': '.src.train_classifier',
+    'ActionEnum': '.src.train_classifier',
+    'train': '.src.train_classifier',
+    'predict_package': '.src.predict',
+    'predict_matrix': '.src.predict',
+    'predict_dataset': '.src.predict',
+    'predict_package_MLP': '.src.predict',
+    'predict_package_NB': '.src.predict',
+    'predict_package_SVM': '.src.predict',
+    'predict_package_RF': '.src.predict',
+    'read_feature_matrix': '.src.read_feature',
+    'pack_feature_dir': '.src.read_feature',
+    'FeatureStore': '.src.feature_store',
+    'is_feature_store': '.src.feature_store',
+    'ModelRegistry': '.src.model_registry',
+    'get_model_registry': '.src.model_registry',
+    'get_model': '.src.model_registry',
+    'TruthTable': '.src.truth_table',
+    'load_truth_table': '.src.truth_table',
+    'score_dataset': '.src.truth_table',
+    'get_dataset_feature_names': '.src.truth_table',
+    'compile_truth_table': '.src.compile_model',
+    'check_truth_table': '.src.compile_model',
+    'check_truth_table_on_matrix': '.src.compile_model',
+    'CHECK_SAMPLE_SIZE': '.src.compile_model',
+    'ReportWriter': '.src.report',
+    'read_report': '.src.report',
+    'write_predictions': '.src.report',
+    'evaluate': '.src.evaluation',
+    'threshold_sweep': '.src.evaluation',
+    'bootstrap_ci': '.src.evaluation',
+    'EnsembleScorer': '.src.ensemble'
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .src.train_classifier import PreprocessMethodEnum, ModelEnum, ActionEnum, train
+    from .src.predict import predict_package, predict_matrix, predict_dataset, predict_package_MLP, predict_package_NB, predict_package_SVM, predict_package_RF
+    from .src.read_feature import read_feature_matrix, pack_feature_dir
+    from .src.feature_store import FeatureStore, is_feature_store
+    from .src.model_registry import ModelRegistry, get_model_registry, get_model
+    from .src.truth_table import TruthTable, load_truth_table, score_dataset, get_dataset_feature_names
+    from .src.compile_model import compile_truth_table, check_truth_table, check_truth_table_on_matrix, CHECK_SAMPLE_SIZE
+    from .src.report import ReportWriter, read_report, write_predictions
+    from .src.evaluation import evaluate, threshold_sweep, bootstrap_ci
+    from .src.ensemble import EnsembleScorer
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,7 +1,5 @@
 import os
 
-from sklearn.metrics import accuracy_score, f1_score, make_scorer, matthews_corrcoef, precision_score, recall_score
-
 from conf.settings import MODELS_PATH
 
 
@@ -26,10 +24,10 @@ mlp_scaler_save_path = os.path.join(scaler_save_path, 'MLP_scaler.pkl')
 nb_scaler_save_path = os.path.join(scaler_save_path, 'NB_scaler.pkl')
 svm_scaler_save_path = os.path.join(scaler_save_path, 'SVM_scaler.pkl')
 
-scoring = {
-    "prec": make_scorer(precision_score, pos_label="malicious"),
-    "accu": make_scorer(accuracy_score),
-    "rec": make_scorer(recall_score, pos_label="malicious"),
-    "f1": make_scorer(f1_score, pos_label="malicious"),
-    "matt_cor": make_scorer(matthews_corrcoef)
-}
\ No newline at end of file
+# 预测时使用的模型与scaler路径，RF预测时不做数据预处理
+model_file_paths = {
+    'MLP': (MLP_path, mlp_scaler_save_path),
+    'NB': (nb_path, nb_scaler_save_path),
+    'SVM': (svm_path, svm_scaler_save_path),
+    'RF': (rf_classifier_path, None)
+}
@@ -0,0 +1,128 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .model_registry import get_model
+from .predict import predict_matrix
+from .commons import model_file_paths
+from .pickle_util import file_hash
+from .truth_table import TruthTable, MAX_TABLE_FEATURES, PROBA_SCALE, get_table_dir, write_truth_table, all_feature_vectors
+from conf.settings import MODEL_TABLES_PATH, SEARCH_WORKERS
+
+
+# 编译真值表时每个任务预测的特征向量数
+COMPILE_CHUNK_SIZE = 1 << 16
+
+# 编译后由模型重新预测、与真值表比较的特征向量数
+CHECK_SAMPLE_SIZE = 1 << 16
+
+
+def _predict_chunk(model_name: str, start: int, stop: int, feature_count: int) -> list:
+    """预测下标在[start, stop)内的所有特征向量"""
+    model = get_model(model_name)
+    classifier = model.classifier
+    feature_matrix = model.transform(all_feature_vectors(start, stop, feature_count))
+    verdicts = classifier.predict(feature_matrix) == 'malicious'
+    proba = None
+    if hasattr(classifier, 'predict_proba'):
+        proba = classifier.predict_proba(feature_matrix)[:, list(classifier.classes_).index('malicious')]
+    return [start, verdicts, proba]
+
+def predict_all(model_name: str, feature_count: int, workers: int = None, chunk_size: int = COMPILE_CHUNK_SIZE) -> list:
+    """
+    使用模型预测所有可能的特征向量
+    :return: [是否恶意数组, 恶意概率数组（模型不支持predict_proba时为None）]，第i项对应下标为i的特征向量
+    """
+    n_rows = 1 << feature_count
+    verdicts = np.empty(n_rows, dtype=bool)
+    proba = None
+    with ProcessPoolExecutor(max_workers=workers or SEARCH_WORKERS) as executor:
+        futures = [executor.submit(_predict_chunk, model_name, start, min(start + chunk_size, n_rows), feature_count) for start in range(0, n_rows, chunk_size)]
+        for future in futures:
+            start, chunk_verdicts, chunk_proba = future.result()
+            verdicts[start:start + len(chunk_verdicts)] = chunk_verdicts
+            if chunk_proba is not None:
+                if proba is None:
+                    proba = np.empty(n_rows, dtype=np.float64)
+                proba[start:start + len(chunk_proba)] = chunk_proba
+    return [verdicts, proba]
+
+def source_stamp(file_path: str) -> dict:
+    """模型文件的文件名、mtime、大小与hash，加载真值表时据此判断模型是否变化"""
+    stat = os.stat(file_path)
+    return {'file': os.path.basename(file_path), 'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': file_hash(file_path)}
+
+def compile_truth_table(model_name: str, feature_names: list = None, table_path: str = MODEL_TABLES_PATH, workers: int = None) -> TruthTable:
+    """
+    将模型（包括scaler）编译为真值表，编译后由模型重新预测（抽样的）特征向量，检查与真值表是否一致
+    :param model_name: 模型名
+    :param feature_names: 特征名，用于预测时检查特征顺序，None表示不检查
+    :param table_path: 真值表文件夹路径
+    :param workers: 并行预测的进程数，None表示使用SEARCH_WORKERS
+    :return: 真值表
+    """
+    model = get_model(model_name)
+    classifier = model.classifier
+    feature_count = classifier.n_features_in_
+    if feature_count > MAX_TABLE_FEATURES:
+        raise ValueError(f'{model_name} has {feature_count} features, a truth table supports at most {MAX_TABLE_FEATURES}')
+    if feature_names is not None and len(feature_names) != feature_count:
+        raise ValueError(f'{model_name} has {feature_count} features, got {len(feature_names)} feature names')
+    if 'malicious' not in classifier.classes_ or len(classifier.classes_) != 2:
+        raise ValueError(f'{model_name} is not a malicious/benign classifier')
+    classifier_path, scaler_path = model_file_paths[model_name]
+    header = {
+        'model_name': model_name,
+        'feature_count': feature_count,
+        'feature_names': feature_names,
+        'classes': [str(label) for label in classifier.classes_ if label != 'malicious'] + ['malicious'],
+        'sources': {
+            'classifier': source_stamp(classifier_path),
+            'scaler': None if scaler_path is None else source_stamp(scaler_path)
+        }
+    }
+
+    verdicts, proba = predict_all(model_name, feature_count, workers)
+    table_dir = get_table_dir(model_name, table_path)
+    write_truth_table(table_dir, verdicts, proba, header)
+
+    table = TruthTable(model_name, table_path)
+    mismatches = check_truth_table(table)
+    if mismatches > 0:
+        raise ValueError(f'Truth table of {model_name} disagrees with the model on {mismatches} feature vectors')
+    return table
+
+def check_truth_table(table: TruthTable, sample_size: int = CHECK_SAMPLE_SIZE, seed: int = 0) -> int:
+    """
+    使用已加载的模型重新预测特征向量，检查真值表与模型的预测结果是否一致
+    所有特征向量不超过sample_size个时逐项检查，否则检查随机抽取的特征向量（以及全0与全1）；
+    预测结果必须完全一致，恶意概率的误差不能超过定点数的精度
+    :param sample_size: 检查的特征向量数
+    :param seed: 抽样的随机种子
+    :return: 不一致的特征向量数
+    """
+    n_rows = 1 << table.feature_count
+    if n_rows <= sample_size:
+        index = np.arange(n_rows, dtype=np.uint32)
+    else:
+        sample = np.random.default_rng(seed).integers(0, n_rows, size=sample_size - 2, dtype=np.uint32)
+        index = np.unique(np.concatenate([np.array([0, n_rows - 1], dtype=np.uint32), sample]))
+    feature_matrix = ((index[:, None] >> np.arange(table.feature_count, dtype=np.uint32)) & 1).astype(bool)
+    y_pred, y_proba = predict_matrix(table.model_name, feature_matrix)
+    mismatch = table.predict(feature_matrix) != y_pred
+    if y_proba is not None:
+        mismatch |= np.abs(table.predict_proba(feature_matrix) - y_proba) > 0.5 / PROBA_SCALE + 1e-12
+    return int(mismatch.sum())
+
+def check_truth_table_on_matrix(table: TruthTable, feature_matrix) -> int:
+    """
+    使用模型与真值表预测同一特征矩阵（如某个数据集），检查两者的预测结果是否一致
+    :return: 预测结果不一致的包数量
+    """
+    model = get_model(table.model_name)
+    feature_matrix = np.asarray(feature_matrix, dtype=bool)
+    if feature_matrix.shape[0] == 0:
+        return 0
+    y_pred = model.classifier.predict(model.transform(feature_matrix))
+    return int((table.predict(feature_matrix) != y_pred).sum())
@@ -0,0 +1,31 @@
+import numpy as np
+from sklearn.utils.validation import has_fit_parameter
+
+
+def dedupe_rows(X, y) -> list:
+    """
+    将特征向量与标签都相同的行合并为一行
+    :param X: 特征矩阵（可以是预处理后的矩阵）
+    :param y: 标签
+    :return: [每组第一行的行号（按行号排序）, 每组的行数]
+    """
+    X = np.ascontiguousarray(X)
+    y = np.asarray(y)
+    if X.shape[0] == 0:
+        return [np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.int64)]
+    _, label_codes = np.unique(y, return_inverse=True)
+    keys = np.concatenate([X.reshape(X.shape[0], -1).view(np.uint8), label_codes.astype('<u4').view(np.uint8).reshape(-1, 4)], axis=1)
+    keys = np.ascontiguousarray(keys).view(np.dtype((np.void, keys.shape[1]))).ravel()
+    _, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    counts = np.bincount(inverse.ravel(), minlength=len(first_index))
+    order = np.argsort(first_index, kind='stable')
+    return [first_index[order], counts[order]]
+
+def supports_sample_weight(model) -> bool:
+    """模型训练时是否支持样本权重，MLPClassifier不支持"""
+    return has_fit_parameter(model, 'sample_weight')
+
+def print_dedupe_summary(n_rows: int, n_unique: int):
+    """打印去重前后的行数与压缩比"""
+    ratio = n_rows / n_unique if n_unique > 0 else 1.0
+    print(f'Deduplicated {n_rows} rows into {n_unique} unique (vector, label) rows, compression ratio {ratio:.1f}x')
@@ -0,0 +1,115 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .model_registry import get_model
+from .predict import predict_matrix
+from .truth_table import load_truth_table
+from conf.settings import ENSEMBLE_VOTES
+
+
+class EnsembleScorer:
+    """
+    多个模型一起预测同一个特征矩阵
+    每个模型只加载一次（已编译为真值表的模型直接查表），每块特征矩阵由各模型在线程池中同时预测，
+    再按投票方式合并为集成结果：
+    - majority：投恶意票的模型比例不低于阈值
+    - any：任一模型预测为恶意
+    - all：所有模型都预测为恶意
+    - mean-proba：各模型恶意概率的平均值不低于阈值，不支持predict_proba的模型以预测结果作为0或1的概率
+    """
+
+    def __init__(self, model_names: list, vote: str = 'majority', threshold: float = 0.5, use_table: bool = True, workers: int = None):
+        """
+        :param model_names: 模型名列表
+        :param vote: 投票方式，见ENSEMBLE_VOTES
+        :param threshold: majority与mean-proba的阈值
+        :param use_table: 模型已编译为真值表时是否查表预测
+        :param workers: 同时预测的模型数，None表示模型数量，1表示依次预测
+        """
+        if vote not in ENSEMBLE_VOTES:
+            raise ValueError(f'Unknown vote {vote}, expected one of {ENSEMBLE_VOTES}')
+        self.model_names = list(model_names)
+        self.vote = vote
+        self.threshold = threshold
+        self.tables = {}
+        for model_name in self.model_names:
+            table = load_truth_table(model_name) if use_table else None
+            if table is not None:
+                self.tables[model_name] = table
+            else:
+                # 预先加载模型与标准化器，预测时不再加载
+                get_model(model_name)
+        workers = workers or len(self.model_names)
+        self._executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    @property
+    def columns(self) -> list:
+        """报告的列：包名、各模型的预测结果与恶意概率、集成结果"""
+        return ['package name'] + [f'{model_name} predict' for model_name in self.model_names] + [f'{model_name} probability' for model_name in self.model_names] + ['ensemble']
+
+    def check_feature_names(self, feature_names: list):
+        """特征的顺序必须与编译真值表时一致，不一致时抛出ValueError"""
+        for table in self.tables.values():
+            table.check_feature_names(feature_names)
+
+    def _score_model(self, model_name: str, feature_matrix) -> list:
+        table = self.tables.get(model_name)
+        if table is not None:
+            return table.score(feature_matrix)
+        return predict_matrix(model_name, feature_matrix)
+
+    def score_models(self, feature_matrix) -> dict:
+        """
+        :return: 模型名到[预测结果数组, 恶意概率数组（模型不支持predict_proba时为None）]的映射
+        """
+        if self._executor is None:
+            return {model_name: self._score_model(model_name, feature_matrix) for model_name in self.model_names}
+        futures = {model_name: self._executor.submit(self._score_model, model_name, feature_matrix) for model_name in self.model_names}
+        return {model_name: future.result() for model_name, future in futures.items()}
+
+    def combine(self, results: dict) -> np.ndarray:
+        """
+        按投票方式合并各模型的结果
+        :param results: score_models的返回值
+        :return: 每个包是否被集成预测为恶意
+        """
+        votes = np.array([y_pred == 'malicious' for y_pred, _ in results.values()])
+        if self.vote == 'any':
+            return votes.any(axis=0)
+        if self.vote == 'all':
+            return votes.all(axis=0)
+        if self.vote == 'majority':
+            return votes.mean(axis=0) >= self.threshold
+        probas = np.array([y_proba if y_proba is not None else vote.astype(np.float64) for (_, y_proba), vote in zip(results.values(), votes)])
+        return probas.mean(axis=0) >= self.threshold
+
+    def score(self, feature_matrix) -> list:
+        """:return: [各模型的结果（同score_models）, 集成预测结果数组]"""
+        results = self.score_models(feature_matrix)
+        malicious = self.combine(results)
+        return [results, np.where(malicious, 'malicious', 'benign')]
+
+    def rows(self, feature_matrix) -> list:
+        """
+        预测一块特征矩阵，用于write_predictions
+        :return: 每个包的(各模型预测结果..., 各模型恶意概率..., 集成结果)，不支持predict_proba的模型概率为空
+        """
+        results, y_vote = self.score(feature_matrix)
+        columns = [results[model_name][0] for model_name in self.model_names]
+        for model_name in self.model_names:
+            y_proba = results[model_name][1]
+            columns.append([''] * len(y_vote) if y_proba is None else [f'{proba:.4f}' for proba in y_proba])
+        columns.append(y_vote)
+        return list(zip(*columns))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,116 @@
+import numpy as np
+
+
+# 正类（恶意包）的标签
+POSITIVE_LABEL = 'malicious'
+
+# 指标名，与超参数搜索结果表的scoring键一致
+METRIC_NAMES = ['accu', 'prec', 'rec', 'f1', 'matt_cor']
+
+# bootstrap默认的重采样次数与置信水平
+BOOTSTRAP_RESAMPLES = 1000
+BOOTSTRAP_CONFIDENCE = 0.95
+
+
+def _safe_divide(numerator, denominator):
+    """分母为0时结果为0，与sklearn的zero_division默认行为一致（不产生警告）"""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    denominator = np.asarray(denominator, dtype=np.float64)
+    result = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=result, where=denominator != 0)
+    return result
+
+def confusion_counts(y_true, y_pred, sample_weight=None, pos_label: str = POSITIVE_LABEL) -> list:
+    """
+    一次计算二分类的混淆矩阵
+    :param y_true: 实际标签
+    :param y_pred: 预测标签
+    :param sample_weight: 样本权重，None表示每个样本权重为1
+    :return: [TP, FP, TN, FN]
+    """
+    cell = 2 * (np.asarray(y_true) == pos_label) + (np.asarray(y_pred) == pos_label)
+    # cell: 0 = TN, 1 = FP, 2 = FN, 3 = TP
+    TN, FP, FN, TP = np.bincount(cell.ravel(), weights=sample_weight, minlength=4)
+    if sample_weight is None:
+        return [int(TP), int(FP), int(TN), int(FN)]
+    return [float(TP), float(FP), float(TN), float(FN)]
+
+def metrics_from_confusion(TP, FP, TN, FN) -> dict:
+    """
+    由混淆矩阵计算所有指标，参数可以是数组（如每个阈值或每次重采样的混淆矩阵），按元素计算
+    :return: 指标名到指标值（或数组）的字典，指标名见METRIC_NAMES
+    """
+    TP, FP, TN, FN = (np.asarray(count, dtype=np.float64) for count in (TP, FP, TN, FN))
+    precision = _safe_divide(TP, TP + FP)
+    recall = _safe_divide(TP, TP + FN)
+    # MCC = (TP*TN - FP*FN) / sqrt((TP+FP)(TP+FN)(TN+FP)(TN+FN))，分母为0时为0
+    mcc_denominator = np.sqrt((TP + FP) * (TP + FN) * (TN + FP) * (TN + FN))
+    return {
+        'accu': _safe_divide(TP + TN, TP + FP + TN + FN),
+        'prec': precision,
+        'rec': recall,
+        'f1': _safe_divide(2 * TP, 2 * TP + FP + FN),
+        'matt_cor': _safe_divide(TP * TN - FP * FN, mcc_denominator)
+    }
+
+def evaluate(y_true, y_pred, sample_weight=None, pos_label: str = POSITIVE_LABEL) -> dict:
+    """
+    由一个混淆矩阵计算所有指标
+    :return: 指标名到指标值的字典，另包括TP、FP、TN、FN
+    """
+    TP, FP, TN, FN = confusion_counts(y_true, y_pred, sample_weight, pos_label)
+    metrics = {name: float(value) for name, value in metrics_from_confusion(TP, FP, TN, FN).items()}
+    return dict(metrics, TP=TP, FP=FP, TN=TN, FN=FN)
+
+def score_model(model, X, y, sample_weight=None) -> list:
+    """
+    预测一次并计算所有指标，代替为每个指标分别调用一次scorer
+    :return: 按METRIC_NAMES顺序的指标值
+    """
+    metrics = evaluate(y, model.predict(X), sample_weight)
+    return [metrics[name] for name in METRIC_NAMES]
+
+def threshold_sweep(y_true, y_score, sample_weight=None, pos_label: str = POSITIVE_LABEL) -> dict:
+    """
+    在所有判定阈值上计算指标，恶意概率不小于阈值即预测为恶意
+    按恶意概率从大到小排序一次，累加得到每个阈值的混淆矩阵
+    :param y_true: 实际标签
+    :param y_score: 恶意概率（predict_proba中恶意类的一列）
+    :return: 'threshold'为从大到小的不同阈值，其余为每个阈值对应的指标数组与TP、FP、TN、FN数组
+    """
+    y_score = np.asarray(y_score, dtype=np.float64).ravel()
+    positive = (np.asarray(y_true) == pos_label).ravel()
+    weight = np.ones(len(y_score), dtype=np.int64) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    order = np.argsort(-y_score, kind='stable')
+    y_score = y_score[order]
+    positive = positive[order]
+    weight = weight[order]
+    # 相同概率的样本一起被判定，只取每组概率的最后一个位置
+    last = np.r_[np.flatnonzero(np.diff(y_score)), len(y_score) - 1] if len(y_score) > 0 else np.zeros(0, dtype=np.intp)
+    TP = np.cumsum(weight * positive)[last]
+    FP = np.cumsum(weight * ~positive)[last]
+    total_positive = np.sum(weight * positive)
+    total_negative = np.sum(weight * ~positive)
+    FN = total_positive - TP
+    TN = total_negative - FP
+    return dict(metrics_from_confusion(TP, FP, TN, FN), threshold=y_score[last], TP=TP, FP=FP, TN=TN, FN=FN)
+
+def bootstrap_ci(y_true, y_pred, n_resamples: int = BOOTSTRAP_RESAMPLES, confidence: float = BOOTSTRAP_CONFIDENCE, random_state=None, pos_label: str = POSITIVE_LABEL) -> dict:
+    """
+    指标的bootstrap百分位置信区间
+    指标只取决于混淆矩阵，有放回地重采样n行等价于从混淆矩阵四格的比例做多项分布抽样，
+    因此所有重采样一次抽出，代价与样本数无关
+    :param n_resamples: 重采样次数
+    :param confidence: 置信水平
+    :param random_state: 随机种子
+    :return: 指标名到(下界, 上界)的字典
+    """
+    TP, FP, TN, FN = confusion_counts(y_true, y_pred, pos_label=pos_label)
+    n = TP + FP + TN + FN
+    if n == 0:
+        return {name: (0.0, 0.0) for name in METRIC_NAMES}
+    rng = np.random.default_rng(random_state)
+    samples = rng.multinomial(n, np.array([TP, FP, TN, FN]) / n, size=n_resamples)
+    metrics = metrics_from_confusion(samples[:, 0], samples[:, 1], samples[:, 2], samples[:, 3])
+    alpha = (1 - confidence) / 2
+    return {name: tuple(float(bound) for bound in np.quantile(metrics[name], [alpha, 1 - alpha])) for name in METRIC_NAMES}
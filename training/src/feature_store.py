@@ -0,0 +1,102 @@
+import os
+import json
+
+import numpy as np
+
+
+# 打包后的特征文件
+STORE_MATRIX_FILE = 'features.npy'
+STORE_NAMES_FILE = 'names.txt'
+STORE_HEADER_FILE = 'header.json'
+
+STORE_VERSION = 1
+
+
+def is_feature_store(dirPath: str) -> bool:
+    """文件夹中是否存在打包后的特征"""
+    return os.path.isfile(os.path.join(dirPath, STORE_HEADER_FILE))
+
+def write_feature_store(dirPath: str, feature_matrix, package_names: list, feature_names: list):
+    """
+    将特征矩阵按位打包后写入文件夹
+    header最后写入，header存在即表示打包完成
+    :param dirPath: 打包后的特征所在文件夹
+    :param feature_matrix: 特征矩阵，每行对应一个包
+    :param package_names: 每行对应的包名
+    :param feature_names: 特征名
+    """
+    feature_matrix = np.asarray(feature_matrix, dtype=bool).reshape(len(package_names), len(feature_names))
+    os.makedirs(dirPath, exist_ok=True)
+    header_path = os.path.join(dirPath, STORE_HEADER_FILE)
+    if os.path.exists(header_path):
+        os.remove(header_path)
+
+    matrix_path = os.path.join(dirPath, STORE_MATRIX_FILE)
+    with open(matrix_path + '.tmp', 'wb') as f:
+        np.save(f, np.packbits(feature_matrix, axis=1))
+    os.replace(matrix_path + '.tmp', matrix_path)
+
+    names_path = os.path.join(dirPath, STORE_NAMES_FILE)
+    with open(names_path + '.tmp', 'w') as f:
+        for package_name in package_names:
+            f.write(package_name + '\n')
+    os.replace(names_path + '.tmp', names_path)
+
+    with open(header_path + '.tmp', 'w') as f:
+        json.dump({
+            'version': STORE_VERSION,
+            'feature_names': list(feature_names),
+            'package_number': len(package_names)
+        }, f)
+    os.replace(header_path + '.tmp', header_path)
+
+
+class FeatureStore:
+    """
+    打包后的特征
+    特征矩阵按位打包后以.npy保存并通过mmap读取，包名与特征名只保存一次
+    """
+
+    def __init__(self, dirPath: str):
+        self.dirPath = dirPath
+        with open(os.path.join(dirPath, STORE_HEADER_FILE)) as f:
+            header = json.load(f)
+        if header['version'] != STORE_VERSION:
+            raise ValueError(f'Unsupported feature store version {header["version"]} in {dirPath}')
+        self.feature_names = header['feature_names']
+        self.packed = np.load(os.path.join(dirPath, STORE_MATRIX_FILE), mmap_mode='r')
+        if self.packed.shape[0] != header['package_number']:
+            raise ValueError(f'Broken feature store in {dirPath}')
+        self._package_names = None
+        self._index = None
+
+    def __len__(self):
+        return self.packed.shape[0]
+
+    @property
+    def package_names(self) -> list:
+        """每行对应的包名"""
+        if self._package_names is None:
+            with open(os.path.join(self.dirPath, STORE_NAMES_FILE)) as f:
+                self._package_names = f.read().splitlines()
+        return self._package_names
+
+    @property
+    def index(self) -> dict:
+        """包名到行号的映射"""
+        if self._index is None:
+            self._index = {package_name: row for row, package_name in enumerate(self.package_names)}
+        return self._index
+
+    def matrix(self, rows=None):
+        """
+        解包特征矩阵
+        :param rows: 需要的行，None表示全部
+        :return: numpy bool特征矩阵
+        """
+        packed = self.packed if rows is None else self.packed[rows]
+        return np.unpackbits(packed, axis=-1, count=len(self.feature_names)).astype(bool)
+
+    def get(self, package_name: str):
+        """获取单个包的特征向量"""
+        return self.matrix(self.index[package_name])
@@ -0,0 +1,204 @@
+import os
+import sys
+import time
+import threading
+
+import numpy as np
+
+from .pickle_util import load_classifier, load_scaler, file_hash
+from .commons import model_file_paths
+
+
+# 两次检查模型文件是否变化的最小间隔（秒）
+CHECK_INTERVAL = 1.0
+
+# 模型未被使用超过该时间（秒）后被移出缓存
+MAX_IDLE_TIME = 30 * 60
+
+
+def estimate_size(obj) -> int:
+    """
+    估算对象常驻内存的大小
+    递归统计numpy数组、容器以及对象状态（__getstate__/__dict__）占用的字节数
+    :param obj: 待估算的对象
+    :return: 字节数
+    """
+    # 保留已访问对象的引用，避免__getstate__生成的临时对象被回收后id被复用
+    seen = {}
+    stack = [obj]
+    size = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen[id(item)] = item
+        if isinstance(item, np.ndarray):
+            size += item.nbytes + sys.getsizeof(np.empty(0))
+            if item.dtype == object:
+                stack.extend(item.ravel())
+            continue
+        size += sys.getsizeof(item)
+        if isinstance(item, (str, bytes, int, float, bool, type(None))):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        else:
+            # sklearn的Tree等Cython对象只能通过__getstate__拿到内部数组
+            state = None
+            if hasattr(item, '__getstate__'):
+                try:
+                    state = item.__getstate__()
+                except Exception:
+                    state = None
+            if state is None:
+                state = getattr(item, '__dict__', None)
+            if state is not None:
+                stack.append(state)
+    return size
+
+
+class _FileStamp:
+    """记录模型文件的mtime、大小与hash，用于判断文件是否被替换"""
+
+    def __init__(self, file_path: str):
+        stat = os.stat(file_path)
+        self.file_path = file_path
+        self.mtime = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.hash = file_hash(file_path)
+
+    def changed(self) -> bool:
+        """mtime或大小变化时再比较hash，只有内容变化才算作改变"""
+        stat = os.stat(self.file_path)
+        if stat.st_mtime_ns == self.mtime and stat.st_size == self.size:
+            return False
+        new_hash = file_hash(self.file_path)
+        self.mtime = stat.st_mtime_ns
+        self.size = stat.st_size
+        if new_hash == self.hash:
+            return False
+        self.hash = new_hash
+        return True
+
+
+class LoadedModel:
+    """已加载的分类器及其scaler"""
+
+    def __init__(self, model_name: str, classifier_path: str, scaler_path: str = None):
+        self.model_name = model_name
+        self.classifier_path = classifier_path
+        self.scaler_path = scaler_path
+        start = time.perf_counter()
+        self.classifier_stamp = _FileStamp(classifier_path)
+        self.classifier = load_classifier(classifier_path)
+        self.scaler_stamp = None
+        self.scaler = None
+        if scaler_path is not None:
+            self.scaler_stamp = _FileStamp(scaler_path)
+            self.scaler = load_scaler(scaler_path)
+        self.load_time = time.perf_counter() - start
+        self.size = estimate_size(self.classifier) + (estimate_size(self.scaler) if self.scaler is not None else 0)
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.last_checked = time.monotonic()
+        self.hits = 0
+
+    def changed(self) -> bool:
+        """分类器或scaler文件内容是否发生变化"""
+        if self.classifier_stamp.changed():
+            return True
+        return self.scaler_stamp is not None and self.scaler_stamp.changed()
+
+    def transform(self, feature_vecs):
+        """使用scaler对特征向量做预处理，没有scaler时原样返回"""
+        if self.scaler is None:
+            return feature_vecs
+        return self.scaler.transform(feature_vecs)
+
+
+class ModelRegistry:
+    """
+    进程内的模型缓存
+    每个模型及其scaler只加载一次，模型文件变化时重新加载，长时间未使用的模型被移出缓存
+    """
+
+    def __init__(self, model_paths: dict = model_file_paths, check_interval: float = CHECK_INTERVAL, max_idle_time: float = MAX_IDLE_TIME):
+        """
+        :param model_paths: 模型名到(分类器路径, scaler路径)的映射，scaler路径为None时不做预处理
+        :param check_interval: 检查模型文件是否变化的最小间隔（秒）
+        :param max_idle_time: 模型未被使用超过该时间（秒）后被移出缓存，None表示不移出
+        """
+        self.model_paths = model_paths
+        self.check_interval = check_interval
+        self.max_idle_time = max_idle_time
+        self.models = {}
+        self.load_count = {}
+        self.lock = threading.Lock()
+
+    def get(self, model_name: str) -> LoadedModel:
+        """获取已加载的模型，必要时加载或重新加载"""
+        if model_name not in self.model_paths:
+            raise ValueError(f'Unknown model: {model_name}')
+        with self.lock:
+            self.evict_idle()
+            model = self.models.get(model_name)
+            now = time.monotonic()
+            if model is not None and now - model.last_checked >= self.check_interval:
+                model.last_checked = now
+                if model.changed():
+                    model = None
+            if model is None:
+                classifier_path, scaler_path = self.model_paths[model_name]
+                model = LoadedModel(model_name, classifier_path, scaler_path)
+                self.models[model_name] = model
+                self.load_count[model_name] = self.load_count.get(model_name, 0) + 1
+            else:
+                model.hits += 1
+            model.last_used = time.time()
+            return model
+
+    def evict_idle(self):
+        """移出长时间未使用的模型"""
+        if self.max_idle_time is None:
+            return
+        now = time.time()
+        for model_name in [name for name, model in self.models.items() if now - model.last_used > self.max_idle_time]:
+            del self.models[model_name]
+
+    def clear(self):
+        """清空缓存"""
+        with self.lock:
+            self.models.clear()
+
+    def stats(self) -> list:
+        """每个已加载模型的加载耗时、常驻内存大小与命中次数"""
+        with self.lock:
+            return [{
+                'model': model.model_name,
+                'load_time': model.load_time,
+                'size': model.size,
+                'loads': self.load_count.get(model.model_name, 0),
+                'hits': model.hits,
+                'last_used': model.last_used
+            } for model in self.models.values()]
+
+    def report(self) -> str:
+        """模型加载情况的文本报告"""
+        lines = []
+        for stat in self.stats():
+            lines.append(f"{stat['model']}: loaded {stat['loads']} time(s) in {stat['load_time']:.3f}s, {stat['size'] / 1024 / 1024:.2f} MiB resident, {stat['hits']} hit(s)")
+        return '\n'.join(lines)
+
+
+_registry = ModelRegistry()
+
+def get_model_registry() -> ModelRegistry:
+    """进程内共享的模型缓存"""
+    return _registry
+
+def get_model(model_name: str) -> LoadedModel:
+    """从共享的模型缓存中获取模型"""
+    return _registry.get(model_name)
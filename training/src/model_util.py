@@ -1,11 +1,7 @@
-from sklearn.metrics import accuracy_score, f1_score, matthews_corrcoef, precision_score, recall_score
+from .evaluation import evaluate
 
 
 def evaluate_model(y_test, y_pred):
-   """模型评估"""
-   acc = accuracy_score(y_test, y_pred)
-   precision = precision_score(y_test, y_pred, pos_label="malicious")
-   recall = recall_score(y_test, y_pred, pos_label="malicious")
-   f1 = f1_score(y_test, y_pred, pos_label="malicious")
-   mcc = matthews_corrcoef(y_test, y_pred)
-   return [acc, precision, recall, f1, mcc]
\ No newline at end of file
+   """模型评估，所有指标由同一个混淆矩阵计算"""
+   metrics = evaluate(y_test, y_pred)
+   return [metrics['accu'], metrics['prec'], metrics['rec'], metrics['f1'], metrics['matt_cor']]
\ No newline at end of file
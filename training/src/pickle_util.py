@@ -1,4 +1,5 @@
 import pickle
+import hashlib
 
 
 def save_classifier(classifier, file_path):
@@ -15,4 +16,12 @@ def save_scaler(scaler, scaler_save_path):
 
 def load_scaler(scaler_save_path):
    with open(scaler_save_path, "rb") as f:
-      return pickle.load(f)
\ No newline at end of file
+      return pickle.load(f)
+
+def file_hash(file_path: str) -> str:
+   """计算文件的sha256"""
+   sha256 = hashlib.sha256()
+   with open(file_path, 'rb') as f:
+      for block in iter(lambda: f.read(1 << 20), b''):
+         sha256.update(block)
+   return sha256.hexdigest()
\ No newline at end of file
@@ -1,50 +1,68 @@
-from .pickle_util import load_classifier, load_scaler
-from .read_feature import read_feature_from_file
-from .commons import MLP_path,mlp_scaler_save_path, nb_path,nb_scaler_save_path, svm_scaler_save_path,svm_path, rf_classifier_path
+import numpy as np
+
+from .read_feature import read_feature_from_file, read_feature_matrix
+from .model_registry import get_model
+from conf.settings import PREDICT_CHUNK_SIZE
 
 
 def predict_single_package(classifier, feature_vec):
    return classifier.predict(feature_vec)
 
-def predict_package_MLP(csv_path):
-    classifier = load_classifier(MLP_path)
+def predict_package(model_name, csv_path):
+    model = get_model(model_name)
     feature_vec = read_feature_from_file(csv_path)
     # 数据预处理
-    scaler_path = mlp_scaler_save_path
-    scaler = load_scaler(scaler_path)
+    feature_vec = model.transform([feature_vec])
+    return predict_single_package(model.classifier, feature_vec)[0]
 
-    feature_vec = scaler.transform([feature_vec])
-    # print(predict_single_package(classifier, feature_vec)[0])
-    return predict_single_package(classifier, feature_vec)[0]
+def predict_package_MLP(csv_path):
+    return predict_package('MLP', csv_path)
 
 def predict_package_NB(csv_path):
-    classifier = load_classifier(nb_path)
-    feature_vec = read_feature_from_file(csv_path)
-    # 数据预处理
-    scaler_path = nb_scaler_save_path
-    scaler = load_scaler(scaler_path)
-
-    feature_vec = scaler.transform([feature_vec])
-    return predict_single_package(classifier, feature_vec)[0]
-
+    return predict_package('NB', csv_path)
 
 def predict_package_SVM(csv_path):
-    classifier = load_classifier(svm_path)
-    feature_vec = read_feature_from_file(csv_path)
-    # 数据预处理
-    scaler_path = svm_scaler_save_path
-    scaler = load_scaler(scaler_path)
-
-    feature_vec = scaler.transform([feature_vec])
-    return predict_single_package(classifier, feature_vec)[0]
+    return predict_package('SVM', csv_path)
 
 def predict_package_RF(csv_path):
-    classifier = load_classifier(rf_classifier_path)
-    feature_vec = read_feature_from_file(csv_path)
-    feature_vec = [feature_vec]
+    return predict_package('RF', csv_path)
+
+def predict_matrix(model_name: str, feature_matrix, chunk_size: int = PREDICT_CHUNK_SIZE) -> list:
+    """
+    批量预测特征矩阵
+    :param model_name: 模型名
+    :param feature_matrix: 特征矩阵，每行对应一个包
+    :param chunk_size: 每次调用分类器预测的行数
+    :return: [预测结果数组, 恶意概率数组（模型不支持predict_proba时为None）]
+    """
+    model = get_model(model_name)
+    classifier = model.classifier
+    feature_matrix = np.asarray(feature_matrix)
+    n_rows = feature_matrix.shape[0]
+    y_pred = np.empty(n_rows, dtype=classifier.classes_.dtype)
+    y_proba = None
+    if hasattr(classifier, 'predict_proba'):
+        y_proba = np.empty(n_rows, dtype=np.float64)
+        malicious_idx = list(classifier.classes_).index('malicious')
+    if n_rows == 0:
+        return [y_pred, y_proba]
     # 数据预处理
-    # scaler_path = rf_scaler_save_path
-    # scaler = load_scaler(scaler_path)
+    feature_matrix = model.transform(feature_matrix)
+    for start in range(0, n_rows, chunk_size):
+        chunk = feature_matrix[start:start + chunk_size]
+        y_pred[start:start + chunk_size] = classifier.predict(chunk)
+        if y_proba is not None:
+            y_proba[start:start + chunk_size] = classifier.predict_proba(chunk)[:, malicious_idx]
+    return [y_pred, y_proba]
 
-    # feature_vec = scaler.transform([feature_vec])
-    return predict_single_package(classifier, feature_vec)[0]
\ No newline at end of file
+def predict_dataset(model_name: str, feature_dir: str, chunk_size: int = PREDICT_CHUNK_SIZE) -> list:
+    """
+    批量预测特征文件夹中的所有包
+    :param model_name: 模型名
+    :param feature_dir: 包含多个特征文件的文件夹路径
+    :param chunk_size: 每次调用分类器预测的行数
+    :return: [包名列表, 预测结果数组, 恶意概率数组（模型不支持predict_proba时为None）]
+    """
+    feature_matrix, package_names = read_feature_matrix(feature_dir)
+    y_pred, y_proba = predict_matrix(model_name, feature_matrix, chunk_size)
+    return [package_names, y_pred, y_proba]
\ No newline at end of file
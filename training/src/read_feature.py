@@ -1,5 +1,18 @@
 import csv
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .feature_store import FeatureStore, is_feature_store, write_feature_store
+
+
+# 并行读取特征文件的线程数，特征文件通常位于NFS上，读取以IO等待为主
+READ_FEATURE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# 每个线程任务读取的特征文件数量上限
+READ_FEATURE_CHUNK_SIZE = 256
 
 
 def normalize_feature(value):
@@ -25,12 +38,169 @@ def read_features(malicousPath, normalPath):
         read_features_from_di(malicousPath, feature_arr, label_arr, True, csv_name_arr)
     if normalPath != None:
         read_features_from_di(normalPath, feature_arr, label_arr, False, csv_name_arr)
-    return [feature_arr, label_arr, csv_name_arr]
+    feature_arr = [matrix for matrix in feature_arr if matrix.shape[0] > 0]
+    if len(feature_arr) == 2 and feature_arr[0].shape[1] != feature_arr[1].shape[1]:
+        raise ValueError(f'{malicousPath} has {feature_arr[0].shape[1]} features but {normalPath} has {feature_arr[1].shape[1]} features')
+    if len(feature_arr) == 0:
+        return [np.zeros((0, 0), dtype=bool), label_arr, csv_name_arr]
+    return [np.concatenate(feature_arr), label_arr, csv_name_arr]
 
-def read_features_from_di(dirPath, feature_arr: list, label_arr: list, isMalicous: bool, csv_name_arr: list):
+def read_features_from_di(dirPath, feature_arr: list, label_arr: list, isMalicous: bool, csv_name_arr: list, errors: list = None):
+    """
+    读取文件夹下所有特征文件
+    :param dirPath: 包含多个特征文件的文件夹路径
+    :param feature_arr: 读取到的特征矩阵追加到该列表
+    :param label_arr: 每个包的标签追加到该列表
+    :param isMalicous: 是否为恶意包
+    :param csv_name_arr: 每个包的特征文件名追加到该列表
+    :param errors: 格式错误的特征文件及错误信息追加到该列表
+    """
+    if is_feature_store(dirPath):
+        store = FeatureStore(dirPath)
+        feature_arr.append(store.matrix())
+        csv_name_arr.extend(package_name + '.csv' for package_name in store.package_names)
+        label_arr.extend(["malicious" if isMalicous else "benign"] * len(store))
+        return
+    csv_paths = []
     for root, _ , files in os.walk(dirPath):
-        for f in files:
-            csvPath = os.path.join(root, f)
-            csv_name_arr.append(f)
-            feature_arr.append(read_feature_from_file(csvPath))
-            label_arr.append("malicious" if isMalicous  else "benign")
\ No newline at end of file
+        for f in sorted(files):
+            csv_paths.append(os.path.join(root, f))
+    feature_matrix, valid = load_feature_files(csv_paths, errors)
+    feature_arr.append(feature_matrix[valid])
+    csv_name_arr.extend(os.path.basename(csv_paths[i]) for i in np.flatnonzero(valid))
+    label_arr.extend(["malicious" if isMalicous else "benign"] * int(valid.sum()))
+
+def read_feature_matrix(dirPath, errors: list = None):
+    """
+    读取文件夹下所有特征文件，组成一个特征矩阵
+    :param dirPath: 包含多个特征文件的文件夹路径
+    :param errors: 格式错误的特征文件及错误信息追加到该列表
+    :return: [特征矩阵(numpy bool数组，每行对应一个包), 包名列表]
+    """
+    if is_feature_store(dirPath):
+        store = FeatureStore(dirPath)
+        return [store.matrix(), store.package_names]
+    return read_csv_feature_matrix(dirPath, errors)
+
+def read_csv_feature_matrix(dirPath, errors: list = None):
+    """
+    读取文件夹下所有特征文件（不使用打包后的特征），组成一个特征矩阵
+    格式错误的特征文件不包含在结果中
+    :param dirPath: 包含多个特征文件的文件夹路径
+    :param errors: 格式错误的特征文件及错误信息追加到该列表
+    :return: [特征矩阵(numpy bool数组，每行对应一个包), 包名列表]
+    """
+    csv_names = sorted(f for f in os.listdir(dirPath) if f.endswith('.csv'))
+    feature_matrix, valid = load_feature_files([os.path.join(dirPath, f) for f in csv_names], errors)
+    package_names = [csv_names[i][:-4] for i in np.flatnonzero(valid)]
+    return [feature_matrix[valid], package_names]
+
+def parse_feature_file(file_path, feature_vec, feature_names: list = None):
+    """
+    解析特征文件并写入预先分配的特征向量
+    :param file_path: 特征文件路径
+    :param feature_vec: 长度为特征数量的numpy bool数组
+    :param feature_names: 应有的特征名（bytes），None表示不检查特征名
+    :raise ValueError: 特征文件格式错误或特征名与应有的特征名不一致
+    """
+    with open(file_path, "rb") as f:
+        lines = f.read().splitlines()
+    if len(lines) != len(feature_vec):
+        raise ValueError(f'expected {len(feature_vec)} features, got {len(lines)}')
+    for i, line in enumerate(lines):
+        fields = line.split(b",")
+        if len(fields) != 2 or fields[1] not in (b"true", b"false"):
+            raise ValueError(f'malformed line {i + 1}: {line[:80]!r}')
+        if feature_names is not None and fields[0] != feature_names[i]:
+            raise ValueError(f'expected feature {feature_names[i]!r} at line {i + 1}, got {fields[0][:80]!r}')
+        feature_vec[i] = fields[1] == b"true"
+
+def parse_feature_names(file_path) -> list:
+    """
+    读取特征文件中的特征名，并检查每行都是"特征名,true/false"的格式
+    :param file_path: 特征文件路径
+    :return: 特征名列表
+    :raise ValueError: 特征文件格式错误
+    """
+    with open(file_path, "rb") as f:
+        lines = f.read().splitlines()
+    feature_names = []
+    for i, line in enumerate(lines):
+        fields = line.split(b",")
+        if len(fields) != 2 or fields[1] not in (b"true", b"false"):
+            raise ValueError(f'malformed line {i + 1}: {line[:80]!r}')
+        feature_names.append(fields[0])
+    return feature_names
+
+def expected_feature_names(file_paths: list) -> list:
+    """
+    以第一个格式正确的特征文件中的特征名作为所有特征文件应有的特征名
+    :param file_paths: 特征文件路径列表
+    :return: 特征名列表（bytes），没有格式正确的特征文件时为空列表
+    """
+    for file_path in file_paths:
+        try:
+            return parse_feature_names(file_path)
+        except (OSError, ValueError):
+            continue
+    return []
+
+def load_feature_files(file_paths: list, errors: list = None, workers: int = READ_FEATURE_WORKERS):
+    """
+    使用线程池并行读取多个特征文件，结果直接写入预先分配的特征矩阵
+    :param file_paths: 特征文件路径列表，第i个文件对应特征矩阵的第i行
+    :param errors: 格式错误的特征文件及错误信息追加到该列表
+    :param workers: 线程数
+    :return: [特征矩阵, 每行是否读取成功的numpy bool数组]
+    """
+    if len(file_paths) == 0:
+        return [np.zeros((0, 0), dtype=bool), np.zeros(0, dtype=bool)]
+    feature_names = expected_feature_names(file_paths)
+    feature_matrix = np.zeros((len(file_paths), len(feature_names)), dtype=bool)
+    valid = np.ones(len(file_paths), dtype=bool)
+    file_errors = []
+
+    def load_chunk(start: int, end: int):
+        for i in range(start, end):
+            try:
+                parse_feature_file(file_paths[i], feature_matrix[i], feature_names)
+            except (OSError, ValueError) as e:
+                valid[i] = False
+                file_errors.append((file_paths[i], str(e)))
+
+    chunk_size = max(1, min(READ_FEATURE_CHUNK_SIZE, len(file_paths) // workers + 1))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(load_chunk, start, min(start + chunk_size, len(file_paths))) for start in range(0, len(file_paths), chunk_size)]
+        for future in futures:
+            future.result()
+
+    file_errors.sort()
+    for file_path, message in file_errors:
+        print(f'Malformed feature file {file_path}: {message}', file=sys.stderr)
+    if errors is not None:
+        errors.extend(file_errors)
+    return [feature_matrix, valid]
+
+def read_feature_names(file_path):
+    """读取特征文件中的特征名"""
+    with open(file_path, "r") as f:
+        return [row[0] for row in csv.reader(f)]
+
+def pack_feature_dir(dirPath, remove_csv=False):
+    """
+    将文件夹中的特征文件打包，打包后的特征写入同一文件夹
+    :param dirPath: 包含多个特征文件的文件夹路径
+    :param remove_csv: 打包后是否删除原特征文件
+    :return: 打包的包数量
+    """
+    csv_names = sorted(f for f in os.listdir(dirPath) if f.endswith('.csv'))
+    if len(csv_names) == 0:
+        raise ValueError(f'No feature files in {dirPath}')
+    feature_names = read_feature_names(os.path.join(dirPath, csv_names[0]))
+    feature_matrix, package_names = read_csv_feature_matrix(dirPath)
+    write_feature_store(dirPath, feature_matrix, package_names, feature_names)
+    if remove_csv:
+        # 格式错误的特征文件未被打包，保留以便排查
+        for package_name in package_names:
+            os.remove(os.path.join(dirPath, package_name + '.csv'))
+    return len(package_names)
\ No newline at end of file
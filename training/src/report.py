@@ -0,0 +1,174 @@
+import os
+import json
+import shutil
+
+from conf.settings import REPORT_CHUNK_SIZE
+
+
+# 报告中列之间的分隔符，与原先的报告格式一致
+REPORT_SEPARATOR = ', '
+
+
+def read_report(report_path: str):
+    """
+    逐行读取报告，不包括表头
+    :return: 每行各列组成的列表
+    """
+    with open(report_path) as f:
+        next(f, None)
+        for line in f:
+            if line.endswith('\n'):
+                yield line[:-1].split(REPORT_SEPARATOR)
+
+
+class ReportWriter:
+    """
+    分块写入的报告
+    每攒够chunk_size行写入一次CSV（可同时写入Parquet），并记录检查点；
+    中断后以resume=True重新打开时，检查点之后写入的内容被丢弃，已写入的包可通过done跳过
+    """
+
+    def __init__(self, report_path: str, columns: list, resume: bool = False, parquet: bool = False, chunk_size: int = REPORT_CHUNK_SIZE, key_column: int = 0):
+        """
+        :param report_path: CSV报告路径
+        :param columns: 列名
+        :param resume: 是否继续之前中断的报告
+        :param parquet: 是否同时写入Parquet报告（report_path去掉.csv后加.parquet的文件夹，每块一个文件），需要pyarrow
+        :param chunk_size: 每次写入的行数
+        :param key_column: 唯一标识一个包的列，done中保存该列的值
+        """
+        self.report_path = report_path
+        self.columns = columns
+        self.chunk_size = chunk_size
+        self.key_column = key_column
+        self.checkpoint_path = report_path + '.checkpoint'
+        self.parquet_path = None
+        if parquet:
+            # pyarrow是可选依赖，只有写入Parquet时才需要
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise ImportError('Writing Parquet reports requires pyarrow, install it with "pip install pyarrow"')
+            self._pyarrow = pyarrow
+            self.parquet_path = (report_path[:-4] if report_path.endswith('.csv') else report_path) + '.parquet'
+        self.buffer = []
+        self.rows = 0
+        self.parquet_parts = 0
+        self.done = set()
+        if resume and os.path.exists(report_path):
+            self._resume()
+        else:
+            self._start()
+
+    def _start(self):
+        with open(self.report_path, 'w') as f:
+            f.write(REPORT_SEPARATOR.join(self.columns) + '\n')
+        if self.parquet_path is not None:
+            if os.path.exists(self.parquet_path):
+                shutil.rmtree(self.parquet_path)
+            os.makedirs(self.parquet_path)
+        self._checkpoint()
+
+    def _resume(self):
+        """丢弃检查点之后写入的内容，读取已写入的包名"""
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+            csv_size = checkpoint['csv_size']
+            self.parquet_parts = checkpoint['parquet_parts']
+        else:
+            # 没有检查点说明报告已完整写入
+            csv_size = os.path.getsize(self.report_path)
+            self.parquet_parts = len(os.listdir(self.parquet_path)) if self.parquet_path is not None and os.path.isdir(self.parquet_path) else 0
+        with open(self.report_path, 'r+') as f:
+            f.truncate(csv_size)
+        for row in read_report(self.report_path):
+            self.done.add(row[self.key_column])
+            self.rows += 1
+        if self.parquet_path is not None:
+            os.makedirs(self.parquet_path, exist_ok=True)
+            for file_name in os.listdir(self.parquet_path):
+                if not (file_name.startswith('part-') and file_name.endswith('.parquet')) or int(file_name[len('part-'):-len('.parquet')]) >= self.parquet_parts:
+                    os.remove(os.path.join(self.parquet_path, file_name))
+            if self.parquet_parts == 0 and self.rows > 0:
+                # 之前没有写入Parquet，补写已有的行
+                self.buffer = list(read_report(self.report_path))
+                self._write_parquet()
+                self.buffer = []
+        self._checkpoint()
+
+    def _checkpoint(self):
+        with open(self.checkpoint_path + '.tmp', 'w') as f:
+            json.dump({'csv_size': os.path.getsize(self.report_path), 'parquet_parts': self.parquet_parts, 'rows': self.rows}, f)
+        os.replace(self.checkpoint_path + '.tmp', self.checkpoint_path)
+
+    def _write_parquet(self):
+        pyarrow = self._pyarrow
+        table = pyarrow.table({column: [row[i] for row in self.buffer] for i, column in enumerate(self.columns)})
+        part_path = os.path.join(self.parquet_path, f'part-{self.parquet_parts:05d}.parquet')
+        pyarrow.parquet.write_table(table, part_path + '.tmp')
+        os.replace(part_path + '.tmp', part_path)
+        self.parquet_parts += 1
+
+    def write_row(self, row):
+        """写入一行"""
+        self.buffer.append([str(value) for value in row])
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    def flush(self):
+        """写入缓存的行并记录检查点"""
+        if len(self.buffer) == 0:
+            return
+        with open(self.report_path, 'a') as f:
+            f.write(''.join(REPORT_SEPARATOR.join(row) + '\n' for row in self.buffer))
+            f.flush()
+            os.fsync(f.fileno())
+        if self.parquet_path is not None:
+            self._write_parquet()
+        self.rows += len(self.buffer)
+        self.done.update(row[self.key_column] for row in self.buffer)
+        self.buffer = []
+        self._checkpoint()
+
+    def close(self):
+        """写入剩余的行，报告完整后删除检查点"""
+        self.flush()
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        # 出错时只写入已缓存的行，保留检查点以便继续
+        if exc_type is None:
+            self.close()
+        else:
+            self.flush()
+
+
+def write_predictions(writer: ReportWriter, predict, feature_matrix, package_names: list, make_row, make_key=None) -> int:
+    """
+    分块预测并写入报告，跳过报告中已有的包
+    :param writer: 报告
+    :param predict: 预测函数，参数为特征矩阵，返回预测结果数组
+    :param feature_matrix: 特征矩阵，每行对应一个包
+    :param package_names: 每行对应的包名
+    :param make_row: 根据包名与预测结果生成报告中的一行
+    :param make_key: 根据包名生成报告中标识该包的值（key_column列），None表示包名本身
+    :return: 本次预测的包数量
+    """
+    if make_key is None:
+        make_key = lambda package_name: package_name
+    rows = [i for i, package_name in enumerate(package_names) if make_key(package_name) not in writer.done]
+    for start in range(0, len(rows), writer.chunk_size):
+        chunk = rows[start:start + writer.chunk_size]
+        y_pred = predict(feature_matrix[chunk])
+        writer.write_rows(make_row(package_names[i], result) for i, result in zip(chunk, y_pred))
+    return len(rows)
@@ -0,0 +1,290 @@
+import os
+import json
+import math
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from prettytable import PrettyTable
+
+from .commons import field_names
+from .evaluation import METRIC_NAMES, score_model
+from .dedupe import dedupe_rows, supports_sample_weight, print_dedupe_summary
+from conf.settings import SEARCH_WORKERS
+
+
+# 交叉验证的折数与随机种子，所有模型的超参数搜索使用相同的划分
+SEARCH_FOLDS = 4
+SEARCH_RANDOM_STATE = 10
+
+# 验证结果表中的各指标，顺序与score_model的返回值一致
+SCORE_NAMES = METRIC_NAMES
+
+# 支持的搜索方法
+SEARCH_METHODS = ['grid', 'halving']
+
+# successive halving每一轮保留1/HALVING_FACTOR的超参数，下一轮的训练样本数乘以HALVING_FACTOR
+HALVING_FACTOR = 3
+# successive halving第一轮每折最少的训练样本数
+HALVING_MIN_SAMPLES = 500
+# successive halving按该指标淘汰超参数
+HALVING_SCORE = 'matt_cor'
+# successive halving的验证结果表在网格搜索的各列之后记录每个超参数最后一轮每折的训练样本数，超参数描述与网格搜索相同
+HALVING_FIELD_NAMES = field_names + ['n_samples']
+
+# 工作进程中的训练数据与交叉验证划分，每个进程只接收一次
+_X = None
+_y = None
+_splits = None
+
+
+def get_search_splits(X, y) -> list:
+    """交叉验证划分，与原先各模型的StratifiedKFold一致"""
+    skf = StratifiedKFold(n_splits=SEARCH_FOLDS, shuffle=True, random_state=SEARCH_RANDOM_STATE)
+    return list(skf.split(X, y))
+
+def data_fingerprint(X, y) -> str:
+    """训练数据的hash，数据变化后不能继续之前的搜索"""
+    sha256 = hashlib.sha256()
+    X = np.ascontiguousarray(X)
+    sha256.update(str((X.shape, X.dtype.str, SEARCH_FOLDS, SEARCH_RANDOM_STATE)).encode())
+    sha256.update(X.tobytes())
+    sha256.update('\n'.join(str(label) for label in y).encode())
+    return sha256.hexdigest()
+
+def _init_search_worker(X, y, splits):
+    global _X, _y, _splits
+    _X = X
+    _y = y
+    _splits = splits
+
+def _run_fold(model, config_index: int, fold_index: int, n_samples: int = None, dedupe: bool = False) -> list:
+    """
+    在一折上训练并评估模型
+    :param n_samples: 训练样本数，从该折的训练集中分层抽样，None表示使用该折的整个训练集
+    :param dedupe: 是否将该折中相同的(特征向量, 标签)合并为一行并以行数作为样本权重，划分与评估结果不受影响
+    """
+    train_index, test_index = _splits[fold_index]
+    if n_samples is not None and n_samples < len(train_index):
+        train_index, _ = train_test_split(train_index, train_size=n_samples, stratify=_y[train_index], random_state=SEARCH_RANDOM_STATE)
+    model = clone(model)
+    if dedupe and supports_sample_weight(model):
+        unique_index, train_weight = dedupe_rows(_X[train_index], _y[train_index])
+        model.fit(_X[train_index[unique_index]], _y[train_index[unique_index]], sample_weight=train_weight)
+        unique_index, test_weight = dedupe_rows(_X[test_index], _y[test_index])
+        test_index = test_index[unique_index]
+        scores = score_model(model, _X[test_index], _y[test_index], sample_weight=test_weight)
+    else:
+        model.fit(_X[train_index], _y[train_index])
+        scores = score_model(model, _X[test_index], _y[test_index])
+    return [config_index, fold_index, n_samples, scores]
+
+def format_row(hyper_parameter: str, scores: list, extra: list = (), columns: list = field_names) -> str:
+    """
+    按PrettyTable的csv格式生成一行验证结果
+    :param extra: 各指标之后的列，如successive halving的训练样本数
+    :param columns: 验证结果表的列名
+    """
+    table = PrettyTable()
+    table.field_names = columns
+    table.add_row([hyper_parameter, *scores, *extra])
+    return table.get_csv_string(header=False)
+
+def load_search_progress(progress_path: str, fingerprint: str) -> dict:
+    """
+    读取已完成的任务及其评估结果
+    :return: (超参数描述, 训练样本数)到{折序号: 评估结果}的映射，数据不一致时为空
+    """
+    progress = {}
+    if not os.path.exists(progress_path):
+        return progress
+    with open(progress_path) as f:
+        lines = f.read().splitlines()
+    if len(lines) == 0 or json.loads(lines[0]).get('fingerprint') != fingerprint:
+        return progress
+    for line in lines[1:]:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            # 中断时可能只写入了半行
+            continue
+        progress.setdefault((record['config'], record.get('n_samples')), {})[record['fold']] = record['scores']
+    return progress
+
+
+class _Search:
+    """
+    一次超参数搜索
+    每个(超参数, 折, 训练样本数)是一个任务，由进程池并行执行，完成的任务记录在验证结果表旁的.progress文件中
+    """
+
+    def __init__(self, configs: list, X, y, csv_path: str, workers: int, resume: bool, dedupe: bool, columns: list = field_names):
+        """
+        :param columns: 验证结果表的列名，超参数描述与各指标之后的列由write_row的extra给出
+        """
+        self.configs = configs
+        self.X = np.asarray(X)
+        self.y = np.asarray(y)
+        self.csv_path = csv_path
+        self.workers = workers or SEARCH_WORKERS
+        self.dedupe = dedupe
+        self.splits = get_search_splits(self.X, self.y)
+        self.fingerprint = data_fingerprint(self.X, self.y) + (':dedupe' if dedupe else '')
+        self.progress_path = csv_path + '.progress'
+        self.progress = load_search_progress(self.progress_path, self.fingerprint) if resume else {}
+        self.columns = columns
+        # 每个超参数写入验证结果表的描述、评估结果与之后的列
+        self.rows = [None] * len(configs)
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.csv_path)), exist_ok=True)
+        self.csv_file = open(self.csv_path, 'w')
+        self.csv_file.write(PrettyTable(self.columns).get_csv_string())
+        self.progress_file = open(self.progress_path, 'w')
+        self.progress_file.write(json.dumps({'fingerprint': self.fingerprint}) + '\n')
+        # 重新写入已完成的任务，中断后仍可继续
+        for (hyper_parameter, n_samples), scores_of_folds in self.progress.items():
+            for fold_index, scores in scores_of_folds.items():
+                self._write_progress(hyper_parameter, fold_index, n_samples, scores)
+        self.executor = None
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+        self.csv_file.close()
+        self.progress_file.close()
+
+    def _write_progress(self, hyper_parameter: str, fold_index: int, n_samples: int, scores: list):
+        self.progress_file.write(json.dumps({'config': hyper_parameter, 'fold': fold_index, 'n_samples': n_samples, 'scores': scores}) + '\n')
+
+    def write_row(self, config_index: int, hyper_parameter: str, scores: list, extra: list = ()):
+        """写入一个超参数的验证结果"""
+        self.rows[config_index] = (hyper_parameter, scores, extra)
+        self.csv_file.write(format_row(hyper_parameter, scores, extra, self.columns))
+        self.csv_file.flush()
+
+    def evaluate(self, config_indexes: list, n_samples: int = None, on_config_done=None) -> dict:
+        """
+        使用交叉验证评估多个超参数，已完成的任务不会再次执行
+        :param config_indexes: 待评估的超参数序号
+        :param n_samples: 每折的训练样本数，None表示使用整个训练集
+        :param on_config_done: 某个超参数的所有折完成时调用，参数为超参数序号与各指标的平均值
+        :return: 超参数序号到各指标平均值的映射
+        """
+        fold_scores = {config_index: self.progress.setdefault((self.configs[config_index][0], n_samples), {}) for config_index in config_indexes}
+        mean_scores = {}
+
+        def config_done(config_index: int):
+            scores_of_folds = fold_scores[config_index]
+            mean_scores[config_index] = [float(np.mean([scores_of_folds[fold_index][i] for fold_index in range(SEARCH_FOLDS)])) for i in range(len(SCORE_NAMES))]
+            if on_config_done is not None:
+                on_config_done(config_index, mean_scores[config_index])
+
+        tasks = []
+        for config_index in config_indexes:
+            missing_folds = [fold_index for fold_index in range(SEARCH_FOLDS) if fold_index not in fold_scores[config_index]]
+            if len(missing_folds) == 0:
+                config_done(config_index)
+            tasks.extend((self.configs[config_index][1], config_index, fold_index, n_samples, self.dedupe) for fold_index in missing_folds)
+        self.progress_file.flush()
+        if len(tasks) == 0:
+            return mean_scores
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_search_worker, initargs=(self.X, self.y, self.splits))
+        futures = [self.executor.submit(_run_fold, *task) for task in tasks]
+        for future in as_completed(futures):
+            config_index, fold_index, _, scores = future.result()
+            fold_scores[config_index][fold_index] = scores
+            self._write_progress(self.configs[config_index][0], fold_index, n_samples, scores)
+            self.progress_file.flush()
+            if len(fold_scores[config_index]) == SEARCH_FOLDS:
+                config_done(config_index)
+        return mean_scores
+
+    def rewrite_table(self):
+        """搜索完成后按超参数的顺序重写验证结果表"""
+        self.csv_file.close()
+        table = PrettyTable()
+        table.field_names = self.columns
+        for hyper_parameter, scores, extra in self.rows:
+            table.add_row([hyper_parameter, *scores, *extra])
+        with open(self.csv_path + '.tmp', 'w') as f:
+            f.write(table.get_csv_string())
+        os.replace(self.csv_path + '.tmp', self.csv_path)
+
+
+def get_halving_schedule(n_configs: int, n_samples: int) -> list:
+    """
+    successive halving每一轮每折的训练样本数，最后一轮使用整个训练集
+    轮数使得最后一轮只剩少量超参数，且第一轮的训练样本数不少于HALVING_MIN_SAMPLES
+    """
+    n_rounds = 1
+    while HALVING_FACTOR ** n_rounds < n_configs and n_samples / HALVING_FACTOR ** n_rounds >= HALVING_MIN_SAMPLES:
+        n_rounds += 1
+    return [None if i == n_rounds - 1 else int(n_samples / HALVING_FACTOR ** (n_rounds - 1 - i)) for i in range(n_rounds)]
+
+def _grid_search(search: _Search):
+    """在整个训练集上评估所有超参数"""
+    search.evaluate(
+        list(range(len(search.configs))),
+        on_config_done=lambda config_index, scores: search.write_row(config_index, search.configs[config_index][0], scores)
+    )
+
+def _halving_search(search: _Search):
+    """
+    successive halving：先用少量训练样本评估所有超参数，每一轮只保留最好的1/HALVING_FACTOR，并将训练样本数乘以HALVING_FACTOR
+    被淘汰的超参数以其最后一轮的评估结果写入验证结果表，n_samples列为该轮每折的训练样本数
+    """
+    n_samples = min(len(train_index) for train_index, _ in search.splits)
+    schedule = get_halving_schedule(len(search.configs), n_samples)
+    candidates = list(range(len(search.configs)))
+    score_index = SCORE_NAMES.index(HALVING_SCORE)
+    for round_index, round_samples in enumerate(schedule):
+        is_last_round = round_index == len(schedule) - 1
+        print(f'Successive halving round {round_index + 1}/{len(schedule)}: {len(candidates)} configs, {round_samples or n_samples} samples per fold')
+
+        def config_done(config_index: int, scores: list):
+            if is_last_round:
+                search.write_row(config_index, search.configs[config_index][0], scores, [round_samples or n_samples])
+
+        mean_scores = search.evaluate(candidates, round_samples, on_config_done=config_done)
+        if is_last_round:
+            break
+        # 分数相同时保留靠前的超参数
+        ranked = sorted(candidates, key=lambda config_index: (-np.nan_to_num(mean_scores[config_index][score_index], nan=-1.0), config_index))
+        survivors = ranked[:max(1, math.ceil(len(candidates) / HALVING_FACTOR))]
+        for config_index in ranked[len(survivors):]:
+            search.write_row(config_index, search.configs[config_index][0], mean_scores[config_index], [round_samples])
+        candidates = sorted(survivors)
+
+def run_search(configs: list, X, y, csv_path: str, workers: int = None, resume: bool = False, method: str = 'grid', dedupe: bool = False):
+    """
+    并行的超参数搜索
+    每个(超参数, 折)是一个任务，所有任务由进程池并行执行；某个超参数的所有折完成后立即写入验证结果表
+    已完成的任务记录在验证结果表旁的.progress文件中，resume为True时跳过这些任务
+    :param configs: 超参数描述与对应的模型组成的列表
+    :param X: 训练集
+    :param y: 训练集标签
+    :param csv_path: 验证结果表路径
+    :param workers: 并行的进程数，None表示使用SEARCH_WORKERS
+    :param resume: 是否继续之前中断的搜索
+    :param method: 搜索方法，grid评估所有超参数，halving使用successive halving提前淘汰较差的超参数
+    :param dedupe: 是否在每折中合并相同的(特征向量, 标签)并以样本权重训练与评估，只对支持样本权重的模型生效
+    """
+    if method not in SEARCH_METHODS:
+        raise ValueError(f'Unknown search method: {method}')
+    if dedupe:
+        unique_index, _ = dedupe_rows(X, y)
+        print_dedupe_summary(len(y), len(unique_index))
+        if not any(supports_sample_weight(model) for _, model in configs):
+            print('The model does not support sample weights, training on all rows')
+    with _Search(configs, X, y, csv_path, workers, resume, dedupe, HALVING_FIELD_NAMES if method == 'halving' else field_names) as search:
+        if method == 'grid':
+            _grid_search(search)
+        else:
+            _halving_search(search)
+        search.rewrite_table()
@@ -1,12 +1,12 @@
 import os
 
-from sklearn.model_selection import StratifiedKFold, cross_validate
 from sklearn.neural_network import MLPClassifier
 from prettytable import PrettyTable
 
-from .commons import table_path, field_names,classifier_save_path, scoring
+from .commons import table_path, field_names,classifier_save_path
 from .model_util import evaluate_model
 from .pickle_util import save_classifier
+from .search import run_search
 
 
 best_layer_size = (16,)
@@ -15,30 +15,24 @@ best_solver="adam"
 best_learn_rate_init=0.05255545233279812
 best_max_iter=400
 
-def train_MLP_validation(X_train, y_train):
+def train_MLP_validation(X_train, y_train, workers=None, resume=False, search_method='grid', dedupe=False):
    layer_sizes = [(16, ), (32, ), (100, ), (150, )]
    activations = [ 'logistic']
    solvers = ['lbfgs', 'adam']
    learning_rate_inits = [0.05045994670005887, 0.10144109595857453, 0.17385803166469083, 0.17382621884779412, 0.05255545233279812]
 
    max_iters = [400, 600]
-   table = PrettyTable()
-   table.field_names = field_names
    validation_path = os.path.join(table_path, "MLP_validation.csv")
 
-   k = 4
-   skf = StratifiedKFold(n_splits=k, shuffle=True, random_state=10)
-
-   with open(validation_path, "w+") as f:
-      for layer_size in layer_sizes:
-         for activation in activations:
-            for solver in solvers:
-               for learn_rate_init in learning_rate_inits:
-                  for max_iter in max_iters:
-                        model = MLPClassifier(hidden_layer_sizes=layer_size, solver=solver, random_state=21, max_iter=max_iter, learning_rate_init=learn_rate_init, activation=activation)
-                        scores = cross_validate(model, X_train, y_train, cv = skf, scoring=scoring)
-                        table.add_row([f'layer_size = {layer_size}; activation={activation}; solver={solver};learn_rate_int={learn_rate_init};max_iter={max_iter}', scores["test_accu"].mean(), scores["test_prec"].mean(), scores["test_rec"].mean(), scores["test_f1"].mean(), scores["test_matt_cor"].mean()])
-      f.write(table.get_csv_string())
+   configs = []
+   for layer_size in layer_sizes:
+      for activation in activations:
+         for solver in solvers:
+            for learn_rate_init in learning_rate_inits:
+               for max_iter in max_iters:
+                  model = MLPClassifier(hidden_layer_sizes=layer_size, solver=solver, random_state=21, max_iter=max_iter, learning_rate_init=learn_rate_init, activation=activation)
+                  configs.append((f'layer_size = {layer_size}; activation={activation}; solver={solver};learn_rate_int={learn_rate_init};max_iter={max_iter}', model))
+   run_search(configs, X_train, y_train, validation_path, workers=workers, resume=resume, method=search_method, dedupe=dedupe)
 
 def test_MLP(X_train, y_train, X_test, y_test):
    test_path = os.path.join(table_path, "MLP_test.csv")
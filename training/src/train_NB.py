@@ -1,34 +1,26 @@
 import os
 
-from sklearn.model_selection import StratifiedKFold, cross_validate
 from sklearn.naive_bayes import GaussianNB
 from prettytable import PrettyTable
 
-from .commons import field_names, table_path, scoring, classifier_save_path
+from .commons import field_names, table_path, classifier_save_path
 from .model_util import evaluate_model
 from .pickle_util import save_classifier
+from .search import run_search
 
 
 best_smoothing = 1e-4
 
-def train_NB_Validate(X, y):
-   table = PrettyTable()
-   table.field_names = field_names
+def train_NB_Validate(X, y, workers=None, resume=False, search_method='grid', dedupe=False):
    csv_path = os.path.join(table_path, "NB_validation.csv")
-   k = 4
-   skf = StratifiedKFold(n_splits=k, shuffle=True, random_state=10)
    smoothings =  [1e-9, 1e-8, 1e-7, 1e-6, 1e-5, 1e-4]
-   with open(csv_path, "w+") as f:
-      for smoothing in smoothings:
-         model = GaussianNB(var_smoothing=smoothing)
-         scores = cross_validate(model, X=X, y=y, cv=skf, scoring=scoring)
-         table.add_row([f"smoothing={smoothing}", scores["test_accu"].mean(), scores["test_prec"].mean(), scores["test_rec"].mean(), scores["test_f1"].mean(), scores["test_matt_cor"].mean()])
-      f.write(table.get_csv_string())
+   configs = [(f"smoothing={smoothing}", GaussianNB(var_smoothing=smoothing)) for smoothing in smoothings]
+   run_search(configs, X, y, csv_path, workers=workers, resume=resume, method=search_method, dedupe=dedupe)
 
-def test_NB(X_train, y_train, X_test, y_test):
+def test_NB(X_train, y_train, X_test, y_test, sample_weight=None):
    save_path = os.path.join(classifier_save_path, "NB.pkl")
    model = GaussianNB(var_smoothing=best_smoothing)
-   model.fit(X_train, y_train)
+   model.fit(X_train, y_train, sample_weight=sample_weight)
 
    save_classifier(model, save_path)
 
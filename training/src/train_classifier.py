@@ -1,5 +1,6 @@
 from enum import Enum
 
+import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
 
@@ -10,6 +11,7 @@ from .train_RF import test_RF, train_classifier_RF_Validation
 from .train_SVM import test_SVM, train_SVM_validate
 from .test import test
 from .pickle_util import save_scaler
+from .dedupe import dedupe_rows, print_dedupe_summary
 from .commons import rf_scaler_save_path, mlp_scaler_save_path, nb_scaler_save_path, svm_scaler_save_path
 
 
@@ -65,7 +67,7 @@ def preprocess(X_train, X_test, scaler_save_path: str, preprocess_method: Prepro
         
         return [X_train_scaled, X_test_scaled]
 
-def train(malcious_features_dir_path: str, normal_features_dir_path: str, preprocess_method: PreprocessMethodEnum, model: ModelEnum, action: ActionEnum, hyper_parameters={}):
+def train(malcious_features_dir_path: str, normal_features_dir_path: str, preprocess_method: PreprocessMethodEnum, model: ModelEnum, action: ActionEnum, hyper_parameters={}, search_workers: int = None, search_resume: bool = False, search_method: str = 'grid', dedupe: bool = False):
     """
     训练分类器
     :param malcious_features_dir_path: 包含多个恶意样本特征文件的文件夹路径
@@ -73,6 +75,10 @@ def train(malcious_features_dir_path: str, normal_features_dir_path: str, prepro
     :param preprocess_method: 数据预处理方法
     :param model: 使用的模型
     :param action: 动作
+    :param search_workers: 超参数搜索时并行的进程数，None表示使用SEARCH_WORKERS
+    :param search_resume: 是否继续之前中断的超参数搜索
+    :param search_method: 超参数搜索方法，grid或halving（successive halving）
+    :param dedupe: 是否将训练集中相同的(特征向量, 标签)合并为一行，以行数作为样本权重训练（MLP不支持样本权重，不会合并）
     """
     [X, y, _] = read_features(malcious_features_dir_path, normal_features_dir_path)
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=0, stratify=y)
@@ -91,25 +97,32 @@ def train(malcious_features_dir_path: str, normal_features_dir_path: str, prepro
     # training and validation
     if action == ActionEnum.TRAINING:
         if model == ModelEnum.RF:
-            train_classifier_RF_Validation(X_train, y_train)
+            train_classifier_RF_Validation(X_train, y_train, search_workers, search_resume, search_method, dedupe)
         elif model == ModelEnum.MLP:
-            train_MLP_validation(X_train, y_train)
+            train_MLP_validation(X_train, y_train, search_workers, search_resume, search_method, dedupe)
         elif model == ModelEnum.NB:
-            train_NB_Validate(X_train, y_train)
+            train_NB_Validate(X_train, y_train, search_workers, search_resume, search_method, dedupe)
         elif model == ModelEnum.SVM:
-            train_SVM_validate(X_train, y_train)
+            train_SVM_validate(X_train, y_train, search_workers, search_resume, search_method, dedupe)
 
     # save model
     elif action == ActionEnum.SAVE:
+        # 先在所有行上划分训练集与测试集，再合并训练集中的重复行，划分与不合并时一致
+        sample_weight = None
+        if dedupe and model != ModelEnum.MLP:
+            unique_index, sample_weight = dedupe_rows(X_train, y_train)
+            print_dedupe_summary(len(y_train), len(unique_index))
+            X_train = np.asarray(X_train)[unique_index]
+            y_train = np.asarray(y_train)[unique_index]
         if model == ModelEnum.RF:
             if hyper_parameters.get('n_estimators') is None or hyper_parameters.get('max_depth') is None:
                 raise Exception('estimators and max_depth cannot be None')
-            test_RF(X_train, y_train, X_test, y_test, n_estimators=hyper_parameters.get('n_estimators'), max_depth=hyper_parameters.get('max_depth'))
+            test_RF(X_train, y_train, X_test, y_test, n_estimators=hyper_parameters.get('n_estimators'), max_depth=hyper_parameters.get('max_depth'), sample_weight=sample_weight)
         elif model == ModelEnum.MLP:
             test_MLP(X_train, y_train, X_test, y_test)
         elif model == ModelEnum.NB:
-            test_NB(X_train, y_train, X_test, y_test)
+            test_NB(X_train, y_train, X_test, y_test, sample_weight=sample_weight)
         elif model == ModelEnum.SVM:
-            test_SVM(X_train, y_train, X_test, y_test)
+            test_SVM(X_train, y_train, X_test, y_test, sample_weight=sample_weight)
     elif action == ActionEnum.TEST:
         test(X_test, y_test)
\ No newline at end of file
@@ -0,0 +1,178 @@
+import os
+import json
+
+import numpy as np
+
+from .pickle_util import file_hash
+from .read_feature import read_feature_matrix, read_feature_names
+from .feature_store import FeatureStore, is_feature_store
+from conf.settings import MODELS_PATH, MODEL_TABLES_PATH
+
+
+TABLE_VERDICTS_FILE = 'verdicts.npy'
+TABLE_PROBA_FILE = 'proba.npy'
+TABLE_HEADER_FILE = 'header.json'
+TABLE_VERSION = 1
+
+# 恶意概率以uint16定点数保存
+PROBA_SCALE = 65535
+
+# 真值表最多支持的特征数，每个特征向量对应表中的一项
+MAX_TABLE_FEATURES = 24
+
+
+def get_table_dir(model_name: str, table_path: str = MODEL_TABLES_PATH) -> str:
+    return os.path.join(table_path, model_name)
+
+def has_truth_table(model_name: str, table_path: str = MODEL_TABLES_PATH) -> bool:
+    return os.path.exists(os.path.join(get_table_dir(model_name, table_path), TABLE_HEADER_FILE))
+
+def feature_index(feature_matrix) -> np.ndarray:
+    """
+    特征向量在真值表中的下标，第i个特征对应下标的第i位
+    :param feature_matrix: 特征矩阵，每行对应一个包
+    :return: uint32下标数组
+    """
+    feature_matrix = np.asarray(feature_matrix, dtype=bool)
+    packed = np.packbits(feature_matrix, axis=1, bitorder='little')
+    index = np.zeros(feature_matrix.shape[0], dtype=np.uint32)
+    for i in range(packed.shape[1]):
+        index |= packed[:, i].astype(np.uint32) << np.uint32(8 * i)
+    return index
+
+def all_feature_vectors(start: int, stop: int, feature_count: int) -> np.ndarray:
+    """下标在[start, stop)内的所有特征向量"""
+    index = np.arange(start, stop, dtype=np.uint32)
+    return ((index[:, None] >> np.arange(feature_count, dtype=np.uint32)) & 1).astype(bool)
+
+def write_truth_table(table_dir: str, verdicts, proba, header: dict):
+    """
+    写入真值表，头文件最后写入，读到头文件即说明真值表完整
+    :param verdicts: 每个特征向量是否被预测为恶意
+    :param proba: 每个特征向量的恶意概率，模型不支持predict_proba时为None
+    """
+    os.makedirs(table_dir, exist_ok=True)
+    header_path = os.path.join(table_dir, TABLE_HEADER_FILE)
+    if os.path.exists(header_path):
+        os.remove(header_path)
+    np.save(os.path.join(table_dir, TABLE_VERDICTS_FILE), np.packbits(verdicts, bitorder='little'))
+    proba_path = os.path.join(table_dir, TABLE_PROBA_FILE)
+    if proba is not None:
+        np.save(proba_path, np.rint(np.clip(proba, 0.0, 1.0) * PROBA_SCALE).astype(np.uint16))
+    elif os.path.exists(proba_path):
+        os.remove(proba_path)
+    with open(header_path + '.tmp', 'w') as f:
+        json.dump(dict(header, version=TABLE_VERSION, has_proba=proba is not None), f, indent=2)
+    os.replace(header_path + '.tmp', header_path)
+
+
+class TruthTable:
+    """
+    由模型编译得到的真值表
+    特征都是布尔值，因此模型是特征向量的纯函数；表中保存每个特征向量的预测结果（按位压缩）与恶意概率，
+    预测时只需按特征向量计算下标并查表，不需要sklearn
+    """
+
+    def __init__(self, model_name: str, table_path: str = MODEL_TABLES_PATH):
+        self.model_name = model_name
+        self.table_dir = get_table_dir(model_name, table_path)
+        with open(os.path.join(self.table_dir, TABLE_HEADER_FILE)) as f:
+            self.header = json.load(f)
+        if self.header['version'] != TABLE_VERSION:
+            raise ValueError(f'Unsupported truth table version {self.header["version"]} in {self.table_dir}')
+        self.feature_count = self.header['feature_count']
+        self.feature_names = self.header['feature_names']
+        self.classes = np.array(self.header['classes'])
+        self.verdicts = np.load(os.path.join(self.table_dir, TABLE_VERDICTS_FILE), mmap_mode='r')
+        self.proba = np.load(os.path.join(self.table_dir, TABLE_PROBA_FILE), mmap_mode='r') if self.header['has_proba'] else None
+        if self.verdicts.shape[0] * 8 < 1 << self.feature_count:
+            raise ValueError(f'Broken truth table in {self.table_dir}')
+
+    def is_stale(self) -> bool:
+        """
+        模型或scaler文件是否在编译后发生了变化
+        与ModelRegistry相同，mtime与大小都未变化时不计算hash，大模型也能立即加载真值表
+        """
+        for source in self.header['sources'].values():
+            if source is None:
+                continue
+            source_path = os.path.join(MODELS_PATH, source['file'])
+            if not os.path.exists(source_path):
+                return True
+            stat = os.stat(source_path)
+            if stat.st_mtime_ns == source.get('mtime') and stat.st_size == source.get('size'):
+                continue
+            if file_hash(source_path) != source['sha256']:
+                return True
+        return False
+
+    def index(self, feature_matrix) -> np.ndarray:
+        feature_matrix = np.asarray(feature_matrix)
+        if feature_matrix.ndim != 2 or feature_matrix.shape[1] != self.feature_count:
+            raise ValueError(f'Expected {self.feature_count} features, got shape {feature_matrix.shape}')
+        return feature_index(feature_matrix)
+
+    def predict_malicious(self, feature_matrix) -> np.ndarray:
+        """每个包是否被预测为恶意"""
+        index = self.index(feature_matrix)
+        return ((self.verdicts[index >> 3] >> (index & 7).astype(np.uint8)) & 1).astype(bool)
+
+    def predict(self, feature_matrix) -> np.ndarray:
+        """预测结果，与模型的predict一致"""
+        return self.classes[self.predict_malicious(feature_matrix).astype(np.intp)]
+
+    def predict_proba(self, feature_matrix) -> np.ndarray:
+        """恶意概率，模型不支持predict_proba时为None"""
+        if self.proba is None:
+            return None
+        return self.proba[self.index(feature_matrix)] / PROBA_SCALE
+
+    def score(self, feature_matrix) -> list:
+        """
+        :return: [预测结果数组, 恶意概率数组（模型不支持predict_proba时为None）]，与predict_matrix一致
+        """
+        return [self.predict(feature_matrix), self.predict_proba(feature_matrix)]
+
+    def check_feature_names(self, feature_names: list):
+        """特征的顺序必须与编译时一致"""
+        if self.feature_names is not None and feature_names is not None and list(feature_names) != self.feature_names:
+            raise ValueError(f'Feature names do not match the truth table of {self.model_name}')
+
+
+def load_truth_table(model_name: str, table_path: str = MODEL_TABLES_PATH):
+    """
+    加载模型的真值表
+    :return: 真值表，不存在或模型已变化时为None
+    """
+    if not has_truth_table(model_name, table_path):
+        return None
+    table = TruthTable(model_name, table_path)
+    if table.is_stale():
+        return None
+    return table
+
+def get_dataset_feature_names(feature_dir: str) -> list:
+    """
+    数据集的特征名
+    :return: 特征名列表，文件夹中没有特征时为None
+    """
+    if is_feature_store(feature_dir):
+        return FeatureStore(feature_dir).feature_names
+    csv_names = sorted(f for f in os.listdir(feature_dir) if f.endswith('.csv'))
+    if len(csv_names) == 0:
+        return None
+    return read_feature_names(os.path.join(feature_dir, csv_names[0]))
+
+def score_dataset(table: TruthTable, feature_dir: str) -> list:
+    """
+    使用真值表预测特征文件夹中的所有包
+    :param table: 真值表
+    :param feature_dir: 包含多个特征文件的文件夹路径
+    :return: [包名列表, 预测结果数组, 恶意概率数组（模型不支持predict_proba时为None）]，与predict_dataset一致
+    """
+    table.check_feature_names(get_dataset_feature_names(feature_dir))
+    feature_matrix, package_names = read_feature_matrix(feature_dir)
+    if len(package_names) == 0:
+        return [package_names, np.empty(0, dtype=table.classes.dtype), None if table.proba is None else np.empty(0)]
+    y_pred, y_proba = table.score(feature_matrix)
+    return [package_names, y_pred, y_proba]
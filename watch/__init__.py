@@ -0,0 +1,9 @@
+from .src.watcher import TarballWatcher, DailyReport, WatchJournal, get_dataset_name, get_watched_dataset_names
+
+__all__ = [
+    'TarballWatcher',
+    'DailyReport',
+    'WatchJournal',
+    'get_dataset_name',
+    'get_watched_dataset_names'
+]
\ No newline at end of file
@@ -0,0 +1,296 @@
+import os
+import json
+import queue
+import threading
+import traceback
+from datetime import date, timedelta
+
+import numpy as np
+
+import training
+from conf.settings import UNKOWN_DATASETS_PATH, FEATURES_PATH, FEATURE_POSITIONS_PATH, REPORTS_PATH, WATCH_POLL_INTERVAL, WATCH_DAYS
+from extraction import ExtractCache, ExtractLimits, TarballPipeline, get_extract_log_path, remove_dir, close_position_stores
+
+
+# 每次预测最多合并的压缩文件数
+SCORE_BATCH_SIZE = 256
+
+
+def get_dataset_name(day: date) -> str:
+    """每天的包所在的文件夹名，与task.py一致"""
+    return f'{day.year}-{day.month}-{day.day}'
+
+def get_watched_dataset_names(days: int, today: date = None) -> list:
+    """:return: 今天及之前共days天的文件夹名，从早到晚"""
+    today = today or date.today()
+    return [get_dataset_name(today - timedelta(days=i)) for i in reversed(range(days))]
+
+
+class WatchJournal:
+    """
+    已评分的压缩文件，每行一个JSON：压缩文件名、大小、修改时间与包数量
+    压缩文件的结果写入报告后才写入日志，重启后日志中的压缩文件不会重新评分
+    """
+
+    def __init__(self, journal_path: str):
+        self.journal_path = journal_path
+        self.tarballs = set()
+        size = 0
+        if os.path.exists(journal_path):
+            with open(journal_path, 'rb') as f:
+                for line in f:
+                    # 中断时写入一半的行被丢弃，对应的压缩文件会重新评分
+                    if not line.endswith(b'\n'):
+                        break
+                    self.tarballs.add(json.loads(line)['tarball'])
+                    size += len(line)
+            with open(journal_path, 'r+b') as f:
+                f.truncate(size)
+        self._file = open(journal_path, 'a')
+
+    def add(self, entries: list):
+        """记录一批已评分的压缩文件并写入磁盘"""
+        self._file.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.tarballs.update(entry['tarball'] for entry in entries)
+
+    def close(self):
+        self._file.close()
+
+
+class DailyReport:
+    """一天的文件夹对应的特征文件夹、报告与评分日志"""
+
+    def __init__(self, dataset_name: str, datasets_path: str = UNKOWN_DATASETS_PATH):
+        self.dataset_name = dataset_name
+        self.dataset_path = os.path.join(datasets_path, dataset_name)
+        self.feature_path = os.path.join(FEATURES_PATH, dataset_name)
+        self.feature_position_path = os.path.join(FEATURE_POSITIONS_PATH, dataset_name)
+        self.report_path = os.path.join(REPORTS_PATH, f'{dataset_name}-report.csv')
+        os.makedirs(self.feature_path, exist_ok=True)
+        os.makedirs(self.feature_position_path, exist_ok=True)
+        os.makedirs(REPORTS_PATH, exist_ok=True)
+        self.journal = WatchJournal(self.report_path + '.journal')
+        # 报告已存在时继续写入，检查点之后的内容被丢弃，已有的包不会重复写入
+        self.writer = training.ReportWriter(self.report_path, ['package name', 'predict'], resume=True)
+
+    def record(self, scored: list):
+        """
+        写入一批压缩文件的预测结果，再记录到评分日志
+        :param scored: (日志项, 报告中的行)的列表
+        """
+        for _, rows in scored:
+            self.writer.write_rows(row for row in rows if row[0] not in self.writer.done)
+        self.writer.flush()
+        self.journal.add([entry for entry, _ in scored])
+
+    def close(self):
+        self.writer.close()
+        self.journal.close()
+        close_position_stores([self.feature_position_path])
+
+
+class TarballWatcher:
+    """
+    持续监视未知数据集文件夹，新的压缩文件写完后立即解压、提取特征、预测，并追加到当天的报告
+    正在处理的压缩文件数量有上限：流水线满时不再提交，新文件留在磁盘上等待下一次扫描；
+    预测结果写入报告后记录到评分日志，重启后不会重新评分
+    """
+
+    def __init__(self, predict, check_feature_names=None, jobs: int = 1, scratch_path: str = None, max_pending: int = None, cache: ExtractCache = None, force: bool = False, days: int = WATCH_DAYS, poll_interval: float = WATCH_POLL_INTERVAL, datasets_path: str = UNKOWN_DATASETS_PATH, limits: ExtractLimits = None):
+        """
+        :param predict: 预测函数，参数为特征矩阵，返回预测结果数组
+        :param check_feature_names: 检查特征名与模型是否一致的函数，不一致时抛出ValueError，None表示不检查
+        :param jobs: 并行的特征提取进程数
+        :param scratch_path: 解压用的临时文件夹，可以位于tmpfs（如/dev/shm），None表示当前文件夹下的.watched-packages
+        :param max_pending: 已解压、等待分析的压缩文件数量上限，None表示jobs的两倍
+        :param cache: 特征缓存，None表示不使用缓存
+        :param force: 是否忽略缓存重新分析所有包（结果仍写入缓存）
+        :param days: 监视今天及之前共days天的文件夹
+        :param poll_interval: 两次扫描之间的秒数
+        :param datasets_path: 未知数据集文件夹
+        :param limits: 每个包的时限、进程内存上限与隔离名单，None表示不限制；隔离的包记为失败，不会重新评分
+        """
+        self.predict = predict
+        self.check_feature_names = check_feature_names
+        self.days = days
+        self.poll_interval = poll_interval
+        self.datasets_path = datasets_path
+        self.scratch_path = scratch_path or os.path.abspath('.watched-packages')
+        self.pipeline = TarballPipeline(self.scratch_path, get_extract_log_path('watch'), jobs, max_pending=max_pending, cache=cache, force=force, on_tarball_done=self._on_tarball_done, limits=limits)
+        self.reports = {}
+        self.lock = threading.Lock()
+        # 已提交、尚未记录到评分日志的压缩文件及其大小与修改时间
+        self.in_flight = {}
+        # 上一次扫描时尚未处理的压缩文件的大小与修改时间，两次扫描之间未变化才认为已写完
+        self.last_seen = {}
+        # 提取结束、等待预测的压缩文件，队列满时特征提取线程等待
+        self.extracted = queue.Queue(maxsize=self.pipeline.max_pending)
+        self.stats = {'tarballs': 0, 'packages': 0, 'malicious': 0, 'failed': 0}
+        self._printed_stats = None
+        self._stop = threading.Event()
+        self._scorer = None
+
+    def stop(self):
+        """停止扫描，已提交的压缩文件处理完后run返回"""
+        self._stop.set()
+
+    def _on_tarball_done(self, tarball_path: str, results: list):
+        self.extracted.put((tarball_path, results))
+
+    def _get_report(self, dataset_name: str) -> DailyReport:
+        with self.lock:
+            if dataset_name not in self.reports:
+                self.reports[dataset_name] = DailyReport(dataset_name, self.datasets_path)
+            return self.reports[dataset_name]
+
+    def _scan(self, report: DailyReport) -> list:
+        """:return: 已写完、尚未评分的压缩文件，按修改时间排序"""
+        ready = []
+        seen = {}
+        with os.scandir(report.dataset_path) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.tgz'):
+                    continue
+                with self.lock:
+                    if entry.name in report.journal.tarballs or entry.path in self.in_flight:
+                        continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                stamp = (stat.st_size, stat.st_mtime_ns)
+                if self.last_seen.get(entry.path) == stamp:
+                    ready.append((stat.st_mtime_ns, entry.path, stamp))
+                else:
+                    seen[entry.path] = stamp
+        self.last_seen = {path: stamp for path, stamp in self.last_seen.items() if os.path.dirname(path) != report.dataset_path}
+        self.last_seen.update(seen)
+        return sorted(ready)
+
+    def _poll(self):
+        """扫描监视的文件夹并提交新的压缩文件，关闭不再监视且没有正在处理的压缩文件的报告"""
+        dataset_names = get_watched_dataset_names(self.days)
+        for dataset_name in dataset_names:
+            if not os.path.isdir(os.path.join(self.datasets_path, dataset_name)):
+                continue
+            report = self._get_report(dataset_name)
+            for _, tarball_path, stamp in self._scan(report):
+                if self._stop.is_set():
+                    return
+                with self.lock:
+                    self.in_flight[tarball_path] = stamp
+                # 流水线满时在此等待
+                self.pipeline.submit(tarball_path, report.feature_path, report.feature_position_path)
+        with self.lock:
+            busy = set(os.path.basename(os.path.dirname(tarball_path)) for tarball_path in self.in_flight)
+            for dataset_name in list(self.reports):
+                if dataset_name not in dataset_names and dataset_name not in busy:
+                    self.reports.pop(dataset_name).close()
+
+    def _score(self, batch: list):
+        """预测一批提取结束的压缩文件，按天写入报告与评分日志"""
+        package_names = []
+        vectors = []
+        failed = 0
+        scored = {}
+        for tarball_path, results in batch:
+            rows = []
+            for package_path, result in results:
+                if result is None:
+                    continue
+                feature_names = [name for name, _ in result['features']]
+                if self.check_feature_names is not None:
+                    try:
+                        self.check_feature_names(feature_names)
+                    except ValueError as e:
+                        print(f'{e}: {package_path}')
+                        continue
+                rows.append(len(vectors))
+                package_names.append(result['featureFileName'][:-4])
+                vectors.append([bool(value) for _, value in result['features']])
+            if len(rows) == 0:
+                failed += 1
+            scored[tarball_path] = rows
+        verdicts = self.predict(np.array(vectors, dtype=bool)) if len(vectors) > 0 else []
+
+        by_dataset = {}
+        with self.lock:
+            for tarball_path, rows in scored.items():
+                size, mtime_ns = self.in_flight[tarball_path]
+                entry = {'tarball': os.path.basename(tarball_path), 'size': size, 'mtime_ns': mtime_ns, 'packages': len(rows)}
+                report_rows = [(package_names[i], verdicts[i]) for i in rows]
+                by_dataset.setdefault(os.path.basename(os.path.dirname(tarball_path)), []).append((entry, report_rows))
+        for dataset_name, dataset_scored in by_dataset.items():
+            self._get_report(dataset_name).record(dataset_scored)
+        with self.lock:
+            for tarball_path in scored:
+                del self.in_flight[tarball_path]
+
+        malicious = [(package_name, verdict) for package_name, verdict in zip(package_names, verdicts) if verdict == 'malicious']
+        for package_name, verdict in malicious:
+            print(f'{package_name}: {verdict}', flush=True)
+        self.stats['tarballs'] += len(batch)
+        self.stats['packages'] += len(vectors)
+        self.stats['malicious'] += len(malicious)
+        self.stats['failed'] += failed
+
+    def _run_scorer(self):
+        """预测线程，一次取出所有提取结束的压缩文件合并预测"""
+        while True:
+            item = self.extracted.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < SCORE_BATCH_SIZE:
+                try:
+                    item = self.extracted.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self._score(batch)
+            except Exception:
+                # 出错的压缩文件不记录到评分日志，下次扫描时重新处理
+                traceback.print_exc()
+                with self.lock:
+                    for tarball_path, _ in batch:
+                        self.in_flight.pop(tarball_path, None)
+            if stop:
+                return
+
+    def print_stats(self):
+        """有新的压缩文件评分时打印统计信息"""
+        with self.lock:
+            stats = dict(self.stats, in_flight=len(self.in_flight))
+        if stats != self._printed_stats:
+            print(f"Scored {stats['tarballs']} tarballs ({stats['packages']} packages, {stats['malicious']} malicious, {stats['failed']} failed), {stats['in_flight']} in flight", flush=True)
+            self._printed_stats = stats
+
+    def run(self):
+        """扫描直到stop被调用，然后等待已提交的压缩文件处理完"""
+        # 上次中断时未删除的解压文件
+        if os.path.exists(self.scratch_path):
+            remove_dir(self.scratch_path)
+        self.pipeline.start()
+        self._scorer = threading.Thread(target=self._run_scorer)
+        self._scorer.start()
+        try:
+            while not self._stop.is_set():
+                self._poll()
+                self.print_stats()
+                self._stop.wait(self.poll_interval)
+        finally:
+            self.pipeline.close()
+            self.extracted.put(None)
+            self._scorer.join()
+            for report in self.reports.values():
+                report.close()
+            self.reports = {}
+            self.print_stats()
+        return self.pipeline.summary